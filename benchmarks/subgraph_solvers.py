@@ -0,0 +1,92 @@
+"""Compare the ``disjoint`` and ``interval`` subgraph solvers on the MS1 scan
+of ``three_test_scans.mzML``.
+
+Reports the time spent solving the clusters of the first deconvolution iteration
+with each solver alone, and then the number of peaks, the number of same-charge
+peak pairs one isotope apart (which usually come from a split envelope) and the
+wall time of the whole deconvolution with each solver.
+
+Run from the repository root::
+
+    python benchmarks/subgraph_solvers.py
+"""
+import sys
+import timeit
+
+from ms_deisotope import MSFileLoader, MSDeconVFitter, deconvolute_peaks
+from ms_deisotope.averagine import AveragineCache, peptide, isotopic_shift
+from ms_deisotope.deconvolution import AveraginePeakDependenceGraphDeconvoluter
+from ms_deisotope.test.common import datafile
+
+
+SOLVERS = ("disjoint", "interval")
+SPACING = isotopic_shift()
+
+
+def count_isotope_ladders(peaks, error_tolerance=5e-5):
+    count = 0
+    for peak in peaks:
+        for other in peaks.all_peaks_for(peak.neutral_mass + SPACING, error_tolerance):
+            if other.charge == peak.charge:
+                count += 1
+    return count
+
+
+def load_scan():
+    scan = MSFileLoader(datafile("three_test_scans.mzML")).next().precursor
+    scan.pick_peaks()
+    return scan
+
+
+def time_solvers(scan, averagine, scorer, repeats=5):
+    deconvoluter = AveraginePeakDependenceGraphDeconvoluter(
+        scan.peak_set.clone(), averagine=averagine, scorer=scorer)
+    deconvoluter.populate_graph(charge_range=(1, 8))
+    clusters = deconvoluter.peak_dependency_network.find_non_overlapping_intervals()
+    n_fits = sum(len(cluster) for cluster in clusters)
+    print("%d clusters, %d fits" % (len(clusters), n_fits))
+    solvers = {
+        "disjoint": lambda: [cluster.disjoint_best_fits() for cluster in clusters],
+        "interval": lambda: [cluster.interval_best_fits() for cluster in clusters],
+    }
+    for name in SOLVERS:
+        elapsed = min(timeit.repeat(solvers[name], number=1, repeat=repeats))
+        selected = sum(len(fits) for fits in solvers[name]())
+        print("%-9s solve %8.2f ms  %5d fits selected" % (name, elapsed * 1e3, selected))
+
+
+def run_deconvolution(scan, averagine, scorer, use_subtraction=True, repeats=3):
+    for name in SOLVERS:
+        config = {
+            "averagine": averagine,
+            "scorer": scorer,
+            "subgraph_solver": name,
+            "use_subtraction": use_subtraction,
+        }
+
+        def run():
+            return deconvolute_peaks(scan.peak_set.clone(), config, charge_range=(1, 8)).peak_set
+
+        elapsed = min(timeit.repeat(run, number=1, repeat=repeats))
+        peaks = run()
+        print("%-9s total %8.2f ms  %5d peaks  %4d ladders  %.1f score" % (
+            name, elapsed * 1e3, len(peaks), count_isotope_ladders(peaks),
+            sum(peak.score for peak in peaks)))
+
+
+def main():
+    scan = load_scan()
+    averagine = AveragineCache(peptide)
+    scorer = MSDeconVFitter(10.)
+    # Warm the cache so neither solver pays for populating it
+    deconvolute_peaks(scan.peak_set.clone(), {"averagine": averagine, "scorer": scorer},
+                      charge_range=(1, 8))
+    time_solvers(scan, averagine, scorer)
+    for use_subtraction in (True, False):
+        print("use_subtraction=%r" % (use_subtraction, ))
+        run_deconvolution(scan, averagine, scorer, use_subtraction)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
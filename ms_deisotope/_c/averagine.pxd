@@ -52,6 +52,9 @@ cdef class TheoreticalIsotopicPattern(object):
     @cython.final
     cdef inline TheoreticalIsotopicPattern _scale(self, list experimental_distribution, str method=*)
 
+    @cython.final
+    cdef TheoreticalIsotopicPattern _scale_intensities(self, double* experimental_intensities, str method=*)
+
     @cython.final
     cdef inline TheoreticalIsotopicPattern clone_shift(self, double mz)
 
@@ -75,6 +78,19 @@ cdef class TheoreticalIsotopicPattern(object):
     cdef TheoreticalIsotopicPattern clone_drop_last(self)
 
 
+cdef class AveragineTable(object):
+    cdef:
+        public Averagine averagine
+        public double step_size
+        public double truncate_after
+        public list rows
+
+    cdef double _max_mass(self)
+    cdef size_t _populate_rows(self, double max_mass)
+    cdef TheoreticalIsotopicPattern _isotopic_cluster(self, double mz, int charge=*, double charge_carrier=*, double truncate_after=*, double ignore_below=*)
+    cpdef TheoreticalIsotopicPattern isotopic_cluster(self, double mz, int charge=*, double charge_carrier=*, double truncate_after=*, double ignore_below=*)
+
+
 @cython.final
 cdef class AveragineCache(object):
     cdef:
@@ -82,9 +98,29 @@ cdef class AveragineCache(object):
         public Averagine averagine
         public double cache_truncation
         public bint enabled
+        public object snapshot
+        public AveragineTable table
+        public Py_ssize_t max_size
+        public Py_ssize_t max_bytes
+        public Py_ssize_t current_bytes
+        public size_t hits
+        public size_t misses
+        public size_t evictions
+        public double generation_time
 
     cdef double _make_cache_key(self, double mz)
 
+    cdef Py_ssize_t _estimate_size(self, tuple key, TheoreticalIsotopicPattern tid)
+    cdef void _evict(self) except *
+    cdef void _store(self, tuple cache_key, TheoreticalIsotopicPattern tid) except *
+
+    cpdef list _missing_pairs(self, int min_mz, int max_mz, int min_charge, int max_charge,
+                              double charge_carrier, double truncate_after)
+
+    cdef TheoreticalIsotopicPattern _get_table_pattern(self, double mz, int charge, double charge_carrier, double truncate_after, double ignore_below)
+    cdef TheoreticalIsotopicPattern _get_stored_pattern(self, double mz, int charge=*, double charge_carrier=*, double truncate_after=*, double ignore_below=*)
+    cdef TheoreticalIsotopicPattern _get_pattern_for_key(self, tuple cache_key, double key_mz, int charge, double charge_carrier, double truncate_after, double ignore_below)
+
     cdef TheoreticalIsotopicPattern has_mz_charge_pair(self, double mz, int charge=*, double charge_carrier=*, double truncate_after=*, double ignore_below=*)
     cpdef TheoreticalIsotopicPattern isotopic_cluster(self, double mz, int charge=*, double charge_carrier=*, double truncate_after=*, double ignore_below=*)
 
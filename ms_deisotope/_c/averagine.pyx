@@ -7,11 +7,14 @@ from cpython.float cimport PyFloat_AsDouble
 from cpython.list cimport (
     PyList_New, PyList_GET_ITEM, PyList_SET_ITEM,
     PyList_GET_SIZE, PyList_Append, PyList_SetItem)
-from cpython.dict cimport PyDict_Next, PyDict_SetItem, PyDict_GetItem
+from cpython.dict cimport PyDict_Next, PyDict_SetItem, PyDict_GetItem, PyDict_DelItem, PyDict_Size
 
 from libc.math cimport floor
 from libc.stdlib cimport malloc, free
 
+import sys
+import time
+
 from brainpy import PROTON as _PROTON, isotopic_variants, calculate_mass as _py_calculate_mass
 from brainpy._c.isotopic_distribution cimport _isotopic_variants
 from brainpy._c.isotopic_distribution cimport TheoreticalPeak
@@ -245,6 +248,16 @@ cdef class Averagine(object):
     def __repr__(self):
         return "Averagine(%r)" % self.base_composition
 
+    def fingerprint(self):
+        """Describe the parameters which determine the isotopic patterns this model
+        produces, as used by :func:`~.deconvolution_cache_key`.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, tuple(sorted(self.base_composition.items())))
+
     def __richcmp__(self, other, int code):
         if code == 2:
             return self.base_composition == other.base_composition
@@ -270,18 +283,17 @@ cdef list clone_peak_list(list peaklist):
     return result
 
 
-cdef double sum_intensity(list peaklist, size_t n):
+cdef double sum_intensity(double* intensities, size_t n):
     cdef:
         size_t i
         double total
-        FittedPeak peak
     total = 0
     for i in range(n):
-        total += (<FittedPeak>PyList_GET_ITEM(peaklist, i)).intensity
+        total += intensities[i]
     return total
 
 
-cdef double top3_scale_factor(TheoreticalIsotopicPattern self, list experimental_distribution):
+cdef double top3_scale_factor(TheoreticalIsotopicPattern self, double* experimental_intensities):
     cdef:
         double top1, top2, top3, scale
         size_t i, n, top1_index, top2_index, top3_index
@@ -312,9 +324,9 @@ cdef double top3_scale_factor(TheoreticalIsotopicPattern self, list experimental
             top3 = peak.intensity
             top3_index = i
 
-    scale = (<FittedPeak>PyList_GET_ITEM(experimental_distribution, top1_index)).intensity / self.get(top1_index).intensity
-    scale += (<FittedPeak>PyList_GET_ITEM(experimental_distribution, top2_index)).intensity / self.get(top2_index).intensity
-    scale += (<FittedPeak>PyList_GET_ITEM(experimental_distribution, top3_index)).intensity / self.get(top3_index).intensity
+    scale = experimental_intensities[top1_index] / self.get(top1_index).intensity
+    scale += experimental_intensities[top2_index] / self.get(top2_index).intensity
+    scale += experimental_intensities[top3_index] / self.get(top3_index).intensity
     scale /= 3
     return scale
 
@@ -569,18 +581,48 @@ cdef class TheoreticalIsotopicPattern(object):
     @cython.final
     @cython.cdivision
     cdef inline TheoreticalIsotopicPattern _scale(self, list experimental_distribution, str method="sum"):
+        cdef:
+            size_t i, n
+            double[16] stack_buffer
+            double* intensities
+
+        n = self.get_size()
+        if n == 0:
+            raise ValueError("Isotopic Pattern has length 0 (%f, %r)" % (self.origin, self.peaklist))
+        # One extra slot because the "basepeak" method may look one peak past the end
+        if n < 16:
+            intensities = stack_buffer
+        else:
+            intensities = <double*>malloc(sizeof(double) * (n + 1))
+            if intensities == NULL:
+                raise MemoryError()
+        for i in range(n):
+            intensities[i] = (<FittedPeak>PyList_GET_ITEM(experimental_distribution, i)).intensity
+        intensities[n] = 0
+        try:
+            return self._scale_intensities(intensities, method)
+        finally:
+            if intensities != stack_buffer:
+                free(intensities)
+
+    @cython.final
+    @cython.cdivision
+    cdef TheoreticalIsotopicPattern _scale_intensities(self, double* experimental_intensities, str method="sum"):
+        """Scale this pattern as :meth:`scale` does, reading the matched experimental
+        intensities from a raw buffer with one entry per theoretical peak rather than
+        from a list of :class:`~.FittedPeak` objects.
+        """
         cdef:
             size_t i, j, n
             TheoreticalPeak peak
-            FittedPeak expeak
-            double total_abundance, maximum, scale_factor
+            double total_abundance, maximum, scale_factor, expeak_intensity
             double weights, scales, w
 
         n = self.get_size()
         if n == 0:
             raise ValueError("Isotopic Pattern has length 0 (%f, %r)" % (self.origin, self.peaklist))
         if method == "sum":
-            total_abundance = sum_intensity(experimental_distribution, n)
+            total_abundance = sum_intensity(experimental_intensities, n)
             for i in range(n):
                 (<TheoreticalPeak>self.get(i)).intensity *= total_abundance
         elif method == "max":
@@ -591,8 +633,7 @@ cdef class TheoreticalIsotopicPattern(object):
                 if peak.intensity > maximum:
                     maximum = peak.intensity
                     j = i
-            scale_factor = (<FittedPeak>PyList_GET_ITEM(
-                experimental_distribution, i)).intensity / maximum
+            scale_factor = experimental_intensities[i] / maximum
             for j in range(n):
                 peak = self.get(j)
                 peak.intensity *= scale_factor
@@ -601,11 +642,11 @@ cdef class TheoreticalIsotopicPattern(object):
             weights = 0
             total_abundance = 0
             for i in range(n):
-                expeak = <FittedPeak>PyList_GET_ITEM(experimental_distribution, i)
+                expeak_intensity = experimental_intensities[i]
                 peak = self.get(i)
-                total_abundance += expeak.intensity
-                w = (peak.intensity * expeak.intensity ** 2)
-                scales += expeak.intensity / peak.intensity * w
+                total_abundance += expeak_intensity
+                w = (peak.intensity * expeak_intensity ** 2)
+                scales += expeak_intensity / peak.intensity * w
                 weights += w
             scale_factor = scales / weights
             for i in range(n):
@@ -614,22 +655,19 @@ cdef class TheoreticalIsotopicPattern(object):
         elif method == 'basepeak':
             i = 1
             j = self.basepeak_index()
-            scale_factor =  (<FittedPeak>PyList_GET_ITEM(
-                experimental_distribution, j)).intensity / self.get(j).intensity
+            scale_factor = experimental_intensities[j] / self.get(j).intensity
             if j < n:
-                scale_factor += (<FittedPeak>PyList_GET_ITEM(
-                                experimental_distribution, j + 1)).intensity / self.get(j + 1).intensity
+                scale_factor += experimental_intensities[j + 1] / self.get(j + 1).intensity
                 i += 1
             if j > 0:
-                scale_factor += (<FittedPeak>PyList_GET_ITEM(
-                                experimental_distribution, j - 1)).intensity / self.get(j - 1).intensity
+                scale_factor += experimental_intensities[j - 1] / self.get(j - 1).intensity
                 i += 1
             scale_factor /= i
             for i in range(n):
                 peak = self.get(i)
                 peak.intensity *= scale_factor
         elif method == 'top3':
-            scale_factor = top3_scale_factor(self, experimental_distribution)
+            scale_factor = top3_scale_factor(self, experimental_intensities)
             for i in range(n):
                 peak = self.get(i)
                 peak.intensity *= scale_factor
@@ -822,6 +860,186 @@ cdef class TheoreticalIsotopicPattern(object):
         return accumulator
 
 
+cdef class AveragineTable(object):
+    """A table of isotopic pattern shapes sampled on a regular neutral mass grid,
+    shared across all charge states.
+
+    The shape of an averagine isotopic pattern depends only on its neutral mass,
+    so rather than generating a new pattern for every (m/z, charge) pair, this table
+    linearly interpolates the peak offsets and intensities of the two grid points
+    bracketing the requested neutral mass and places the result at the requested m/z.
+    Grid points are generated lazily as larger masses are requested.
+
+    The interpolated intensities differ from those of :meth:`Averagine.isotopic_cluster`
+    by up to about one percent of the total intensity, so when the cumulative intensity
+    of the exact pattern is that close to ``truncate_after`` at one of its peaks, the interpolated pattern may
+    keep one peak more or one peak fewer than the exact pattern.
+
+    Attributes
+    ----------
+    averagine : :class:`Averagine`
+        The averagine model used to generate the grid patterns
+    step_size : float
+        The spacing between grid points in Daltons
+    truncate_after : float
+        The fraction of the isotopic signal retained in each grid pattern. Any
+        ``truncate_after`` requested from :meth:`isotopic_cluster` is applied on
+        top of this.
+    rows : list of :class:`TheoreticalIsotopicPattern`
+        The grid patterns at charge 1. The pattern for neutral mass ``(i + 1) * step_size``
+        is stored at index ``i``.
+    """
+
+    def __init__(self, averagine, double step_size=10.0, double truncate_after=0.9999):
+        if isinstance(averagine, AveragineCache):
+            averagine = averagine.averagine
+        self.averagine = Averagine(averagine)
+        self.step_size = step_size
+        self.truncate_after = truncate_after
+        self.rows = []
+
+    def __reduce__(self):
+        return self.__class__, (self.averagine, self.step_size, self.truncate_after)
+
+    def __repr__(self):
+        return "%s(%r, %r)" % (self.__class__.__name__, self.averagine, self.step_size)
+
+    def fingerprint(self):
+        """Describe the parameters which determine the isotopic patterns this table
+        produces, as used by :func:`~.deconvolution_cache_key`.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, self.averagine, self.step_size, self.truncate_after)
+
+    def __len__(self):
+        return PyList_GET_SIZE(self.rows)
+
+    cdef double _max_mass(self):
+        return PyList_GET_SIZE(self.rows) * self.step_size
+
+    cdef size_t _populate_rows(self, double max_mass):
+        cdef:
+            size_t i
+            double mass
+        i = 0
+        while self._max_mass() <= max_mass:
+            mass = self._max_mass() + self.step_size
+            PyList_Append(self.rows, self.averagine._isotopic_cluster(
+                mass_charge_ratio(mass, 1, PROTON), 1, PROTON, self.truncate_after, 0.0))
+            i += 1
+        return i
+
+    def populate(self, double max_mass):
+        """Generate all grid points up to ``max_mass``.
+
+        Parameters
+        ----------
+        max_mass : float
+            The largest neutral mass to cover
+
+        Returns
+        -------
+        :class:`AveragineTable`
+            self
+        """
+        self._populate_rows(max_mass)
+        return self
+
+    @cython.cdivision
+    cdef TheoreticalIsotopicPattern _isotopic_cluster(self, double mz, int charge=1, double charge_carrier=PROTON,
+                                                      double truncate_after=0.95, double ignore_below=0.0):
+        cdef:
+            double mass, position, weight, total, offset, intensity, z
+            double lower_offset, upper_offset, lower_intensity, upper_intensity
+            size_t index, i, n_lower, n_upper, n
+            TheoreticalIsotopicPattern lower, upper, tid
+            TheoreticalPeak peak
+            list peaklist
+
+        mass = neutral_mass(mz, charge, charge_carrier)
+        position = mass / self.step_size
+        if position < 1:
+            return self.averagine._isotopic_cluster(mz, charge, charge_carrier, truncate_after, ignore_below)
+        index = <size_t>position
+        if mass >= self._max_mass():
+            self._populate_rows(mass)
+        weight = position - index
+        lower = <TheoreticalIsotopicPattern>PyList_GET_ITEM(self.rows, index - 1)
+        upper = <TheoreticalIsotopicPattern>PyList_GET_ITEM(self.rows, index)
+        n_lower = lower.get_size()
+        n_upper = upper.get_size()
+        n = n_lower if n_lower > n_upper else n_upper
+        z = abs(charge)
+        peaklist = PyList_New(n)
+        total = 0.0
+        lower_offset = upper_offset = 0.0
+        lower_intensity = upper_intensity = 0.0
+        for i in range(n):
+            if i < n_lower:
+                peak = lower.get(i)
+                lower_offset = peak.mz - lower.origin
+                lower_intensity = peak.intensity
+            if i < n_upper:
+                peak = upper.get(i)
+                upper_offset = peak.mz - upper.origin
+                upper_intensity = peak.intensity
+            if i >= n_lower:
+                lower_offset = upper_offset
+                lower_intensity = 0.0
+            if i >= n_upper:
+                upper_offset = lower_offset
+                upper_intensity = 0.0
+            offset = lower_offset + (upper_offset - lower_offset) * weight
+            intensity = lower_intensity + (upper_intensity - lower_intensity) * weight
+            total += intensity
+            peak = TheoreticalPeak._create(mz + offset / z, intensity, charge)
+            Py_INCREF(peak)
+            PyList_SET_ITEM(peaklist, i, peak)
+        for i in range(n):
+            peak = <TheoreticalPeak>PyList_GET_ITEM(peaklist, i)
+            peak.intensity /= total
+        tid = TheoreticalIsotopicPattern._create(peaklist, mz, 0)
+        if truncate_after < 1.0:
+            tid.truncate_after(truncate_after)
+        if ignore_below > 0:
+            tid.ignore_below(ignore_below)
+        return tid
+
+    cpdef TheoreticalIsotopicPattern isotopic_cluster(self, double mz, int charge=1, double charge_carrier=PROTON,
+                                                      double truncate_after=0.95, double ignore_below=0.0):
+        """Interpolate a theoretical isotopic pattern for the given m/z and charge state, thresholded
+        by theoretical peak height and density.
+
+        Mimics :meth:`Averagine.isotopic_cluster`. Neutral masses below the first grid
+        point are generated directly from :attr:`averagine`.
+
+        Parameters
+        ----------
+        mz : float
+            The reference m/z to calculate the neutral mass to interpolate from
+        charge : int, optional
+            The reference charge state to calculate the neutral mass. Defaults to 1
+        charge_carrier : float, optional
+            The mass of the charge carrier. Defaults to the mass of a proton.
+        truncate_after : float, optional
+            The percentage of the signal in the theoretical isotopic pattern to include.
+        ignore_below : float, optional
+            Omit theoretical peaks whose intensity is below this number.
+
+        Returns
+        -------
+        :class:`TheoreticalIsotopicPattern`
+        """
+        return self._isotopic_cluster(mz, charge, charge_carrier, truncate_after, ignore_below)
+
+    def __call__(self, double mz, int charge=1, double charge_carrier=PROTON, double truncate_after=0.95,
+                 double ignore_below=0.0):
+        return self._isotopic_cluster(mz, charge, charge_carrier, truncate_after, ignore_below)
+
+
 cdef class AveragineCache(object):
     """A wrapper around a :class:`Averagine` instance which will cache isotopic patterns
     produced for new (m/z, charge) pairs and reuses it for nearby m/z values
@@ -832,32 +1050,144 @@ cdef class AveragineCache(object):
         The averagine to use to generate new isotopic patterns
     cache_truncation : float
         Number of decimal places to round off the m/z for caching purposes
+    snapshot : :class:`~.AveragineCacheSnapshot`
+        A read-only, memory-mapped table of pre-computed patterns consulted
+        before generating a new pattern. May be :const:`None`.
+    max_size : int
+        The maximum number of patterns to keep in :attr:`backend`. When exceeded,
+        the least recently used pattern is evicted. ``0`` means no limit.
+    max_bytes : int
+        The approximate maximum number of bytes of patterns to keep in :attr:`backend`.
+        When exceeded, the least recently used pattern is evicted. ``0`` means no limit.
+    current_bytes : int
+        The approximate number of bytes used by patterns in :attr:`backend`. Only
+        tracked when :attr:`max_bytes` is set.
+    hits : int
+        The number of requests served without generating a new pattern, including
+        those interpolated from existing :attr:`table` grid points
+    misses : int
+        The number of requests which required generating a new pattern, including
+        those which required new :attr:`table` grid points
+    evictions : int
+        The number of patterns evicted to stay within :attr:`max_size` or :attr:`max_bytes`
+    generation_time : float
+        The total time in seconds spent generating new patterns
+    table : :class:`AveragineTable`
+        An interpolated pattern table used in place of :attr:`backend` and
+        :attr:`averagine` when set. May be :const:`None`.
     """
 
-    def __init__(self, object averagine, object backend=None, double cache_truncation=1.):
+    def __init__(self, object averagine, object backend=None, double cache_truncation=1., object snapshot=None,
+                 object max_size=None, object max_bytes=None):
         if backend is None:
             backend = {}
         self.backend = dict(backend)
+        self.table = None
         if isinstance(averagine, AveragineCache):
             self.averagine = averagine.averagine
             self.cache_truncation = averagine.cache_truncation
             self.backend = averagine.backend.copy()
+            self.table = averagine.table
+            if snapshot is None:
+                snapshot = averagine.snapshot
+            if max_size is None:
+                max_size = averagine.max_size
+            if max_bytes is None:
+                max_bytes = averagine.max_bytes
         else:
             self.averagine = Averagine(averagine)
         self.cache_truncation = cache_truncation
         self.enabled = True
+        if snapshot is not None:
+            from ms_deisotope.averagine import AveragineCacheSnapshot
+            if not isinstance(snapshot, AveragineCacheSnapshot):
+                snapshot = AveragineCacheSnapshot(snapshot)
+        self.snapshot = snapshot
+        self.max_size = max_size or 0
+        self.max_bytes = max_bytes or 0
+        self.current_bytes = 0
+        if self.max_bytes:
+            for key, tid in self.backend.items():
+                self.current_bytes += self._estimate_size(key, tid)
+        self.reset_statistics()
+        self._evict()
 
     def __reduce__(self):
-        return self.__class__, self.__getstate__()
+        return self.__class__, (self.averagine, self.backend, self.cache_truncation, self.snapshot,
+                                self.max_size, self.max_bytes), self.__getstate__()
 
     def __getstate__(self):
-        return self.averagine, self.backend, self.cache_truncation
+        return (self.averagine, self.backend, self.cache_truncation, self.snapshot,
+                self.max_size, self.max_bytes, self.table)
 
     def __setstate__(self, state):
-        avg, store, trunc = state
+        avg, store, trunc, snapshot, max_size, max_bytes, table = state
         self.averagine = Averagine(avg)
-        self.store = dict(store)
+        self.backend = dict(store)
         self.cache_truncation = trunc
+        self.snapshot = snapshot
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.table = table
+
+    cdef Py_ssize_t _estimate_size(self, tuple key, TheoreticalIsotopicPattern tid):
+        cdef:
+            Py_ssize_t size
+            size_t i
+        size = sys.getsizeof(key) + sys.getsizeof(tid) + sys.getsizeof(tid.peaklist)
+        for i in range(tid.get_size()):
+            size += sys.getsizeof(tid.get(i))
+        return size
+
+    cdef void _evict(self) except *:
+        cdef:
+            Py_ssize_t pos
+            PyObject* pkey
+            PyObject* pvalue
+            tuple key
+        while PyDict_Size(self.backend) > 1 and (
+                (self.max_size and PyDict_Size(self.backend) > self.max_size) or
+                (self.max_bytes and self.current_bytes > self.max_bytes)):
+            pos = 0
+            PyDict_Next(self.backend, &pos, &pkey, &pvalue)
+            key = <tuple>pkey
+            if self.max_bytes:
+                self.current_bytes -= self._estimate_size(key, <TheoreticalIsotopicPattern>pvalue)
+            PyDict_DelItem(self.backend, key)
+            self.evictions += 1
+
+    cdef void _store(self, tuple cache_key, TheoreticalIsotopicPattern tid) except *:
+        PyDict_SetItem(self.backend, cache_key, tid)
+        if self.max_bytes:
+            self.current_bytes += self._estimate_size(cache_key, tid)
+        if self.max_size or self.max_bytes:
+            self._evict()
+
+    def reset_statistics(self):
+        """Reset :attr:`hits`, :attr:`misses`, :attr:`evictions` and :attr:`generation_time`.
+        """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation_time = 0.0
+
+    def statistics(self):
+        """Summarize how effective this cache has been.
+
+        Returns
+        -------
+        dict
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "generation_time": self.generation_time,
+            "hit_rate": self.hits / float(total) if total else 0.0,
+            "size": len(self.backend),
+            "bytes": self.current_bytes,
+        }
 
     @cython.cdivision
     cdef double _make_cache_key(self, double mz):
@@ -871,32 +1201,84 @@ cdef class AveragineCache(object):
     def make_cache_key(self, double mz):
         return self._make_cache_key(mz)
 
-    @cython.cdivision
-    cdef TheoreticalIsotopicPattern has_mz_charge_pair(self, double mz, int charge=1, double charge_carrier=PROTON, double truncate_after=0.95,
-                                 double ignore_below=0.0):
+    cdef TheoreticalIsotopicPattern _get_table_pattern(self, double mz, int charge, double charge_carrier,
+                                                       double truncate_after, double ignore_below):
+        cdef:
+            double mass
+            TheoreticalIsotopicPattern tid
+        mass = neutral_mass(mz, charge, charge_carrier)
+        if self.table.step_size <= mass < self.table._max_mass():
+            self.hits += 1
+            return self.table._isotopic_cluster(mz, charge, charge_carrier, truncate_after, ignore_below)
+        # The table has to generate new grid points, or the pattern itself below the grid
+        self.misses += 1
+        start = time.time()
+        tid = self.table._isotopic_cluster(mz, charge, charge_carrier, truncate_after, ignore_below)
+        self.generation_time += time.time() - start
+        return tid
+
+    cdef TheoreticalIsotopicPattern _get_stored_pattern(self, double mz, int charge=1, double charge_carrier=PROTON,
+                                                        double truncate_after=0.95, double ignore_below=0.0):
         cdef:
             double key_mz
             tuple cache_key
+
+        if self.table is not None:
+            return self._get_table_pattern(mz, charge, charge_carrier, truncate_after, ignore_below)
+        key_mz = self._make_cache_key(mz)
+
+        # Attempting to replace this tuple construction (which in turn necessitates packing each
+        # numeric argument as a Python object) with a hand-written extension class that can compute
+        # its own hash value without invoking any Python operations turns out to be just a bit slower
+        # than the bare tuple itself.
+        cache_key = (key_mz, charge, charge_carrier, truncate_after)
+        return self._get_pattern_for_key(cache_key, key_mz, charge, charge_carrier, truncate_after, ignore_below)
+
+    cdef TheoreticalIsotopicPattern _get_pattern_for_key(self, tuple cache_key, double key_mz, int charge,
+                                                         double charge_carrier, double truncate_after,
+                                                         double ignore_below):
+        # Look up or generate the stored pattern for a key built by :meth:`_get_stored_pattern`,
+        # letting callers which query several caches with the same cache truncation share a key
+        cdef:
             PyObject* pvalue
+            object stored
             TheoreticalIsotopicPattern tid
-        if self.enabled:
-            key_mz = self._make_cache_key(mz)
-
-            # Attempting to replace this tuple construction (which in turn necessitates packing each
-            # numeric argument as a Python object) with a hand-written extension class that can compute
-            # its own hash value without invoking any Python operations turns out to be just a bit slower
-            # than the bare tuple itself.
-            cache_key = (key_mz, charge, charge_carrier, truncate_after)
-            pvalue = PyDict_GetItem(self.backend, cache_key)
-            if pvalue == NULL:
-                tid = self.averagine._isotopic_cluster(key_mz, charge, charge_carrier, truncate_after, ignore_below)
-                PyDict_SetItem(self.backend, cache_key, tid.clone())
-                tid.shift(mz)
-                return tid
-            else:
-                tid = <TheoreticalIsotopicPattern>pvalue
-                tid = tid.clone_shift(mz)
+
+        pvalue = PyDict_GetItem(self.backend, cache_key)
+        if pvalue != NULL:
+            self.hits += 1
+            tid = <TheoreticalIsotopicPattern>pvalue
+            if self.max_size or self.max_bytes:
+                # Re-insert the key to mark it as the most recently used
+                PyDict_DelItem(self.backend, cache_key)
+                PyDict_SetItem(self.backend, cache_key, tid)
+            return tid
+        if self.snapshot is not None:
+            stored = self.snapshot.get(cache_key, TheoreticalIsotopicPattern)
+            if stored is not None:
+                self.hits += 1
+                tid = <TheoreticalIsotopicPattern>stored
+                # Only keep a private copy of snapshot patterns when the backend is bounded,
+                # otherwise every process would rebuild the whole table the snapshot shares.
+                if self.max_size or self.max_bytes:
+                    self._store(cache_key, tid)
                 return tid
+        self.misses += 1
+        start = time.time()
+        tid = self.averagine._isotopic_cluster(key_mz, charge, charge_carrier, truncate_after, ignore_below)
+        self.generation_time += time.time() - start
+        self._store(cache_key, tid)
+        return tid
+
+    cdef TheoreticalIsotopicPattern has_mz_charge_pair(self, double mz, int charge=1, double charge_carrier=PROTON, double truncate_after=0.95,
+                                 double ignore_below=0.0):
+        cdef:
+            TheoreticalIsotopicPattern tid
+        if self.table is not None:
+            return self._get_table_pattern(mz, charge, charge_carrier, truncate_after, ignore_below)
+        if self.enabled:
+            tid = self._get_stored_pattern(mz, charge, charge_carrier, truncate_after, ignore_below)
+            return tid.clone_shift(mz)
         else:
             tid = self.averagine._isotopic_cluster(mz, charge, charge_carrier, truncate_after)
             return tid
@@ -955,17 +1337,190 @@ cdef class AveragineCache(object):
     def __repr__(self):
         return "AveragineCache(%r)" % self.averagine
 
+    def fingerprint(self):
+        """Describe the parameters which determine the isotopic patterns this cache
+        produces, as used by :func:`~.deconvolution_cache_key`.
+
+        The stored patterns, :attr:`snapshot` and the bounds on the size of the cache
+        only change how quickly patterns are produced, and are not included.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, self.averagine, self.cache_truncation, self.table)
+
     def clear(self):
         self.backend.clear()
+        self.current_bytes = 0
 
-    def populate(self, min_mz=10, max_mz=3000, min_charge=1, max_charge=8, charge_carrier=PROTON,
-                 truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW):
-        for i in range(int(min_mz), int(max_mz)):
+    cpdef list _missing_pairs(self, int min_mz, int max_mz, int min_charge, int max_charge,
+                              double charge_carrier, double truncate_after):
+        cdef:
+            int i, j
+            double key_mz
+            tuple key
+            object snapshot
+            list pairs
+        snapshot = self.snapshot
+        pairs = []
+        for i in range(min_mz, max_mz):
+            key_mz = self._make_cache_key(i)
             for j in range(min(max_charge, min_charge), max(min_charge, max_charge)):
-                self.isotopic_cluster(
-                    i, j, charge_carrier, truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW)
+                key = (key_mz, j, charge_carrier, truncate_after)
+                if PyDict_GetItem(self.backend, key) != NULL or (snapshot is not None and key in snapshot):
+                    continue
+                pairs.append((i, j))
+        return pairs
+
+    def populate(self, min_mz=10, max_mz=3000, min_charge=1, max_charge=8, charge_carrier=PROTON,
+                 truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW, processes=1):
+        """Pre-compute the isotopic patterns for every integer m/z in ``[min_mz, max_mz)``
+        and charge state in ``[min_charge, max_charge)``.
+
+        Entries already present in :attr:`backend` or :attr:`snapshot` are not recomputed,
+        so an existing cache can be extended to a wider m/z or charge window cheaply.
+
+        If :attr:`table` is set, its grid is extended to cover the same neutral masses instead.
+
+        Parameters
+        ----------
+        min_mz : int, optional
+            The lowest m/z to populate
+        max_mz : int, optional
+            The m/z to stop populating at
+        min_charge : int, optional
+            The lowest charge state to populate
+        max_charge : int, optional
+            The charge state to stop populating at
+        charge_carrier : float, optional
+            The mass of the charge carrier. Defaults to the mass of a proton.
+        truncate_after : float, optional
+            The percentage of the signal in the theoretical isotopic pattern to include.
+        ignore_below : float, optional
+            Omit theoretical peaks whose intensity is below this number.
+        processes : int, optional
+            The number of worker processes to generate patterns with. Defaults to 1,
+            generating patterns in this process.
+
+        Returns
+        -------
+        :class:`AveragineCache`
+            self
+        """
+        if self.table is not None:
+            start = time.time()
+            self.misses += self.table._populate_rows(neutral_mass(
+                max_mz, max(abs(min_charge), abs(max_charge)), charge_carrier))
+            self.generation_time += time.time() - start
+            return self
+        pairs = self._missing_pairs(
+            int(min_mz), int(max_mz), min_charge, max_charge, charge_carrier, truncate_after)
+        if processes > 1 and len(pairs) > processes:
+            from ms_deisotope.averagine import _populate_in_parallel
+            for key, tid in _populate_in_parallel(
+                    self.averagine.base_composition, self.cache_truncation, pairs,
+                    charge_carrier, truncate_after, ignore_below, processes):
+                if PyDict_GetItem(self.backend, key) == NULL:
+                    self.misses += 1
+                    self._store(key, tid)
+        else:
+            for i, j in pairs:
+                self._get_stored_pattern(i, j, charge_carrier, truncate_after, ignore_below)
         return self
 
+    def save_snapshot(self, path):
+        """Write every pattern in this cache, including those only present in
+        :attr:`snapshot`, to a memory-mappable snapshot file at ``path``.
+
+        Parameters
+        ----------
+        path : str
+            The path to write the snapshot to
+
+        Returns
+        -------
+        :class:`~.AveragineCacheSnapshot`
+
+        See Also
+        --------
+        :meth:`from_snapshot`
+        """
+        from ms_deisotope.averagine import AveragineCacheSnapshot
+        backend = {}
+        if self.snapshot is not None:
+            for key in self.snapshot.keys():
+                backend[key] = self.snapshot.get(key, TheoreticalIsotopicPattern)
+        backend.update(self.backend)
+        AveragineCacheSnapshot.write(
+            path, self.averagine.base_composition, self.cache_truncation, backend)
+        return AveragineCacheSnapshot(path)
+
+    def attach_snapshot(self, snapshot):
+        """Use ``snapshot`` as a read-only source of pre-computed patterns.
+
+        Parameters
+        ----------
+        snapshot : :class:`~.AveragineCacheSnapshot` or :class:`str`
+            The snapshot, or the path to a snapshot file
+
+        Returns
+        -------
+        :class:`AveragineCache`
+            self
+        """
+        from ms_deisotope.averagine import AveragineCacheSnapshot
+        if not isinstance(snapshot, AveragineCacheSnapshot):
+            snapshot = AveragineCacheSnapshot(snapshot)
+        if snapshot.cache_truncation != self.cache_truncation:
+            raise ValueError("Snapshot cache truncation %r does not match %r" % (
+                snapshot.cache_truncation, self.cache_truncation))
+        self.snapshot = snapshot
+        return self
+
+    def use_table(self, table=None, double step_size=10.0):
+        """Interpolate patterns from a neutral mass grid instead of generating
+        and caching one pattern per (m/z, charge) pair.
+
+        Parameters
+        ----------
+        table : :class:`AveragineTable`, optional
+            The table to use. If omitted, a new table is built from :attr:`averagine`.
+            Passing :const:`False` disables the table.
+        step_size : float, optional
+            The grid spacing in Daltons of a newly built table
+
+        Returns
+        -------
+        :class:`AveragineCache`
+            self
+        """
+        if table is None:
+            table = AveragineTable(self.averagine, step_size)
+        elif table is False:
+            table = None
+        self.table = table
+        return self
+
+    @classmethod
+    def from_snapshot(cls, path):
+        """Create a new :class:`AveragineCache` whose :class:`Averagine` and
+        cached patterns are read from the snapshot at ``path``.
+
+        Parameters
+        ----------
+        path : str
+            The path to a snapshot written by :meth:`save_snapshot`
+
+        Returns
+        -------
+        :class:`AveragineCache`
+        """
+        from ms_deisotope.averagine import AveragineCacheSnapshot
+        snapshot = AveragineCacheSnapshot(path)
+        return cls(snapshot.base_composition, cache_truncation=snapshot.cache_truncation,
+                   snapshot=snapshot)
+
 
 cdef double _neutron_shift
 _neutron_shift = _py_calculate_mass({"C[13]": 1}) - _py_calculate_mass({"C[12]": 1})
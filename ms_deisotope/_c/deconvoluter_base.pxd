@@ -22,6 +22,28 @@ ctypedef fused FittedPeakOrPosition:
     long
 
 
+@cython.final
+cdef class PeakSetArrays(object):
+    cdef:
+        public PeakSet peaklist
+        public np.ndarray mz
+        public np.ndarray intensity
+        public np.ndarray signal_to_noise
+        public np.ndarray index
+        public size_t size
+        public bint nearest_match
+        double* _mz
+        double* _intensity
+        double* _signal_to_noise
+
+    cdef Py_ssize_t _has_peak(self, double mz, double error_tolerance) nogil
+    cdef Py_ssize_t _nearest_ppm_error(self, double mz, double error_tolerance) nogil
+    cdef Py_ssize_t _sweep_ppm_error(self, double mz, size_t lo, size_t hi, double error_tolerance) nogil
+    cdef void _between_bounds(self, double m1, double m2, size_t* start, size_t* stop) nogil
+    cdef FittedPeak getitem(self, size_t i)
+    cpdef refresh(self, size_t i)
+
+
 cdef class DeconvoluterBase(object):
     cdef:
         public bint use_subtraction
@@ -34,6 +56,18 @@ cdef class DeconvoluterBase(object):
         public IsotopicFitterBase scorer
         public bint verbose
         public dict _slice_cache
+        public object _quick_charge_table
+        public object _quick_charge_stale
+        public bint use_peak_arrays
+        public PeakSetArrays _peak_arrays
+        public bint prune_candidates
+        public size_t pruned_by_peak_count
+        public size_t pruned_by_score
+
+    cdef PeakSetArrays _get_peak_arrays(self)
+
+    cpdef _mark_quick_charge_stale(self, FittedPeak peak)
+    cpdef bint _quick_charge_row_stale(self, FittedPeak peak)
 
     cpdef PeakSet between(self, double m1, double m2)
     cpdef FittedPeak has_peak(self, double mz, double error_tolerance)
@@ -42,6 +76,10 @@ cdef class DeconvoluterBase(object):
     cpdef list match_theoretical_isotopic_distribution(self, list theoretical_distribution, double error_tolerance=*)
     cpdef scale_theoretical_distribution(self, TheoreticalIsotopicPattern theoretical_distribution, list experimental_distribution)
     cpdef IsotopicFitRecord _evaluate_theoretical_distribution(self, list experimental, TheoreticalIsotopicPattern theoretical, FittedPeak peak, int charge)
+    cpdef list _evaluate_theoretical_distributions(self, list experimentals, list theoreticals, list peaks, list charges)
+    cpdef list _fit_theoretical_distributions(self, list theoreticals, list peaks, list charges, double error_tolerance,
+                                              list data=*)
+    cdef bint _prune_candidate(self, list experimental, int charge) except -1
     cpdef subtraction(self, TheoreticalIsotopicPattern isotopic_cluster, double error_tolerance=*)
     cpdef list fit_incremental_truncation(self, IsotopicFitRecord seed_fit, double lower_bound)
 
@@ -87,6 +125,8 @@ cpdef set _get_all_peak_charge_pairs(DeconvoluterBase self, FittedPeak peak, dou
 
 cpdef np.ndarray[np.int32_t, ndim=1] quick_charge(FittedPeakCollection peak_set, FittedPeakOrPosition position_spec, int min_charge, int max_charge)
 
+cpdef tuple quick_charge_table(FittedPeakCollection peak_set, int min_charge, int max_charge)
+
 
 cdef class ChargeIterator(object):
     cdef:
@@ -108,6 +148,8 @@ cdef class ChargeIterator(object):
     cdef ChargeIterator from_quickcharge(tuple charge_range, PeakSet peaks, FittedPeak peak)
 
     cpdef sequence_from_quickcharge(self, PeakSet peaks, FittedPeak peak)
+    cpdef bint sequence_from_quickcharge_table(self, tuple table, FittedPeak peak)
+    cpdef sequence_from_charges(self, object charges)
     cpdef make_sequence(self)
 
     cdef void release_sequence(self)
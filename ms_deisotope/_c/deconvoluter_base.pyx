@@ -1,7 +1,8 @@
 # cython: embedsignature=True
 
 cimport cython
-from libc.stdlib cimport malloc, free
+from libc.stdlib cimport malloc, calloc, realloc, free
+from libc.math cimport fabs
 
 from ms_peak_picker._c.peak_set cimport PeakSet, FittedPeak, PeakSetIndexed
 from ms_peak_picker._c.peak_index cimport PeakIndex
@@ -12,7 +13,7 @@ from ms_deisotope.constants import (
     ERROR_TOLERANCE as _ERROR_TOLERANCE,
     IGNORE_BELOW as _IGNORE_BELOW,
     TRUNCATE_AFTER as _TRUNCATE_AFTER)
-from ms_deisotope._c.scoring cimport IsotopicFitterBase, IsotopicFitRecord
+from ms_deisotope._c.scoring cimport IsotopicFitterBase, IsotopicFitRecord, IsotopicFitBatch, overrides_method
 from ms_deisotope._c.averagine cimport (AveragineCache, isotopic_shift, PROTON,
                                         TheoreticalIsotopicPattern, neutral_mass)
 from ms_deisotope._c.peak_set cimport DeconvolutedPeak
@@ -108,6 +109,231 @@ cdef FittedPeak first_peak(peaks):
     return None
 
 
+@cython.final
+cdef class PeakSetArrays(object):
+    """A struct-of-arrays view of a :class:`~.PeakSet`, holding the m/z, intensity,
+    signal-to-noise ratio and index of each peak in contiguous arrays so that
+    peak queries can binary search over raw doubles instead of over
+    :class:`~.FittedPeak` objects.
+
+    Peak positions in these arrays are the same as in :attr:`peaklist`, and the
+    original :class:`~.FittedPeak` is only retrieved through :meth:`getitem`.
+    If a peak's intensity is changed, :meth:`refresh` must be called to keep
+    the arrays in sync.
+
+    Attributes
+    ----------
+    peaklist : :class:`~.PeakSet`
+        The peak list viewed
+    mz : np.ndarray
+        The m/z of each peak
+    intensity : np.ndarray
+        The intensity of each peak
+    signal_to_noise : np.ndarray
+        The signal-to-noise ratio of each peak
+    index : np.ndarray
+        The index of each peak in the profile spectrum it was picked from
+    size : int
+        The number of peaks
+    nearest_match : bool
+        Whether peak queries return the nearest peak within the error tolerance, as
+        :class:`~.PeakSetIndexed` does, or sweep around the first match as :class:`~.PeakSet` does
+    """
+
+    def __init__(self, PeakSet peaklist):
+        cdef:
+            size_t i, n
+            FittedPeak peak
+            Py_ssize_t[::1] index
+
+        n = peaklist.get_size()
+        self.peaklist = peaklist
+        self.size = n
+        # An indexed peak set searches for the nearest peak, rather than sweeping
+        # for the most intense peak around the first match.
+        self.nearest_match = isinstance(peaklist, PeakSetIndexed)
+        self.mz = np.empty(n, dtype=np.float64)
+        self.intensity = np.empty(n, dtype=np.float64)
+        self.signal_to_noise = np.empty(n, dtype=np.float64)
+        self.index = np.empty(n, dtype=np.intp)
+        self._mz = <double*>cnp.PyArray_DATA(self.mz)
+        self._intensity = <double*>cnp.PyArray_DATA(self.intensity)
+        self._signal_to_noise = <double*>cnp.PyArray_DATA(self.signal_to_noise)
+        index = self.index
+        for i in range(n):
+            peak = peaklist.getitem(i)
+            self._mz[i] = peak.mz
+            self._intensity[i] = peak.intensity
+            self._signal_to_noise[i] = peak.signal_to_noise
+            index[i] = peak.index
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return "{self.__class__.__name__}({self.size})".format(self=self)
+
+    @cython.cdivision
+    cdef Py_ssize_t _has_peak(self, double mz, double error_tolerance) nogil:
+        """Find the position of the peak matching `mz` within `error_tolerance` ppm error,
+        using the same search as :attr:`peaklist`'s :meth:`has_peak`, or -1 if there is none.
+        """
+        cdef:
+            size_t lo, hi, mid
+            double x
+        if self.nearest_match:
+            return self._nearest_ppm_error(mz, error_tolerance)
+        lo = 0
+        hi = self.size
+        while True:
+            if (hi - lo) < 5:
+                return self._sweep_ppm_error(mz, lo, hi, error_tolerance)
+            mid = (hi + lo) // 2
+            x = self._mz[mid]
+            if fabs((mz - x) / x) <= error_tolerance:
+                return self._sweep_ppm_error(
+                    mz, max(mid - (mid if mid < 5 else 5), lo), min(mid + 5, hi), error_tolerance)
+            elif x > mz:
+                hi = mid
+            elif x < mz:
+                lo = mid
+            else:
+                return -1
+
+    @cython.cdivision
+    cdef Py_ssize_t _nearest_ppm_error(self, double mz, double error_tolerance) nogil:
+        cdef:
+            size_t lo, hi, mid, i, best_index
+            double x, error, abs_error, best_error
+        lo = 0
+        hi = self.size
+        if hi == 0:
+            return -1
+        best_index = 0
+        while hi != lo:
+            mid = (hi + lo) // 2
+            x = self._mz[mid]
+            error = (x - mz) / mz
+            abs_error = fabs(error)
+            if abs_error < error_tolerance:
+                best_error = abs_error
+                best_index = mid
+                i = mid
+                while i > 0:
+                    i -= 1
+                    abs_error = fabs((self._mz[i] - mz) / mz)
+                    if abs_error > error_tolerance:
+                        break
+                    elif abs_error < best_error:
+                        best_error = abs_error
+                        best_index = i
+                i = mid
+                while i < self.size - 1:
+                    i += 1
+                    abs_error = fabs((self._mz[i] - mz) / mz)
+                    if abs_error > error_tolerance:
+                        break
+                    elif abs_error < best_error:
+                        best_error = abs_error
+                        best_index = i
+                break
+            elif (hi - 1) == lo:
+                best_index = mid
+                break
+            elif error > 0:
+                hi = mid
+            else:
+                lo = mid
+        if fabs((self._mz[best_index] - mz) / mz) < error_tolerance:
+            return best_index
+        return -1
+
+    @cython.cdivision
+    cdef Py_ssize_t _sweep_ppm_error(self, double mz, size_t lo, size_t hi, double error_tolerance) nogil:
+        cdef:
+            size_t i
+            Py_ssize_t best_index
+            double best_error, abs_error
+        best_index = -1
+        best_error = 1000000000000000
+        for i in range(lo, hi):
+            abs_error = fabs((mz - self._mz[i]) / self._mz[i])
+            if abs_error < error_tolerance and abs_error < (best_error * 1.1) and self._intensity[i] > 0:
+                best_index = i
+                best_error = abs_error
+        return best_index
+
+    cdef void _between_bounds(self, double m1, double m2, size_t* start, size_t* stop) nogil:
+        """Find the range of positions of the peaks whose m/z is between `m1` and `m2`, inclusive"""
+        cdef:
+            size_t lo, hi, mid
+        lo = 0
+        hi = self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._mz[mid] < m1:
+                lo = mid + 1
+            else:
+                hi = mid
+        start[0] = lo
+        hi = self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._mz[mid] <= m2:
+                lo = mid + 1
+            else:
+                hi = mid
+        stop[0] = lo
+
+    def has_peak(self, double mz, double error_tolerance=2e-5):
+        """Find the position of the peak matching `mz` within `error_tolerance` ppm error.
+
+        Parameters
+        ----------
+        mz : float
+            The m/z to search for
+        error_tolerance : float, optional
+            The parts-per-million error tolerance
+
+        Returns
+        -------
+        int
+            The position of the peak, or -1 if no peak matches
+        """
+        return self._has_peak(mz, error_tolerance)
+
+    def between_bounds(self, double m1, double m2):
+        """Find the range of positions of the peaks whose m/z is between `m1` and `m2`
+
+        Returns
+        -------
+        start : int
+        stop : int
+        """
+        cdef:
+            size_t start, stop
+        self._between_bounds(m1, m2, &start, &stop)
+        return start, stop
+
+    cdef FittedPeak getitem(self, size_t i):
+        return self.peaklist.getitem(i)
+
+    def __getitem__(self, i):
+        if i < 0 or i >= self.size:
+            raise IndexError(i)
+        return self.getitem(i)
+
+    cpdef refresh(self, size_t i):
+        """Re-read the intensity of the `i` th peak from :attr:`peaklist`
+
+        Parameters
+        ----------
+        i : int
+            The position of the peak
+        """
+        self._intensity[i] = self.peaklist.getitem(i).intensity
+
+
 cdef class DeconvoluterBase(object):
     """Base class for all Deconvoluter types. Provides basic configuration for common operations,
     regardless of implementation. Because these methods form the backbone of all deconvolution algorithms,
@@ -133,6 +359,18 @@ cdef class DeconvoluterBase(object):
         Whether or not to apply a subtraction procedure to experimental peaks after they
         have been fitted. This is only necessary if the same signal may be examined multiple
         times as in a multi-pass method or when peak dependence is not considered
+    use_peak_arrays : bool
+        Whether or not to query :attr:`peaklist` through a :class:`PeakSetArrays` view, and
+        to create :class:`~.FittedPeak` placeholders and :class:`~.IsotopicFitRecord` objects
+        only for candidate fits which pass the scorer's threshold
+    prune_candidates : bool
+        Whether or not to discard candidate fits which :meth:`_check_fit` would reject for
+        lacking multiple real peaks, or whose :meth:`~.IsotopicFitterBase.best_possible_score`
+        the scorer would reject, before they are scaled and scored. Defaults to :const:`True`.
+    pruned_by_peak_count : int
+        The number of candidate fits discarded for lacking multiple real peaks
+    pruned_by_score : int
+        The number of candidate fits discarded because their best possible score was rejected
     verbose : bool
         Produce extra logging information
     """
@@ -143,6 +381,20 @@ cdef class DeconvoluterBase(object):
         self.merge_isobaric_peaks = merge_isobaric_peaks
         self.minimum_intensity = minimum_intensity
         self._slice_cache = {}
+        self._quick_charge_table = None
+        self._quick_charge_stale = None
+        self.use_peak_arrays = kwargs.get("use_peak_arrays", False)
+        self._peak_arrays = None
+        self.prune_candidates = kwargs.get("prune_candidates", True)
+        self.pruned_by_peak_count = 0
+        self.pruned_by_score = 0
+
+    cdef PeakSetArrays _get_peak_arrays(self):
+        if not self.use_peak_arrays or self.peaklist is None:
+            return None
+        if self._peak_arrays is None or self._peak_arrays.peaklist is not self.peaklist:
+            self._peak_arrays = PeakSetArrays(self.peaklist)
+        return self._peak_arrays
 
     cpdef PeakSet between(self, double m1, double m2):
         cdef:
@@ -164,6 +416,15 @@ cdef class DeconvoluterBase(object):
 
     @cython.final
     cdef FittedPeak _has_peak(self, double mz, double error_tolerance):
+        cdef:
+            PeakSetArrays arrays
+            Py_ssize_t i
+        arrays = self._get_peak_arrays()
+        if arrays is not None:
+            i = arrays._has_peak(mz, error_tolerance)
+            if i < 0 or arrays._intensity[i] < self.minimum_intensity:
+                return make_placeholder_peak(mz)
+            return arrays.getitem(i)
         peak = self.peaklist._has_peak(mz, error_tolerance)
         if peak is None or peak.intensity < self.minimum_intensity:
             return make_placeholder_peak(mz)
@@ -221,6 +482,242 @@ cdef class DeconvoluterBase(object):
         fit.missed_peaks = count_missed_peaks(fit.experimental)
         return fit
 
+    cpdef list _evaluate_theoretical_distributions(self, list experimentals, list theoreticals,
+                                                   list peaks, list charges):
+        """Evaluate many theoretical isotopic pattern fits against their matched
+        experimental peaks, scoring them all in a single call to :attr:`scorer`.
+
+        This produces the same fits as calling :meth:`_evaluate_theoretical_distribution`
+        on each entry, but uses :meth:`~.IsotopicFitterBase.evaluate_batch` so that fitters
+        which support packed evaluation do not cross the Python boundary for each fit.
+
+        Parameters
+        ----------
+        experimentals : list
+            The experimental fitted peak lists of each fit
+        theoreticals : list of :class:`~.TheoreticalIsotopicPattern`
+            The theoretical isotopic patterns of each fit
+        peaks : list of :class:`~.FittedPeak`
+            The seed peak of each fit
+        charges : list of int
+            The charge state of each fit
+
+        Returns
+        -------
+        :class:`list` of :class:`~.IsotopicFitRecord`
+        """
+        cdef:
+            size_t i, n
+            list experimental, theoretical_peaklists, fits
+            TheoreticalIsotopicPattern theoretical
+            IsotopicFitRecord fit
+            double[::1] scores
+
+        n = PyList_GET_SIZE(experimentals)
+        theoretical_peaklists = PyList_New(n)
+        for i in range(n):
+            experimental = <list>PyList_GET_ITEM(experimentals, i)
+            theoretical = <TheoreticalIsotopicPattern>PyList_GET_ITEM(theoreticals, i)
+            theoretical._scale(experimental, self.scale_method)
+            Py_INCREF(theoretical.peaklist)
+            PyList_SET_ITEM(theoretical_peaklists, i, theoretical.peaklist)
+        scores = self.scorer._evaluate_batch(self.peaklist, experimentals, theoretical_peaklists)
+        fits = PyList_New(n)
+        for i in range(n):
+            fit = IsotopicFitRecord._create(
+                <FittedPeak>PyList_GET_ITEM(peaks, i), scores[i],
+                PyInt_AsLong(<object>PyList_GET_ITEM(charges, i)),
+                <TheoreticalIsotopicPattern>PyList_GET_ITEM(theoreticals, i),
+                <list>PyList_GET_ITEM(experimentals, i), None, 0)
+            fit.missed_peaks = count_missed_peaks(fit.experimental)
+            Py_INCREF(fit)
+            PyList_SET_ITEM(fits, i, fit)
+        return fits
+
+    cpdef list _fit_theoretical_distributions(self, list theoreticals, list peaks, list charges,
+                                              double error_tolerance, list data=None):
+        """Match, scale, score and filter many theoretical isotopic patterns against
+        :attr:`peaklist`, returning only those fits which pass :meth:`_check_fit`.
+
+        When :attr:`use_peak_arrays` is set and :attr:`scorer` supports packed evaluation,
+        the experimental peaks are matched against a :class:`PeakSetArrays` view and packed
+        straight into an :class:`~.IsotopicFitBatch`, so placeholder :class:`~.FittedPeak`
+        and :class:`~.IsotopicFitRecord` objects are only created for candidates which are
+        not rejected by their score or for lacking multiple real peaks. Otherwise this
+        matches each pattern with :meth:`match_theoretical_isotopic_distribution` and scores
+        them with :meth:`_evaluate_theoretical_distributions`, first discarding those which
+        cannot pass :meth:`_check_fit` if :attr:`prune_candidates` is set.
+
+        Parameters
+        ----------
+        theoreticals : list of :class:`~.TheoreticalIsotopicPattern`
+            The theoretical isotopic patterns of each fit
+        peaks : list of :class:`~.FittedPeak`
+            The seed peak of each fit
+        charges : list of int
+            The charge state of each fit
+        error_tolerance : float
+            The mass accuracy required to match experimental peaks
+        data : list, optional
+            A value to store on :attr:`~.IsotopicFitRecord.data` for each fit
+
+        Returns
+        -------
+        :class:`list` of :class:`~.IsotopicFitRecord`
+        """
+        cdef:
+            size_t i, j, k, n, m, start, size, scratch_size
+            Py_ssize_t match
+            list experimentals, fits, results, experimental
+            list kept_theoreticals, kept_peaks, kept_charges, kept_data
+            TheoreticalIsotopicPattern theoretical
+            TheoreticalPeak tpeak
+            IsotopicFitRecord fit
+            IsotopicFitBatch batch
+            PeakSetArrays arrays
+            FittedPeak fpeak
+            int charge, real_peaks
+            double* scratch
+            double[::1] scores, observed_mz, observed_intensity, observed_signal_to_noise
+            double[::1] expected_mz, expected_intensity
+            Py_ssize_t[::1] indptr, matches
+
+        n = PyList_GET_SIZE(theoreticals)
+        arrays = self._get_peak_arrays()
+        results = []
+        if arrays is None or not self.scorer.supports_packed_evaluation():
+            if self.prune_candidates:
+                experimentals = []
+                kept_theoreticals = []
+                kept_peaks = []
+                kept_charges = []
+                kept_data = [] if data is not None else None
+                for i in range(n):
+                    experimental = self.match_theoretical_isotopic_distribution(
+                        (<TheoreticalIsotopicPattern>PyList_GET_ITEM(theoreticals, i)).peaklist,
+                        error_tolerance=error_tolerance)
+                    if self._prune_candidate(
+                            experimental, PyInt_AsLong(<object>PyList_GET_ITEM(charges, i))):
+                        continue
+                    experimentals.append(experimental)
+                    kept_theoreticals.append(<object>PyList_GET_ITEM(theoreticals, i))
+                    kept_peaks.append(<object>PyList_GET_ITEM(peaks, i))
+                    kept_charges.append(<object>PyList_GET_ITEM(charges, i))
+                    if data is not None:
+                        kept_data.append(<object>PyList_GET_ITEM(data, i))
+                theoreticals = kept_theoreticals
+                peaks = kept_peaks
+                charges = kept_charges
+                data = kept_data
+                n = PyList_GET_SIZE(experimentals)
+            else:
+                experimentals = PyList_New(n)
+                for i in range(n):
+                    experimental = self.match_theoretical_isotopic_distribution(
+                        (<TheoreticalIsotopicPattern>PyList_GET_ITEM(theoreticals, i)).peaklist,
+                        error_tolerance=error_tolerance)
+                    Py_INCREF(experimental)
+                    PyList_SET_ITEM(experimentals, i, experimental)
+            fits = self._evaluate_theoretical_distributions(experimentals, theoreticals, peaks, charges)
+            for i in range(n):
+                fit = <IsotopicFitRecord>PyList_GET_ITEM(fits, i)
+                if data is not None:
+                    fit.data = <object>PyList_GET_ITEM(data, i)
+                if self._check_fit(fit):
+                    results.append(fit)
+            return results
+
+        batch = IsotopicFitBatch.__new__(IsotopicFitBatch)
+        batch.indptr = np.zeros(n + 1, dtype=np.intp)
+        indptr = batch.indptr
+        scratch_size = 0
+        for i in range(n):
+            size = (<TheoreticalIsotopicPattern>PyList_GET_ITEM(theoreticals, i)).get_size()
+            indptr[i + 1] = indptr[i] + size
+            if size > scratch_size:
+                scratch_size = size
+        m = indptr[n]
+        batch.observed_mz = np.empty(m, dtype=np.float64)
+        batch.observed_intensity = np.empty(m, dtype=np.float64)
+        batch.observed_signal_to_noise = np.empty(m, dtype=np.float64)
+        batch.expected_mz = np.empty(m, dtype=np.float64)
+        batch.expected_intensity = np.empty(m, dtype=np.float64)
+        observed_mz = batch.observed_mz
+        observed_intensity = batch.observed_intensity
+        observed_signal_to_noise = batch.observed_signal_to_noise
+        expected_mz = batch.expected_mz
+        expected_intensity = batch.expected_intensity
+        matches = np.empty(m, dtype=np.intp)
+
+        # The scaling methods may read one position past the end of the pattern, which
+        # must be zero as it is when scaling against a list of peaks.
+        scratch = <double*>malloc(sizeof(double) * (scratch_size + 1))
+        if scratch == NULL:
+            raise MemoryError()
+        try:
+            for i in range(n):
+                theoretical = <TheoreticalIsotopicPattern>PyList_GET_ITEM(theoreticals, i)
+                start = indptr[i]
+                size = indptr[i + 1] - start
+                for j in range(size):
+                    k = start + j
+                    tpeak = theoretical.get(j)
+                    match = arrays._has_peak(tpeak.mz, error_tolerance)
+                    if match >= 0 and arrays._intensity[match] < self.minimum_intensity:
+                        match = -1
+                    matches[k] = match
+                    if match >= 0:
+                        observed_mz[k] = arrays._mz[match]
+                        observed_intensity[k] = arrays._intensity[match]
+                        observed_signal_to_noise[k] = arrays._signal_to_noise[match]
+                    else:
+                        observed_mz[k] = tpeak.mz
+                        observed_intensity[k] = 1.0
+                        observed_signal_to_noise[k] = 1.0
+                    scratch[j] = observed_intensity[k]
+                scratch[size] = 0
+                theoretical._scale_intensities(scratch, self.scale_method)
+                for j in range(size):
+                    tpeak = theoretical.get(j)
+                    expected_mz[start + j] = tpeak.mz
+                    expected_intensity[start + j] = tpeak.intensity
+        finally:
+            free(scratch)
+
+        scores = self.scorer._evaluate_packed(self.peaklist, batch)
+        for i in range(n):
+            start = indptr[i]
+            size = indptr[i + 1] - start
+            charge = PyInt_AsLong(<object>PyList_GET_ITEM(charges, i))
+            if charge > 1:
+                real_peaks = 0
+                for j in range(start, start + size):
+                    if observed_mz[j] > 1 and observed_intensity[j] > 1:
+                        real_peaks += 1
+                if real_peaks < 2:
+                    continue
+            if self.scorer.reject_score(scores[i]):
+                continue
+            experimental = PyList_New(size)
+            for j in range(size):
+                match = matches[start + j]
+                if match >= 0:
+                    fpeak = arrays.getitem(match)
+                else:
+                    fpeak = make_placeholder_peak(expected_mz[start + j])
+                Py_INCREF(fpeak)
+                PyList_SET_ITEM(experimental, j, fpeak)
+            fit = IsotopicFitRecord._create(
+                <FittedPeak>PyList_GET_ITEM(peaks, i), scores[i], charge,
+                <TheoreticalIsotopicPattern>PyList_GET_ITEM(theoreticals, i),
+                experimental, None, 0)
+            fit.missed_peaks = count_missed_peaks(experimental)
+            if data is not None:
+                fit.data = <object>PyList_GET_ITEM(data, i)
+            if self._check_fit(fit):
+                results.append(fit)
+        return results
+
     cpdef list fit_incremental_truncation(self, IsotopicFitRecord seed_fit, double lower_bound):
         """Fit incrementally truncated versions of the seed fit to check to see if a narrower
         theoretical fit matches the data better.
@@ -258,20 +755,91 @@ cdef class DeconvoluterBase(object):
         return fits
 
 
+    cdef bint _prune_candidate(self, list experimental, int charge) except -1:
+        # Apply the tests of :meth:`_check_fit` which do not need the score, counting
+        # the candidates they discard
+        if charge > 1 and not has_multiple_real_peaks(experimental):
+            self.pruned_by_peak_count += 1
+            return True
+        if self.scorer.reject_score(self.scorer.best_possible_score(experimental)):
+            self.pruned_by_score += 1
+            return True
+        return False
+
     cpdef subtraction(self, TheoreticalIsotopicPattern isotopic_cluster, double error_tolerance=2e-5):
         cdef:
             size_t i
+            Py_ssize_t j
             double existing
             TheoreticalPeak peak
             FittedPeak match
+            PeakSetArrays arrays
+        arrays = self._get_peak_arrays()
         for i in range(isotopic_cluster.get_size()):
             peak = isotopic_cluster.get(i)
-            match = self.peaklist._has_peak(peak.mz, error_tolerance)
+            if arrays is not None:
+                j = arrays._has_peak(peak.mz, error_tolerance)
+                match = arrays.getitem(j) if j >= 0 else None
+            else:
+                match = self.peaklist._has_peak(peak.mz, error_tolerance)
             if match is not None:
                 existing = match.intensity
                 match.intensity -= peak.intensity
                 if (match.intensity < 0) or (peak.intensity > (existing * 0.7)):
                     match.intensity = 1.
+                if arrays is not None:
+                    arrays.refresh(j)
+                self._mark_quick_charge_stale(match)
+
+    cpdef _mark_quick_charge_stale(self, FittedPeak peak):
+        """Mark the rows of the pre-computed QuickCharge table which depend upon the
+        intensity of `peak` as stale, after it has been changed by :meth:`subtraction`.
+
+        The charge states of a peak depend upon its own intensity and those of the peaks
+        up to 1.1 m/z above it, so only the peaks up to 1.1 m/z below `peak` are affected.
+
+        Parameters
+        ----------
+        peak : :class:`~.FittedPeak`
+            The peak whose intensity changed
+        """
+        cdef:
+            cnp.uint8_t[::1] stale
+            Py_ssize_t i
+            double mz
+        if self._quick_charge_stale is None:
+            return
+        stale = self._quick_charge_stale
+        i = peak.peak_count
+        if i < 0 or i >= stale.shape[0]:
+            return
+        mz = peak.mz
+        while i >= 0 and mz - self.peaklist.getitem(i).mz <= 1.1:
+            stale[i] = 1
+            i -= 1
+
+    cpdef bint _quick_charge_row_stale(self, FittedPeak peak):
+        """Check whether the row of the pre-computed QuickCharge table for `peak`
+        was invalidated by :meth:`subtraction`.
+
+        Parameters
+        ----------
+        peak : :class:`~.FittedPeak`
+
+        Returns
+        -------
+        bool
+        """
+        cdef:
+            cnp.uint8_t[::1] stale
+            Py_ssize_t i
+        if self._quick_charge_stale is None:
+            return False
+        stale = self._quick_charge_stale
+        i = peak.peak_count
+        if i < 0 or i >= stale.shape[0]:
+            return False
+        return stale[i]
 
     cpdef bint _check_fit(self, IsotopicFitRecord fit):
         cdef:
@@ -303,18 +871,29 @@ cdef class DeconvoluterBase(object):
             FittedPeak dummy_peak, forward
             size_t i
             size_t start, stop
+            PeakSetArrays arrays
 
         shift = isotopic_shift(charge)
         next_peak = mz + (shift * step)
         start = 0
         stop = 0
-        self.peaklist._between_bounds(
-            next_peak - (next_peak * tolerance),
-            next_peak + (next_peak * tolerance),
-            &start, &stop)
+        arrays = self._get_peak_arrays()
+        if arrays is not None:
+            arrays._between_bounds(
+                next_peak - (next_peak * tolerance),
+                next_peak + (next_peak * tolerance),
+                &start, &stop)
+        else:
+            self.peaklist._between_bounds(
+                next_peak - (next_peak * tolerance),
+                next_peak + (next_peak * tolerance),
+                &start, &stop)
         for i in range(start, stop):
-            forward = self.peaklist.getitem(i)
-            prev_peak_mz = forward.mz - (shift * step)
+            if arrays is not None:
+                prev_peak_mz = arrays._mz[i] - (shift * step)
+            else:
+                forward = self.peaklist.getitem(i)
+                prev_peak_mz = forward.mz - (shift * step)
             dummy_peak = make_placeholder_peak(prev_peak_mz)
             PySet_Add(result, (dummy_peak, charge))
         return stop - start
@@ -325,17 +904,28 @@ cdef class DeconvoluterBase(object):
             FittedPeak backward
             size_t i, n
             size_t start, stop
+            PeakSetArrays arrays
 
         shift = isotopic_shift(charge)
         prev_peak = mz - (shift)
-        self.peaklist._between_bounds(
-            prev_peak - (prev_peak * tolerance),
-            prev_peak + (prev_peak * tolerance),
-            &start, &stop)
+        arrays = self._get_peak_arrays()
+        if arrays is not None:
+            arrays._between_bounds(
+                prev_peak - (prev_peak * tolerance),
+                prev_peak + (prev_peak * tolerance),
+                &start, &stop)
+        else:
+            self.peaklist._between_bounds(
+                prev_peak - (prev_peak * tolerance),
+                prev_peak + (prev_peak * tolerance),
+                &start, &stop)
 
         for i in range(start, stop):
-            backward = self.peaklist.getitem(i)
-            prev_peak_mz = backward.mz
+            if arrays is not None:
+                prev_peak_mz = arrays._mz[i]
+            else:
+                backward = self.peaklist.getitem(i)
+                prev_peak_mz = backward.mz
             if step == 1:
                 self._find_next_putative_peak_inplace(prev_peak_mz, charge, result, 1, tolerance)
             else:
@@ -464,14 +1054,31 @@ cdef class AveragineDeconvoluterBase(DeconvoluterBase):
     cpdef set _fit_peaks_at_charges(self, set peak_charge_set, double error_tolerance, double charge_carrier=PROTON,
                                     double truncate_after=0.95, double ignore_below=0):
         cdef:
-            set results
             tuple peak_charge
+            FittedPeak peak
+            TheoreticalIsotopicPattern tid
             IsotopicFitRecord fit
-            size_t i
-
             int charge
-            list peak_charge_list
-        results = set()
+            list peaks, charges, theoreticals
+            set results
+        if overrides_method(self, AveragineDeconvoluterBase, "fit_theoretical_distribution"):
+            # Candidates can only be scored together when they are fit the way this class does
+            results = set()
+            for obj in peak_charge_set:
+                peak_charge = <tuple>obj
+                peak = <FittedPeak>PyTuple_GET_ITEM(peak_charge, 0)
+                charge = PyInt_AsLong(<object>PyTuple_GET_ITEM(peak_charge, 1))
+                if peak.mz < 1:
+                    continue
+                fit = self.fit_theoretical_distribution(
+                    peak, error_tolerance, charge, charge_carrier, truncate_after=truncate_after,
+                    ignore_below=ignore_below)
+                if self._check_fit(fit):
+                    results.add(fit)
+            return results
+        peaks = []
+        charges = []
+        theoreticals = []
         for obj in peak_charge_set:
             peak_charge = <tuple>obj
             peak = <FittedPeak>PyTuple_GET_ITEM(peak_charge, 0)
@@ -480,14 +1087,15 @@ cdef class AveragineDeconvoluterBase(DeconvoluterBase):
             if peak.mz < 1:
                 continue
 
-            fit = self.fit_theoretical_distribution(
-                     peak, error_tolerance, charge,
-                     charge_carrier, truncate_after=truncate_after,
-                     ignore_below=ignore_below)
-            if not self._check_fit(fit):
-                continue
-            results.add(fit)
-        return results
+            tid = self.averagine.isotopic_cluster(
+                peak.mz, charge, charge_carrier=charge_carrier, truncate_after=truncate_after,
+                ignore_below=ignore_below)
+            peaks.append(peak)
+            charges.append(charge)
+            theoreticals.append(tid)
+
+        # Score all of the candidate fits together rather than one at a time
+        return set(self._fit_theoretical_distributions(theoreticals, peaks, charges, error_tolerance))
 
 
 cdef class MultiAveragineDeconvoluterBase(DeconvoluterBase):
@@ -515,16 +1123,91 @@ cdef class MultiAveragineDeconvoluterBase(DeconvoluterBase):
 
     cpdef set _fit_peaks_at_charges(self, set peak_charge_set, double error_tolerance, double charge_carrier=PROTON,
                                     double truncate_after=0.95, double ignore_below=0):
+        """Fit each candidate (peak, charge) pair with every model in :attr:`averagines`,
+        scoring all of the candidate fits together.
+
+        When :attr:`prune_candidates` is set and the fits are not scored in packed form,
+        each model's cached pattern for a pair is matched against :attr:`peaklist` in place,
+        and only models whose matched isotopic peaks may pass :meth:`_check_fit` have their
+        pattern copied and shifted onto the peak to be scaled and scored.
+
+        If a subclass overrides :meth:`fit_theoretical_distribution`, each fit is
+        instead made by calling it, one candidate at a time.
+
+        Parameters
+        ----------
+        peak_charge_set : set
+            The set of candidate (:class:`~.FittedPeak`, charge) tuples to try to fit
+        error_tolerance : float
+            Matching error tolerance
+        charge_carrier : float, optional
+            The charge carrier to use. Defaults to |PROTON|
+
+        Returns
+        -------
+        set
+            The set of :class:`~.IsotopicFitRecord` instances produced
+        """
         cdef:
-            list results
             tuple peak_charge
+            FittedPeak peak
+            AveragineCache averagine
+            TheoreticalIsotopicPattern tid, stored
             IsotopicFitRecord fit
             size_t i, j, n_averagine
             int charge
-            list peak_charge_list
-        results = []
+            double key_mz, last_key_mz
+            tuple cache_key
+            list peak_charge_list, peaks, charges, theoreticals, models, experimentals, experimental, fits
+            set results
         n_averagine = PyList_GET_SIZE(self.averagines)
         peak_charge_list = list(peak_charge_set)
+        if overrides_method(self, MultiAveragineDeconvoluterBase, "fit_theoretical_distribution"):
+            # Candidates can only be scored together when they are fit the way this class does
+            results = set()
+            for i in range(PyList_GET_SIZE(peak_charge_list)):
+                peak_charge = <tuple>PyList_GET_ITEM(peak_charge_list, i)
+                peak = <FittedPeak>PyTuple_GET_ITEM(peak_charge, 0)
+                charge = PyInt_AsLong(<object>PyTuple_GET_ITEM(peak_charge, 1))
+                if peak.mz < 1:
+                    continue
+                for j in range(n_averagine):
+                    averagine = <AveragineCache>PyList_GET_ITEM(self.averagines, j)
+                    fit = self.fit_theoretical_distribution(
+                        peak, error_tolerance, charge, averagine, charge_carrier,
+                        truncate_after=truncate_after, ignore_below=ignore_below)
+                    fit.data = averagine
+                    if self._check_fit(fit):
+                        results.add(fit)
+            return results
+        peaks = []
+        charges = []
+        theoreticals = []
+        models = []
+        if not self.prune_candidates or (
+                self._get_peak_arrays() is not None and self.scorer.supports_packed_evaluation()):
+            for i in range(PyList_GET_SIZE(peak_charge_list)):
+                peak_charge = <tuple>PyList_GET_ITEM(peak_charge_list, i)
+                peak = <FittedPeak>PyTuple_GET_ITEM(peak_charge, 0)
+                charge = PyInt_AsLong(<object>PyTuple_GET_ITEM(peak_charge, 1))
+
+                if peak.mz < 1:
+                    continue
+                for j in range(n_averagine):
+                    averagine = <AveragineCache>PyList_GET_ITEM(self.averagines, j)
+                    tid = averagine.isotopic_cluster(
+                        peak.mz, charge, charge_carrier=charge_carrier,
+                        truncate_after=truncate_after, ignore_below=ignore_below)
+                    peaks.append(peak)
+                    charges.append(charge)
+                    theoreticals.append(tid)
+                    models.append(averagine)
+
+            # Score all of the candidate fits for every model together rather than one at a time.
+            return set(self._fit_theoretical_distributions(
+                theoreticals, peaks, charges, error_tolerance, models))
+
+        experimentals = []
         for i in range(PyList_GET_SIZE(peak_charge_list)):
             peak_charge = <tuple>PyList_GET_ITEM(peak_charge_list, i)
             peak = <FittedPeak>PyTuple_GET_ITEM(peak_charge, 0)
@@ -532,21 +1215,108 @@ cdef class MultiAveragineDeconvoluterBase(DeconvoluterBase):
 
             if peak.mz < 1:
                 continue
+            cache_key = None
             for j in range(n_averagine):
                 averagine = <AveragineCache>PyList_GET_ITEM(self.averagines, j)
-                fit = self.fit_theoretical_distribution(
-                    peak, error_tolerance, charge, averagine, charge_carrier,
-                    truncate_after=truncate_after, ignore_below=ignore_below)
-                # fit.missed_peaks = count_missed_peaks(fit.experimental)
-                fit.data = averagine
-                if not self._check_fit(fit):
+                if averagine.enabled and averagine.table is None:
+                    # Models with the same cache truncation share the same key
+                    key_mz = averagine._make_cache_key(peak.mz)
+                    if cache_key is None or key_mz != last_key_mz:
+                        cache_key = (key_mz, charge, charge_carrier, truncate_after)
+                        last_key_mz = key_mz
+                    stored = averagine._get_pattern_for_key(
+                        cache_key, key_mz, charge, charge_carrier, truncate_after, ignore_below)
+                    tid = None
+                    experimental = match_shifted_pattern(self, stored, peak.mz, error_tolerance, charge > 1)
+                    if experimental is None:
+                        self.pruned_by_peak_count += 1
+                        continue
+                else:
+                    tid = averagine.isotopic_cluster(
+                        peak.mz, charge, charge_carrier=charge_carrier,
+                        truncate_after=truncate_after, ignore_below=ignore_below)
+                    experimental = self.match_theoretical_isotopic_distribution(
+                        tid.peaklist, error_tolerance=error_tolerance)
+                if self._prune_candidate(experimental, charge):
                     continue
-                # should we track the best fit for each hypothetical peak charge pair
-                # and only add the best one to the result set? This would save time
-                # later.
-                results.append(fit)
+                if tid is None:
+                    tid = stored.clone_shift(peak.mz)
+                experimentals.append(experimental)
+                peaks.append(peak)
+                charges.append(charge)
+                theoreticals.append(tid)
+                models.append(averagine)
+
+        fits = self._evaluate_theoretical_distributions(experimentals, theoreticals, peaks, charges)
+        results = set()
+        for i in range(PyList_GET_SIZE(fits)):
+            fit = <IsotopicFitRecord>PyList_GET_ITEM(fits, i)
+            fit.data = <object>PyList_GET_ITEM(models, i)
+            if self._check_fit(fit):
+                results.add(fit)
+        return results
+
 
-        return set(results)
+DEF MATCH_BUFFER_SIZE = 32
+
+
+cdef list match_shifted_pattern(DeconvoluterBase self, TheoreticalIsotopicPattern pattern, double mz,
+                                double error_tolerance, bint require_multiple_real_peaks):
+    # Match `pattern` as if it had been shifted to start at `mz` without copying it, computing
+    # each peak's position as :meth:`TheoreticalIsotopicPattern.clone_shift` would. If fewer
+    # than two peaks match and `require_multiple_real_peaks` is set, return None before the
+    # list of matched peaks or any placeholder peaks are created.
+    cdef:
+        list experimental_distribution
+        size_t i, n, real_peaks
+        double delta
+        Py_ssize_t index
+        PeakSetArrays arrays
+        FittedPeak peak
+        PyObject* stack_matches[MATCH_BUFFER_SIZE]
+        PyObject** matches
+
+    delta = mz - pattern.origin
+    n = pattern.get_size()
+    arrays = self._get_peak_arrays()
+    if n > MATCH_BUFFER_SIZE:
+        matches = <PyObject**>malloc(sizeof(PyObject*) * n)
+        if matches == NULL:
+            raise MemoryError()
+    else:
+        matches = stack_matches
+    real_peaks = 0
+    # The matched peaks belong to :attr:`peaklist`, which keeps them alive while they
+    # are only held through `matches`
+    for i in range(n):
+        if arrays is not None:
+            index = arrays._has_peak(pattern.get(i).mz + delta, error_tolerance)
+            if index < 0 or arrays._intensity[index] < self.minimum_intensity:
+                matches[i] = NULL
+                continue
+            peak = arrays.getitem(index)
+        else:
+            peak = self.peaklist._has_peak(pattern.get(i).mz + delta, error_tolerance)
+            if peak is None or peak.intensity < self.minimum_intensity:
+                matches[i] = NULL
+                continue
+        if peak.mz > 1 and peak.intensity > 1:
+            real_peaks += 1
+        matches[i] = <PyObject*>peak
+    if require_multiple_real_peaks and real_peaks < 2:
+        experimental_distribution = None
+    else:
+        experimental_distribution = PyList_New(n)
+        for i in range(n):
+            if matches[i] == NULL:
+                peak = make_placeholder_peak(pattern.get(i).mz + delta)
+            else:
+                peak = <FittedPeak>matches[i]
+            Py_INCREF(peak)
+            PyList_SET_ITEM(experimental_distribution, i, peak)
+    if matches != stack_matches:
+        free(matches)
+    return experimental_distribution
 
 
 cdef FittedPeak has_previous_peak_at_charge(DeconvoluterBase peak_collection, FittedPeak peak, int charge, int step, double error_tolerance):
@@ -638,12 +1408,44 @@ cdef class ChargeIterator(object):
         return inst
 
     cpdef sequence_from_quickcharge(self, PeakSet peaks, FittedPeak peak):
+        self.sequence_from_charges(
+            quick_charge(peaks, peak.peak_count, abs(self.lower), abs(self.upper)))
+
+    cpdef bint sequence_from_quickcharge_table(self, tuple table, FittedPeak peak):
+        """Set the charge sequence from a pre-computed :func:`quick_charge_table`.
+
+        Parameters
+        ----------
+        table : tuple
+            The ``(min_charge, max_charge, indptr, charges)`` table
+        peak : :class:`~.FittedPeak`
+            The peak to read the charge states of
+
+        Returns
+        -------
+        bool
+            Whether the table covered this iterator's charge range and ``peak``. If not,
+            the sequence is unchanged.
+        """
+        cdef:
+            Py_ssize_t index
+            Py_ssize_t[::1] indptr
+        if table[0] != self.lower or table[1] != self.upper:
+            return False
+        indptr = table[2]
+        index = peak.peak_count
+        if index < 0 or index >= indptr.shape[0] - 1:
+            return False
+        self.sequence_from_charges(table[3][indptr[index]:indptr[index + 1]])
+        return True
+
+    cpdef sequence_from_charges(self, object charges_):
         cdef:
             np.ndarray[int, ndim=1] charges
             size_t i, n
+        charges = charges_
         self.release_sequence()
         self.index = 0
-        charges = quick_charge(peaks, peak.peak_count, abs(self.lower), abs(self.upper))
         n = charges.shape[0]
         if n == 0:
             self.size = 1
@@ -835,6 +1637,148 @@ cpdef np.ndarray[np.int32_t, ndim=1] quick_charge(FittedPeakCollection peak_set,
     return result
 
 
+@cython.cdivision
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef tuple quick_charge_table(FittedPeakCollection peak_set, int min_charge, int max_charge):
+    """Compute the QuickCharge feasible charge states for every peak in `peak_set` in a single
+    sweep over the peak list.
+
+    The result for each peak is identical to calling :func:`quick_charge` on it, but the window of
+    neighbors within 1.1 m/z of each peak is carried from one peak to the next instead of being
+    searched for again, and the whole sweep runs without the GIL.
+
+    Parameters
+    ----------
+    peak_set : :class:`ms_peak_picker.PeakSet
+        The centroided peak set to search
+    min_charge : int
+        The minimum charge state to consider
+    max_charge : int
+        The maximum charge state to consider
+
+    Returns
+    -------
+    indptr : np.ndarray
+        The offsets into `charges` where each peak's charge states begin, with one
+        more entry than there are peaks, as in a compressed sparse row matrix.
+    charges : np.ndarray
+        The feasible charge states of all peaks, in ascending order for each peak
+    """
+    cdef:
+        PeakSet peaks
+        FittedPeak peak
+        size_t i, n, lo, hi, size, capacity, n_found
+        ssize_t j
+        int charge
+        double mz, diff, raw_charge, remain, min_intensity
+        double[::1] mzs, intensities
+        Py_ssize_t[::1] indptr
+        char* flags
+        int* buffer
+        int* grown
+        bint failed
+        np.ndarray[int, ndim=1] charges
+
+    if FittedPeakCollection is PeakSet:
+        peaks = peak_set
+    else:
+        peaks = peak_set.peaks
+    n = peaks.get_size()
+    mz_array = np.empty(n, dtype=np.float64)
+    intensity_array = np.empty(n, dtype=np.float64)
+    indptr_array = np.zeros(n + 1, dtype=np.intp)
+    mzs = mz_array
+    intensities = intensity_array
+    indptr = indptr_array
+    for i in range(n):
+        peak = peaks.getitem(i)
+        mzs[i] = peak.mz
+        intensities[i] = peak.intensity
+    if max_charge < 1 or n == 0:
+        return indptr_array, np.zeros(0, dtype=np.int32)
+
+    capacity = n
+    size = 0
+    failed = False
+    flags = <char*>calloc(max_charge + 1, sizeof(char))
+    buffer = <int*>malloc(sizeof(int) * capacity)
+    if flags == NULL or buffer == NULL:
+        free(flags)
+        free(buffer)
+        raise MemoryError()
+    with nogil:
+        lo = 0
+        hi = 0
+        for i in range(n):
+            mz = mzs[i]
+            while mz - mzs[lo] > 1.1:
+                lo += 1
+            if hi <= i:
+                hi = i + 1
+            while hi < n and mzs[hi] - mz <= 1.1:
+                hi += 1
+            min_intensity = intensities[i] / 4.
+            n_found = 0
+            for j in range(i + 1, hi):
+                if intensities[j] < min_intensity:
+                    continue
+                diff = mzs[j] - mz
+                if diff <= 0:
+                    continue
+                raw_charge = 1 / diff
+                if raw_charge > max_charge + 1:
+                    continue
+                charge = <int>(raw_charge + 0.5)
+                remain = raw_charge - <int>(raw_charge)
+                if 0.2 < remain and remain < 0.8:
+                    continue
+                if (charge < min_charge) or (charge > max_charge):
+                    continue
+                if not flags[charge]:
+                    flags[charge] = 1
+                    n_found += 1
+            if n_found:
+                for j in range(<ssize_t>i - 1, <ssize_t>lo - 1, -1):
+                    diff = mz - mzs[j]
+                    if diff <= 0:
+                        continue
+                    raw_charge = 1 / diff
+                    if raw_charge > max_charge + 1:
+                        continue
+                    charge = <int>(raw_charge + 0.5)
+                    remain = raw_charge - <int>(raw_charge)
+                    if 0.2 < remain and remain < 0.8:
+                        continue
+                    if (charge < min_charge) or (charge > max_charge):
+                        continue
+                    if not flags[charge]:
+                        flags[charge] = 1
+                        n_found += 1
+                if size + n_found > capacity:
+                    capacity = (size + n_found) * 2
+                    grown = <int*>realloc(buffer, sizeof(int) * capacity)
+                    if grown == NULL:
+                        failed = True
+                        break
+                    buffer = grown
+                for charge in range(1, max_charge + 1):
+                    if flags[charge]:
+                        flags[charge] = 0
+                        buffer[size] = charge
+                        size += 1
+            indptr[i + 1] = size
+    free(flags)
+    if failed:
+        free(buffer)
+        raise MemoryError()
+    charges = np.empty(size, dtype=np.int32)
+    for i in range(size):
+        charges[i] = buffer[i]
+    free(buffer)
+    return indptr_array, charges
+
+
 @cython.binding(True)
 cpdef set _get_all_peak_charge_pairs(DeconvoluterBase self, FittedPeak peak, double error_tolerance=ERROR_TOLERANCE,
                                      object charge_range=(1, 8), int left_search_limit=3, int right_search_limit=3,
@@ -872,10 +1816,16 @@ cpdef set _get_all_peak_charge_pairs(DeconvoluterBase self, FittedPeak peak, dou
             size_t i
             set target_peaks
             FittedPeak prev_peak, nxt_peak
-            object add_, update_
+            object add_, update_, table
 
         if use_quick_charge:
-            charge_iterator = ChargeIterator.from_quickcharge(tuple(charge_range), self.peaklist, peak)
+            table = self._quick_charge_table
+            if table is not None and not self._quick_charge_row_stale(peak):
+                charge_iterator = ChargeIterator.from_tuple(tuple(charge_range))
+                if not charge_iterator.sequence_from_quickcharge_table(<tuple>table, peak):
+                    charge_iterator.sequence_from_quickcharge(self.peaklist, peak)
+            else:
+                charge_iterator = ChargeIterator.from_quickcharge(tuple(charge_range), self.peaklist, peak)
         else:
             charge_iterator = ChargeIterator.from_tuple(tuple(charge_range))
 
@@ -965,20 +1915,64 @@ cpdef int _explore_local(DeconvoluterBase self, peak, error_tolerance=ERROR_TOLE
     int
         The number of fits added to the graph
     """
+    cdef:
+        list fits
+        size_t i, n
+        PeakDependenceGraphBase peak_graph
+
+    fits = _explore_local_fits(
+        self, peak, error_tolerance=error_tolerance, charge_range=charge_range,
+        left_search_limit=left_search_limit, right_search_limit=right_search_limit,
+        charge_carrier=charge_carrier, truncate_after=truncate_after, ignore_below=ignore_below)
+    peak_graph = <PeakDependenceGraphBase>self.peak_dependency_network
+    n = PyList_GET_SIZE(fits)
+    for i in range(n):
+        peak_graph.add_fit_dependence(<IsotopicFitRecord>PyList_GET_ITEM(fits, i))
+    return n
+
+
+@cython.binding(True)
+cpdef list _explore_local_fits(DeconvoluterBase self, peak, error_tolerance=ERROR_TOLERANCE,
+                               charge_range=(1, 8), left_search_limit=1, right_search_limit=0,
+                               charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
+                               ignore_below=IGNORE_BELOW):
+    """Select the fits in the local neighborhood of `peak` which :meth:`_explore_local` would
+    add to the peak dependence graph, without adding them.
+
+    Parameters
+    ----------
+    peak : :class:`~.FittedPeak`
+        The peak to start the search from
+    error_tolerance : float, optional
+        The parts-per-million error tolerance in m/z to search with. Defaults to |ERROR_TOLERANCE|
+    charge_range : tuple, optional
+        The range of charge states to consider. Defaults to (1, 8)
+    left_search_limit : int, optional
+        The number of steps to search to the left of `peak`. Defaults to 1
+    right_search_limit : int, optional
+        The number of steps to search to the right of `peak`. Defaults to 0
+    charge_carrier : float, optional
+        The mass of the charge carrier. Defaults to |PROTON|
+    truncate_after : float, optional
+        The percent of intensity to ensure is included in a theoretical isotopic pattern
+        starting from the monoisotopic peak.
+
+    Returns
+    -------
+    list of :class:`~.IsotopicFitRecord`
+        The selected fits, in the order they were selected
+    """
     cdef:
         set hold
         set results
+        list selected
         IsotopicFitRecord fit
         size_t n, i, stop
-        object fit_saver
-        PeakDependenceGraphBase peak_graph
 
     results = self._fit_all_charge_states(
         peak, error_tolerance=error_tolerance, charge_range=charge_range, left_search_limit=left_search_limit,
         charge_carrier=charge_carrier, truncate_after=truncate_after, ignore_below=ignore_below)
 
-    peak_graph = <PeakDependenceGraphBase>self.peak_dependency_network
-
     hold = set()
     for obj in results:
         fit = <IsotopicFitRecord>obj
@@ -988,21 +1982,22 @@ cpdef int _explore_local(DeconvoluterBase self, peak, error_tolerance=ERROR_TOLE
 
     results = hold
     n = len(results)
+    selected = []
 
     stop = max(min(n // 2, 100), 10)
     if n == 0:
-        return 0
+        return selected
 
     for i in range(stop):
         if len(results) == 0:
             break
         candidate = self.scorer.select.best(results)
         if candidate is None:
-                break
-        peak_graph.add_fit_dependence(candidate)
+            break
+        selected.append(candidate)
         results.discard(candidate)
 
-    return i
+    return selected
 
 
 @cython.binding(True)
@@ -1030,22 +2025,56 @@ cpdef populate_graph(DeconvoluterBase self, error_tolerance=ERROR_TOLERANCE, cha
         starting from the monoisotopic peak. This will cause theoretical isotopic patterns
         to be truncated, excluding trailing peaks which do not contribute substantially to
         the overall shape of the isotopic pattern.
+
+    Notes
+    -----
+    If :attr:`_fit_cache` is set, the fits selected for each peak are stored in it, and
+    if :attr:`_dirty_peaks` is also set, peaks not marked in it re-use their stored fits
+    instead of being explored again. See :meth:`_mark_dirty_peaks`.
+
+    If :attr:`budget` is set and is exceeded, the remaining peaks are explored with the
+    cheaper search of :meth:`_narrow_search`.
     """
     cdef:
-        size_t i, n
+        size_t i, j, n, m
         FittedPeak peak
         dict _priority_map
+        object fit_cache, dirty_peaks, cached, budget
+        list fits
+        bint narrowed
+        PeakDependenceGraphBase peak_graph
     _priority_map = self._priority_map
+    fit_cache = self._fit_cache
+    dirty_peaks = self._dirty_peaks
+    budget = self.budget
+    narrowed = False
+    peak_graph = <PeakDependenceGraphBase>self.peak_dependency_network
+    if self.use_quick_charge and self._quick_charge_table is None:
+        self._build_quick_charge_table(charge_range)
     n = self.peaklist.get_size()
     for i in range(n):
         peak = self.peaklist.getitem(i)
         if peak in _priority_map or peak.intensity < self.minimum_intensity:
             continue
-        n = _explore_local(self,
-            peak, error_tolerance=error_tolerance, charge_range=charge_range,
-            left_search_limit=left_search_limit, right_search_limit=right_search_limit,
-            charge_carrier=charge_carrier,
-            truncate_after=truncate_after, ignore_below=ignore_below)
+        fits = None
+        if dirty_peaks is not None and not (<list>dirty_peaks)[i]:
+            cached = (<list>fit_cache)[i]
+            if cached is not None:
+                fits = <list>cached
+        if fits is None:
+            if budget is not None and not narrowed and budget.spend():
+                narrowed = True
+                left_search_limit = self._narrow_search(left_search_limit)
+            fits = _explore_local_fits(self,
+                peak, error_tolerance=error_tolerance, charge_range=charge_range,
+                left_search_limit=left_search_limit, right_search_limit=right_search_limit,
+                charge_carrier=charge_carrier,
+                truncate_after=truncate_after, ignore_below=ignore_below)
+            if fit_cache is not None:
+                (<list>fit_cache)[i] = fits
+        m = PyList_GET_SIZE(fits)
+        for j in range(m):
+            peak_graph.add_fit_dependence(<IsotopicFitRecord>PyList_GET_ITEM(fits, j))
 
 
 @cython.binding(True)
@@ -56,6 +56,7 @@ cdef class DependenceCluster(SpanningMixin):
     cpdef ConnectedSubgraph build_graph(self)
     cdef IsotopicFitRecord _best_fit(self)
     cpdef list disjoint_best_fits(self)
+    cpdef list interval_best_fits(self)
     cdef double _start(self)
     cdef double _end(self)
 
@@ -75,10 +76,19 @@ cdef class PeakDependenceGraphBase(object):
 
         public IntervalTreeNode _interval_tree
 
+        size_t* _component_parent
+        size_t* _component_rank
+        size_t _component_capacity
+        public bint _components_stale
+
     cpdef reset(self)
     cpdef _populate_initial_graph(self)
+    cpdef _reset_components(self)
+    cdef int _ensure_component_capacity(self, size_t n) except -1
+    cdef size_t _find_component(self, size_t i)
+    cdef int _merge_components(self, IsotopicFitRecord fit_record) except -1
     cpdef add_fit_dependence(self, IsotopicFitRecord fit_record)
     cpdef list nodes_for(self, IsotopicFitRecord fit_record, dict cache=*)
     cpdef drop_fit_dependence(self, IsotopicFitRecord fit_record)
     cpdef best_exact_fits(self)
-    cpdef _gather_independent_clusters(self, dict nodes_for_cache=*)
\ No newline at end of file
+    cpdef list _gather_independent_clusters(self)
\ No newline at end of file
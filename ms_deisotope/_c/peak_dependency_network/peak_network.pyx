@@ -4,6 +4,8 @@ from collections import defaultdict
 
 cimport cython
 
+from libc.stdlib cimport malloc, realloc, free
+
 from cpython cimport Py_INCREF
 from cpython.list cimport PyList_GET_ITEM, PyList_GET_SIZE, PyList_New, PyList_SET_ITEM
 from cpython.tuple cimport PyTuple_GET_ITEM
@@ -17,7 +19,7 @@ from ms_peak_picker._c.peak_set cimport FittedPeak, PeakSet
 
 from ms_deisotope._c.scoring cimport IsotopicFitRecord
 from ms_deisotope._c.peak_dependency_network.intervals cimport SpanningMixin, IntervalTreeNode
-from ms_deisotope._c.peak_dependency_network.subgraph cimport ConnectedSubgraph
+from ms_deisotope._c.peak_dependency_network.subgraph cimport ConnectedSubgraph, select_disjoint_fit_intervals
 
 
 @cython.freelist(1000000)
@@ -148,6 +150,18 @@ cdef class DependenceCluster(SpanningMixin):
         best_fits = fit_sets
         return [node.fit for node in best_fits]
 
+    cpdef list interval_best_fits(self):
+        """
+        Compute the set of isotopic fits spanning this cluster whose m/z
+        intervals do not overlap with the best total score, using
+        :func:`~.select_disjoint_fit_intervals`
+
+        Returns
+        -------
+        list of IsotopicFitRecord
+        """
+        return select_disjoint_fit_intervals(self.dependencies, self.maximize)
+
     cdef double _start(self):
         """
         Determine the first mz coordinate for members of this cluster
@@ -190,6 +204,18 @@ cdef class DependenceCluster(SpanningMixin):
 
 cdef class PeakDependenceGraphBase(object):
 
+    def __cinit__(self, *args, **kwargs):
+        self._component_parent = NULL
+        self._component_rank = NULL
+        self._component_capacity = 0
+        self._components_stale = False
+
+    def __dealloc__(self):
+        free(self._component_parent)
+        free(self._component_rank)
+        self._component_parent = NULL
+        self._component_rank = NULL
+
     cpdef reset(self):
         # Keep a record of all clusters from previous iterations
         self._all_clusters.extend(
@@ -198,6 +224,7 @@ cdef class PeakDependenceGraphBase(object):
         self.dependencies = set()
         self._interval_tree = None
         self._populate_initial_graph()
+        self._reset_components()
 
     cpdef _populate_initial_graph(self):
         cdef:
@@ -210,6 +237,91 @@ cdef class PeakDependenceGraphBase(object):
         for peak in self.peaklist:
             self.nodes[peak.index] = PeakNode(peak)
 
+    cpdef _reset_components(self):
+        '''Rebuild the disjoint set forest over peak positions from
+        the fits currently in :attr:`dependencies`.
+        '''
+        cdef:
+            size_t i, n
+            object fit_record
+        n = self.peaklist.get_size()
+        self._ensure_component_capacity(n)
+        for i in range(self._component_capacity):
+            self._component_parent[i] = i
+            self._component_rank[i] = 0
+        self._components_stale = False
+        for fit_record in self.dependencies:
+            self._merge_components(<IsotopicFitRecord>fit_record)
+
+    cdef int _ensure_component_capacity(self, size_t n) except -1:
+        cdef:
+            size_t i, capacity
+            size_t* parent
+            size_t* rank
+        if n <= self._component_capacity and self._component_parent != NULL:
+            return 0
+        capacity = n if n > self._component_capacity * 2 else self._component_capacity * 2
+        if capacity == 0:
+            capacity = 1
+        parent = <size_t*>realloc(self._component_parent, sizeof(size_t) * capacity)
+        if parent == NULL:
+            raise MemoryError()
+        self._component_parent = parent
+        rank = <size_t*>realloc(self._component_rank, sizeof(size_t) * capacity)
+        if rank == NULL:
+            raise MemoryError()
+        self._component_rank = rank
+        for i in range(self._component_capacity, capacity):
+            self._component_parent[i] = i
+            self._component_rank[i] = 0
+        self._component_capacity = capacity
+        return 0
+
+    cdef size_t _find_component(self, size_t i):
+        cdef:
+            size_t root, next_i
+            size_t* parent
+        parent = self._component_parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        # Compress the path so later queries on these positions are direct
+        while parent[i] != root:
+            next_i = parent[i]
+            parent[i] = root
+            i = next_i
+        return root
+
+    cdef int _merge_components(self, IsotopicFitRecord fit_record) except -1:
+        '''Join the components of every real peak in `fit_record`.
+        '''
+        cdef:
+            size_t i, n, root, other, swap
+            bint has_root
+            FittedPeak peak
+        has_root = False
+        root = 0
+        n = PyList_GET_SIZE(fit_record.experimental)
+        for i in range(n):
+            peak = <FittedPeak>PyList_GET_ITEM(fit_record.experimental, i)
+            if peak.peak_count < 0:
+                continue
+            if <size_t>peak.peak_count >= self._component_capacity:
+                self._ensure_component_capacity(peak.peak_count + 1)
+            other = self._find_component(peak.peak_count)
+            if not has_root:
+                root = other
+                has_root = True
+            elif other != root:
+                if self._component_rank[other] > self._component_rank[root]:
+                    swap = root
+                    root = other
+                    other = swap
+                elif self._component_rank[other] == self._component_rank[root]:
+                    self._component_rank[root] += 1
+                self._component_parent[other] = root
+        return 0
+
     cpdef add_fit_dependence(self, IsotopicFitRecord fit_record):
         '''Add the relatoinship between the experimental peaks
         in `fit_record` to the graph, expressed as a hyper-edge
@@ -218,7 +330,8 @@ cdef class PeakDependenceGraphBase(object):
         This adds `fit_record` to :attr:`PeakNode.links` for each
         node corresponding to the :class:`~.FittedPeak` instance in
         :attr:`IsotopicFitRecord.experimental` of `fit_record`. It also
-        adds `fit_record to :attr:`dependencies`
+        adds `fit_record to :attr:`dependencies`, and joins the connected
+        components of its peaks.
 
         Parameters
         ----------
@@ -236,6 +349,8 @@ cdef class PeakDependenceGraphBase(object):
             node = <PeakNode>PyDict_GetItem(self.nodes, peak.index)
             PyDict_SetItem(node.links, fit_record, fit_record.score)
         self.dependencies.add(fit_record)
+        if not self._components_stale:
+            self._merge_components(fit_record)
 
     cpdef list nodes_for(self, IsotopicFitRecord fit_record, dict cache=None):
         cdef:
@@ -269,6 +384,9 @@ cdef class PeakDependenceGraphBase(object):
     cpdef drop_fit_dependence(self, IsotopicFitRecord fit_record):
         '''Remove this fit from the graph, deleting all
         hyper-edges.
+
+        Components cannot be split, so they will be rebuilt from the
+        remaining fits when they are next gathered.
         '''
         cdef:
             list nodes
@@ -282,6 +400,7 @@ cdef class PeakDependenceGraphBase(object):
                 (PyDict_DelItem(node.links, fit_record))
             except KeyError:
                 pass
+        self._components_stale = True
 
     cpdef best_exact_fits(self):
         '''For each distinct group of experimental peaks, retain only
@@ -325,60 +444,43 @@ cdef class PeakDependenceGraphBase(object):
             best_fits.append(fit)
         self.dependencies = set(best_fits)
 
-    cpdef _gather_independent_clusters(self, dict nodes_for_cache=None):
+    cpdef list _gather_independent_clusters(self):
+        '''Group the fits in :attr:`dependencies` by the connected
+        component of the peaks they depend upon.
+
+        Returns
+        -------
+        list of list of :class:`~.IsotopicFitRecord`
+        '''
         cdef:
             dict clusters
-            set dependencies
-            list dependencies_snapshot, dependent_nodes
-            PeakNode seed_node, dep_node
-            list nodes, nodes_of
-            IsotopicFitRecord dep
-            Py_ssize_t i, n, j, m, k, p
+            list members
+            object _fit
+            IsotopicFitRecord fit_record
+            FittedPeak peak
+            Py_ssize_t i, n
+            size_t root
             PyObject* ptemp
 
-        clusters = dict()
-        if nodes_for_cache is None:
-            nodes_for_cache = dict()
-
-        nodes = PyDict_Values(self.nodes)
-        n = PyList_GET_SIZE(nodes)
-        for i in range(n):
-            seed_node = <PeakNode>PyList_GET_ITEM(nodes, i)
-
-            # This peak is depended upon by each fit in `dependencies`
-            dependencies = set(seed_node.links)
-
-            if len(dependencies) == 0:
+        if self._components_stale:
+            self._reset_components()
+        clusters = {}
+        for _fit in self.dependencies:
+            fit_record = <IsotopicFitRecord>_fit
+            n = PyList_GET_SIZE(fit_record.experimental)
+            for i in range(n):
+                peak = <FittedPeak>PyList_GET_ITEM(fit_record.experimental, i)
+                if peak.peak_count >= 0:
+                    break
+            else:
                 continue
-
-            # These fits also depend upon these other peaks, and those peaks are depended upon
-            # for other fits in turn, which depend upon the assignment of this peak.
-            dependencies_snapshot = list(dependencies)
-            dependent_nodes = []
-            m = PyList_GET_SIZE(dependencies_snapshot)
-            for j in range(m):
-                dep = <IsotopicFitRecord>PyList_GET_ITEM(dependencies_snapshot, j)
-                nodes_of = self.nodes_for(dep, nodes_for_cache)
-                p = PyList_GET_SIZE(nodes_of)
-                for k in range(p):
-                    dep_node = <PeakNode>PyList_GET_ITEM(nodes_of, k)
-                    ptemp = PyDict_GetItem(clusters, dep_node)
-                    if ptemp != NULL:
-                        dependencies |= (<set>ptemp)
-                    # Update all co-depended nodes with the full set of all fits which depend upon them
-                    # PyDict_SetItem(clusters, dep_node, dependencies)
-
-            # dependencies = set(dependencies)
-
-            for _dep in dependencies:
-                dep = <IsotopicFitRecord>_dep
-                nodes_of = self.nodes_for(dep, nodes_for_cache)
-                p = PyList_GET_SIZE(nodes_of)
-                for k in range(p):
-                    dep_node = <PeakNode>PyList_GET_ITEM(nodes_of, k)
-                    PyDict_SetItem(clusters, dep_node, dependencies)
-
-        return clusters
+            root = self._find_component(peak.peak_count)
+            ptemp = PyDict_GetItem(clusters, root)
+            if ptemp == NULL:
+                PyDict_SetItem(clusters, root, [fit_record])
+            else:
+                (<list>ptemp).append(fit_record)
+        return PyDict_Values(clusters)
 
 
 cdef double INFTY = float('inf')
@@ -33,3 +33,6 @@ cdef class ConnectedSubgraph(object):
     cdef void _init_nodes(self, list fits)
     cdef void populate_edges(self)
     cpdef find_heaviest_path(self, method=*)
+
+
+cpdef list select_disjoint_fit_intervals(list fits, bint maximize=*)
@@ -1,4 +1,5 @@
 cimport cython
+from libc.stdlib cimport malloc, free, qsort
 from cpython.list cimport PyList_GetItem, PyList_Size, PyList_AsTuple
 from cpython.tuple cimport PyTuple_GetItem, PyTuple_Size
 from cpython.set cimport PySet_Add
@@ -128,6 +129,236 @@ cpdef list layout_layers(list envelopes, bint maximize=True):
     return layers
 
 
+cdef struct fit_interval:
+    double start
+    double end
+    double weight
+    size_t index
+
+
+cdef int compare_fit_interval_end(const void* a, const void* b) nogil:
+    cdef:
+        fit_interval* x = <fit_interval*>a
+        fit_interval* y = <fit_interval*>b
+    if x.end < y.end:
+        return -1
+    elif x.end > y.end:
+        return 1
+    elif x.index < y.index:
+        return -1
+    elif x.index > y.index:
+        return 1
+    return 0
+
+
+cdef list _schedule_fit_intervals(list fits, bint maximize=True):
+    cdef:
+        size_t i, j, k, n, lo, hi, mid
+        fit_interval* intervals
+        double* best
+        size_t* predecessors
+        IsotopicFitRecord fit
+        list experimental, selected
+        double take, weight
+
+    n = PyList_Size(fits)
+    if n == 0:
+        return []
+    intervals = <fit_interval*>malloc(sizeof(fit_interval) * n)
+    best = <double*>malloc(sizeof(double) * (n + 1))
+    predecessors = <size_t*>malloc(sizeof(size_t) * n)
+    if intervals == NULL or best == NULL or predecessors == NULL:
+        free(intervals)
+        free(best)
+        free(predecessors)
+        raise MemoryError()
+    try:
+        for i in range(n):
+            fit = <IsotopicFitRecord>PyList_GetItem(fits, i)
+            experimental = fit.experimental
+            intervals[i].start = (<FittedPeak>PyList_GetItem(experimental, 0)).mz
+            intervals[i].end = (<FittedPeak>PyList_GetItem(experimental, PyList_Size(experimental) - 1)).mz
+            weight = fit.score if maximize else 1.0 / (1.0 + fit.score)
+            intervals[i].weight = weight * weight
+            intervals[i].index = i
+
+        with nogil:
+            qsort(intervals, n, sizeof(fit_interval), compare_fit_interval_end)
+            # best[j] is the greatest total weight using only the first j intervals by end
+            best[0] = 0
+            for j in range(n):
+                # The number of intervals ending strictly before this interval starts
+                lo = 0
+                hi = j
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if intervals[mid].end < intervals[j].start:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                predecessors[j] = lo
+                take = intervals[j].weight + best[lo]
+                best[j + 1] = take if take > best[j] else best[j]
+
+        selected = []
+        j = n
+        while j > 0:
+            k = predecessors[j - 1]
+            if intervals[j - 1].weight + best[k] > best[j - 1]:
+                selected.append(<object>PyList_GetItem(fits, intervals[j - 1].index))
+                j = k
+            else:
+                j -= 1
+        selected.reverse()
+        return selected
+    finally:
+        free(intervals)
+        free(best)
+        free(predecessors)
+
+
+cdef tuple _split_dominated_fits(list fits, bint maximize=True):
+    cdef:
+        size_t i, n
+        IsotopicFitRecord fit, other
+        FittedPeak peak
+        list peak_sets, kept, dominated, positions
+        dict containing
+        object peaks, peak_count, key, j
+        bint is_dominated
+
+    n = PyList_Size(fits)
+    peak_sets = []
+    containing = {}
+    for i in range(n):
+        fit = <IsotopicFitRecord>PyList_GetItem(fits, i)
+        peaks = set()
+        for peak in fit.experimental:
+            # Placeholder Peaks have a peak_count of -1
+            if peak.peak_count >= 0:
+                peaks.add(peak.peak_count)
+        peak_sets.append(peaks)
+        for peak_count in peaks:
+            key = (peak_count, fit.charge)
+            positions = containing.get(key)
+            if positions is None:
+                containing[key] = [i]
+            else:
+                positions.append(i)
+    kept = []
+    dominated = []
+    for i in range(n):
+        fit = <IsotopicFitRecord>PyList_GetItem(fits, i)
+        peaks = peak_sets[i]
+        is_dominated = False
+        if peaks:
+            for j in containing[next(iter(peaks)), fit.charge]:
+                if j == i or not peaks <= peak_sets[j]:
+                    continue
+                other = <IsotopicFitRecord>PyList_GetItem(fits, j)
+                if other.score == fit.score:
+                    # Of two fits with the same score and peaks, keep the first
+                    is_dominated = len(peak_sets[j]) > len(peaks) or j < i
+                elif maximize:
+                    is_dominated = other.score > fit.score
+                else:
+                    is_dominated = other.score < fit.score
+                if is_dominated:
+                    break
+        if is_dominated:
+            dominated.append(fit)
+        else:
+            kept.append(fit)
+    return kept, dominated
+
+
+cdef size_t _bisect_left(double* values, size_t n, double x) nogil:
+    cdef size_t lo, hi, mid
+    lo = 0
+    hi = n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if values[mid] < x:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _fit_start(IsotopicFitRecord fit):
+    return (<FittedPeak>PyList_GetItem(fit.experimental, 0)).mz
+
+
+cpdef list select_disjoint_fit_intervals(list fits, bint maximize=True):
+    """Select the set of isotopic fits whose m/z intervals do not overlap with the greatest
+    total weight, as a weighted interval scheduling problem in :math:`O(n \\log n)` time.
+
+    Each fit spans the closed interval from the m/z of its first experimental peak to the
+    m/z of its last, so fits in the selected set never share a peak. When `maximize` is
+    true, a fit's weight is the square of its score, otherwise it is the square of
+    :math:`1 / (1 + score)` so that lower scores are preferred.
+
+    Scores grow with the number of peaks fit, but fits of parts of an envelope can each
+    match their own peaks more closely than the whole, and so outweigh it together. Squaring
+    the weights favours one strong fit over several weaker ones, moving the solution towards
+    the greedy selection. A fit whose real peaks all belong to another fit of the same charge
+    state with an equal or better score is also only considered for the gaps left between
+    the fits selected without it.
+
+    Parameters
+    ----------
+    fits : list of :class:`~.IsotopicFitRecord`
+        The fits to select from
+    maximize : bool, optional
+        Whether a greater score is better
+
+    Returns
+    -------
+    list of :class:`~.IsotopicFitRecord`
+        The selected fits, in ascending order of m/z
+    """
+    cdef:
+        size_t i, k, n_selected
+        list kept, dominated, selected, remaining, experimental
+        IsotopicFitRecord fit
+        double* ends
+        double start, end
+
+    if not fits:
+        return []
+    kept, dominated = _split_dominated_fits(fits, maximize)
+    selected = _schedule_fit_intervals(kept, maximize)
+    if not dominated:
+        return selected
+    n_selected = PyList_Size(selected)
+    ends = <double*>malloc(sizeof(double) * (n_selected + 1))
+    if ends == NULL:
+        raise MemoryError()
+    try:
+        for i in range(n_selected):
+            experimental = (<IsotopicFitRecord>PyList_GetItem(selected, i)).experimental
+            ends[i] = (<FittedPeak>PyList_GetItem(experimental, PyList_Size(experimental) - 1)).mz
+        remaining = []
+        for fit in dominated:
+            experimental = fit.experimental
+            start = (<FittedPeak>PyList_GetItem(experimental, 0)).mz
+            end = (<FittedPeak>PyList_GetItem(experimental, PyList_Size(experimental) - 1)).mz
+            # The first selected interval which does not end before this one starts
+            k = _bisect_left(ends, n_selected, start)
+            if k < n_selected:
+                experimental = (<IsotopicFitRecord>PyList_GetItem(selected, k)).experimental
+                if (<FittedPeak>PyList_GetItem(experimental, 0)).mz <= end:
+                    continue
+            remaining.append(fit)
+    finally:
+        free(ends)
+    if not remaining:
+        return selected
+    selected.extend(select_disjoint_fit_intervals(remaining, maximize))
+    selected.sort(key=_fit_start)
+    return selected
+
+
 @cython.final
 @cython.freelist(5)
 cdef class GreedySubgraphSelection(object):
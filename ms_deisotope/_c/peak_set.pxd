@@ -87,6 +87,8 @@ cdef class DeconvolutedPeakSet(object):
 
     cdef DeconvolutedPeak _get_nearest_peak(self, double neutral_mass, double* errout)
 
+    cdef tuple _mass_column(self, bint use_mz)
+
     cdef size_t get_size(self)
 
     cdef DeconvolutedPeak getitem(self, size_t i)
@@ -104,11 +106,15 @@ cdef class DeconvolutedPeakSetIndexed(DeconvolutedPeakSet):
 
         size_t _size
 
+        # The size requested, which may be AUTO_INTERVAL_INDEX_SIZE, and the size chosen
+        Py_ssize_t _requested_interval_index_size
+        Py_ssize_t _interval_index_size
+
     cdef void _build_index_arrays(self)
     cdef int _interval_for(self, double neutral_mass, double tolerance, size_t* start, size_t* end) nogil
 
 
-cdef size_t INTERVAL_INDEX_SIZE
+cdef Py_ssize_t INTERVAL_INDEX_SIZE
 
 cdef struct index_cell:
     double center_value
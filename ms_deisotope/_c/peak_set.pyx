@@ -5,7 +5,7 @@ import operator
 cimport cython
 from cpython.tuple cimport (PyTuple_GET_ITEM, PyTuple_GetItem, PyTuple_GetSlice,
                             PyTuple_GET_SIZE, PyTuple_New, PyTuple_SetItem)
-from cpython.list cimport PyList_Append, PyList_AsTuple
+from cpython.list cimport PyList_Append, PyList_AsTuple, PyList_GET_ITEM, PyList_GET_SIZE, PyList_New, PyList_SET_ITEM
 from cpython.ref cimport Py_INCREF
 from cpython.object cimport PyObject
 # from cpython.bytearray cimport PyByteArray_FromStringAndSize
@@ -22,6 +22,7 @@ from libc.stdlib cimport malloc, free
 from ms_deisotope._c.averagine cimport mass_charge_ratio
 from ms_peak_picker._c.peak_set cimport PeakBase
 
+import numpy as np
 cimport numpy as np
 
 np.import_array()
@@ -696,20 +697,87 @@ cdef class DeconvolutedPeakSet:
             int lo_ix, hi_ix
             DeconvolutedPeak lo_peak
             DeconvolutedPeak hi_peak
-        lo = neutral_mass - neutral_mass * tolerance
-        hi = neutral_mass + neutral_mass * tolerance
+        lo = neutral_mass / (1 + tolerance)
+        hi = neutral_mass / (1 - tolerance)
         lo_peak = binary_search_nearest_neutral_mass(self.peaks, lo, &lo_err)
         hi_peak = binary_search_nearest_neutral_mass(self.peaks, hi, &hi_err)
         lo_ix = lo_peak._index.neutral_mass
-        if lo_ix < PyTuple_GET_SIZE(self.peaks) and abs(
-                ppm_error(lo_peak.neutral_mass, neutral_mass)) > tolerance:
+        if lo_ix < PyTuple_GET_SIZE(self.peaks) and fabs(
+                _ppm_error(neutral_mass, lo_peak.neutral_mass)) >= tolerance:
             lo_ix += 1
         hi_ix = hi_peak._index.neutral_mass + 1
-        if hi_ix != 0 and abs(
-                ppm_error(hi_peak.neutral_mass, neutral_mass)) > tolerance:
+        if hi_ix != 0 and fabs(
+                _ppm_error(neutral_mass, hi_peak.neutral_mass)) >= tolerance:
             hi_ix -= 1
         return <tuple>PyTuple_GetSlice(self.peaks, lo_ix, hi_ix)
 
+    cdef tuple _mass_column(self, bint use_mz):
+        cdef:
+            size_t i, n
+            tuple peaks
+            DeconvolutedPeak peak
+            np.ndarray[double, ndim=1] values
+            np.ndarray[np.intp_t, ndim=1] order
+        if not self.indexed:
+            self.reindex()
+        n = self.get_size()
+        values = np.empty(n, dtype=np.float64)
+        if use_mz:
+            order = np.empty(n, dtype=np.intp)
+            for i in range(n):
+                peak = <DeconvolutedPeak>PyTuple_GET_ITEM(self._mz_ordered, i)
+                values[i] = peak.mz
+                order[i] = peak._index.neutral_mass
+            return values, order
+        for i in range(n):
+            values[i] = self.getitem(i).neutral_mass
+        return values, None
+
+    def has_peaks(self, neutral_masses, double error_tolerance=1e-5, bint use_mz=False):
+        '''Find the position of the peak that best matches each of ``neutral_masses``
+        within ``error_tolerance`` mass accuracy ppm, as :meth:`has_peak` would.
+
+        Parameters
+        ----------
+        neutral_masses: :class:`np.ndarray`
+            The masses to search for
+        error_tolerance: double
+            The PPM error tolerance to apply
+        use_mz: bool
+            Whether to search using m/z instead of neutral mass
+
+        Returns
+        -------
+        :class:`np.ndarray` of int
+            The position of the matching peak in :attr:`peaks` for each query, or -1
+            where no peak matches
+        '''
+        values, order = self._mass_column(use_mz)
+        indices = nearest_match_indices(values, neutral_masses, error_tolerance)
+        if order is not None:
+            indices = np.where(indices >= 0, order[indices], -1)
+        return indices
+
+    def all_peaks_for_many(self, neutral_masses, double tolerance=1e-5):
+        '''Find the positions of all peaks that match each of ``neutral_masses``
+        within ``tolerance`` mass accuracy ppm, as :meth:`all_peaks_for` would.
+
+        Parameters
+        ----------
+        neutral_masses: :class:`np.ndarray`
+            The masses to search for
+        tolerance: double
+            The PPM error tolerance to apply
+
+        Returns
+        -------
+        starts: :class:`np.ndarray` of int
+        ends: :class:`np.ndarray` of int
+            The peaks matching the ``i`` th query are ``peaks[starts[i]:ends[i]]``
+        '''
+        values, _ = self._mass_column(False)
+        return match_intervals(values, neutral_masses, tolerance)
+
     cdef DeconvolutedPeak _get_nearest_peak(self, double neutral_mass, double* errout):
         '''Find the peak nearest to ``neutral_mass``, regardless of error.
 
@@ -794,6 +862,128 @@ cdef double INF
 INF = float('inf')
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef np.ndarray nearest_match_indices(object values, object queries, double error_tolerance=1e-5):
+    """Find the position of the value nearest to each of `queries` in the sorted
+    array `values`, if it is within `error_tolerance` PPM error of that value.
+
+    The queries are visited in ascending order, so every query is answered in a
+    single sweep over `values`.
+
+    Parameters
+    ----------
+    values : :class:`np.ndarray`
+        The values to search, in ascending order
+    queries : :class:`np.ndarray`
+        The values to search for, in any order
+    error_tolerance : float, optional
+        The PPM error tolerance to apply
+
+    Returns
+    -------
+    :class:`np.ndarray` of int
+        The position of the nearest match in `values` for each query, or -1
+        where there is no match
+    """
+    cdef:
+        const double[::1] values_, queries_
+        const np.intp_t[::1] order
+        np.intp_t[::1] indices_
+        size_t i, j, k, n, m
+        np.intp_t best_index
+        double query, error, best_error
+
+    values_ = np.ascontiguousarray(values, dtype=np.float64)
+    queries_array = np.ascontiguousarray(queries, dtype=np.float64)
+    queries_ = queries_array
+    n = values_.shape[0]
+    m = queries_.shape[0]
+    indices = np.full(m, -1, dtype=np.intp)
+    if n == 0 or m == 0:
+        return indices
+    indices_ = indices
+    order = np.argsort(queries_array, kind='mergesort').astype(np.intp)
+    j = 0
+    for k in range(m):
+        i = order[k]
+        query = queries_[i]
+        while j < n and values_[j] < query:
+            j += 1
+        best_index = -1
+        best_error = INF
+        if j > 0:
+            best_index = j - 1
+            best_error = fabs(values_[j - 1] - query)
+        if j < n:
+            error = fabs(values_[j] - query)
+            if error < best_error:
+                best_index = j
+                best_error = error
+        if best_error / fabs(values_[best_index]) < error_tolerance:
+            indices_[i] = best_index
+    return indices
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef tuple match_intervals(object values, object queries, double tolerance=1e-5):
+    """Find the range of positions of the values within `tolerance` PPM error of each
+    of `queries` in the sorted array `values`.
+
+    The queries are visited in ascending order, so every query is answered in a
+    single sweep over `values`.
+
+    Parameters
+    ----------
+    values : :class:`np.ndarray`
+        The values to search, in ascending order
+    queries : :class:`np.ndarray`
+        The values to search for, in any order
+    tolerance : float, optional
+        The PPM error tolerance to apply
+
+    Returns
+    -------
+    starts : :class:`np.ndarray` of int
+    ends : :class:`np.ndarray` of int
+        The matches of the ``i`` th query are ``values[starts[i]:ends[i]]``
+    """
+    cdef:
+        const double[::1] values_, queries_
+        const np.intp_t[::1] order
+        np.intp_t[::1] starts_, ends_
+        size_t i, k, n, m, lo, hi
+        double query
+
+    values_ = np.ascontiguousarray(values, dtype=np.float64)
+    queries_array = np.ascontiguousarray(queries, dtype=np.float64)
+    queries_ = queries_array
+    n = values_.shape[0]
+    m = queries_.shape[0]
+    starts = np.zeros(m, dtype=np.intp)
+    ends = np.zeros(m, dtype=np.intp)
+    if n == 0 or m == 0:
+        return starts, ends
+    starts_ = starts
+    ends_ = ends
+    order = np.argsort(queries_array, kind='mergesort').astype(np.intp)
+    lo = hi = 0
+    for k in range(m):
+        i = order[k]
+        query = queries_[i]
+        while lo < n and values_[lo] < query and fabs(_ppm_error(query, values_[lo])) >= tolerance:
+            lo += 1
+        if hi < lo:
+            hi = lo
+        while hi < n and (values_[hi] <= query or fabs(_ppm_error(query, values_[hi])) < tolerance):
+            hi += 1
+        starts_[i] = lo
+        ends_[i] = hi
+    return starts, ends
+
+
 cdef DeconvolutedPeak _sweep_solution_neutral_mass(tuple array, double value, size_t mid, double tolerance):
     cdef:
         size_t best_index, i, n
@@ -903,7 +1093,7 @@ cdef int _binary_search_interval(double* array, double target, double error_tole
     while hi != lo:
         mid = (hi + lo) / 2
         found_mass = array[mid]
-        if fabs(_ppm_error(found_mass, target)) < error_tolerance:
+        if fabs(_ppm_error(target, found_mass)) < error_tolerance:
             best_index = mid
             best_error = INF
             i = 0
@@ -919,7 +1109,7 @@ cdef int _binary_search_interval(double* array, double target, double error_tole
                 i += 1
             start[0] = mid - i + 1
             i = 1
-            while (mid + i) < (n - 1):
+            while (mid + i) < n:
                 found_mass = array[mid + i]
                 abs_error = fabs(_ppm_error(target, found_mass))
                 if abs_error < error_tolerance:
@@ -1077,6 +1267,193 @@ cdef DeconvolutedPeak binary_search_nearest_neutral_mass(tuple peak_set, double
             lo = mid
 
 
+cdef inline double _merge_key(DeconvolutedPeak peak, bint by_mz):
+    if by_mz:
+        return peak.mz
+    return peak.neutral_mass
+
+
+cdef inline bint _merge_heap_less(double* keys, size_t* heap, size_t a, size_t b) nogil:
+    # Ties go to the earlier run, so merging is stable across inputs
+    return keys[heap[a]] < keys[heap[b]] or (keys[heap[a]] == keys[heap[b]] and heap[a] < heap[b])
+
+
+cdef void _merge_heap_sift_down(double* keys, size_t* heap, size_t size, size_t i) nogil:
+    cdef:
+        size_t smallest, left, right, tmp
+    while True:
+        smallest = i
+        left = 2 * i + 1
+        right = left + 1
+        if left < size and _merge_heap_less(keys, heap, left, smallest):
+            smallest = left
+        if right < size and _merge_heap_less(keys, heap, right, smallest):
+            smallest = right
+        if smallest == i:
+            return
+        tmp = heap[i]
+        heap[i] = heap[smallest]
+        heap[smallest] = tmp
+        i = smallest
+
+
+cdef list _merge_sorted_runs(list runs, bint by_mz):
+    """Merge tuples of :class:`DeconvolutedPeak`, each sorted by neutral mass
+    or by m/z, with a binary heap over the head of each run.
+    """
+    cdef:
+        size_t k, r, size, i, total
+        size_t* heap
+        size_t* positions
+        double* keys
+        tuple run
+        list merged
+
+    k = PyList_GET_SIZE(runs)
+    keys = <double*>malloc(sizeof(double) * (k + 1))
+    heap = <size_t*>malloc(sizeof(size_t) * (k + 1))
+    positions = <size_t*>malloc(sizeof(size_t) * (k + 1))
+    size = 0
+    total = 0
+    for r in range(k):
+        run = <tuple>PyList_GET_ITEM(runs, r)
+        positions[r] = 0
+        total += PyTuple_GET_SIZE(run)
+        if PyTuple_GET_SIZE(run) > 0:
+            keys[r] = _merge_key(<DeconvolutedPeak>PyTuple_GET_ITEM(run, 0), by_mz)
+            heap[size] = r
+            size += 1
+    i = size // 2
+    while i > 0:
+        i -= 1
+        _merge_heap_sift_down(keys, heap, size, i)
+
+    merged = PyList_New(total)
+    i = 0
+    while size > 0:
+        r = heap[0]
+        run = <tuple>PyList_GET_ITEM(runs, r)
+        peak = <object>PyTuple_GET_ITEM(run, positions[r])
+        Py_INCREF(peak)
+        PyList_SET_ITEM(merged, i, peak)
+        i += 1
+        positions[r] += 1
+        if positions[r] < <size_t>PyTuple_GET_SIZE(run):
+            keys[r] = _merge_key(<DeconvolutedPeak>PyTuple_GET_ITEM(run, positions[r]), by_mz)
+        else:
+            size -= 1
+            heap[0] = heap[size]
+        _merge_heap_sift_down(keys, heap, size, 0)
+
+    free(keys)
+    free(heap)
+    free(positions)
+    return merged
+
+
+cdef tuple _mz_ordered_run(DeconvolutedPeakSet peak_set, tuple by_mass):
+    # Re-use the m/z ordering of an indexed peak set for `by_mass`, copies of
+    # its peaks, falling back to sorting if its indices are out of date.
+    cdef:
+        size_t i, j, n
+        DeconvolutedPeak peak
+        tuple by_mz
+    n = PyTuple_GET_SIZE(by_mass)
+    if peak_set._mz_ordered is None or PyTuple_GET_SIZE(peak_set._mz_ordered) != n:
+        return tuple(sorted(by_mass, key=mz_getter))
+    by_mz = PyTuple_New(n)
+    for i in range(n):
+        peak = <DeconvolutedPeak>PyTuple_GET_ITEM(peak_set._mz_ordered, i)
+        j = peak._index.neutral_mass
+        if j >= n or PyTuple_GET_ITEM(peak_set.peaks, j) != <PyObject*>peak:
+            return tuple(sorted(by_mass, key=mz_getter))
+        peak = <DeconvolutedPeak>PyTuple_GET_ITEM(by_mass, j)
+        Py_INCREF(peak)
+        PyTuple_SetItem(by_mz, i, peak)
+    return by_mz
+
+
+cpdef DeconvolutedPeakSet merge_peak_sets(object peak_sets, bint copy=True):
+    '''Combine any number of :class:`DeconvolutedPeakSet` objects.
+
+    Indexed peak sets are already sorted by neutral mass and by m/z, so their peaks
+    are merged in a single pass over each ordering, assigning the index of each
+    peak as it is placed. Other inputs, like lists of peaks, are sorted first.
+
+    Parameters
+    ----------
+    peak_sets: :class:`~.Iterable` of :class:`DeconvolutedPeakSet`
+    copy: bool
+        Whether or not to copy the peaks first. If not,
+        the input peak sets should not be used again
+        as their indices will have been corrupted.
+
+    Returns
+    -------
+    :class:`DeconvolutedPeakSet`
+        An instance of the type of the first input if it is a :class:`DeconvolutedPeakSet`,
+        otherwise a :class:`DeconvolutedPeakSetIndexed`
+    '''
+    cdef:
+        list inputs, mass_runs, mz_runs, merged, merged_mz
+        tuple by_mass, by_mz
+        size_t i, n
+        DeconvolutedPeakSet peak_set, result
+        DeconvolutedPeak peak
+
+    inputs = list(peak_sets)
+    tp = DeconvolutedPeakSetIndexed
+    if inputs and isinstance(inputs[0], DeconvolutedPeakSet):
+        tp = inputs[0].__class__
+    mass_runs = []
+    mz_runs = []
+    for peaks in inputs:
+        if isinstance(peaks, DeconvolutedPeakSet) and (<DeconvolutedPeakSet>peaks).indexed:
+            peak_set = <DeconvolutedPeakSet>peaks
+            if copy:
+                n = peak_set.get_size()
+                by_mass = PyTuple_New(n)
+                for i in range(n):
+                    peak = peak_set.getitem(i).clone()
+                    Py_INCREF(peak)
+                    PyTuple_SetItem(by_mass, i, peak)
+                by_mz = _mz_ordered_run(peak_set, by_mass)
+            else:
+                by_mass = peak_set.peaks
+                by_mz = _mz_ordered_run(peak_set, by_mass)
+        else:
+            peaks = list(peaks)
+            for item in peaks:
+                if not isinstance(item, DeconvolutedPeak):
+                    raise TypeError("Cannot merge %r, expected a DeconvolutedPeak" % (item, ))
+            if copy:
+                peaks = [peak.clone() for peak in peaks]
+            by_mass = tuple(sorted(peaks, key=neutral_mass_getter))
+            by_mz = tuple(sorted(by_mass, key=mz_getter))
+        mass_runs.append(by_mass)
+        mz_runs.append(by_mz)
+
+    merged = _merge_sorted_runs(mass_runs, False)
+    n = PyList_GET_SIZE(merged)
+    for i in range(n):
+        peak = <DeconvolutedPeak>PyList_GET_ITEM(merged, i)
+        peak._index = _Index._create(i, 0)
+    merged_mz = _merge_sorted_runs(mz_runs, True)
+    for i in range(n):
+        peak = <DeconvolutedPeak>PyList_GET_ITEM(merged_mz, i)
+        peak._index.mz = i
+
+    result = tp(merged)
+    result._mz_ordered = PyList_AsTuple(merged_mz)
+    result.indexed = True
+    if isinstance(result, DeconvolutedPeakSetIndexed):
+        if isinstance(inputs[0], DeconvolutedPeakSetIndexed):
+            (<DeconvolutedPeakSetIndexed>result)._requested_interval_index_size = (
+                <DeconvolutedPeakSetIndexed>inputs[0])._requested_interval_index_size
+        (<DeconvolutedPeakSetIndexed>result)._build_index_arrays()
+    return result
+
+
 def convert(self):
     return DeconvolutedPeak(
         self.neutral_mass, self.intensity, self.charge,
@@ -1119,13 +1496,74 @@ def decode_envelopes(np.ndarray[cython.floating, ndim=1, mode='c'] array):
     return envelope_list
 
 
-INTERVAL_INDEX_SIZE = 0
+#: The :attr:`~.DeconvolutedPeakSetIndexed.interval_index_size` value which sizes the
+#: interval index with :func:`interval_index_size_for`
+AUTO_INTERVAL_INDEX_SIZE = -1
+
+#: The :attr:`~.DeconvolutedPeakSetIndexed.interval_index_size` of new peak sets
+INTERVAL_INDEX_SIZE = -1
+
+#: The number of peaks each cell of an automatically sized interval index should cover
+cdef size_t PEAKS_PER_INTERVAL_CELL = 4
+#: The fewest peaks for which an automatically sized interval index is built. Below
+#: this a plain binary search is as fast.
+cdef size_t MIN_INTERVAL_INDEXED_PEAKS = 1024
+#: The narrowest cell of an automatically sized interval index, in Daltons
+cdef double MIN_INTERVAL_CELL_WIDTH = 0.1
+
+
+cpdef size_t interval_index_size_for(size_t n, double low, double high):
+    """Choose the number of cells of the interval index for `n` peaks whose neutral
+    masses span `low` to `high`.
+
+    Each cell covers about four peaks if the peaks were spread evenly, but cells are
+    not made narrower than 0.1 Da, and peak sets with fewer than 1024 peaks or no mass
+    spread get no index at all.
+
+    Parameters
+    ----------
+    n : int
+        The number of peaks
+    low : float
+        The smallest neutral mass
+    high : float
+        The largest neutral mass
+
+    Returns
+    -------
+    int
+        The number of cells, or 0 if the index should not be built
+    """
+    cdef:
+        size_t size, widest
+    if n < MIN_INTERVAL_INDEXED_PEAKS or high <= low:
+        return 0
+    size = n // PEAKS_PER_INTERVAL_CELL
+    widest = <size_t>((high - low) / MIN_INTERVAL_CELL_WIDTH)
+    if widest < size:
+        size = widest
+    if size < 2:
+        return 0
+    return size
+
 
 cdef class DeconvolutedPeakSetIndexed(DeconvolutedPeakSet):
+    """A :class:`DeconvolutedPeakSet` which copies the neutral mass and m/z of its peaks
+    into C arrays to search, with an interpolating interval index over the neutral mass
+    array to narrow each search.
+
+    Attributes
+    ----------
+    interval_index_size : int
+        The number of cells of the interval index. If :const:`0`, no index is built. If
+        set to :const:`AUTO_INTERVAL_INDEX_SIZE`, the size is chosen by :func:`interval_index_size_for`
+        whenever the peak set is reindexed, and the size chosen is reported once it is.
+    """
     def __init__(self, peaks):
         self.neutral_mass_array = NULL
         self.mz_array = NULL
         self.interval_index = NULL
+        self.interval_index_size = INTERVAL_INDEX_SIZE
         super(DeconvolutedPeakSetIndexed, self).__init__(peaks)
 
     def __dealloc__(self):
@@ -1135,10 +1573,11 @@ cdef class DeconvolutedPeakSetIndexed(DeconvolutedPeakSet):
         return self.__class__, (self.peaks, ), self.__getstate__()
 
     def __getstate__(self):
-        d = {"indexed": self.indexed}
+        d = {"indexed": self.indexed, "interval_index_size": self._requested_interval_index_size}
         return d
 
     def __setstate__(self, d):
+        self.interval_index_size = d.get("interval_index_size", INTERVAL_INDEX_SIZE)
         if d.get("indexed", False):
             self.reindex()
 
@@ -1153,15 +1592,47 @@ cdef class DeconvolutedPeakSetIndexed(DeconvolutedPeakSet):
             free_index_list(self.interval_index)
             self.interval_index = NULL
 
-    def set_interval_index_size(self, index_size):
-        global INTERVAL_INDEX_SIZE
-        INTERVAL_INDEX_SIZE = index_size
+    def set_interval_index_size(self, index_size=AUTO_INTERVAL_INDEX_SIZE):
+        """Set :attr:`interval_index_size` and rebuild the index.
+
+        Parameters
+        ----------
+        index_size : int, optional
+            The number of cells of the index, :const:`0` to search without an
+            index, or :const:`AUTO_INTERVAL_INDEX_SIZE`, the default, to size the
+            index from the peaks with :func:`interval_index_size_for`.
+        """
+        if index_size is None:
+            index_size = AUTO_INTERVAL_INDEX_SIZE
+        self.interval_index_size = index_size
         self.reindex()
 
+    @property
+    def interval_index_size(self):
+        return self._interval_index_size
+
+    @interval_index_size.setter
+    def interval_index_size(self, Py_ssize_t index_size):
+        self._requested_interval_index_size = index_size
+        self._interval_index_size = index_size
+
+    @property
+    def interval_index_cells(self):
+        """The number of cells in the interval index currently built, or 0 if there is none.
+
+        Returns
+        -------
+        int
+        """
+        if self.interval_index == NULL:
+            return 0
+        return self.interval_index.size
+
     cdef void _build_index_arrays(self):
         cdef:
-            size_t i, n
+            size_t i, n, index_size
             DeconvolutedPeak peak
+            index_list* interval_index
         n = PyTuple_GET_SIZE(self.peaks)
         self._size = n
         self._release_buffers()
@@ -1173,14 +1644,15 @@ cdef class DeconvolutedPeakSetIndexed(DeconvolutedPeakSet):
             self.neutral_mass_array[i] = peak.neutral_mass
             self.mz_array[peak._index.mz] = peak.mz
 
-        # The interpolating interval index is just a bit slower than
-        # the normal binary search, likely due to cache friendliness.
-        if n > 2 and INTERVAL_INDEX_SIZE > 0:
-            if self.interval_index != NULL:
-                free_index_list(self.interval_index)
-                self.interval_index = NULL
+        if self._requested_interval_index_size < 0:
+            index_size = interval_index_size_for(
+                n, self.neutral_mass_array[0], self.neutral_mass_array[n - 1]) if n > 0 else 0
+        else:
+            index_size = self._requested_interval_index_size
+        self._interval_index_size = index_size
+        if n > 2 and index_size > 1:
             interval_index = <index_list*>malloc(sizeof(index_list))
-            build_interval_index(self, interval_index, INTERVAL_INDEX_SIZE)
+            build_interval_index(self.neutral_mass_array, n, interval_index, index_size)
             if check_index(interval_index) != 0:
                 free_index_list(interval_index)
             else:
@@ -1225,7 +1697,9 @@ cdef class DeconvolutedPeakSetIndexed(DeconvolutedPeakSet):
         if n == 0:
             return None
         if self.interval_index != NULL:
-            find_search_interval(self.interval_index, neutral_mass, &s, &n)
+            find_search_bounds(
+                self.interval_index, neutral_mass - neutral_mass * error_tolerance,
+                neutral_mass + neutral_mass * error_tolerance, &s, &n)
             status = _binary_search_with_hint(self.neutral_mass_array, neutral_mass, error_tolerance, n, s, &i)
         else:
             status = _binary_search(self.neutral_mass_array, neutral_mass, error_tolerance, n, &i)
@@ -1270,7 +1744,9 @@ cdef class DeconvolutedPeakSetIndexed(DeconvolutedPeakSet):
         if n == 0:
             return ()
         if self.interval_index != NULL:
-            find_search_interval(self.interval_index, neutral_mass, &s, &n)
+            find_search_bounds(
+                self.interval_index, neutral_mass / (1 + tolerance),
+                neutral_mass / (1 - tolerance), &s, &n)
             status = _binary_search_interval_with_hint(
                 self.neutral_mass_array, neutral_mass, tolerance, n, s, &start, &end)
         else:
@@ -1400,7 +1876,7 @@ cdef int _binary_search_interval_with_hint(double* array, double target, double
     while hi != lo:
         mid = (hi + lo) / 2
         found_mass = array[mid]
-        if fabs(_ppm_error(found_mass, target)) < error_tolerance:
+        if fabs(_ppm_error(target, found_mass)) < error_tolerance:
             best_index = mid
             best_error = INF
             i = 0
@@ -1416,7 +1892,7 @@ cdef int _binary_search_interval_with_hint(double* array, double target, double
                 i += 1
             start[0] = mid - i + 1
             i = 1
-            while (mid + i) < (n - 1):
+            while (mid + i) < n:
                 found_mass = array[mid + i]
                 abs_error = fabs(_ppm_error(target, found_mass))
                 if abs_error < error_tolerance:
@@ -1441,16 +1917,21 @@ cdef int _binary_search_interval_with_hint(double* array, double target, double
     return 2
 
 
-cdef int build_interval_index(DeconvolutedPeakSet peaks, index_list* index, size_t index_size):
+cdef int build_interval_index(double* values, size_t n, index_list* index, size_t index_size) nogil:
+    """Build an interpolating interval index of `index_size` evenly spaced cells
+    over the sorted array `values`.
+
+    Each cell spans from the end of the previous cell to the last value nearer its
+    center than the next cell's center. Because both the cell centers and `values`
+    are sorted, this is done in one pass over `values`.
+    """
     cdef:
         double* linear_spacing
-        double current_value, err, next_value
-        size_t i, start_i, end_i, index_i, peaks_size
-        DeconvolutedPeak peak
-    peaks_size = peaks.get_size()
-    if peaks_size > 0:
-        index.low = peaks.getitem(0).neutral_mass
-        index.high = peaks.getitem(peaks_size - 1).neutral_mass
+        double current_value, next_value
+        size_t i, j, nearest, start_i, end_i, index_i
+    if n > 0:
+        index.low = values[0]
+        index.high = values[n - 1]
     else:
         index.low = 0
         index.high = 1
@@ -1462,21 +1943,30 @@ cdef int build_interval_index(DeconvolutedPeakSet peaks, index_list* index, size
 
     index.index = <index_cell*>malloc(sizeof(index_cell) * index_size)
 
+    j = 0
     for index_i in range(index_size):
         current_value = linear_spacing[index_i]
-        peak = peaks._get_nearest_peak(current_value, &err)
-        if peaks_size > 0:
-            start_i = peak._index.neutral_mass
+        if n > 0:
+            while j < n and values[j] < current_value:
+                j += 1
+            if j == 0:
+                nearest = 0
+            elif j == n or (current_value - values[j - 1]) <= (values[j] - current_value):
+                nearest = j - 1
+            else:
+                nearest = j
+            start_i = nearest
             if index_i > 0:
-                start_i = index.index[index_i - 1].end - 1
+                start_i = index.index[index_i - 1].end
+                if start_i > 0:
+                    start_i -= 1
             if index_i == index_size - 1:
-                end_i = peaks_size - 1
+                end_i = n - 1
             else:
                 next_value = linear_spacing[index_i + 1]
-                i = peak._index.neutral_mass
-                while i < peaks_size:
-                    peak = peaks.getitem(i)
-                    if abs(current_value - peak.neutral_mass) > abs(next_value - peak.neutral_mass):
+                i = nearest
+                while i < n:
+                    if fabs(current_value - values[i]) > fabs(next_value - values[i]):
                         break
                     i += 1
                 end_i = i
@@ -1491,7 +1981,7 @@ cdef int build_interval_index(DeconvolutedPeakSet peaks, index_list* index, size
     return 0
 
 
-cdef double* build_linear_spaced_array(double low, double high, size_t n):
+cdef double* build_linear_spaced_array(double low, double high, size_t n) nogil:
     cdef:
         double* array
         double delta
@@ -1553,3 +2043,13 @@ cdef int find_search_interval(index_list* index, double value, size_t* start, si
     else:
         end[0] = index.index[i + 1].end + 1
     return 0
+
+
+cdef int find_search_bounds(index_list* index, double low, double high, size_t* start, size_t* end):
+    # The cells neighbouring a single value may not reach every value within a wide
+    # tolerance of it, so start from the cells around `low` and end with those around `high`
+    cdef:
+        size_t unused
+    find_search_interval(index, low, start, &unused)
+    find_search_interval(index, high, &unused, end)
+    return 0
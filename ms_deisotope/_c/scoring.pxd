@@ -1,9 +1,13 @@
+cimport cython
+
 from brainpy._c.isotopic_distribution cimport TheoreticalPeak
 from ms_peak_picker._c.peak_set cimport PeakSet, FittedPeak
 
 from ms_deisotope._c.deconvoluter_base cimport DeconvoluterBase
 from ms_deisotope._c.averagine cimport TheoreticalIsotopicPattern
 
+cimport numpy as np
+
 ctypedef fused fit_collection:
     list
     set
@@ -13,6 +17,9 @@ ctypedef fused fit_collection:
 cdef double INFINITY = float('inf')
 
 
+cdef bint overrides_method(object obj, type base, str name)
+
+
 cdef class IsotopicFitRecord(object):
     cdef:
         public FittedPeak seed_peak
@@ -47,11 +54,31 @@ cdef class FitSelectorBase(object):
     cpdef bint is_maximizing(self)
 
 
+@cython.final
+cdef class IsotopicFitBatch(object):
+    cdef:
+        public np.ndarray indptr
+        public np.ndarray observed_mz
+        public np.ndarray observed_intensity
+        public np.ndarray observed_signal_to_noise
+        public np.ndarray expected_mz
+        public np.ndarray expected_intensity
+
+    @staticmethod
+    cdef IsotopicFitBatch _create(list observed, list expected)
+
+    cdef size_t get_size(self)
+
+
 cdef class IsotopicFitterBase(object):
     cdef:
         public FitSelectorBase select
 
     cpdef double _evaluate(self, PeakSet peaklist, list observed, list expected)
+    cpdef np.ndarray _evaluate_batch(self, PeakSet peaklist, list observed, list expected)
+    cpdef np.ndarray _evaluate_packed(self, PeakSet peaklist, IsotopicFitBatch batch)
+    cpdef bint supports_packed_evaluation(self)
+    cpdef double best_possible_score(self, list observed)
     cpdef bint reject(self, IsotopicFitRecord fit)
     cpdef bint reject_score(self, double score)
     cpdef bint is_maximizing(self)
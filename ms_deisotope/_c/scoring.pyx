@@ -1,7 +1,7 @@
 # cython: embedsignature=True
 
 cimport cython
-from libc.math cimport fabs, sqrt, log, ceil, floor
+from libc.math cimport fabs, sqrt, log, ceil, floor, HUGE_VAL
 from libc.stdlib cimport malloc, free
 import operator
 
@@ -11,6 +11,11 @@ from cpython.sequence cimport PySequence_List
 from brainpy._c.isotopic_distribution cimport TheoreticalPeak
 from ms_peak_picker._c.peak_set cimport PeakSet, FittedPeak
 
+import numpy as np
+cimport numpy as cnp
+
+cnp.import_array()
+
 
 @cython.nonecheck(False)
 @cython.cdivision(True)
@@ -195,6 +200,16 @@ cdef class FitSelectorBase(object):
     def __repr__(self):
         return "{self.__class__.__name__}(minimum_score={self.minimum_score})".format(self=self)
 
+    def fingerprint(self):
+        """Describe the parameters of this selector, as used by
+        :func:`~.deconvolution_cache_key`.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, self.minimum_score)
+
 
 cdef class MinimizeFitSelector(FitSelectorBase):
     """A FitSelector which tries to minimize the score of the best fit.
@@ -320,6 +335,155 @@ cdef class MaximizeFitSelector(FitSelectorBase):
         return True
 
 
+@cython.final
+cdef class IsotopicFitBatch(object):
+    """Many pairs of matched experimental and theoretical peak lists packed
+    into flat arrays so that they can be scored together.
+
+    The peaks of the ith fit are stored in positions ``indptr[i]:indptr[i + 1]``
+    of each peak array, as in a compressed sparse row matrix.
+
+    Attributes
+    ----------
+    indptr : np.ndarray
+        The offsets into the peak arrays where each fit begins, with one more
+        entry than there are fits
+    observed_mz : np.ndarray
+        The m/z of each experimental peak
+    observed_intensity : np.ndarray
+        The intensity of each experimental peak
+    observed_signal_to_noise : np.ndarray
+        The signal-to-noise ratio of each experimental peak
+    expected_mz : np.ndarray
+        The m/z of each theoretical peak
+    expected_intensity : np.ndarray
+        The intensity of each theoretical peak
+    """
+
+    def __init__(self, indptr, observed_mz, observed_intensity, observed_signal_to_noise,
+                 expected_mz, expected_intensity):
+        self.indptr = np.require(indptr, dtype=np.intp, requirements=['C', 'W'])
+        self.observed_mz = np.require(observed_mz, dtype=np.float64, requirements=['C', 'W'])
+        self.observed_intensity = np.require(observed_intensity, dtype=np.float64, requirements=['C', 'W'])
+        self.observed_signal_to_noise = np.require(
+            observed_signal_to_noise, dtype=np.float64, requirements=['C', 'W'])
+        self.expected_mz = np.require(expected_mz, dtype=np.float64, requirements=['C', 'W'])
+        self.expected_intensity = np.require(expected_intensity, dtype=np.float64, requirements=['C', 'W'])
+
+    def __reduce__(self):
+        return self.__class__, (
+            self.indptr, self.observed_mz, self.observed_intensity, self.observed_signal_to_noise,
+            self.expected_mz, self.expected_intensity)
+
+    @staticmethod
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef IsotopicFitBatch _create(list observed, list expected):
+        cdef:
+            IsotopicFitBatch inst
+            size_t i, j, k, n, m
+            list obs, theo
+            FittedPeak fpeak
+            TheoreticalPeak tpeak
+            Py_ssize_t[::1] indptr
+            double[::1] observed_mz, observed_intensity, observed_signal_to_noise
+            double[::1] expected_mz, expected_intensity
+
+        n = PyList_GET_SIZE(observed)
+        if n != <size_t>PyList_GET_SIZE(expected):
+            raise ValueError("Cannot pack %d experimental peak lists with %d theoretical peak lists" % (
+                n, PyList_GET_SIZE(expected)))
+        inst = IsotopicFitBatch.__new__(IsotopicFitBatch)
+        inst.indptr = np.zeros(n + 1, dtype=np.intp)
+        indptr = inst.indptr
+        for i in range(n):
+            obs = <list>PyList_GET_ITEM(observed, i)
+            theo = <list>PyList_GET_ITEM(expected, i)
+            m = PyList_GET_SIZE(obs)
+            if m != <size_t>PyList_GET_SIZE(theo):
+                raise ValueError("Fit %d has %d experimental peaks but %d theoretical peaks" % (
+                    i, m, PyList_GET_SIZE(theo)))
+            indptr[i + 1] = indptr[i] + m
+        m = indptr[n]
+        inst.observed_mz = np.empty(m, dtype=np.float64)
+        inst.observed_intensity = np.empty(m, dtype=np.float64)
+        inst.observed_signal_to_noise = np.empty(m, dtype=np.float64)
+        inst.expected_mz = np.empty(m, dtype=np.float64)
+        inst.expected_intensity = np.empty(m, dtype=np.float64)
+        observed_mz = inst.observed_mz
+        observed_intensity = inst.observed_intensity
+        observed_signal_to_noise = inst.observed_signal_to_noise
+        expected_mz = inst.expected_mz
+        expected_intensity = inst.expected_intensity
+        k = 0
+        for i in range(n):
+            obs = <list>PyList_GET_ITEM(observed, i)
+            theo = <list>PyList_GET_ITEM(expected, i)
+            for j in range(PyList_GET_SIZE(obs)):
+                fpeak = <FittedPeak>PyList_GET_ITEM(obs, j)
+                tpeak = <TheoreticalPeak>PyList_GET_ITEM(theo, j)
+                observed_mz[k] = fpeak.mz
+                observed_intensity[k] = fpeak.intensity
+                observed_signal_to_noise[k] = fpeak.signal_to_noise
+                expected_mz[k] = tpeak.mz
+                expected_intensity[k] = tpeak.intensity
+                k += 1
+        return inst
+
+    @classmethod
+    def from_peak_lists(cls, observed, expected):
+        """Pack parallel sequences of experimental and theoretical peak lists.
+
+        Parameters
+        ----------
+        observed : list of list of :class:`~.FittedPeak`
+            The experimental peaks of each fit
+        expected : list of list of :class:`~.TheoreticalPeak`
+            The theoretical peaks of each fit, the same length as the matching
+            entry of `observed`
+
+        Returns
+        -------
+        :class:`IsotopicFitBatch`
+        """
+        return IsotopicFitBatch._create(
+            [list(obs) for obs in observed], [list(theo) for theo in expected])
+
+    cdef size_t get_size(self):
+        return self.indptr.shape[0] - 1
+
+    def __len__(self):
+        return self.get_size()
+
+    def __repr__(self):
+        return "IsotopicFitBatch(nfits=%d, npeaks=%d)" % (self.get_size(), self.indptr[-1])
+
+
+cdef struct fit_batch_view:
+    size_t size
+    Py_ssize_t* indptr
+    double* observed_mz
+    double* observed_intensity
+    double* observed_signal_to_noise
+    double* expected_mz
+    double* expected_intensity
+
+
+cdef void view_fit_batch(IsotopicFitBatch batch, fit_batch_view* view):
+    view.size = batch.get_size()
+    view.indptr = <Py_ssize_t*>cnp.PyArray_DATA(batch.indptr)
+    view.observed_mz = <double*>cnp.PyArray_DATA(batch.observed_mz)
+    view.observed_intensity = <double*>cnp.PyArray_DATA(batch.observed_intensity)
+    view.observed_signal_to_noise = <double*>cnp.PyArray_DATA(batch.observed_signal_to_noise)
+    view.expected_mz = <double*>cnp.PyArray_DATA(batch.expected_mz)
+    view.expected_intensity = <double*>cnp.PyArray_DATA(batch.expected_intensity)
+
+
+cdef bint overrides_method(object obj, type base, str name):
+    # Whether the class of `obj` replaces `base`'s implementation of the method `name`
+    return getattr(type(obj), name) is not getattr(base, name)
+
+
 cdef class IsotopicFitterBase(object):
     '''A base class for Isotopic Pattern Fitters, objects
     which given a set of experimental peaks and a set of matching
@@ -367,6 +531,94 @@ cdef class IsotopicFitterBase(object):
     cpdef double _evaluate(self, PeakSet peaklist, list observed, list expected):
         raise NotImplementedError()
 
+    def evaluate_batch(self, PeakSet peaklist, list observed, list expected):
+        """Evaluate many pairs of peak lists for goodness-of-fit at once.
+
+        Fitters which support :meth:`evaluate_packed` pack the pairs into an
+        :class:`IsotopicFitBatch` and score them together in a single loop
+        without the GIL, otherwise each pair is passed to :meth:`_evaluate`
+        in turn.
+
+        Parameters
+        ----------
+        peaklist : :class:`~.PeakSet`
+            The full set of all experimental peaks
+        observed : list
+            The list of experimental peak lists of each fit
+        expected : list
+            The list of theoretical peak lists of each fit
+
+        Returns
+        -------
+        np.ndarray
+            The score of each fit
+        """
+        return self._evaluate_batch(peaklist, observed, expected)
+
+    cpdef np.ndarray _evaluate_batch(self, PeakSet peaklist, list observed, list expected):
+        cdef:
+            size_t i, n
+            np.ndarray[double, ndim=1] scores
+        n = PyList_GET_SIZE(observed)
+        if n != <size_t>PyList_GET_SIZE(expected):
+            raise ValueError("Cannot score %d experimental peak lists with %d theoretical peak lists" % (
+                n, PyList_GET_SIZE(expected)))
+        scores = np.empty(n, dtype=np.float64)
+        for i in range(n):
+            scores[i] = self._evaluate(
+                peaklist, <list>PyList_GET_ITEM(observed, i), <list>PyList_GET_ITEM(expected, i))
+        return scores
+
+    def evaluate_packed(self, PeakSet peaklist, IsotopicFitBatch batch):
+        """Evaluate every fit in an :class:`IsotopicFitBatch`.
+
+        Parameters
+        ----------
+        peaklist : :class:`~.PeakSet`
+            The full set of all experimental peaks
+        batch : :class:`IsotopicFitBatch`
+            The packed experimental and theoretical peaks of each fit
+
+        Returns
+        -------
+        np.ndarray
+            The score of each fit
+        """
+        return self._evaluate_packed(peaklist, batch)
+
+    cpdef np.ndarray _evaluate_packed(self, PeakSet peaklist, IsotopicFitBatch batch):
+        raise NotImplementedError("%s does not support packed evaluation" % (self.__class__.__name__, ))
+
+    cpdef bint supports_packed_evaluation(self):
+        """Whether or not :meth:`evaluate_packed` is implemented by this fitter
+
+        Returns
+        -------
+        bool
+        """
+        return False
+
+    cpdef double best_possible_score(self, list observed):
+        """An optimistic bound on the score of any theoretical isotopic pattern
+        matched against `observed`, which lets fits that :meth:`reject_score` would
+        reject be discarded before they are scaled and scored.
+
+        Fitters which cannot bound their score return positive infinity when
+        maximizing and negative infinity when minimizing, so nothing is discarded.
+
+        Parameters
+        ----------
+        observed : list
+            The list of experimental peaks that are part of the fit
+
+        Returns
+        -------
+        float
+        """
+        if self.is_maximizing():
+            return HUGE_VAL
+        return -HUGE_VAL
+
     def __call__(self, *args, **kwargs):
         """Invokes :meth:`evaluate`
 
@@ -420,6 +672,16 @@ cdef class IsotopicFitterBase(object):
     def __repr__(self):
         return "{self.__class__.__name__}({fields})".format(self=self, fields=self.__getstate__())
 
+    def fingerprint(self):
+        """Describe the parameters which determine the scores this fitter produces,
+        as used by :func:`~.deconvolution_cache_key`.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, self.__getstate__())
+
 
 cdef double sum_intensity_theoretical(list peaklist):
     cdef:
@@ -527,6 +789,49 @@ cdef class ScaledGTestFitter(IsotopicFitterBase):
 
         return g_score * 2.
 
+    cpdef np.ndarray _evaluate_batch(self, PeakSet peaklist, list observed, list expected):
+        if not self.supports_packed_evaluation():
+            return IsotopicFitterBase._evaluate_batch(self, peaklist, observed, expected)
+        return self._evaluate_packed(peaklist, IsotopicFitBatch._create(observed, expected))
+
+    cpdef bint supports_packed_evaluation(self):
+        # The packed form would bypass a subclass's own _evaluate
+        return not overrides_method(self, ScaledGTestFitter, "_evaluate")
+
+    cpdef np.ndarray _evaluate_packed(self, PeakSet peaklist, IsotopicFitBatch batch):
+        cdef:
+            size_t i
+            fit_batch_view view
+            np.ndarray[double, ndim=1, mode='c'] scores
+            double* out
+
+        view_fit_batch(batch, &view)
+        scores = np.empty(view.size, dtype=np.float64)
+        out = <double*>cnp.PyArray_DATA(scores)
+        with nogil:
+            for i in range(view.size):
+                out[i] = scaled_g_test_packed(&view, view.indptr[i], view.indptr[i + 1])
+        return scores
+
+
+@cython.cdivision
+cdef double scaled_g_test_packed(fit_batch_view* view, Py_ssize_t start, Py_ssize_t end) nogil:
+    cdef:
+        Py_ssize_t j
+        double total_observed, total_expected, g_score, obs, theo
+
+    total_observed = 0
+    total_expected = 0
+    for j in range(start, end):
+        total_observed += view.observed_intensity[j]
+        total_expected += view.expected_intensity[j]
+    g_score = 0.
+    for j in range(start, end):
+        obs = view.observed_intensity[j] / total_observed
+        theo = view.expected_intensity[j] / total_expected
+        g_score += obs * (log(obs) - log(theo))
+    return g_score * 2.
+
 
 cdef ScaledGTestFitter g_test_scaled
 
@@ -627,25 +932,65 @@ cdef class ChiSquareFitter(IsotopicFitterBase):
 
 @cython.cdivision
 cdef double ms_deconv_score_peak(FittedPeak obs, TheoreticalPeak theo, double mass_error_tolerance=0.02, double minimum_signal_to_noise=1) nogil:
+    return ms_deconv_score_values(
+        obs.mz, obs.intensity, obs.signal_to_noise, theo.mz, theo.intensity,
+        mass_error_tolerance, minimum_signal_to_noise)
+
+
+cdef double ms_deconv_best_possible_score(list observed):
+    # Each peak contributes at most the square root of its observed intensity, which
+    # is reached when the theoretical intensity matches it exactly. The bound is
+    # padded slightly so that rounding cannot make it smaller than a real score.
+    cdef:
+        size_t i
+        FittedPeak obs
+        double bound
+    bound = 0
+    for i in range(PyList_GET_SIZE(observed)):
+        obs = <FittedPeak>PyList_GET_ITEM(observed, i)
+        if obs.signal_to_noise < 1:
+            continue
+        if obs.intensity <= 0:
+            return HUGE_VAL
+        bound += sqrt(obs.intensity)
+    return bound * (1 + 1e-9)
+
+
+@cython.cdivision
+cdef inline double ms_deconv_score_values(double obs_mz, double obs_intensity, double obs_signal_to_noise,
+                                          double theo_mz, double theo_intensity, double mass_error_tolerance,
+                                          double minimum_signal_to_noise) nogil:
     cdef:
-        double mass_error, abundance_diff
-    if obs.signal_to_noise < minimum_signal_to_noise:
+        double mass_error, mass_accuracy, abundance_diff
+    if obs_signal_to_noise < minimum_signal_to_noise:
         return 0.
 
-    mass_error = fabs(obs.mz - theo.mz)
+    mass_error = fabs(obs_mz - theo_mz)
 
     if mass_error <= mass_error_tolerance:
         mass_accuracy = 1 - mass_error / mass_error_tolerance
     else:
         return 0.
 
-    if obs.intensity < theo.intensity and (((theo.intensity - obs.intensity) / obs.intensity) <= 1):
-        abundance_diff = 1 - ((theo.intensity - obs.intensity) / obs.intensity)
-    elif obs.intensity >= theo.intensity and (((obs.intensity - theo.intensity) / obs.intensity) <= 1):
-        abundance_diff = sqrt(1 - ((obs.intensity - theo.intensity) / obs.intensity))
+    if obs_intensity < theo_intensity and (((theo_intensity - obs_intensity) / obs_intensity) <= 1):
+        abundance_diff = 1 - ((theo_intensity - obs_intensity) / obs_intensity)
+    elif obs_intensity >= theo_intensity and (((obs_intensity - theo_intensity) / obs_intensity) <= 1):
+        abundance_diff = sqrt(1 - ((obs_intensity - theo_intensity) / obs_intensity))
     else:
         return 0.
-    score = sqrt(theo.intensity) * mass_accuracy * abundance_diff
+    return sqrt(theo_intensity) * mass_accuracy * abundance_diff
+
+
+cdef double ms_deconv_score_packed(fit_batch_view* view, Py_ssize_t start, Py_ssize_t end,
+                                   double mass_error_tolerance) nogil:
+    cdef:
+        Py_ssize_t j
+        double score
+    score = 0
+    for j in range(start, end):
+        score += ms_deconv_score_values(
+            view.observed_mz[j], view.observed_intensity[j], view.observed_signal_to_noise[j],
+            view.expected_mz[j], view.expected_intensity[j], mass_error_tolerance, 1)
     return score
 
 
@@ -696,6 +1041,35 @@ cdef class MSDeconVFitter(IsotopicFitterBase):
 
         return score
 
+    cpdef np.ndarray _evaluate_batch(self, PeakSet peaklist, list observed, list expected):
+        if not self.supports_packed_evaluation():
+            return IsotopicFitterBase._evaluate_batch(self, peaklist, observed, expected)
+        return self._evaluate_packed(peaklist, IsotopicFitBatch._create(observed, expected))
+
+    cpdef bint supports_packed_evaluation(self):
+        # The packed form would bypass a subclass's own _evaluate
+        return not overrides_method(self, MSDeconVFitter, "_evaluate")
+
+    cpdef double best_possible_score(self, list observed):
+        return ms_deconv_best_possible_score(observed)
+
+    cpdef np.ndarray _evaluate_packed(self, PeakSet peaklist, IsotopicFitBatch batch):
+        cdef:
+            size_t i
+            fit_batch_view view
+            np.ndarray[double, ndim=1, mode='c'] scores
+            double* out
+            double mass_error_tolerance
+
+        view_fit_batch(batch, &view)
+        scores = np.empty(view.size, dtype=np.float64)
+        out = <double*>cnp.PyArray_DATA(scores)
+        mass_error_tolerance = self.mass_error_tolerance
+        with nogil:
+            for i in range(view.size):
+                out[i] = ms_deconv_score_packed(&view, view.indptr[i], view.indptr[i + 1], mass_error_tolerance)
+        return scores
+
 
 cdef class PenalizedMSDeconVFitter(IsotopicFitterBase):
     r'''An Isotopic Fitter which uses the :class:`MSDeconVFitter` score
@@ -755,6 +1129,42 @@ cdef class PenalizedMSDeconVFitter(IsotopicFitterBase):
         score *= ((1 - penalty * self.penalty_factor))
         return score
 
+    cpdef np.ndarray _evaluate_batch(self, PeakSet peaklist, list observed, list expected):
+        if not self.supports_packed_evaluation():
+            return IsotopicFitterBase._evaluate_batch(self, peaklist, observed, expected)
+        return self._evaluate_packed(peaklist, IsotopicFitBatch._create(observed, expected))
+
+    cpdef bint supports_packed_evaluation(self):
+        # The packed form would bypass a subclass's own _evaluate
+        return not overrides_method(self, PenalizedMSDeconVFitter, "_evaluate")
+
+    cpdef double best_possible_score(self, list observed):
+        # The penalty can only lower the MSDeconV score when it is scaled by a
+        # non-negative factor
+        if self.penalty_factor < 0:
+            return HUGE_VAL
+        return ms_deconv_best_possible_score(observed)
+
+    cpdef np.ndarray _evaluate_packed(self, PeakSet peaklist, IsotopicFitBatch batch):
+        cdef:
+            size_t i
+            fit_batch_view view
+            np.ndarray[double, ndim=1, mode='c'] scores
+            double* out
+            double mass_error_tolerance, penalty_factor, score, penalty
+
+        view_fit_batch(batch, &view)
+        scores = np.empty(view.size, dtype=np.float64)
+        out = <double*>cnp.PyArray_DATA(scores)
+        mass_error_tolerance = self.mass_error_tolerance
+        penalty_factor = self.penalty_factor
+        with nogil:
+            for i in range(view.size):
+                score = ms_deconv_score_packed(&view, view.indptr[i], view.indptr[i + 1], mass_error_tolerance)
+                penalty = fabs(scaled_g_test_packed(&view, view.indptr[i], view.indptr[i + 1]))
+                out[i] = score * (1 - penalty * penalty_factor)
+        return scores
+
 
 cdef class FunctionScorer(IsotopicFitterBase):
 
@@ -841,6 +1251,11 @@ cdef class DistinctPatternFitter(IsotopicFitterBase):
     def __setstate__(self, state):
         self.select, self.interference_detector, self.g_test_scaled, self.peak_count_scale, self.domain_scale = state
 
+    def fingerprint(self):
+        # The interference detector is built from the spectrum being scored
+        return (self.__class__.__name__, self.select, self.g_test_scaled, self.peak_count_scale,
+                self.domain_scale)
+
     cpdef IsotopicFitterBase _configure(self, DeconvoluterBase deconvoluter, dict kwargs):
         self.interference_detector = InterferenceDetection(deconvoluter.peaklist)
         return self
@@ -888,6 +1303,10 @@ cdef class ScaledPenalizedMSDeconvFitter(IsotopicFitterBase):
     def __setstate__(self, state):
         self.select, self.scale_factor, self.scorer = state
 
+    def fingerprint(self):
+        # The scale factor is computed from the spectrum being scored
+        return (self.__class__.__name__, self.select, self.scorer)
+
     @property
     def penalty_factor(self):
         return self.scorer.penalty_factor
@@ -962,3 +1381,32 @@ cdef class DotProductFitter(IsotopicFitterBase):
             theo = <TheoreticalPeak>PyList_GET_ITEM(theoretical, i)
             score += obs.intensity * theo.intensity
         return score
+
+    cpdef np.ndarray _evaluate_batch(self, PeakSet peaklist, list observed, list expected):
+        if not self.supports_packed_evaluation():
+            return IsotopicFitterBase._evaluate_batch(self, peaklist, observed, expected)
+        return self._evaluate_packed(peaklist, IsotopicFitBatch._create(observed, expected))
+
+    cpdef bint supports_packed_evaluation(self):
+        # The packed form would bypass a subclass's own _evaluate
+        return not overrides_method(self, DotProductFitter, "_evaluate")
+
+    cpdef np.ndarray _evaluate_packed(self, PeakSet peaklist, IsotopicFitBatch batch):
+        cdef:
+            size_t i
+            Py_ssize_t j
+            fit_batch_view view
+            np.ndarray[double, ndim=1, mode='c'] scores
+            double* out
+            double score
+
+        view_fit_batch(batch, &view)
+        scores = np.empty(view.size, dtype=np.float64)
+        out = <double*>cnp.PyArray_DATA(scores)
+        with nogil:
+            for i in range(view.size):
+                score = 0
+                for j in range(view.indptr[i], view.indptr[i + 1]):
+                    score += view.observed_intensity[j] * view.expected_intensity[j]
+                out[i] = score
+        return scores
@@ -24,6 +24,13 @@ cpdef DeconvolutedPeakSetIndexed build_deconvoluted_peak_set_from_arrays(np.ndar
                                                                          np.ndarray[double, ndim=1] intensity_array,
                                                                          np.ndarray[long, ndim=1] charge_array)
 
+cpdef tuple deconvoluted_peak_columns(object peaks)
+cpdef list deconvoluted_peaks_from_columns(dict columns, object envelope_starts, object envelope_ends,
+                                           object envelope_mz, object envelope_intensity,
+                                           object positions, object mz_rank)
+cpdef dict fitted_peak_columns(object peaks)
+cpdef list fitted_peaks_from_columns(dict columns)
+
 
 ctypedef fused peak_collection:
     PeakSet
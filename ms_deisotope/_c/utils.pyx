@@ -2,6 +2,8 @@
 
 cimport cython
 from cpython.list cimport PyList_Append, PyList_GET_ITEM, PyList_GET_SIZE
+from cpython.tuple cimport PyTuple_New, PyTuple_SET_ITEM
+from cpython.ref cimport Py_INCREF
 
 import numpy as np
 cimport numpy as np
@@ -9,7 +11,7 @@ cimport numpy as np
 from ms_peak_picker._c.peak_index cimport PeakIndex
 from ms_peak_picker._c.peak_set cimport PeakSet, FittedPeak, PeakSetIndexed
 from ms_deisotope._c.peak_set cimport (
-    Envelope, EnvelopePair, DeconvolutedPeak, DeconvolutedPeakSet, DeconvolutedPeakSetIndexed, PeakBase)
+    _Index, Envelope, EnvelopePair, DeconvolutedPeak, DeconvolutedPeakSet, DeconvolutedPeakSetIndexed, PeakBase)
 from ms_deisotope._c.averagine cimport neutral_mass
 
 
@@ -196,6 +198,316 @@ cpdef DeconvolutedPeakSetIndexed build_deconvoluted_peak_set_from_arrays(np.ndar
     return peak_set
 
 
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef tuple deconvoluted_peak_columns(object peaks):
+    """Copy the attributes and isotopic envelopes of a sequence of :class:`DeconvolutedPeak`
+    into the columns of a :class:`~.ColumnarDeconvolutedPeakSet`.
+
+    Parameters
+    ----------
+    peaks : :class:`~.Iterable` of :class:`DeconvolutedPeak`
+
+    Returns
+    -------
+    columns : dict
+        A :class:`np.ndarray` for each name in :attr:`~.ColumnarDeconvolutedPeakSet.columns`
+    envelope_offsets : :class:`np.ndarray` of int64
+    envelope_mz : :class:`np.ndarray` of float64
+    envelope_intensity : :class:`np.ndarray` of float64
+    """
+    cdef:
+        list peak_list
+        size_t i, j, n, k, n_points
+        object obj
+        DeconvolutedPeak peak
+        Envelope envelope
+        EnvelopePair pair
+        np.float64_t[::1] neutral_mass_, intensity, mz, score, signal_to_noise
+        np.float64_t[::1] full_width_at_half_max, a_to_a2_ratio, most_abundant_mass
+        np.float64_t[::1] average_mass, area, envelope_mz, envelope_intensity
+        np.int32_t[::1] charge
+        np.uint8_t[::1] chosen_for_msms
+        np.int64_t[::1] envelope_offsets
+        dict columns
+
+    peak_list = list(peaks)
+    n = PyList_GET_SIZE(peak_list)
+    columns = {
+        "neutral_mass": np.empty(n, dtype=np.float64),
+        "intensity": np.empty(n, dtype=np.float64),
+        "charge": np.empty(n, dtype=np.int32),
+        "mz": np.empty(n, dtype=np.float64),
+        "score": np.empty(n, dtype=np.float64),
+        "signal_to_noise": np.empty(n, dtype=np.float64),
+        "full_width_at_half_max": np.empty(n, dtype=np.float64),
+        "a_to_a2_ratio": np.empty(n, dtype=np.float64),
+        "most_abundant_mass": np.empty(n, dtype=np.float64),
+        "average_mass": np.empty(n, dtype=np.float64),
+        "area": np.empty(n, dtype=np.float64),
+        "chosen_for_msms": np.empty(n, dtype=np.bool_),
+    }
+    neutral_mass_ = columns['neutral_mass']
+    intensity = columns['intensity']
+    charge = columns['charge']
+    mz = columns['mz']
+    score = columns['score']
+    signal_to_noise = columns['signal_to_noise']
+    full_width_at_half_max = columns['full_width_at_half_max']
+    a_to_a2_ratio = columns['a_to_a2_ratio']
+    most_abundant_mass = columns['most_abundant_mass']
+    average_mass = columns['average_mass']
+    area = columns['area']
+    chosen_for_msms = columns['chosen_for_msms'].view(np.uint8)
+    offsets_array = np.empty(n + 1, dtype=np.int64)
+    envelope_offsets = offsets_array
+
+    n_points = 0
+    for i in range(n):
+        obj = <object>PyList_GET_ITEM(peak_list, i)
+        if isinstance(obj, DeconvolutedPeak):
+            peak = <DeconvolutedPeak>obj
+            neutral_mass_[i] = peak.neutral_mass
+            intensity[i] = peak.intensity
+            charge[i] = peak.charge
+            mz[i] = peak.mz
+            score[i] = peak.score
+            signal_to_noise[i] = peak.signal_to_noise
+            full_width_at_half_max[i] = peak.full_width_at_half_max
+            a_to_a2_ratio[i] = peak.a_to_a2_ratio
+            most_abundant_mass[i] = peak.most_abundant_mass
+            average_mass[i] = peak.average_mass
+            area[i] = peak.area
+            chosen_for_msms[i] = peak.chosen_for_msms
+        else:
+            neutral_mass_[i] = obj.neutral_mass
+            intensity[i] = obj.intensity
+            charge[i] = obj.charge
+            mz[i] = obj.mz
+            score[i] = obj.score
+            signal_to_noise[i] = obj.signal_to_noise
+            full_width_at_half_max[i] = obj.full_width_at_half_max
+            a_to_a2_ratio[i] = obj.a_to_a2_ratio
+            most_abundant_mass[i] = obj.most_abundant_mass
+            average_mass[i] = obj.average_mass
+            area[i] = obj.area
+            chosen_for_msms[i] = obj.chosen_for_msms
+        envelope_offsets[i] = n_points
+        if obj.envelope is not None:
+            n_points += len(obj.envelope)
+    envelope_offsets[n] = n_points
+
+    mz_array = np.empty(n_points, dtype=np.float64)
+    intensity_array = np.empty(n_points, dtype=np.float64)
+    envelope_mz = mz_array
+    envelope_intensity = intensity_array
+    k = 0
+    for i in range(n):
+        obj = (<object>PyList_GET_ITEM(peak_list, i)).envelope
+        if obj is None:
+            continue
+        if isinstance(obj, Envelope):
+            envelope = <Envelope>obj
+            for j in range(envelope.get_size()):
+                pair = envelope.getitem(j)
+                envelope_mz[k] = pair.mz
+                envelope_intensity[k] = pair.intensity
+                k += 1
+        else:
+            for point in obj:
+                envelope_mz[k] = point.mz
+                envelope_intensity[k] = point.intensity
+                k += 1
+    return columns, offsets_array, mz_array, intensity_array
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef list deconvoluted_peaks_from_columns(dict columns, object envelope_starts, object envelope_ends,
+                                           object envelope_mz, object envelope_intensity,
+                                           object positions, object mz_rank):
+    """Create a :class:`DeconvolutedPeak` from each row of the columns of a
+    :class:`~.ColumnarDeconvolutedPeakSet`.
+
+    Parameters
+    ----------
+    columns : dict
+        A :class:`np.ndarray` for each name in :attr:`~.ColumnarDeconvolutedPeakSet.columns`,
+        holding only the rows to create
+    envelope_starts, envelope_ends : :class:`np.ndarray` of int64
+        The span of each row's isotopic envelope in `envelope_mz`
+    envelope_mz, envelope_intensity : :class:`np.ndarray` of float64
+    positions : :class:`np.ndarray` of int64
+        The neutral mass index of each row
+    mz_rank : :class:`np.ndarray` of int64
+        The m/z index of each row
+
+    Returns
+    -------
+    list of :class:`DeconvolutedPeak`
+    """
+    cdef:
+        size_t i, j, n, start, end
+        list peaks
+        tuple pairs
+        EnvelopePair pair
+        DeconvolutedPeak peak
+        const np.float64_t[::1] neutral_mass_, intensity, mz, score, signal_to_noise
+        const np.float64_t[::1] full_width_at_half_max, a_to_a2_ratio, most_abundant_mass
+        const np.float64_t[::1] average_mass, area, env_mz, env_intensity
+        const np.int32_t[::1] charge
+        const np.uint8_t[::1] chosen_for_msms
+        const np.int64_t[::1] starts, ends, position, rank
+
+    neutral_mass_ = np.ascontiguousarray(columns['neutral_mass'], dtype=np.float64)
+    intensity = np.ascontiguousarray(columns['intensity'], dtype=np.float64)
+    charge = np.ascontiguousarray(columns['charge'], dtype=np.int32)
+    mz = np.ascontiguousarray(columns['mz'], dtype=np.float64)
+    score = np.ascontiguousarray(columns['score'], dtype=np.float64)
+    signal_to_noise = np.ascontiguousarray(columns['signal_to_noise'], dtype=np.float64)
+    full_width_at_half_max = np.ascontiguousarray(columns['full_width_at_half_max'], dtype=np.float64)
+    a_to_a2_ratio = np.ascontiguousarray(columns['a_to_a2_ratio'], dtype=np.float64)
+    most_abundant_mass = np.ascontiguousarray(columns['most_abundant_mass'], dtype=np.float64)
+    average_mass = np.ascontiguousarray(columns['average_mass'], dtype=np.float64)
+    area = np.ascontiguousarray(columns['area'], dtype=np.float64)
+    chosen_for_msms = np.ascontiguousarray(columns['chosen_for_msms'], dtype=np.bool_).view(np.uint8)
+    starts = np.ascontiguousarray(envelope_starts, dtype=np.int64)
+    ends = np.ascontiguousarray(envelope_ends, dtype=np.int64)
+    env_mz = np.ascontiguousarray(envelope_mz, dtype=np.float64)
+    env_intensity = np.ascontiguousarray(envelope_intensity, dtype=np.float64)
+    position = np.ascontiguousarray(positions, dtype=np.int64)
+    rank = np.ascontiguousarray(mz_rank, dtype=np.int64)
+
+    n = neutral_mass_.shape[0]
+    peaks = []
+    for i in range(n):
+        start = starts[i]
+        end = ends[i]
+        pairs = PyTuple_New(end - start)
+        for j in range(start, end):
+            pair = EnvelopePair._create(env_mz[j], env_intensity[j])
+            Py_INCREF(pair)
+            PyTuple_SET_ITEM(pairs, j - start, pair)
+        peak = DeconvolutedPeak.__new__(DeconvolutedPeak)
+        peak.neutral_mass = neutral_mass_[i]
+        peak.intensity = intensity[i]
+        peak.charge = charge[i]
+        peak.mz = mz[i]
+        peak.score = score[i]
+        peak.signal_to_noise = signal_to_noise[i]
+        peak.full_width_at_half_max = full_width_at_half_max[i]
+        peak.a_to_a2_ratio = a_to_a2_ratio[i]
+        peak.most_abundant_mass = most_abundant_mass[i]
+        peak.average_mass = average_mass[i]
+        peak.area = area[i]
+        peak.chosen_for_msms = chosen_for_msms[i]
+        peak.envelope = Envelope._create(pairs)
+        peak._index = _Index._create(position[i], rank[i])
+        peak.fit = None
+        peaks.append(peak)
+    return peaks
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef dict fitted_peak_columns(object peaks):
+    """Copy the attributes of a sequence of :class:`~ms_peak_picker.FittedPeak` into
+    one array per attribute.
+
+    Parameters
+    ----------
+    peaks : :class:`~.Iterable` of :class:`~ms_peak_picker.FittedPeak`
+
+    Returns
+    -------
+    dict
+        Maps each attribute name to a :class:`np.ndarray`
+    """
+    cdef:
+        list peak_list
+        size_t i, n
+        FittedPeak peak
+        np.float64_t[::1] mz, intensity, signal_to_noise, full_width_at_half_max
+        np.float64_t[::1] area, left_width, right_width
+        np.int64_t[::1] peak_count, index
+        dict columns
+
+    peak_list = list(peaks)
+    n = PyList_GET_SIZE(peak_list)
+    columns = {
+        "mz": np.empty(n, dtype=np.float64),
+        "intensity": np.empty(n, dtype=np.float64),
+        "signal_to_noise": np.empty(n, dtype=np.float64),
+        "full_width_at_half_max": np.empty(n, dtype=np.float64),
+        "area": np.empty(n, dtype=np.float64),
+        "left_width": np.empty(n, dtype=np.float64),
+        "right_width": np.empty(n, dtype=np.float64),
+        "peak_count": np.empty(n, dtype=np.int64),
+        "index": np.empty(n, dtype=np.int64),
+    }
+    mz = columns['mz']
+    intensity = columns['intensity']
+    signal_to_noise = columns['signal_to_noise']
+    full_width_at_half_max = columns['full_width_at_half_max']
+    area = columns['area']
+    left_width = columns['left_width']
+    right_width = columns['right_width']
+    peak_count = columns['peak_count']
+    index = columns['index']
+    for i in range(n):
+        peak = <FittedPeak>PyList_GET_ITEM(peak_list, i)
+        mz[i] = peak.mz
+        intensity[i] = peak.intensity
+        signal_to_noise[i] = peak.signal_to_noise
+        full_width_at_half_max[i] = peak.full_width_at_half_max
+        area[i] = peak.area
+        left_width[i] = peak.left_width
+        right_width[i] = peak.right_width
+        peak_count[i] = peak.peak_count
+        index[i] = peak.index
+    return columns
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef list fitted_peaks_from_columns(dict columns):
+    """Create a :class:`~ms_peak_picker.FittedPeak` from each row of the arrays
+    produced by :func:`fitted_peak_columns`.
+
+    Parameters
+    ----------
+    columns : dict
+
+    Returns
+    -------
+    list of :class:`~ms_peak_picker.FittedPeak`
+    """
+    cdef:
+        size_t i, n
+        list peaks
+        const np.float64_t[::1] mz, intensity, signal_to_noise, full_width_at_half_max
+        const np.float64_t[::1] area, left_width, right_width
+        const np.int64_t[::1] peak_count, index
+
+    mz = np.ascontiguousarray(columns['mz'], dtype=np.float64)
+    intensity = np.ascontiguousarray(columns['intensity'], dtype=np.float64)
+    signal_to_noise = np.ascontiguousarray(columns['signal_to_noise'], dtype=np.float64)
+    full_width_at_half_max = np.ascontiguousarray(columns['full_width_at_half_max'], dtype=np.float64)
+    area = np.ascontiguousarray(columns['area'], dtype=np.float64)
+    left_width = np.ascontiguousarray(columns['left_width'], dtype=np.float64)
+    right_width = np.ascontiguousarray(columns['right_width'], dtype=np.float64)
+    peak_count = np.ascontiguousarray(columns['peak_count'], dtype=np.int64)
+    index = np.ascontiguousarray(columns['index'], dtype=np.int64)
+    n = mz.shape[0]
+    peaks = []
+    for i in range(n):
+        peaks.append(FittedPeak._create(
+            mz[i], intensity[i], signal_to_noise[i], full_width_at_half_max[i],
+            left_width[i], right_width[i], peak_count[i], index[i], area[i]))
+    return peaks
+
+
 @cython.binding(True)
 cpdef double _peak_sequence_tic(self, peak_collection peaks) except -1:
     cdef:
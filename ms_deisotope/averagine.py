@@ -1,8 +1,17 @@
 # -*- coding: utf-8 -*-
 
+import os
+import sys
+import json
+import struct
+import time
+import multiprocessing
+
 from collections import defaultdict
 from array import array as pyarray
 
+import numpy as np
+
 from brainpy import (
     calculate_mass, neutral_mass, PROTON,
     isotopic_variants, mass_charge_ratio)
@@ -11,6 +20,11 @@ from brainpy.composition import (
     parse_formula,
     PyComposition)
 
+try:
+    from brainpy._c.isotopic_distribution import TheoreticalPeak
+except ImportError:
+    from brainpy import Peak as TheoreticalPeak
+
 from .utils import dict_proxy
 from .constants import IGNORE_BELOW, TRUNCATE_AFTER
 
@@ -419,6 +433,16 @@ class Averagine(object):
     def __hash__(self):
         return hash(frozenset(self.base_composition.items()))
 
+    def fingerprint(self):
+        """Describe the parameters which determine the isotopic patterns this model
+        produces, as used by :func:`~.deconvolution_cache_key`.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, tuple(sorted(self.base_composition.items())))
+
 
 def average_compositions(compositions, weights=None):
     """Calculate the average composition
@@ -483,6 +507,371 @@ def isotopic_shift(charge=1):
     return _neutron_shift / float(charge)
 
 
+class AveragineTable(object):
+    """A table of isotopic pattern shapes sampled on a regular neutral mass grid,
+    shared across all charge states.
+
+    The shape of an averagine isotopic pattern depends only on its neutral mass,
+    so rather than generating a new pattern for every (m/z, charge) pair, this table
+    linearly interpolates the peak offsets and intensities of the two grid points
+    bracketing the requested neutral mass and places the result at the requested m/z.
+    Grid points are generated lazily as larger masses are requested.
+
+    The interpolated intensities differ from those of :meth:`Averagine.isotopic_cluster`
+    by up to about one percent of the total intensity, so when the cumulative intensity
+    of the exact pattern is that close to ``truncate_after`` at one of its peaks, the interpolated pattern may
+    keep one peak more or one peak fewer than the exact pattern.
+
+    Attributes
+    ----------
+    averagine : :class:`Averagine`
+        The averagine model used to generate the grid patterns
+    step_size : float
+        The spacing between grid points in Daltons
+    truncate_after : float
+        The fraction of the isotopic signal retained in each grid pattern. Any
+        ``truncate_after`` requested from :meth:`isotopic_cluster` is applied on
+        top of this.
+    rows : list of :class:`TheoreticalIsotopicPattern`
+        The grid patterns at charge 1. The pattern for neutral mass ``(i + 1) * step_size``
+        is stored at index ``i``.
+    """
+
+    def __init__(self, averagine, step_size=10.0, truncate_after=0.9999):
+        self.averagine = Averagine(averagine)
+        self.step_size = float(step_size)
+        self.truncate_after = truncate_after
+        self.rows = []
+
+    def __reduce__(self):
+        return self.__class__, (self.averagine, self.step_size, self.truncate_after)
+
+    def __repr__(self):
+        return "%s(%r, %r)" % (self.__class__.__name__, self.averagine, self.step_size)
+
+    def fingerprint(self):
+        """Describe the parameters which determine the isotopic patterns this table
+        produces, as used by :func:`~.deconvolution_cache_key`.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, self.averagine, self.step_size, self.truncate_after)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _max_mass(self):
+        return len(self.rows) * self.step_size
+
+    def _populate_rows(self, max_mass):
+        i = 0
+        while self._max_mass() <= max_mass:
+            mass = self._max_mass() + self.step_size
+            self.rows.append(self.averagine.isotopic_cluster(
+                mass_charge_ratio(mass, 1, PROTON), 1, PROTON, self.truncate_after, 0.0))
+            i += 1
+        return i
+
+    def populate(self, max_mass):
+        """Generate all grid points up to ``max_mass``.
+
+        Parameters
+        ----------
+        max_mass : float
+            The largest neutral mass to cover
+
+        Returns
+        -------
+        :class:`AveragineTable`
+            self
+        """
+        self._populate_rows(max_mass)
+        return self
+
+    def isotopic_cluster(self, mz, charge=1, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
+                         ignore_below=IGNORE_BELOW):
+        """Interpolate a theoretical isotopic pattern for the given m/z and charge state, thresholded
+        by theoretical peak height and density.
+
+        Mimics :meth:`Averagine.isotopic_cluster`. Neutral masses below the first grid
+        point are generated directly from :attr:`averagine`.
+
+        Parameters
+        ----------
+        mz : float
+            The reference m/z to calculate the neutral mass to interpolate from
+        charge : int, optional
+            The reference charge state to calculate the neutral mass. Defaults to 1
+        charge_carrier : float, optional
+            The mass of the charge carrier. Defaults to the mass of a proton.
+        truncate_after : float, optional
+            The percentage of the signal in the theoretical isotopic pattern to include.
+        ignore_below : float, optional
+            Omit theoretical peaks whose intensity is below this number.
+
+        Returns
+        -------
+        :class:`TheoreticalIsotopicPattern`
+        """
+        mass = neutral_mass(mz, charge, charge_carrier)
+        position = mass / self.step_size
+        index = int(position)
+        if index < 1:
+            return self.averagine.isotopic_cluster(
+                mz, charge, charge_carrier, truncate_after, ignore_below)
+        if mass >= self._max_mass():
+            self._populate_rows(mass)
+        weight = position - index
+        lower = self.rows[index - 1]
+        upper = self.rows[index]
+        n_lower = len(lower)
+        n_upper = len(upper)
+        z = abs(charge)
+        peaklist = []
+        total = 0.0
+        for i in range(max(n_lower, n_upper)):
+            if i < n_lower:
+                lower_offset = lower[i].mz - lower.origin
+                lower_intensity = lower[i].intensity
+            if i < n_upper:
+                upper_offset = upper[i].mz - upper.origin
+                upper_intensity = upper[i].intensity
+            if i >= n_lower:
+                lower_offset = upper_offset
+                lower_intensity = 0.0
+            if i >= n_upper:
+                upper_offset = lower_offset
+                upper_intensity = 0.0
+            offset = lower_offset + (upper_offset - lower_offset) * weight
+            intensity = lower_intensity + (upper_intensity - lower_intensity) * weight
+            total += intensity
+            peaklist.append(TheoreticalPeak(mz + offset / z, intensity, charge))
+        for peak in peaklist:
+            peak.intensity /= total
+        tid = TheoreticalIsotopicPattern(peaklist, mz, 0)
+        if truncate_after < 1.0:
+            tid.truncate_after(truncate_after)
+        if ignore_below > 0:
+            tid.ignore_below(ignore_below)
+        return tid
+
+    def __call__(self, mz, charge=1, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW):
+        return self.isotopic_cluster(mz, charge, charge_carrier, truncate_after, ignore_below)
+
+
+class AveragineCacheSnapshot(object):
+    """A read-only table of cached isotopic patterns stored in a compact binary
+    file and accessed through a memory map.
+
+    Snapshots are written by :meth:`AveragineCache.save_snapshot`. The file holds a
+    small JSON header describing the :class:`Averagine` and cache truncation used to
+    build it, followed by a packed table of cache entries and a packed table of
+    theoretical peaks. Because the tables are mapped rather than read, every process
+    which opens the same file shares a single copy of the pages, and an individual
+    pattern is only turned into a :class:`TheoreticalIsotopicPattern` when it is
+    requested.
+
+    Pickling a snapshot only records its path, so it is cheap to send to worker processes.
+
+    Attributes
+    ----------
+    path : str
+        The path to the snapshot file
+    base_composition : dict
+        The base composition of the :class:`Averagine` the patterns were generated from
+    cache_truncation : float
+        The cache truncation of the :class:`AveragineCache` which was saved
+    entries : :class:`numpy.ndarray`
+        The memory-mapped table of cache keys and pattern locations
+    peaks : :class:`numpy.ndarray`
+        The memory-mapped table of theoretical peak m/z and intensity
+    """
+
+    magic = b"MSDAVGC1"
+    entry_dtype = np.dtype([
+        ("key_mz", "<f8"), ("charge_carrier", "<f8"), ("truncate_after", "<f8"),
+        ("origin", "<f8"), ("offset", "<f8"), ("start", "<i8"),
+        ("charge", "<i4"), ("size", "<i4")])
+    peak_dtype = np.dtype([("mz", "<f8"), ("intensity", "<f8")])
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.base_composition = None
+        self.cache_truncation = None
+        self.entries = None
+        self.peaks = None
+        self._index = None
+        self._columns = None
+        self._open()
+
+    def _open(self):
+        with open(self.path, 'rb') as fh:
+            magic = fh.read(len(self.magic))
+            if magic != self.magic:
+                raise ValueError("%r is not an AveragineCache snapshot" % (self.path, ))
+            header_size, = struct.unpack("<Q", fh.read(8))
+            header = json.loads(fh.read(header_size).decode('utf8'))
+        self.base_composition = header['base_composition']
+        self.cache_truncation = header['cache_truncation']
+        offset = self._align(len(self.magic) + 8 + header_size)
+        n_entries = header['n_entries']
+        n_peaks = header['n_peaks']
+        if n_entries:
+            self.entries = np.memmap(
+                self.path, dtype=self.entry_dtype, mode='r', offset=offset, shape=(n_entries, ))
+        else:
+            self.entries = np.zeros(0, dtype=self.entry_dtype)
+        offset += n_entries * self.entry_dtype.itemsize
+        if n_peaks:
+            self.peaks = np.memmap(
+                self.path, dtype=self.peak_dtype, mode='r', offset=offset, shape=(n_peaks, ))
+        else:
+            self.peaks = np.zeros(0, dtype=self.peak_dtype)
+
+    @staticmethod
+    def _align(offset, width=8):
+        return offset + (-offset % width)
+
+    @classmethod
+    def write(cls, path, base_composition, cache_truncation, backend):
+        """Write the contents of an :class:`AveragineCache`'s backend to ``path``.
+
+        The file is written to a temporary path and moved into place so
+        that concurrent readers never observe a partially written snapshot.
+
+        Parameters
+        ----------
+        path : str
+            The path to write the snapshot to
+        base_composition : dict
+            The base composition of the :class:`Averagine` which generated the patterns
+        cache_truncation : float
+            The cache truncation used to generate keys
+        backend : dict
+            A mapping from ``(key_mz, charge, charge_carrier, truncate_after)`` to
+            :class:`TheoreticalIsotopicPattern`
+
+        Returns
+        -------
+        str
+        """
+        path = str(path)
+        items = sorted(backend.items(), key=lambda x: (x[0][1], x[0][0], x[0][2], x[0][3]))
+        entries = np.zeros(len(items), dtype=cls.entry_dtype)
+        n_peaks = sum(len(tid) for _, tid in items)
+        peaks = np.zeros(n_peaks, dtype=cls.peak_dtype)
+        start = 0
+        for i, ((key_mz, charge, charge_carrier, truncate_after), tid) in enumerate(items):
+            size = len(tid)
+            entries[i] = (key_mz, charge_carrier, truncate_after, tid.origin,
+                          tid.offset, start, charge, size)
+            for j, peak in enumerate(tid):
+                peaks[start + j] = (peak.mz, peak.intensity)
+            start += size
+        header = json.dumps({
+            "base_composition": dict(base_composition),
+            "cache_truncation": cache_truncation,
+            "n_entries": len(entries),
+            "n_peaks": len(peaks),
+        }).encode('utf8')
+        preamble_size = len(cls.magic) + 8 + len(header)
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, 'wb') as fh:
+            fh.write(cls.magic)
+            fh.write(struct.pack("<Q", len(header)))
+            fh.write(header)
+            fh.write(b'\x00' * (cls._align(preamble_size) - preamble_size))
+            fh.write(entries.tobytes())
+            fh.write(peaks.tobytes())
+        os.replace(tmp_path, path)
+        return path
+
+    def _build_index(self):
+        entries = self.entries
+        keys = zip(entries['key_mz'].tolist(), entries['charge'].tolist(),
+                   entries['charge_carrier'].tolist(), entries['truncate_after'].tolist())
+        # Plain array views of the mapped columns are much cheaper to slice than the memmaps
+        self._columns = (
+            np.asarray(entries['start']), np.asarray(entries['size']), np.asarray(entries['origin']),
+            np.asarray(entries['offset']), np.asarray(self.peaks['mz']), np.asarray(self.peaks['intensity']))
+        self._index = {key: i for i, key in enumerate(keys)}
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._build_index()
+        return self._index
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def keys(self):
+        return self.index.keys()
+
+    def get(self, key, pattern_type=None):
+        """Materialize the isotopic pattern stored under ``key``.
+
+        Parameters
+        ----------
+        key : tuple
+            The ``(key_mz, charge, charge_carrier, truncate_after)`` cache key
+        pattern_type : type, optional
+            The isotopic pattern type to construct. Defaults to :class:`TheoreticalIsotopicPattern`
+
+        Returns
+        -------
+        :class:`TheoreticalIsotopicPattern` or :const:`None`
+        """
+        i = self.index.get(key)
+        if i is None:
+            return None
+        if pattern_type is None:
+            pattern_type = TheoreticalIsotopicPattern
+        starts, sizes, origins, offsets, mzs, intensities = self._columns
+        start = int(starts[i])
+        end = start + int(sizes[i])
+        charge = key[1]
+        peaklist = [TheoreticalPeak(mz, intensity, charge)
+                    for mz, intensity in zip(mzs[start:end].tolist(), intensities[start:end].tolist())]
+        return pattern_type(peaklist, float(origins[i]), float(offsets[i]))
+
+    def __reduce__(self):
+        return self.__class__, (self.path, )
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.path)
+
+
+def _populate_worker(payload):
+    base_composition, cache_truncation, pairs, charge_carrier, truncate_after, ignore_below = payload
+    cache = AveragineCache(base_composition, cache_truncation=cache_truncation)
+    for mz, charge in pairs:
+        cache.isotopic_cluster(mz, charge, charge_carrier, truncate_after, ignore_below)
+    return list(cache.backend.items())
+
+
+def _populate_in_parallel(base_composition, cache_truncation, pairs, charge_carrier, truncate_after,
+                          ignore_below, processes):
+    chunk_size = max(len(pairs) // (processes * 4), 1)
+    payloads = [
+        (dict(base_composition), cache_truncation, pairs[i:i + chunk_size], charge_carrier,
+         truncate_after, ignore_below)
+        for i in range(0, len(pairs), chunk_size)]
+    pool = multiprocessing.Pool(processes)
+    try:
+        for chunk in pool.imap_unordered(_populate_worker, payloads):
+            for key, tid in chunk:
+                yield key, tid
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 @dict_proxy("averagine")
 class AveragineCache(object):
     """A wrapper around a :class:`Averagine` instance which will cache isotopic patterns
@@ -494,31 +883,172 @@ class AveragineCache(object):
         The averagine to use to generate new isotopic patterns
     cache_truncation : float
         Number of decimal places to round off the m/z for caching purposes
+    snapshot : :class:`AveragineCacheSnapshot`
+        A read-only, memory-mapped table of pre-computed patterns consulted
+        before generating a new pattern. May be :const:`None`.
+    max_size : int
+        The maximum number of patterns to keep in :attr:`backend`. When exceeded,
+        the least recently used pattern is evicted. ``0`` means no limit.
+    max_bytes : int
+        The approximate maximum number of bytes of patterns to keep in :attr:`backend`.
+        When exceeded, the least recently used pattern is evicted. ``0`` means no limit.
+    current_bytes : int
+        The approximate number of bytes used by patterns in :attr:`backend`. Only
+        tracked when :attr:`max_bytes` is set.
+    hits : int
+        The number of requests served without generating a new pattern, including
+        those interpolated from existing :attr:`table` grid points
+    misses : int
+        The number of requests which required generating a new pattern, including
+        those which required new :attr:`table` grid points
+    evictions : int
+        The number of patterns evicted to stay within :attr:`max_size` or :attr:`max_bytes`
+    generation_time : float
+        The total time in seconds spent generating new patterns
+    table : :class:`AveragineTable`
+        An interpolated pattern table used in place of :attr:`backend` and
+        :attr:`averagine` when set. May be :const:`None`.
     """
 
-    def __init__(self, averagine, backend=None, cache_truncation=1.0):
+    def __init__(self, averagine, backend=None, cache_truncation=1.0, snapshot=None,
+                 max_size=None, max_bytes=None):
         if backend is None:
             backend = {}
         self.backend = backend
+        self.table = None
+        if isinstance(averagine, (_AveragineCache, AveragineCache)):
+            self.backend = dict(averagine.backend)
+            self.table = averagine.table
+            if snapshot is None:
+                snapshot = averagine.snapshot
+            if max_size is None:
+                max_size = averagine.max_size
+            if max_bytes is None:
+                max_bytes = averagine.max_bytes
         self.averagine = Averagine(averagine)
         self.cache_truncation = cache_truncation
+        if snapshot is not None and not isinstance(snapshot, AveragineCacheSnapshot):
+            snapshot = AveragineCacheSnapshot(snapshot)
+        self.snapshot = snapshot
+        self.max_size = int(max_size or 0)
+        self.max_bytes = int(max_bytes or 0)
+        self.current_bytes = 0
+        if self.max_bytes:
+            for key, tid in self.backend.items():
+                self.current_bytes += self._estimate_size(key, tid)
+        self.reset_statistics()
+        self._evict()
 
     def __call__(self, mz, charge=1, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW):
         return self.isotopic_cluster(mz, charge, charge_carrier, truncate_after, ignore_below)
 
-    def has_mz_charge_pair(self, mz, charge=1, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
-                           ignore_below=IGNORE_BELOW):
+    def _make_cache_key(self, mz):
         if self.cache_truncation == 0.0:
             key_mz = mz
         else:
             key_mz = round(mz / self.cache_truncation) * self.cache_truncation
-        if (key_mz, charge, charge_carrier) in self.backend:
-            return self.backend[key_mz, charge, charge_carrier].clone().shift(mz)
-        else:
-            tid = self.averagine.isotopic_cluster(
-                mz, charge, charge_carrier, truncate_after, ignore_below)
-            self.backend[key_mz, charge, charge_carrier] = tid.clone()
+        return key_mz
+
+    @staticmethod
+    def _estimate_size(key, tid):
+        size = sys.getsizeof(key) + sys.getsizeof(tid) + sys.getsizeof(tid.peaklist)
+        for peak in tid.peaklist:
+            size += sys.getsizeof(peak)
+        return size
+
+    def _evict(self):
+        backend = self.backend
+        while len(backend) > 1 and (
+                (self.max_size and len(backend) > self.max_size) or
+                (self.max_bytes and self.current_bytes > self.max_bytes)):
+            key = next(iter(backend))
+            tid = backend.pop(key)
+            if self.max_bytes:
+                self.current_bytes -= self._estimate_size(key, tid)
+            self.evictions += 1
+
+    def _store(self, cache_key, tid):
+        self.backend[cache_key] = tid
+        if self.max_bytes:
+            self.current_bytes += self._estimate_size(cache_key, tid)
+        if self.max_size or self.max_bytes:
+            self._evict()
+
+    def _get_table_pattern(self, mz, charge, charge_carrier, truncate_after, ignore_below):
+        table = self.table
+        mass = neutral_mass(mz, charge, charge_carrier)
+        if table.step_size <= mass < table._max_mass():
+            self.hits += 1
+            return table.isotopic_cluster(mz, charge, charge_carrier, truncate_after, ignore_below)
+        # The table has to generate new grid points, or the pattern itself below the grid
+        self.misses += 1
+        start = time.time()
+        tid = table.isotopic_cluster(mz, charge, charge_carrier, truncate_after, ignore_below)
+        self.generation_time += time.time() - start
+        return tid
+
+    def _get_stored_pattern(self, mz, charge, charge_carrier, truncate_after, ignore_below):
+        if self.table is not None:
+            return self._get_table_pattern(mz, charge, charge_carrier, truncate_after, ignore_below)
+        key_mz = self._make_cache_key(mz)
+        cache_key = (key_mz, charge, charge_carrier, truncate_after)
+        tid = self.backend.get(cache_key)
+        if tid is not None:
+            self.hits += 1
+            if self.max_size or self.max_bytes:
+                # Re-insert the key to mark it as the most recently used
+                del self.backend[cache_key]
+                self.backend[cache_key] = tid
             return tid
+        if self.snapshot is not None:
+            tid = self.snapshot.get(cache_key, TheoreticalIsotopicPattern)
+            if tid is not None:
+                self.hits += 1
+                # Only keep a private copy of snapshot patterns when the backend is bounded,
+                # otherwise every process would rebuild the whole table the snapshot shares.
+                if self.max_size or self.max_bytes:
+                    self._store(cache_key, tid)
+                return tid
+        self.misses += 1
+        start = time.time()
+        tid = self.averagine.isotopic_cluster(
+            mz, charge, charge_carrier, truncate_after, ignore_below)
+        self.generation_time += time.time() - start
+        self._store(cache_key, tid)
+        return tid
+
+    def reset_statistics(self):
+        """Reset :attr:`hits`, :attr:`misses`, :attr:`evictions` and :attr:`generation_time`.
+        """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation_time = 0.0
+
+    def statistics(self):
+        """Summarize how effective this cache has been.
+
+        Returns
+        -------
+        dict
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "generation_time": self.generation_time,
+            "hit_rate": self.hits / float(total) if total else 0.0,
+            "size": len(self.backend),
+            "bytes": self.current_bytes,
+        }
+
+    def has_mz_charge_pair(self, mz, charge=1, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
+                           ignore_below=IGNORE_BELOW):
+        if self.table is not None:
+            return self._get_table_pattern(mz, charge, charge_carrier, truncate_after, ignore_below)
+        return self._get_stored_pattern(
+            mz, charge, charge_carrier, truncate_after, ignore_below).clone().shift(mz)
 
     def isotopic_cluster(self, mz, charge=1, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
                          ignore_below=IGNORE_BELOW):
@@ -553,21 +1083,185 @@ class AveragineCache(object):
     def __repr__(self):
         return "AveragineCache(%r)" % self.averagine
 
+    def fingerprint(self):
+        """Describe the parameters which determine the isotopic patterns this cache
+        produces, as used by :func:`~.deconvolution_cache_key`.
+
+        The stored patterns, :attr:`snapshot` and the bounds on the size of the cache
+        only change how quickly patterns are produced, and are not included.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, self.averagine, self.cache_truncation, self.table)
+
     def clear(self):
         self.backend.clear()
+        self.current_bytes = 0
 
-    def populate(self, min_mz=10, max_mz=3000, min_charge=1, max_charge=8, charge_carrier=PROTON,
-                 truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW):
+    def _missing_pairs(self, min_mz, max_mz, min_charge, max_charge, charge_carrier, truncate_after):
+        snapshot = self.snapshot
+        pairs = []
         for i in range(int(min_mz), int(max_mz)):
+            key_mz = self._make_cache_key(i)
             for j in range(min(max_charge, min_charge), max(min_charge, max_charge)):
-                self.isotopic_cluster(i, j, PROTON, TRUNCATE_AFTER, IGNORE_BELOW)
+                key = (key_mz, j, charge_carrier, truncate_after)
+                if key in self.backend or (snapshot is not None and key in snapshot):
+                    continue
+                pairs.append((i, j))
+        return pairs
+
+    def populate(self, min_mz=10, max_mz=3000, min_charge=1, max_charge=8, charge_carrier=PROTON,
+                 truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW, processes=1):
+        """Pre-compute the isotopic patterns for every integer m/z in ``[min_mz, max_mz)``
+        and charge state in ``[min_charge, max_charge)``.
+
+        Entries already present in :attr:`backend` or :attr:`snapshot` are not recomputed,
+        so an existing cache can be extended to a wider m/z or charge window cheaply.
+
+        If :attr:`table` is set, its grid is extended to cover the same neutral masses instead.
+
+        Parameters
+        ----------
+        min_mz : int, optional
+            The lowest m/z to populate
+        max_mz : int, optional
+            The m/z to stop populating at
+        min_charge : int, optional
+            The lowest charge state to populate
+        max_charge : int, optional
+            The charge state to stop populating at
+        charge_carrier : float, optional
+            The mass of the charge carrier. Defaults to the mass of a proton.
+        truncate_after : float, optional
+            The percentage of the signal in the theoretical isotopic pattern to include.
+        ignore_below : float, optional
+            Omit theoretical peaks whose intensity is below this number.
+        processes : int, optional
+            The number of worker processes to generate patterns with. Defaults to 1,
+            generating patterns in this process.
+
+        Returns
+        -------
+        :class:`AveragineCache`
+            self
+        """
+        if self.table is not None:
+            start = time.time()
+            self.misses += self.table._populate_rows(neutral_mass(
+                max_mz, max(abs(min_charge), abs(max_charge)), charge_carrier))
+            self.generation_time += time.time() - start
+            return self
+        pairs = self._missing_pairs(
+            min_mz, max_mz, min_charge, max_charge, charge_carrier, truncate_after)
+        if processes > 1 and len(pairs) > processes:
+            for key, tid in _populate_in_parallel(
+                    self.averagine.base_composition, self.cache_truncation, pairs,
+                    charge_carrier, truncate_after, ignore_below, processes):
+                if key not in self.backend:
+                    self.misses += 1
+                    self._store(key, tid)
+        else:
+            for i, j in pairs:
+                self._get_stored_pattern(i, j, charge_carrier, truncate_after, ignore_below)
         return self
 
+    def save_snapshot(self, path):
+        """Write every pattern in this cache, including those only present in
+        :attr:`snapshot`, to a memory-mappable snapshot file at ``path``.
+
+        Parameters
+        ----------
+        path : str
+            The path to write the snapshot to
+
+        Returns
+        -------
+        :class:`AveragineCacheSnapshot`
+
+        See Also
+        --------
+        :meth:`from_snapshot`
+        """
+        backend = {}
+        if self.snapshot is not None:
+            for key in self.snapshot.keys():
+                backend[key] = self.snapshot.get(key, TheoreticalIsotopicPattern)
+        backend.update(self.backend)
+        AveragineCacheSnapshot.write(
+            path, self.averagine.base_composition, self.cache_truncation, backend)
+        return AveragineCacheSnapshot(path)
+
+    def attach_snapshot(self, snapshot):
+        """Use ``snapshot`` as a read-only source of pre-computed patterns.
+
+        Parameters
+        ----------
+        snapshot : :class:`AveragineCacheSnapshot` or :class:`str`
+            The snapshot, or the path to a snapshot file
+
+        Returns
+        -------
+        :class:`AveragineCache`
+            self
+        """
+        if not isinstance(snapshot, AveragineCacheSnapshot):
+            snapshot = AveragineCacheSnapshot(snapshot)
+        if snapshot.cache_truncation != self.cache_truncation:
+            raise ValueError("Snapshot cache truncation %r does not match %r" % (
+                snapshot.cache_truncation, self.cache_truncation))
+        self.snapshot = snapshot
+        return self
+
+    def use_table(self, table=None, step_size=10.0):
+        """Interpolate patterns from a neutral mass grid instead of generating
+        and caching one pattern per (m/z, charge) pair.
+
+        Parameters
+        ----------
+        table : :class:`AveragineTable`, optional
+            The table to use. If omitted, a new table is built from :attr:`averagine`.
+            Passing :const:`False` disables the table.
+        step_size : float, optional
+            The grid spacing in Daltons of a newly built table
+
+        Returns
+        -------
+        :class:`AveragineCache`
+            self
+        """
+        if table is None:
+            table = AveragineTable(self.averagine, step_size)
+        elif table is False:
+            table = None
+        self.table = table
+        return self
+
+    @classmethod
+    def from_snapshot(cls, path):
+        """Create a new :class:`AveragineCache` whose :class:`Averagine` and
+        cached patterns are read from the snapshot at ``path``.
+
+        Parameters
+        ----------
+        path : str
+            The path to a snapshot written by :meth:`save_snapshot`
+
+        Returns
+        -------
+        :class:`AveragineCache`
+        """
+        snapshot = AveragineCacheSnapshot(path)
+        return cls(snapshot.base_composition, cache_truncation=snapshot.cache_truncation,
+                   snapshot=snapshot)
+
 
 try:
     _AveragineCache = AveragineCache
+    _AveragineTable = AveragineTable
     _isotopic_shift = isotopic_shift
-    from ms_deisotope._c.averagine import AveragineCache, isotopic_shift
+    from ms_deisotope._c.averagine import AveragineCache, AveragineTable, isotopic_shift
 except ImportError:
     pass
 
@@ -7,6 +7,10 @@ dense spectra.
 import math
 from collections import defaultdict
 
+import numpy as np
+
+from ms_deisotope.peak_set import ColumnarDeconvolutedPeakSet
+
 
 def top_n_filter(peak_set, n=40):
     """Keep only the top `n` most abundant peaks in the spectrum.
@@ -118,6 +122,49 @@ def convolved_product(pairs):
     return d
 
 
+def _peak_arrays(peak_set):
+    if isinstance(peak_set, ColumnarDeconvolutedPeakSet):
+        return peak_set.mz, peak_set.intensity
+    peaks = list(peak_set)
+    mz = np.fromiter((p.mz for p in peaks), dtype=np.float64, count=len(peaks))
+    intensity = np.fromiter((p.intensity for p in peaks), dtype=np.float64, count=len(peaks))
+    return mz, intensity
+
+
+def array_peak_set_similarity(peak_set_a, peak_set_b, precision=0):
+    """Computes the same binned cosine similarity as :func:`peak_set_similarity`
+    from arrays of peak m/z and intensity, without visiting each peak, which is
+    used when either peak set is a :class:`~.ColumnarDeconvolutedPeakSet`.
+
+    Parameters
+    ----------
+    peak_set_a : :class:`~.ColumnarDeconvolutedPeakSet` or Iterable of Peak-like
+    peak_set_b : :class:`~.ColumnarDeconvolutedPeakSet` or Iterable of Peak-like
+        The two peak collections to compare.
+    precision : int, optional
+        The precision of rounding to use when binning spectra. Defaults to 0
+
+    Returns
+    -------
+    float
+        The similarity between peak_set_a and peak_set_b. Between 0.0 and 1.0
+    """
+    mz_a, intensity_a = _peak_arrays(peak_set_a)
+    mz_b, intensity_b = _peak_arrays(peak_set_b)
+    if len(mz_a) == 0 or len(mz_b) == 0:
+        return 0.0
+    scaler = 10 ** precision
+    bins_a = (mz_a * scaler).astype(np.int64)
+    bins_b = (mz_b * scaler).astype(np.int64)
+    size = max(bins_a.max(), bins_b.max()) + 1
+    bin_a = np.bincount(bins_a, weights=intensity_a, minlength=size)
+    bin_b = np.bincount(bins_b, weights=intensity_b, minlength=size)
+    n_ab = math.sqrt(bin_a.dot(bin_a)) * math.sqrt(bin_b.dot(bin_b))
+    if n_ab == 0.0:
+        return 0.0
+    return float(bin_a.dot(bin_b) / n_ab)
+
+
 try:
     _has_c = True
     from ms_deisotope._c import similarity_methods as csimilarity_methods
@@ -129,6 +176,9 @@ try:
             raise TypeError("Peak sets cannot be None!")
         if precision > 2:
             return sparse_similarity(peak_set_a, peak_set_b, precision)
+        elif isinstance(peak_set_a, ColumnarDeconvolutedPeakSet) or isinstance(
+                peak_set_b, ColumnarDeconvolutedPeakSet):
+            return array_peak_set_similarity(peak_set_a, peak_set_b, precision)
         else:
             return csimilarity_methods.peak_set_similarity(peak_set_a, peak_set_b, precision)
 
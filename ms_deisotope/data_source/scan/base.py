@@ -1355,6 +1355,97 @@ class PeakSetMethods(_SequenceABC):
         else:
             raise NotImplementedError()
 
+    def _bulk_collection(self, method):
+        if self.is_deconvoluted:
+            return self._get_deconvoluted(), True
+        elif self.is_centroided:
+            return self._get_centroided(), False
+        elif self.is_scan:
+            self.scan.pick_peaks()
+            self.is_centroided = self._is_centroided()
+            return self._get_centroided(), False
+        elif self.is_raw_sequence:
+            if not hasattr(self.scan, method):
+                raise NotImplementedError()
+            return self.scan, True
+        else:
+            raise NotImplementedError()
+
+    def has_peaks(self, ms, error_tolerance=2e-5):
+        """Search the most refined representation available for the peak nearest to each
+        of the given mass dimension coordinates within the specified parts-per-million
+        error tolerance.
+
+        All of the queries are answered in one sweep over the peaks' sorted coordinates.
+
+        Parameters
+        ----------
+        ms : :class:`np.ndarray`
+            The mass dimension coordinates to search for. Depending upon if the
+            peaks have been deconvoluted, this may be m/z or neutral mass.
+        error_tolerance : float, optional
+            The parts-per-million error tolerance to apply (the default is 2e-5)
+
+        Returns
+        -------
+        :class:`np.ndarray` of int
+            The position of the matching peak for each query, or -1 where no peak matches
+
+        See Also
+        --------
+        :meth:`~.DeconvolutedPeakSet.has_peaks`
+
+        Raises
+        ------
+        NotImplementedError
+            When the underlying collection does not support this operation
+        """
+        from ms_deisotope.peak_set import nearest_match_indices
+        peaks, delegate = self._bulk_collection('has_peaks')
+        if delegate:
+            return peaks.has_peaks(ms, error_tolerance)
+        return nearest_match_indices(self._mz_column(peaks), ms, error_tolerance)
+
+    def all_peaks_for_many(self, ms, error_tolerance=2e-5):
+        """Search the most refined representation available for all peaks at each of
+        the given mass dimension coordinates within the specified parts-per-million
+        error tolerance.
+
+        All of the queries are answered in one sweep over the peaks' sorted coordinates.
+
+        Parameters
+        ----------
+        ms : :class:`np.ndarray`
+            The mass dimension coordinates to search for. Depending upon if the
+            peaks have been deconvoluted, this may be m/z or neutral mass.
+        error_tolerance : float, optional
+            The parts-per-million error tolerance to apply (the default is 2e-5)
+
+        Returns
+        -------
+        starts : :class:`np.ndarray` of int
+        ends : :class:`np.ndarray` of int
+            The peaks matching the ``i`` th query are at positions ``starts[i]`` up
+            to ``ends[i]``
+
+        See Also
+        --------
+        :meth:`~.DeconvolutedPeakSet.all_peaks_for_many`
+
+        Raises
+        ------
+        NotImplementedError
+            When the underlying collection does not support this operation
+        """
+        from ms_deisotope.peak_set import match_intervals
+        peaks, delegate = self._bulk_collection('all_peaks_for_many')
+        if delegate:
+            return peaks.all_peaks_for_many(ms, error_tolerance)
+        return match_intervals(self._mz_column(peaks), ms, error_tolerance)
+
+    def _mz_column(self, peaks):
+        return np.fromiter((peak.mz for peak in peaks), dtype=np.float64, count=len(peaks))
+
     def between(self, lo, hi, **kwargs):
         """Search the most refined representation available for all peaks at the
         between the given low and high mass dimension coordinates.
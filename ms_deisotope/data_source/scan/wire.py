@@ -0,0 +1,316 @@
+'''A compact binary encoding of :class:`~.ProcessedScan` for sending processed
+scans between processes.
+
+Pickling a :class:`~.ProcessedScan` pickles every peak and isotopic envelope point
+as its own object, which dominates the cost of moving deconvoluted scans from worker
+processes back to the process writing them out. :func:`encode_processed_scan` instead
+writes the peak attributes as contiguous arrays after a small fixed-size header, and
+:func:`decode_processed_scan` reads them back with :func:`np.frombuffer` without
+copying them before the peak objects are rebuilt.
+
+The layout of an encoded scan is:
+
+1. The header, :data:`HEADER`, holding :data:`MAGIC`, the format version, flags
+   describing which peak sets are present, and the sizes of the sections which follow.
+2. The scan's metadata, everything other than its peak sets, as a pickle.
+3. The fitted peaks, one column per name in :data:`FITTED_COLUMNS`.
+4. The deconvoluted peaks, one column per name in
+   :attr:`~.ColumnarDeconvolutedPeakSet.columns`, followed by the isotopic envelope
+   offsets, m/z and intensity arrays of a :class:`~.ColumnarDeconvolutedPeakSet`.
+
+Every section is padded to a multiple of 8 bytes so the arrays are aligned. Peak sets
+of peak types which this layout does not describe, such as :class:`~.DeconvolutedPeakDriftTime`,
+are pickled into the metadata section instead. The :attr:`~.DeconvolutedPeak.fit` and
+:attr:`~.DeconvolutedPeakSolution.solution` of deconvoluted peaks are not transported,
+just as when the peaks are written to a file.
+'''
+import pickle
+import struct
+
+import numpy as np
+
+from ms_peak_picker import FittedPeak, PeakIndex, PeakSet
+
+from ms_deisotope.peak_set import (
+    DeconvolutedPeak, DeconvolutedPeakSolution,
+    ColumnarDeconvolutedPeakSet, deconvoluted_peak_columns)
+
+from .scan import ProcessedScan
+
+
+#: The first bytes of every encoded scan
+MAGIC = b"MSDW"
+#: The version of the layout written by :func:`encode_processed_scan`
+VERSION = 1
+
+#: The magic number, version, flags, metadata size, number of fitted peaks,
+#: number of deconvoluted peaks and number of isotopic envelope points
+HEADER = struct.Struct("<4sBBxxqqqq")
+
+HAS_FITTED = 1
+HAS_DECONVOLUTED = 2
+PICKLED_FITTED = 4
+PICKLED_DECONVOLUTED = 8
+FITTED_INDEX = 16
+
+#: The columns of the fitted peak section and their types, in the order they are written
+FITTED_COLUMNS = (
+    ("mz", np.float64),
+    ("intensity", np.float64),
+    ("signal_to_noise", np.float64),
+    ("full_width_at_half_max", np.float64),
+    ("area", np.float64),
+    ("left_width", np.float64),
+    ("right_width", np.float64),
+    ("peak_count", np.int64),
+    ("index", np.int64),
+)
+
+_DECONVOLUTED_COLUMNS = tuple(
+    (name, np.dtype(ColumnarDeconvolutedPeakSet._column_types.get(name, np.float64)))
+    for name in ColumnarDeconvolutedPeakSet.columns)
+
+_DECONVOLUTED_PEAK_TYPES = (DeconvolutedPeak, DeconvolutedPeakSolution)
+
+
+def fitted_peak_columns(peaks):
+    """Copy the attributes of `peaks` into one array per name in :data:`FITTED_COLUMNS`.
+
+    Parameters
+    ----------
+    peaks : :class:`~.Iterable` of :class:`~ms_peak_picker.FittedPeak`
+
+    Returns
+    -------
+    dict
+    """
+    peaks = list(peaks)
+    return {
+        name: np.array([getattr(peak, name) for peak in peaks], dtype=dtype)
+        for name, dtype in FITTED_COLUMNS
+    }
+
+
+def fitted_peaks_from_columns(columns):
+    """Create a :class:`~ms_peak_picker.FittedPeak` from each row of `columns`.
+
+    Parameters
+    ----------
+    columns : dict
+
+    Returns
+    -------
+    list of :class:`~ms_peak_picker.FittedPeak`
+    """
+    rows = zip(*[columns[name].tolist() for name, _ in FITTED_COLUMNS])
+    return [
+        FittedPeak(mz, intensity, signal_to_noise, peak_count, index, full_width_at_half_max,
+                   area, left_width, right_width)
+        for (mz, intensity, signal_to_noise, full_width_at_half_max, area, left_width,
+             right_width, peak_count, index) in rows
+    ]
+
+
+try:
+    _fitted_peak_columns = fitted_peak_columns
+    _fitted_peaks_from_columns = fitted_peaks_from_columns
+    from ms_deisotope._c.utils import fitted_peak_columns, fitted_peaks_from_columns
+except ImportError:
+    pass
+
+
+def _padding(size):
+    return b"\0" * (-size % 8)
+
+
+def _fitted_peaks_of(peak_set):
+    # The fitted peaks if `peak_set` can be written as columns, otherwise None.
+    # Profile arrays of a PeakIndex are not part of the layout.
+    if isinstance(peak_set, PeakIndex):
+        if len(peak_set.mz_array) or len(peak_set.intensity_array):
+            return None
+        peak_set = peak_set.peaks
+    if not isinstance(peak_set, PeakSet):
+        return None
+    peaks = list(peak_set)
+    if not all(type(peak) is FittedPeak for peak in peaks):
+        return None
+    return peaks
+
+
+def _deconvoluted_peaks_of(peak_set):
+    if isinstance(peak_set, ColumnarDeconvolutedPeakSet):
+        return peak_set
+    try:
+        peaks = list(peak_set)
+    except TypeError:
+        return None
+    if not all(type(peak) in _DECONVOLUTED_PEAK_TYPES for peak in peaks):
+        return None
+    return peaks
+
+
+def is_encoded_scan(value):
+    """Check whether `value` was produced by :func:`encode_processed_scan`.
+
+    Parameters
+    ----------
+    value : object
+
+    Returns
+    -------
+    bool
+    """
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:4]) == MAGIC
+
+
+def encode_processed_scan(scan):
+    """Encode `scan` in the binary layout described in :mod:`ms_deisotope.data_source.scan.wire`.
+
+    Parameters
+    ----------
+    scan : :class:`~.ProcessedScan`
+        The scan to encode. Use :meth:`~.Scan.pack` to convert a :class:`~.Scan`.
+
+    Returns
+    -------
+    bytes
+    """
+    flags = 0
+    chunks = []
+    n_fitted = n_deconvoluted = n_points = 0
+    pickled_peaks = {}
+
+    peak_set = scan.peak_set
+    if peak_set is not None:
+        flags |= HAS_FITTED
+        peaks = _fitted_peaks_of(peak_set)
+        if peaks is None:
+            flags |= PICKLED_FITTED
+            pickled_peaks['peak_set'] = peak_set
+        else:
+            if isinstance(peak_set, PeakIndex):
+                flags |= FITTED_INDEX
+            n_fitted = len(peaks)
+            columns = fitted_peak_columns(peaks)
+            for name, dtype in FITTED_COLUMNS:
+                chunks.append(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+
+    deconvoluted_peak_set = scan.deconvoluted_peak_set
+    if deconvoluted_peak_set is not None:
+        flags |= HAS_DECONVOLUTED
+        peaks = _deconvoluted_peaks_of(deconvoluted_peak_set)
+        if peaks is None:
+            flags |= PICKLED_DECONVOLUTED
+            pickled_peaks['deconvoluted_peak_set'] = deconvoluted_peak_set
+        else:
+            if isinstance(peaks, ColumnarDeconvolutedPeakSet):
+                columns = {name: getattr(peaks, name) for name in peaks.columns}
+                envelope_offsets = peaks.envelope_offsets
+                envelope_mz = peaks.envelope_mz
+                envelope_intensity = peaks.envelope_intensity
+            else:
+                columns, envelope_offsets, envelope_mz, envelope_intensity = deconvoluted_peak_columns(peaks)
+            n_deconvoluted = len(envelope_offsets) - 1
+            n_points = len(envelope_mz)
+            for name, dtype in _DECONVOLUTED_COLUMNS:
+                data = np.ascontiguousarray(columns[name], dtype=dtype).tobytes()
+                chunks.append(data)
+                chunks.append(_padding(len(data)))
+            chunks.append(np.ascontiguousarray(envelope_offsets, dtype=np.int64).tobytes())
+            chunks.append(np.ascontiguousarray(envelope_mz, dtype=np.float64).tobytes())
+            chunks.append(np.ascontiguousarray(envelope_intensity, dtype=np.float64).tobytes())
+
+    metadata = pickle.dumps((
+        scan.id, scan.title, scan.precursor_information, scan.ms_level, scan.scan_time,
+        scan.index, scan.polarity, scan.activation, scan.acquisition_information,
+        scan.isolation_window, scan.instrument_configuration, scan.product_scans,
+        scan.annotations, scan.source, pickled_peaks), pickle.HIGHEST_PROTOCOL)
+    header = HEADER.pack(MAGIC, VERSION, flags, len(metadata), n_fitted, n_deconvoluted, n_points)
+    return b"".join([header, metadata, _padding(len(metadata))] + chunks)
+
+
+class _Reader(object):
+    def __init__(self, buffer, offset):
+        self.buffer = buffer
+        self.offset = offset
+
+    def read(self, dtype, count):
+        dtype = np.dtype(dtype)
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        array = np.frombuffer(self.buffer, dtype=dtype, count=count, offset=self.offset)
+        size = dtype.itemsize * count
+        self.offset += size + (-size % 8)
+        return array
+
+
+def decode_processed_scan(buffer, include_fitted=True, columnar=False):
+    """Decode a scan encoded by :func:`encode_processed_scan`.
+
+    Parameters
+    ----------
+    buffer : bytes
+        The encoded scan
+    include_fitted : bool, optional
+        Whether to rebuild the fitted peaks. If :const:`False`, the decoded scan's
+        :attr:`~.ProcessedScan.peak_set` is :const:`None`. Defaults to :const:`True`
+    columnar : bool, optional
+        Whether to return the deconvoluted peaks as a :class:`~.ColumnarDeconvolutedPeakSet`
+        viewing `buffer` instead of a :class:`~.DeconvolutedPeakSet`. Defaults to :const:`False`
+
+    Returns
+    -------
+    :class:`~.ProcessedScan`
+
+    Raises
+    ------
+    ValueError
+        If `buffer` is not an encoded scan of a version this function reads
+    """
+    if len(buffer) < HEADER.size:
+        raise ValueError("The buffer is too short to hold an encoded scan")
+    magic, version, flags, metadata_size, n_fitted, n_deconvoluted, n_points = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("The buffer does not hold an encoded scan")
+    if version != VERSION:
+        raise ValueError("Cannot decode version %d of the scan encoding" % (version, ))
+    offset = HEADER.size
+    (scan_id, title, precursor_information, ms_level, scan_time, index, polarity, activation,
+     acquisition_information, isolation_window, instrument_configuration, product_scans,
+     annotations, source, pickled_peaks) = pickle.loads(buffer[offset:offset + metadata_size])
+    reader = _Reader(buffer, offset + metadata_size + (-metadata_size % 8))
+
+    peak_set = None
+    if flags & HAS_FITTED:
+        if flags & PICKLED_FITTED:
+            peak_set = pickled_peaks['peak_set']
+        else:
+            columns = {name: reader.read(dtype, n_fitted) for name, dtype in FITTED_COLUMNS}
+            if include_fitted:
+                peak_set = PeakSet(fitted_peaks_from_columns(columns))
+                peak_set.reindex()
+                if flags & FITTED_INDEX:
+                    peak_set = PeakIndex(np.array([]), np.array([]), peak_set)
+        if not include_fitted:
+            peak_set = None
+
+    deconvoluted_peak_set = None
+    if flags & HAS_DECONVOLUTED:
+        if flags & PICKLED_DECONVOLUTED:
+            deconvoluted_peak_set = pickled_peaks['deconvoluted_peak_set']
+        else:
+            columns = {name: reader.read(dtype, n_deconvoluted) for name, dtype in _DECONVOLUTED_COLUMNS}
+            envelope_offsets = reader.read(np.int64, n_deconvoluted + 1)
+            envelope_mz = reader.read(np.float64, n_points)
+            envelope_intensity = reader.read(np.float64, n_points)
+            deconvoluted_peak_set = ColumnarDeconvolutedPeakSet.__new__(ColumnarDeconvolutedPeakSet)
+            deconvoluted_peak_set._set_columns(columns, envelope_offsets, envelope_mz, envelope_intensity)
+            if not columnar:
+                deconvoluted_peak_set = deconvoluted_peak_set.to_peak_set()
+
+    return ProcessedScan(
+        scan_id, title, precursor_information, ms_level, scan_time, index, peak_set,
+        deconvoluted_peak_set, polarity, activation, acquisition_information,
+        isolation_window, instrument_configuration, product_scans, annotations,
+        source=source)
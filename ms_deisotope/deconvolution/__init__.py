@@ -11,6 +11,8 @@ from .utils import (
     charge_range_,
     ChargeIterator,
     quick_charge,
+    quick_charge_table,
+    PeakSetArrays,
     drop_placeholders_parallel,
     drop_placeholders,
     first_peak,
@@ -34,8 +36,19 @@ from .averagine_based import (
     MultiAveraginePeakDependenceGraphDeconvoluter)
 
 from .composition_list import (
+    composition_hash,
+    CompositionPatternStore,
+    CompositionIndex,
     CompositionListDeconvoluterBase,
     CompositionListDeconvoluter,
     CompositionListPeakDependenceGraphDeconvoluter)
 
-from .api import deconvolute_peaks
+from .profiling import DeconvolutionProfile
+from .budget import DeconvolutionBudget
+from .result_cache import (
+    deconvolution_cache_key,
+    DeconvolutionResultCache,
+    MemoryDeconvolutionResultCache,
+    DiskDeconvolutionResultCache)
+
+from .api import deconvolute_peaks, DeconvolutionEngine
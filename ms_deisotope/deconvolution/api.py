@@ -5,6 +5,10 @@ High Level Deconvolution API
 A high-level wrapper around the deconvolution machinery, orchestrating the
 process of constructing a deconvoluter instance, performing deconvolution, and
 extracting targets of interest from the result.
+
+:func:`deconvolute_peaks` deconvolutes a single spectrum. :class:`DeconvolutionEngine`
+deconvolutes many spectra with the same configuration, reusing one deconvoluter, and
+optionally the results of identical spectra.
 '''
 
 from ms_peak_picker import FittedPeak
@@ -20,9 +24,30 @@ from ms_deisotope.constants import (
 from ms_deisotope.averagine import PROTON
 
 from .averagine_based import AveraginePeakDependenceGraphDeconvoluter
+from .composition_list import CompositionIndex
+from .profiling import DeconvolutionProfile
+from .result_cache import deconvolution_cache_key
 from .utils import logger, prepare_peaklist
 
 
+#: The parameters of :func:`deconvolute_peaks` which control how a spectrum is deconvoluted,
+#: rather than how the deconvoluter is constructed.
+DECONVOLUTION_PARAMETERS = (
+    "charge_range",
+    "error_tolerance",
+    "left_search_limit",
+    "right_search_limit",
+    "left_search_limit_for_priorities",
+    "right_search_limit_for_priorities",
+    "verbose_priorities",
+    "verbose",
+    "charge_carrier",
+    "truncate_after",
+    "iterations",
+    "retention_strategy",
+)
+
+
 def deconvolute_peaks(peaklist, decon_config=None,
                       charge_range=(1, 8), error_tolerance=ERROR_TOLERANCE,
                       priority_list=None, left_search_limit=3, right_search_limit=0,
@@ -32,6 +57,9 @@ def deconvolute_peaks(peaklist, decon_config=None,
                       deconvoluter_type=AveraginePeakDependenceGraphDeconvoluter,
                       retention_strategy=None,
                       use_quick_charge=False,
+                      profile=False,
+                      time_budget=None,
+                      work_budget=None,
                       **kwargs):
     """Deconvolute a centroided mass spectrum
 
@@ -49,7 +77,9 @@ def deconvolute_peaks(peaklist, decon_config=None,
         The centroided mass spectrum to deconvolute.
     decon_config : dict, optional
         Parameters to use to initialize the deconvoluter instance produced by
-        ``deconvoluter_type``
+        ``deconvoluter_type``. If it has a ``composition_list``, the
+        :class:`~.CompositionIndex` built for it is stored as ``composition_index``,
+        so passing the same `decon_config` for the next spectrum reuses it.
     charge_range : tuple of integers, optional
         The range of charge states to consider.
     error_tolerance : float, optional
@@ -84,6 +114,16 @@ def deconvolute_peaks(peaklist, decon_config=None,
     use_quick_charge: :class:`bool`
         Whether or not to use the :title-reference:`QuickCharge` algorithm to quickly filter
         theoretical charge states to consider for each peak.
+    profile: :class:`bool` or :class:`~.DeconvolutionProfile`
+        Whether to record the time spent in each phase of deconvolution and the number of
+        fits considered. If a :class:`~.DeconvolutionProfile` is given, measurements are added
+        to it. The profile is available as :attr:`~.DeconvolutionProcessResult.profile`.
+    time_budget: :class:`float`, optional
+        The number of seconds deconvolution should take before the deconvoluter falls back
+        to cheaper strategies. The strategies used are listed by
+        :attr:`~.DeconvolutionProcessResult.degraded`. See :attr:`~.PeakDependenceGraphDeconvoluterBase.budget`.
+    work_budget: :class:`int`, optional
+        The number of peaks to explore before the deconvoluter falls back to cheaper strategies.
     **kwargs
         Additional keywords included in ``decon_config``
 
@@ -91,6 +131,46 @@ def deconvolute_peaks(peaklist, decon_config=None,
     -------
     :class:`~.DeconvolutionProcessResult`
     """
+    decon_config = decon_config or {}
+    decon_config.update(kwargs)
+    _fill_deconvoluter_config(decon_config, use_quick_charge, profile, time_budget, work_budget)
+    decon = deconvoluter_type(peaklist=peaklist, **decon_config)
+    return _deconvolute_with(
+        decon, peaklist, charge_range=charge_range, error_tolerance=error_tolerance,
+        priority_list=priority_list, left_search_limit=left_search_limit,
+        right_search_limit=right_search_limit,
+        left_search_limit_for_priorities=left_search_limit_for_priorities,
+        right_search_limit_for_priorities=right_search_limit_for_priorities,
+        verbose_priorities=verbose_priorities, verbose=verbose, charge_carrier=charge_carrier,
+        truncate_after=truncate_after, iterations=iterations, retention_strategy=retention_strategy)
+
+
+def _fill_deconvoluter_config(decon_config, use_quick_charge=False, profile=False, time_budget=None,
+                              work_budget=None):
+    decon_config.setdefault("use_subtraction", True)
+    decon_config.setdefault("scale_method", SCALE_METHOD)
+    decon_config.setdefault("use_quick_charge", use_quick_charge)
+    if profile:
+        decon_config.setdefault("profile", profile)
+    if time_budget is not None:
+        decon_config.setdefault("time_budget", time_budget)
+    if work_budget is not None:
+        decon_config.setdefault("work_budget", work_budget)
+    if (decon_config.get("composition_list") is not None and
+            decon_config.get("use_composition_index", True) and
+            decon_config.get("composition_index") is None):
+        decon_config["composition_index"] = CompositionIndex(decon_config["composition_list"])
+    return decon_config
+
+
+def _deconvolute_with(decon, peaklist, charge_range=(1, 8), error_tolerance=ERROR_TOLERANCE,
+                      priority_list=None, left_search_limit=3, right_search_limit=0,
+                      left_search_limit_for_priorities=None, right_search_limit_for_priorities=None,
+                      verbose_priorities=False, verbose=False, charge_carrier=PROTON,
+                      truncate_after=TRUNCATE_AFTER, iterations=MAX_ITERATION,
+                      retention_strategy=None):
+    # Deconvolute `peaklist` with `decon`, which has already been given a copy of it,
+    # and collect the priority targets. See :func:`deconvolute_peaks`.
     if priority_list is None:
         priority_list = []
     if left_search_limit_for_priorities is None:
@@ -98,15 +178,9 @@ def deconvolute_peaks(peaklist, decon_config=None,
     if right_search_limit_for_priorities is None:
         right_search_limit_for_priorities = right_search_limit
 
-    decon_config = decon_config or {}
-    decon_config.update(kwargs)
-    decon_config.setdefault("use_subtraction", True)
-    decon_config.setdefault("scale_method", SCALE_METHOD)
-    decon_config.setdefault("use_quick_charge", use_quick_charge)
-    decon = deconvoluter_type(peaklist=peaklist, **decon_config)
-
     peaklist = prepare_peaklist(peaklist)
 
+    was_verbose = decon.verbose
     if verbose_priorities or verbose:
         decon.verbose = True
 
@@ -137,6 +211,7 @@ def deconvolute_peaks(peaklist, decon_config=None,
         left_search_limit=left_search_limit, right_search_limit=right_search_limit,
         charge_carrier=charge_carrier, truncate_after=truncate_after,
         iterations=iterations)
+    decon.verbose = was_verbose
 
     acc = []
     errors = []
@@ -155,7 +230,155 @@ def deconvolute_peaks(peaklist, decon_config=None,
     if retention_strategy is not None:
         retained = retention_strategy(
             decon.peaklist, peaklist, charge_range, deconvoluted_peaks)
-        deconvoluted_peaks = merge(deconvoluted_peaks, retained)
+        # Both peak sets were just created and are not returned on their own,
+        # so their peaks can be re-indexed in place rather than copied.
+        deconvoluted_peaks = merge(deconvoluted_peaks, retained, copy=False)
 
     return DeconvolutionProcessResult(
-        decon, deconvoluted_peaks, priority_list_results, errors)
+        decon, deconvoluted_peaks, priority_list_results, errors,
+        profile=getattr(decon, "profile", None),
+        degraded=getattr(decon, "degraded", None))
+
+
+class DeconvolutionEngine(object):
+    """Deconvolutes a stream of spectra with the same configuration, reusing a single
+    deconvoluter, its theoretical isotopic pattern caches and its scratch state between
+    spectra instead of constructing a new deconvoluter for each, as :func:`deconvolute_peaks`
+    does.
+
+    Takes the same arguments as :func:`deconvolute_peaks`, except for the peak list and
+    priority targets, which are given to :meth:`deconvolute` for each spectrum. The arguments
+    named in :data:`DECONVOLUTION_PARAMETERS` become the default arguments of :meth:`deconvolute`,
+    and may be overridden for each spectrum. The rest configure the deconvoluter.
+
+    If ``deconvoluter_type`` produces a deconvoluter without a ``reset`` method, a new
+    deconvoluter is constructed for each spectrum. The :class:`~.CompositionIndex` of a
+    composition list configuration is built once and shared by each of them.
+
+    The :attr:`~.DeconvolutionProcessResult.deconvoluter` of each result is the shared
+    deconvoluter, so it only describes the most recently deconvoluted spectrum.
+
+    If a ``result_cache`` is given, spectra deconvoluted without priority targets are looked
+    up in it by :func:`~.deconvolution_cache_key` first, and results found there are returned
+    without a deconvoluter. Results whose deconvolution exceeded its budget or raised errors
+    are not stored, nor are results of a configuration which cannot be identified.
+
+    Attributes
+    ----------
+    deconvoluter_type : type or callable
+        A callable returning a deconvoluter
+    decon_config : dict
+        The parameters used to initialize the deconvoluter
+    parameters : dict
+        The default arguments of :meth:`deconvolute`
+    deconvoluter : :class:`~.DeconvoluterBase`
+        The deconvoluter used for the most recent spectrum, or :const:`None` before the first
+    profile : :class:`~.DeconvolutionProfile`
+        If ``profile`` was given, the time spent in each phase of deconvolution of all
+        spectra so far, otherwise :const:`None`.
+    result_cache : :class:`~.DeconvolutionResultCache`
+        The store of previously deconvoluted spectra, or :const:`None`
+    """
+
+    def __init__(self, decon_config=None, deconvoluter_type=AveraginePeakDependenceGraphDeconvoluter,
+                 use_quick_charge=False, profile=False, time_budget=None, work_budget=None,
+                 result_cache=None, **kwargs):
+        parameters = {}
+        for name in DECONVOLUTION_PARAMETERS:
+            if name in kwargs:
+                parameters[name] = kwargs.pop(name)
+        if profile is True:
+            profile = DeconvolutionProfile()
+        decon_config = dict(decon_config or {})
+        decon_config.update(kwargs)
+        self.decon_config = _fill_deconvoluter_config(
+            decon_config, use_quick_charge, profile, time_budget, work_budget)
+        self.deconvoluter_type = deconvoluter_type
+        self.parameters = parameters
+        self.profile = profile or None
+        self.result_cache = result_cache
+        self.deconvoluter = None
+
+    def _prepare_deconvoluter(self, peaklist):
+        decon = self.deconvoluter
+        if decon is not None and hasattr(decon, "reset"):
+            decon.reset(peaklist)
+        else:
+            decon = self.deconvoluter = self.deconvoluter_type(
+                peaklist=peaklist, **self.decon_config)
+        return decon
+
+    def deconvolute(self, peaklist, priority_list=None, **kwargs):
+        """Deconvolute a centroided mass spectrum.
+
+        Parameters
+        ----------
+        peaklist : :class:`~.PeakSet` or list of Peak-like objects, see :func:`~.prepare_peaklist`
+            The centroided mass spectrum to deconvolute.
+        priority_list : list, optional
+            The set of peaks to target for deconvolution, as for :func:`deconvolute_peaks`
+        **kwargs
+            Arguments named in :data:`DECONVOLUTION_PARAMETERS` to use in place of
+            :attr:`parameters` for this spectrum
+
+        Returns
+        -------
+        :class:`~.DeconvolutionProcessResult`
+        """
+        parameters = dict(self.parameters)
+        parameters.update(kwargs)
+        key = None
+        if self.result_cache is not None and not priority_list:
+            key = self.cache_key(peaklist, parameters)
+        if key is not None:
+            peak_set = self.result_cache.get(key)
+            if peak_set is not None:
+                return DeconvolutionProcessResult(None, peak_set, [], [], profile=self.profile)
+        decon = self._prepare_deconvoluter(peaklist)
+        result = _deconvolute_with(decon, peaklist, priority_list=priority_list, **parameters)
+        if key is not None and not result.degraded and not result.errors:
+            self.result_cache.put(key, result.peak_set)
+        return result
+
+    def cache_key(self, peaklist, parameters=None):
+        """Compute the key under which the deconvolution of `peaklist` with this engine's
+        configuration is stored in :attr:`result_cache`.
+
+        Parameters
+        ----------
+        peaklist : :class:`~.PeakSet` or list of Peak-like objects, see :func:`~.prepare_peaklist`
+            The centroided mass spectrum to deconvolute.
+        parameters : dict, optional
+            The arguments of :meth:`deconvolute`. Defaults to :attr:`parameters`
+
+        Returns
+        -------
+        str
+            The key, or :const:`None` if the configuration cannot be identified
+            and so its results are not cached
+        """
+        if parameters is None:
+            parameters = self.parameters
+        configuration = dict(self.decon_config)
+        configuration.update(parameters)
+        configuration['deconvoluter_type'] = self.deconvoluter_type
+        return deconvolution_cache_key(peaklist, configuration)
+
+    def deconvolute_all(self, peaklists):
+        """Deconvolute each centroided mass spectrum in `peaklists` with :attr:`parameters`.
+
+        Parameters
+        ----------
+        peaklists : :class:`~.Iterable`
+            The centroided mass spectra to deconvolute
+
+        Yields
+        ------
+        :class:`~.DeconvolutionProcessResult`
+        """
+        for peaklist in peaklists:
+            yield self.deconvolute(peaklist)
+
+    def __repr__(self):
+        return "{self.__class__.__name__}({name}, {self.parameters})".format(
+            self=self, name=getattr(self.deconvoluter_type, "__name__", self.deconvoluter_type))
@@ -18,6 +18,7 @@ from ms_deisotope.averagine import PROTON, AveragineCache, peptide, glycopeptide
 from ms_deisotope.constants import IGNORE_BELOW, TRUNCATE_AFTER, SCALE_METHOD
 
 from ms_deisotope.scoring import penalized_msdeconv
+from ms_deisotope.utils import overrides_method
 
 from .base import (
     DeconvoluterBase)
@@ -26,7 +27,7 @@ from .exhaustive import (
     ExhaustivePeakSearchDeconvoluterBase,
     PeakDependenceGraphDeconvoluterBase)
 
-from .utils import count_placeholders, prepare_peaklist
+from .utils import prepare_peaklist
 
 
 class AveragineDeconvoluterBase(DeconvoluterBase):
@@ -79,7 +80,12 @@ class AveragineDeconvoluterBase(DeconvoluterBase):
         """Given a set of candidate monoisotopic peaks and charge states, and a PPM error tolerance,
         fit each putative isotopic pattern.
 
-        Calls :meth:`fit_theoretical_distribution` on each candidate.
+        Builds the theoretical isotopic pattern of each candidate as :meth:`fit_theoretical_distribution`
+        does, and then matches and scores all of the candidates together with
+        :meth:`_fit_theoretical_distributions`.
+
+        If a subclass overrides :meth:`fit_theoretical_distribution`, it is called on each
+        candidate instead.
 
         If a fit does not satisfy :attr:`scorer` `.reject`, it is discarded. If a fit has only one real peak
         and has a charge state greater than 1, it will also be discarded.
@@ -98,17 +104,33 @@ class AveragineDeconvoluterBase(DeconvoluterBase):
         set
             The set of :class:`~.IsotopicFitRecord` instances produced
         """
-        results = []
+        if overrides_method(self, "fit_theoretical_distribution", "_fit_peaks_at_charges"):
+            # Candidates can only be scored together when they are fit the way this class does
+            results = []
+            for peak, charge in peak_charge_set:
+                if peak.mz < 1:
+                    continue
+                fit = self.fit_theoretical_distribution(
+                    peak, error_tolerance, charge, charge_carrier, truncate_after,
+                    ignore_below)
+                fit.missed_peaks = count_placeholders(fit.experimental)
+                if not self._check_fit(fit):
+                    continue
+                results.append(fit)
+            return set(results)
+        peaks = []
+        charges = []
+        theoreticals = []
         for peak, charge in peak_charge_set:
             if peak.mz < 1:
                 continue
-            fit = self.fit_theoretical_distribution(
-                peak, error_tolerance, charge, charge_carrier, truncate_after,
-                ignore_below)
-            fit.missed_peaks = count_placeholders(fit.experimental)
-            if not self._check_fit(fit):
-                continue
-            results.append(fit)
+            tid = self.averagine.isotopic_cluster(
+                peak.mz, charge, charge_carrier=charge_carrier,
+                truncate_after=truncate_after, ignore_below=ignore_below)
+            peaks.append(peak)
+            charges.append(charge)
+            theoreticals.append(tid)
+        results = self._fit_theoretical_distributions(theoreticals, peaks, charges, error_tolerance)
         return set(results)
 
 
@@ -161,28 +183,79 @@ class AveragineDeconvoluter(AveragineDeconvoluterBase, ExhaustivePeakSearchDecon
         super(AveragineDeconvoluter, self).__init__(
             use_subtraction, scale_method, merge_isobaric_peaks=True, **kwargs)
 
+    def _pattern_caches(self):
+        return [self.averagine]
+
 
 class MultiAveragineDeconvoluterBase(DeconvoluterBase):
     """A base class derived from :class:`DeconvoluterBase` which provides some common methods
     for fitting isotopic patterns using multiple Averagine models.
     """
 
+    def fit_theoretical_distribution(self, peak, error_tolerance, charge, averagine, charge_carrier=PROTON,
+                                     truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW):
+        """Fit an isotopic pattern seeded at `peak` at `charge` charge using `averagine`.
+
+        Parameters
+        ----------
+        peak : :class:`~.FittedPeak`
+            The putative monoisotopic peak to use for interpolating an isotopic pattern
+        error_tolerance : float
+            Parts-per-million error tolerance for isotopic pattern matching
+        charge : int
+            The charge state to produce an isotopic pattern for
+        averagine : :class:`~.AveragineCache`
+            The model to produce the isotopic pattern with
+        charge_carrier : float, optional
+            The charge carrier mass, defaults to |PROTON|
+
+        Returns
+        -------
+        :class:`~.IsotopicFitRecord`
+            The fitted isotopic pattern
+        """
+        tid = averagine.isotopic_cluster(
+            peak.mz, charge, charge_carrier=charge_carrier,
+            truncate_after=truncate_after, ignore_below=ignore_below)
+        eid = self.match_theoretical_isotopic_distribution(
+            tid, error_tolerance=error_tolerance)
+        return self._evaluate_theoretical_distribution(eid, tid, peak, charge)
+
     def _fit_peaks_at_charges(self, peak_charge_set, error_tolerance, charge_carrier=PROTON,
                               truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW):
-        results = []
+        if overrides_method(self, "fit_theoretical_distribution", "_fit_peaks_at_charges"):
+            # Candidates can only be scored together when they are fit the way this class does
+            results = []
+            for peak, charge in peak_charge_set:
+                if peak.mz < 1:
+                    continue
+                for averagine in self.averagines:
+                    fit = self.fit_theoretical_distribution(
+                        peak, error_tolerance, charge, averagine, charge_carrier=charge_carrier,
+                        truncate_after=truncate_after, ignore_below=ignore_below)
+                    fit.missed_peaks = count_placeholders(fit.experimental)
+                    fit.data = averagine
+                    if not self._check_fit(fit):
+                        continue
+                    results.append(fit)
+            return set(results)
+        peaks = []
+        charges = []
+        theoreticals = []
+        models = []
         for peak, charge in peak_charge_set:
             for averagine in self.averagines:
                 if peak.mz < 1:
                     continue
-                fit = self.fit_theoretical_distribution(
-                    peak, error_tolerance, charge, averagine, charge_carrier=charge_carrier,
+                tid = averagine.isotopic_cluster(
+                    peak.mz, charge, charge_carrier=charge_carrier,
                     truncate_after=truncate_after, ignore_below=ignore_below)
-                fit.missed_peaks = count_placeholders(fit.experimental)
-                fit.data = averagine
-                if not self._check_fit(fit):
-                    continue
-                results.append(fit)
-        return set(results)
+                peaks.append(peak)
+                charges.append(charge)
+                theoreticals.append(tid)
+                models.append(averagine)
+        return set(self._fit_theoretical_distributions(
+            theoreticals, peaks, charges, error_tolerance, models))
 
 
 try:
@@ -245,6 +318,26 @@ class MultiAveragineDeconvoluter(MultiAveragineDeconvoluterBase, ExhaustivePeakS
             use_subtraction, scale_method, merge_isobaric_peaks,
             minimum_intensity, *args, **kwargs)
 
+    def _pattern_caches(self):
+        return list(self.averagines)
+
+
+def _share_model_arguments(init_args, model_name, model, scorer):
+    # Pass the already-built model caches and scorer on to region deconvoluters, whether they
+    # were originally given by position or by keyword
+    args, kwargs = init_args
+    args = list(args)
+    kwargs = dict(kwargs)
+    if args:
+        args[0] = model
+    else:
+        kwargs[model_name] = model
+    if len(args) > 1:
+        args[1] = scorer
+    else:
+        kwargs['scorer'] = scorer
+    return tuple(args), kwargs
+
 
 class AveraginePeakDependenceGraphDeconvoluter(AveragineDeconvoluter, PeakDependenceGraphDeconvoluterBase):
     """A Deconvoluter which uses an :title-reference:`averagine` [1] model to generate theoretical
@@ -296,6 +389,20 @@ class AveraginePeakDependenceGraphDeconvoluter(AveragineDeconvoluter, PeakDepend
     def __init__(self, peaklist, *args, **kwargs):
         super(AveraginePeakDependenceGraphDeconvoluter,
               self).__init__(peaklist, *args, **kwargs)
+        self._init_args = (args, kwargs)
+
+    def _region_deconvoluter_config(self):
+        args, kwargs = _share_model_arguments(self._init_args, 'averagine', self.averagine, self.scorer)
+        return self.__class__, args, kwargs
+
+    def _isotopic_pattern_width(self, mz, charge, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
+                                ignore_below=IGNORE_BELOW):
+        # Bypass the cache, which would otherwise keep this pattern for every nearby m/z
+        # fitting later asks for
+        tid = self.averagine.averagine.isotopic_cluster(
+            mz, charge, charge_carrier=charge_carrier, truncate_after=truncate_after,
+            ignore_below=ignore_below)
+        return tid[-1].mz - tid[0].mz
 
 
 class MultiAveraginePeakDependenceGraphDeconvoluter(MultiAveragineDeconvoluter, PeakDependenceGraphDeconvoluterBase):
@@ -339,3 +446,20 @@ class MultiAveraginePeakDependenceGraphDeconvoluter(MultiAveragineDeconvoluter,
     def __init__(self, peaklist, *args, **kwargs):
         super(MultiAveraginePeakDependenceGraphDeconvoluter,
               self).__init__(peaklist, *args, **kwargs)
+        self._init_args = (args, kwargs)
+
+    def _region_deconvoluter_config(self):
+        args, kwargs = _share_model_arguments(self._init_args, 'averagines', self.averagines, self.scorer)
+        return self.__class__, args, kwargs
+
+    def _isotopic_pattern_width(self, mz, charge, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
+                                ignore_below=IGNORE_BELOW):
+        width = 0.0
+        for averagine in self.averagines:
+            # Bypass the cache, which would otherwise keep this pattern for every nearby m/z
+            # fitting later asks for
+            tid = averagine.averagine.isotopic_cluster(
+                mz, charge, charge_carrier=charge_carrier, truncate_after=truncate_after,
+                ignore_below=ignore_below)
+            width = max(width, tid[-1].mz - tid[0].mz)
+        return width
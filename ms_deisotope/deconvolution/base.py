@@ -15,7 +15,7 @@ from ms_deisotope.utils import (
     Base)
 
 from .utils import (
-    isotopic_shift, drop_placeholders)
+    isotopic_shift, drop_placeholders, count_placeholders, PeakSetArrays)
 
 
 logger = logging.getLogger("deconvolution")
@@ -49,6 +49,18 @@ class DeconvoluterBase(Base):
         Whether or not to apply a subtraction procedure to experimental peaks after they
         have been fitted. This is only necessary if the same signal may be examined multiple
         times as in a multi-pass method or when peak dependence is not considered
+    use_peak_arrays : bool
+        Whether or not to query :attr:`peaklist` through a :class:`~.PeakSetArrays` view, and
+        to create :class:`~.FittedPeak` placeholders and :class:`~.IsotopicFitRecord` objects
+        only for candidate fits which pass the scorer's threshold
+    prune_candidates : bool
+        Whether or not to discard candidate fits which :meth:`_check_fit` would reject for
+        lacking multiple real peaks, or whose :meth:`~.IsotopicFitterBase.best_possible_score`
+        the scorer would reject, before they are scaled and scored. Defaults to :const:`True`.
+    pruned_by_peak_count : int
+        The number of candidate fits discarded for lacking multiple real peaks
+    pruned_by_score : int
+        The number of candidate fits discarded because their best possible score was rejected
     verbose : bool
         Produce extra logging information
     """
@@ -56,6 +68,10 @@ class DeconvoluterBase(Base):
     scale_method = 'sum'
     merge_isobaric_peaks = True
     minimum_intensity = 5.
+    use_peak_arrays = False
+    prune_candidates = True
+    pruned_by_peak_count = 0
+    pruned_by_score = 0
     verbose = False
     peaklist = None
     scorer = None
@@ -67,6 +83,20 @@ class DeconvoluterBase(Base):
         self.merge_isobaric_peaks = merge_isobaric_peaks
         self.minimum_intensity = minimum_intensity
         self._slice_cache = {}
+        self._quick_charge_table = None
+        self._quick_charge_stale = None
+        self.use_peak_arrays = kwargs.get("use_peak_arrays", False)
+        self._peak_arrays = None
+        self.prune_candidates = kwargs.get("prune_candidates", True)
+        self.pruned_by_peak_count = 0
+        self.pruned_by_score = 0
+
+    def _get_peak_arrays(self):
+        if not self.use_peak_arrays or self.peaklist is None:
+            return None
+        if self._peak_arrays is None or self._peak_arrays.peaklist is not self.peaklist:
+            self._peak_arrays = PeakSetArrays(self.peaklist)
+        return self._peak_arrays
 
     def has_peak(self, mz, error_tolerance):
         """Query :attr:`peaklist` for a peak at `mz` within `error_tolerance` ppm. If a peak
@@ -84,6 +114,12 @@ class DeconvoluterBase(Base):
         FittedPeak
             A peak from :attr:`peaklist` if present, else a placeholder peak.
         """
+        arrays = self._get_peak_arrays()
+        if arrays is not None:
+            i = arrays.has_peak(mz, error_tolerance)
+            if i < 0 or arrays._intensity[i] < self.minimum_intensity:
+                return FittedPeak(mz, 1.0, 1.0, -1, 0, 0, 0)
+            return arrays[i]
         peak = self.peaklist.has_peak(mz, error_tolerance)
         if peak is None or peak.intensity < self.minimum_intensity:
             return FittedPeak(mz, 1.0, 1.0, -1, 0, 0, 0)
@@ -180,6 +216,94 @@ class DeconvoluterBase(Base):
         score = self.scorer(self.peaklist, experimental, theoretical)  # pylint: disable=not-callable
         return IsotopicFitRecord(peak, score, charge, theoretical, experimental)
 
+    def _evaluate_theoretical_distributions(self, experimentals, theoreticals, peaks, charges):
+        """Evaluate many theoretical isotopic pattern fits against their matched
+        experimental peaks, scoring them all in a single call to :attr:`scorer`.
+
+        This produces the same fits as calling :meth:`_evaluate_theoretical_distribution`
+        on each entry, but uses :meth:`~.IsotopicFitterBase.evaluate_batch` so that fitters
+        which support packed evaluation can score them together.
+
+        Parameters
+        ----------
+        experimentals : list
+            The experimental fitted peak lists of each fit
+        theoreticals : list of :class:`~.TheoreticalIsotopicPattern`
+            The theoretical isotopic patterns of each fit
+        peaks : list of :class:`~.FittedPeak`
+            The seed peak of each fit
+        charges : list of int
+            The charge state of each fit
+
+        Returns
+        -------
+        :class:`list` of :class:`~.IsotopicFitRecord`
+        """
+        for experimental, theoretical in zip(experimentals, theoreticals):
+            self.scale_theoretical_distribution(theoretical, experimental)
+        scores = self.scorer.evaluate_batch(
+            self.peaklist, experimentals, [list(theoretical) for theoretical in theoreticals])
+        return [IsotopicFitRecord(peak, score, charge, theoretical, experimental)
+                for experimental, theoretical, peak, charge, score in zip(
+                    experimentals, theoreticals, peaks, charges, scores)]
+
+    def _fit_theoretical_distributions(self, theoreticals, peaks, charges, error_tolerance, data=None):
+        """Match, scale, score and filter many theoretical isotopic patterns against
+        :attr:`peaklist`, returning only those fits which pass :meth:`_check_fit`.
+
+        When :attr:`prune_candidates` is set, candidates which cannot pass :meth:`_check_fit`
+        regardless of their score are discarded before they are scaled and scored.
+        The C implementation skips creating placeholder peaks and fit records for
+        candidates which would be rejected when :attr:`use_peak_arrays` is set.
+
+        Parameters
+        ----------
+        theoreticals : list of :class:`~.TheoreticalIsotopicPattern`
+            The theoretical isotopic patterns of each fit
+        peaks : list of :class:`~.FittedPeak`
+            The seed peak of each fit
+        charges : list of int
+            The charge state of each fit
+        error_tolerance : float
+            The mass accuracy required to match experimental peaks
+        data : list, optional
+            A value to store on :attr:`~.IsotopicFitRecord.data` for each fit
+
+        Returns
+        -------
+        :class:`list` of :class:`~.IsotopicFitRecord`
+        """
+        experimentals = [
+            self.match_theoretical_isotopic_distribution(tid, error_tolerance=error_tolerance)
+            for tid in theoreticals]
+        if self.prune_candidates:
+            keep = []
+            for i, experimental in enumerate(experimentals):
+                # Apply the tests of :meth:`_check_fit` which do not need the score
+                if charges[i] > 1 and len(drop_placeholders(experimental)) == 1:
+                    self.pruned_by_peak_count += 1
+                elif self.scorer.reject_score(self.scorer.best_possible_score(experimental)):
+                    self.pruned_by_score += 1
+                else:
+                    keep.append(i)
+            if len(keep) < len(experimentals):
+                experimentals = [experimentals[i] for i in keep]
+                theoreticals = [theoreticals[i] for i in keep]
+                peaks = [peaks[i] for i in keep]
+                charges = [charges[i] for i in keep]
+                if data is not None:
+                    data = [data[i] for i in keep]
+        fits = self._evaluate_theoretical_distributions(experimentals, theoreticals, peaks, charges)
+        results = []
+        for i, fit in enumerate(fits):
+            fit.missed_peaks = count_placeholders(fit.experimental)
+            if data is not None:
+                fit.data = data[i]
+            if not self._check_fit(fit):
+                continue
+            results.append(fit)
+        return results
+
     def fit_incremental_truncation(self, seed_fit, lower_bound):
         """Fit incrementally truncated versions of the seed fit to check to see if a narrower
         theoretical fit matches the data better.
@@ -220,13 +344,64 @@ class DeconvoluterBase(Base):
             Parts-per-million mass accuracy error tolerance to permit when
             finding matches for `isotopic_cluster`
         """
+        arrays = self._get_peak_arrays()
         for peak in isotopic_cluster:
-            match = self.peaklist.has_peak(peak.mz, error_tolerance)
+            if arrays is not None:
+                i = arrays.has_peak(peak.mz, error_tolerance)
+                match = arrays[i] if i >= 0 else None
+            else:
+                match = self.peaklist.has_peak(peak.mz, error_tolerance)
             if match is not None:
                 existing = match.intensity
                 match.intensity -= peak.intensity
                 if (match.intensity < 0) or (peak.intensity > (existing * 0.7)):
                     match.intensity = 1.
+                if arrays is not None:
+                    arrays.refresh(i)
+                self._mark_quick_charge_stale(match)
+
+    def _mark_quick_charge_stale(self, peak):
+        """Mark the rows of the pre-computed :title-reference:`QuickCharge` table which
+        depend upon the intensity of `peak` as stale, after it has been changed by
+        :meth:`subtraction`.
+
+        The charge states of a peak depend upon its own intensity and those of the peaks
+        up to 1.1 m/z above it, so only the peaks up to 1.1 m/z below `peak` are affected.
+
+        Parameters
+        ----------
+        peak : :class:`~.FittedPeak`
+            The peak whose intensity changed
+        """
+        stale = self._quick_charge_stale
+        if stale is None:
+            return
+        peaklist = self.peaklist
+        i = peak.peak_count
+        if not 0 <= i < len(stale):
+            return
+        mz = peak.mz
+        while i >= 0 and mz - peaklist[i].mz <= 1.1:
+            stale[i] = True
+            i -= 1
+
+    def _quick_charge_row_stale(self, peak):
+        """Check whether the row of the pre-computed :title-reference:`QuickCharge` table
+        for `peak` was invalidated by :meth:`subtraction`.
+
+        Parameters
+        ----------
+        peak : :class:`~.FittedPeak`
+
+        Returns
+        -------
+        bool
+        """
+        stale = self._quick_charge_stale
+        if stale is None:
+            return False
+        i = peak.peak_count
+        return 0 <= i < len(stale) and stale[i]
 
     def _merge_peaks(self, peak_list):
         peak_list = sorted(peak_list, key=operator.attrgetter("neutral_mass"))
@@ -273,12 +448,19 @@ class DeconvoluterBase(Base):
         """
         shift = isotopic_shift(charge)
         next_peak = mz + (shift * step)
-        peaklist_slice = self.between(
-            next_peak - (next_peak * tolerance),
-            next_peak + (next_peak * tolerance))
+        arrays = self._get_peak_arrays()
+        if arrays is not None:
+            start, stop = arrays.between_bounds(
+                next_peak - (next_peak * tolerance),
+                next_peak + (next_peak * tolerance))
+            forward_mzs = arrays._mz[start:stop]
+        else:
+            forward_mzs = [forward.mz for forward in self.between(
+                next_peak - (next_peak * tolerance),
+                next_peak + (next_peak * tolerance))]
         candidates = []
-        for forward in peaklist_slice:
-            prev_peak_mz = forward.mz - (shift * step)
+        for forward_mz in forward_mzs:
+            prev_peak_mz = forward_mz - (shift * step)
             dummy_peak = FittedPeak(prev_peak_mz, 1.0, 1.0, -1, 0, 0, 0)
             candidates.append((dummy_peak, charge))
         return candidates
@@ -313,12 +495,18 @@ class DeconvoluterBase(Base):
         """
         shift = isotopic_shift(charge)
         prev_peak = mz - (shift)
-        peaklist_slice = self.between(
-            prev_peak - (prev_peak * tolerance),
-            prev_peak + (prev_peak * tolerance))
+        arrays = self._get_peak_arrays()
+        if arrays is not None:
+            start, stop = arrays.between_bounds(
+                prev_peak - (prev_peak * tolerance),
+                prev_peak + (prev_peak * tolerance))
+            backward_mzs = arrays._mz[start:stop]
+        else:
+            backward_mzs = [backward.mz for backward in self.between(
+                prev_peak - (prev_peak * tolerance),
+                prev_peak + (prev_peak * tolerance))]
         candidates = []
-        for backward in peaklist_slice:
-            prev_peak_mz = backward.mz
+        for prev_peak_mz in backward_mzs:
             if step == 1:
                 candidates.extend(self._find_next_putative_peak(
                     prev_peak_mz, charge, 1, tolerance))
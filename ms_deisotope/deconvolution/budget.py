@@ -0,0 +1,100 @@
+'''A time and work budget for a single deconvolution, which lets a deconvoluter
+give up on the most expensive parts of its search when a pathological spectrum
+would otherwise take far longer than usual, recording which shortcuts were taken.
+'''
+import time
+
+
+#: Graph building ran out of budget, and the remaining peaks were explored
+#: without searching to the left for a monoisotopic peak.
+NARROWED_SEARCH = "narrowed_search"
+#: Graph building ran out of budget, and the remaining peaks were explored
+#: using the :title-reference:`QuickCharge` charge states only.
+QUICK_CHARGE = "quick_charge"
+#: The budget ran out between iterations, so no further iterations were done.
+REDUCED_ITERATIONS = "reduced_iterations"
+#: The budget ran out while deconvoluting priority targets, so only the
+#: priority targets were solved.
+PRIORITY_TARGETS_ONLY = "priority_targets_only"
+
+
+class DeconvolutionBudget(object):
+    """Tracks the wall time and work spent deconvoluting a single spectrum
+    against optional limits.
+
+    Attributes
+    ----------
+    time_limit : float or :const:`None`
+        The number of seconds to spend before the budget is exceeded
+    work_limit : int or :const:`None`
+        The number of peaks to explore before the budget is exceeded
+    work : int
+        The number of peaks explored so far
+    degraded : list of str
+        The shortcuts taken after the budget was exceeded, in the order they
+        were taken
+    """
+
+    def __init__(self, time_limit=None, work_limit=None):
+        self.time_limit = time_limit
+        self.work_limit = work_limit
+        self.started = None
+        self.work = 0
+        self.degraded = []
+
+    def start(self):
+        """Start the clock, if it is not already running.
+        """
+        if self.started is None:
+            self.started = time.time()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return time.time() - self.started
+
+    def exceeded(self):
+        """Check whether either limit has been exceeded.
+
+        Returns
+        -------
+        bool
+        """
+        if self.work_limit is not None and self.work >= self.work_limit:
+            return True
+        if self.time_limit is not None and self.elapsed >= self.time_limit:
+            return True
+        return False
+
+    def spend(self, work=1):
+        """Record `work` units of work, and check whether either limit
+        has been exceeded.
+
+        Parameters
+        ----------
+        work : int, optional
+            The number of peaks explored. Defaults to 1
+
+        Returns
+        -------
+        bool
+        """
+        self.work += work
+        return self.exceeded()
+
+    def degrade(self, shortcut):
+        """Record that `shortcut` was taken because the budget was exceeded.
+
+        Parameters
+        ----------
+        shortcut : str
+            One of :data:`NARROWED_SEARCH`, :data:`QUICK_CHARGE`, :data:`REDUCED_ITERATIONS`
+            or :data:`PRIORITY_TARGETS_ONLY`
+        """
+        if shortcut not in self.degraded:
+            self.degraded.append(shortcut)
+
+    def __repr__(self):
+        return "{self.__class__.__name__}(time_limit={self.time_limit}, work_limit={self.work_limit})".format(
+            self=self)
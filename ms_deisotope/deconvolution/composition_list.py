@@ -1,9 +1,15 @@
 '''Deconvolution strategies using a list of compositions.
 '''
+import os
+import hashlib
+
+import numpy as np
 
 from ms_deisotope.averagine import (
     PROTON, isotopic_variants,
     TheoreticalIsotopicPattern,
+    TheoreticalPeak,
+    calculate_mass,
     neutral_mass)
 
 from ms_deisotope.envelope_statistics import average_mz, a_to_a2_ratio, most_abundant_mz
@@ -27,6 +33,325 @@ from .utils import (
     )
 
 
+def composition_hash(composition):
+    """Compute a stable digest of an elemental composition.
+
+    Elements with a count of zero are ignored and the remaining elements are
+    sorted, so equal compositions produce the same digest regardless of their
+    type or insertion order, and the digest is the same from one process to the next.
+
+    Parameters
+    ----------
+    composition : :class:`~.Mapping`
+        An object representing an elemental composition
+
+    Returns
+    -------
+    str
+    """
+    parts = []
+    for element, count in sorted(composition.items()):
+        if not count:
+            continue
+        if count == int(count):
+            count = int(count)
+        parts.append("%s:%r" % (element, count))
+    return hashlib.sha1(";".join(parts).encode('utf8')).hexdigest()
+
+
+class CompositionPatternStore(object):
+    """A store of theoretical isotopic patterns for elemental compositions, which
+    may be shared between deconvoluters and written to disk to be re-used across runs.
+
+    Patterns are keyed by :func:`composition_hash` together with the charge state,
+    charge carrier and truncation parameters used to generate them, and are generated
+    the first time they are requested. A copy is returned on each request, so callers
+    are free to shift and scale the result.
+
+    Attributes
+    ----------
+    backend : dict
+        The mapping from ``(composition_hash, charge, charge_carrier, truncate_after, ignore_below)``
+        to :class:`~.TheoreticalIsotopicPattern`
+    hits : int
+        The number of requests answered from the store
+    misses : int
+        The number of requests which required a new pattern to be generated
+    """
+
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = {}
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.backend)
+
+    def __contains__(self, key):
+        return key in self.backend
+
+    def clear(self):
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _make_key(self, composition, charge, charge_carrier, truncate_after, ignore_below):
+        return (composition_hash(composition), int(charge), float(charge_carrier),
+                float(truncate_after), float(ignore_below))
+
+    def _generate(self, composition, charge, charge_carrier, truncate_after, ignore_below):
+        tid = isotopic_variants(
+            composition, charge=charge, charge_carrier=charge_carrier)
+        tid = TheoreticalIsotopicPattern(tid, tid[0].mz)
+        tid.truncate_after(truncate_after)
+        tid.ignore_below(ignore_below)
+        return tid
+
+    def isotopic_cluster(self, composition, charge, charge_carrier=PROTON,
+                         truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW):
+        """Get the theoretical isotopic pattern for ``composition`` at ``charge``, generating
+        and storing it if it has not been seen before.
+
+        Parameters
+        ----------
+        composition : :class:`~.Mapping`
+            An object representing an elemental composition
+        charge : int
+            The charge state to generate the isotopic pattern for
+        charge_carrier : float, optional
+            The mass of the charge carrier. Defaults to |PROTON|
+        truncate_after : float, optional
+            The percent of intensity to ensure is included in a theoretical isotopic pattern
+        ignore_below : float, optional
+            The minimum relative intensity a theoretical peak must have to be retained
+
+        Returns
+        -------
+        :class:`~.TheoreticalIsotopicPattern`
+        """
+        key = self._make_key(composition, charge, charge_carrier, truncate_after, ignore_below)
+        try:
+            tid = self.backend[key]
+            self.hits += 1
+        except KeyError:
+            tid = self._generate(composition, charge, charge_carrier, truncate_after, ignore_below)
+            self.backend[key] = tid
+            self.misses += 1
+        return tid.clone()
+
+    def populate(self, composition_list, charge_range=(1, 8), charge_carrier=PROTON,
+                 truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW):
+        """Pre-compute the isotopic patterns for every composition in ``composition_list``
+        at every charge state in ``charge_range``.
+
+        Parameters
+        ----------
+        composition_list : :class:`~.Iterable` of :class:`~.Mapping`
+            The compositions to generate patterns for
+        charge_range : tuple, optional
+            The range of charge states to generate patterns for. Defaults to (1, 8)
+        charge_carrier : float, optional
+            The mass of the charge carrier. Defaults to |PROTON|
+        truncate_after : float, optional
+            The percent of intensity to ensure is included in a theoretical isotopic pattern
+        ignore_below : float, optional
+            The minimum relative intensity a theoretical peak must have to be retained
+
+        Returns
+        -------
+        :class:`CompositionPatternStore`
+        """
+        for composition in composition_list:
+            for charge in charge_range_(*charge_range):
+                key = self._make_key(composition, charge, charge_carrier, truncate_after, ignore_below)
+                if key in self.backend:
+                    continue
+                self.backend[key] = self._generate(
+                    composition, charge, charge_carrier, truncate_after, ignore_below)
+        return self
+
+    def save(self, path):
+        """Write the stored patterns to ``path`` as a NumPy ``.npz`` archive.
+
+        The file is written to a temporary path and moved into place so that
+        concurrent readers never observe a partially written store.
+
+        Parameters
+        ----------
+        path : str
+            The path to write to
+
+        Returns
+        -------
+        str
+        """
+        path = str(path)
+        items = sorted(self.backend.items(), key=lambda x: x[0])
+        sizes = np.array([len(tid) for _, tid in items], dtype=np.int64)
+        arrays = {
+            "composition_hash": np.array([key[0] for key, _ in items], dtype='S40'),
+            "charge": np.array([key[1] for key, _ in items], dtype=np.int32),
+            "charge_carrier": np.array([key[2] for key, _ in items], dtype=np.float64),
+            "truncate_after": np.array([key[3] for key, _ in items], dtype=np.float64),
+            "ignore_below": np.array([key[4] for key, _ in items], dtype=np.float64),
+            "origin": np.array([tid.origin for _, tid in items], dtype=np.float64),
+            "offset": np.array([tid.offset for _, tid in items], dtype=np.float64),
+            "size": sizes,
+            "mz": np.array([p.mz for _, tid in items for p in tid], dtype=np.float64),
+            "intensity": np.array([p.intensity for _, tid in items for p in tid], dtype=np.float64),
+        }
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, 'wb') as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Read a store written by :meth:`save`.
+
+        Parameters
+        ----------
+        path : str
+            The path to read from
+
+        Returns
+        -------
+        :class:`CompositionPatternStore`
+        """
+        backend = {}
+        with np.load(str(path)) as data:
+            hashes = data['composition_hash'].tolist()
+            charges = data['charge'].tolist()
+            charge_carriers = data['charge_carrier'].tolist()
+            truncate_afters = data['truncate_after'].tolist()
+            ignore_belows = data['ignore_below'].tolist()
+            origins = data['origin'].tolist()
+            offsets = data['offset'].tolist()
+            sizes = data['size'].tolist()
+            mzs = data['mz'].tolist()
+            intensities = data['intensity'].tolist()
+        start = 0
+        for i, size in enumerate(sizes):
+            charge = charges[i]
+            end = start + size
+            peaklist = [TheoreticalPeak(mz, intensity, charge)
+                        for mz, intensity in zip(mzs[start:end], intensities[start:end])]
+            start = end
+            key = (hashes[i].decode('ascii'), charge, charge_carriers[i],
+                   truncate_afters[i], ignore_belows[i])
+            backend[key] = TheoreticalIsotopicPattern(peaklist, origins[i], offsets[i])
+        return cls(backend)
+
+    def __repr__(self):
+        return "%s(%d patterns)" % (self.__class__.__name__, len(self))
+
+
+class CompositionIndex(object):
+    """An index over a list of compositions sorted by monoisotopic neutral mass, used
+    to select only those compositions whose isotopic pattern could be observed within
+    a given m/z interval at a particular charge state.
+
+    The index refers to compositions by their position in the list it was built from,
+    so the same index may be shared by every deconvoluter built with that list.
+
+    Attributes
+    ----------
+    masses : :class:`numpy.ndarray`
+        The monoisotopic neutral masses of the compositions, in ascending order
+    order : :class:`numpy.ndarray`
+        The position in the original list of each entry in :attr:`masses`
+    envelope_width : float
+        An upper bound on the width of an isotopic pattern in Daltons. A composition
+        whose monoisotopic peak falls up to this far below the start of the m/z interval
+        may still have most of its isotopic pattern inside it.
+    """
+
+    def __init__(self, composition_list, envelope_width=None):
+        masses = np.array([calculate_mass(composition) for composition in composition_list],
+                          dtype=np.float64)
+        order = np.argsort(masses, kind='mergesort')
+        self.masses = masses[order]
+        self.order = order
+        if envelope_width is None:
+            envelope_width = 10.0
+            if len(self.masses):
+                envelope_width += self.masses[-1] * 0.005
+        self.envelope_width = envelope_width
+
+    def __len__(self):
+        return len(self.masses)
+
+    def fingerprint(self):
+        """Describe the contents of this index, as used by :func:`~.deconvolution_cache_key`.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, self.masses, self.order, self.envelope_width)
+
+    def search(self, low, high):
+        """Find the compositions whose neutral mass lies between ``low`` and ``high``.
+
+        Parameters
+        ----------
+        low : float
+            The lowest neutral mass to include
+        high : float
+            The highest neutral mass to include
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            The positions of the matching compositions in the original list
+        """
+        lo = np.searchsorted(self.masses, low, side='left')
+        hi = np.searchsorted(self.masses, high, side='right')
+        return self.order[lo:hi]
+
+    def select(self, min_mz, max_mz, charge_range=(1, 8), charge_carrier=PROTON,
+               mass_shift=None, error_tolerance=ERROR_TOLERANCE):
+        """Select the compositions which could be observed between ``min_mz`` and ``max_mz``
+        at each charge state in ``charge_range``.
+
+        Parameters
+        ----------
+        min_mz : float
+            The smallest m/z observed
+        max_mz : float
+            The largest m/z observed
+        charge_range : tuple, optional
+            The range of charge states to consider. Defaults to (1, 8)
+        charge_carrier : float, optional
+            The mass of the charge carrier. Defaults to |PROTON|
+        mass_shift : float, optional
+            An arbitrary mass shift applied to every composition
+        error_tolerance : float, optional
+            The mass accuracy required to for peak matches
+
+        Returns
+        -------
+        dict
+            A mapping from position in the original list to the charge states that
+            position should be evaluated at, in the order produced by :func:`charge_range_`
+        """
+        if mass_shift is None:
+            mass_shift = 0.0
+        selected = {}
+        for charge in charge_range_(*charge_range):
+            low = neutral_mass(min_mz, charge, charge_carrier) - mass_shift - self.envelope_width
+            high = neutral_mass(max_mz * (1 + error_tolerance), charge, charge_carrier) - mass_shift
+            for i in self.search(low, high).tolist():
+                try:
+                    selected[i].append(charge)
+                except KeyError:
+                    selected[i] = [charge]
+        return selected
+
+
 class CompositionListDeconvoluterBase(DeconvoluterBase):
     """A mixin class to provide common features for deconvoluters which process spectra
     using a list of targeted compositions.
@@ -36,12 +361,33 @@ class CompositionListDeconvoluterBase(DeconvoluterBase):
     composition_list : list of :class:`~.Mapping`
         A series of objects which represent elemental compositions and support
         the :class:`~.Mapping` interface to access their individual elements.
+    pattern_store : :class:`CompositionPatternStore`
+        An optional store of pre-computed theoretical isotopic patterns. When present,
+        patterns are taken from the store instead of being generated again for every
+        spectrum.
+    composition_index : :class:`CompositionIndex`
+        An index over :attr:`composition_list` by neutral mass used to skip compositions
+        which cannot be observed in the spectrum. Built on first use unless
+        ``use_composition_index=False`` was passed, and may be passed in to share it
+        between spectra. :func:`~.deconvolute_peaks` and :class:`~.DeconvolutionEngine`
+        build it once per configuration.
     """
 
-    def __init__(self, composition_list, *args, **kwargs):
+    def __init__(self, *args, **kwargs):
+        # When mixed into another deconvoluter's cooperative ``__init__`` chain, as in
+        # the hybrid deconvoluter, the composition list arrives by keyword
+        if "composition_list" in kwargs:
+            composition_list = kwargs.pop("composition_list")
+        else:
+            composition_list, args = args[0], args[1:]
         self.composition_list = list(composition_list)
         self.incremental_truncation = kwargs.get(
             "incremental_truncation", None)
+        self.pattern_store = kwargs.get("pattern_store", None)
+        self.use_composition_index = kwargs.get("use_composition_index", True)
+        self.composition_index = kwargs.get("composition_index", None)
+        if self.composition_index is not None and len(self.composition_index) != len(self.composition_list):
+            raise ValueError("The composition index does not match the composition list")
         super(CompositionListDeconvoluterBase, self).__init__(*args, **kwargs)
 
     def generate_theoretical_isotopic_cluster(self, composition, charge, truncate_after=TRUNCATE_AFTER,
@@ -72,15 +418,47 @@ class CompositionListDeconvoluterBase(DeconvoluterBase):
         :class:`~.TheoreticalIsotopicPattern`
             The theoretical isotopic pattern generated
         """
-        tid = isotopic_variants(
-            composition, charge=charge, charge_carrier=charge_carrier)
-        tid = TheoreticalIsotopicPattern(tid, tid[0].mz)
-        tid.truncate_after(truncate_after)
-        tid.ignore_below(ignore_below)
+        if self.pattern_store is not None:
+            tid = self.pattern_store.isotopic_cluster(
+                composition, charge, charge_carrier=charge_carrier,
+                truncate_after=truncate_after, ignore_below=ignore_below)
+        else:
+            tid = isotopic_variants(
+                composition, charge=charge, charge_carrier=charge_carrier)
+            tid = TheoreticalIsotopicPattern(tid, tid[0].mz)
+            tid.truncate_after(truncate_after)
+            tid.ignore_below(ignore_below)
         if mass_shift is not None:
             tid.shift(mass_shift / abs(charge))
         return tid
 
+    def _candidate_compositions(self, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8),
+                                charge_carrier=PROTON, mass_shift=None):
+        """Yield each composition which could be observed in :attr:`peaklist` along with the
+        charge range to evaluate it over, in the order of :attr:`composition_list`.
+
+        Yields
+        ------
+        composition : :class:`~.Mapping`
+        charge_range : tuple
+        """
+        if not self.use_composition_index:
+            for composition in self.composition_list:
+                yield composition, charge_range
+            return
+        if not len(self.peaklist):
+            return
+        if self.composition_index is None:
+            self.composition_index = CompositionIndex(self.composition_list)
+        selected = self.composition_index.select(
+            self.peaklist[0].mz, self.peaklist[-1].mz, charge_range,
+            charge_carrier=charge_carrier, mass_shift=mass_shift,
+            error_tolerance=error_tolerance)
+        for i in sorted(selected):
+            composition = self.composition_list[i]
+            for charge in selected[i]:
+                yield composition, (charge, charge)
+
     def recalibrate_theoretical_mz(self, theoretical_distribution, experimental_mz):
         """Recalibrate the m/z of the theoretical isotopic pattern to start from the
         peak matching the experimental monoisotopic m/z
@@ -277,6 +655,23 @@ class CompositionListDeconvoluter(CompositionListDeconvoluterBase):
             use_subtraction=use_subtraction, scale_method=scale_method,
             merge_isobaric_peaks=True, **kwargs)
 
+    def reset(self, peaklist):
+        """Prepare to deconvolute a new spectrum, `peaklist`, discarding everything
+        learned about the previous one while keeping the configuration, :attr:`pattern_store`
+        and :attr:`composition_index`.
+
+        Parameters
+        ----------
+        peaklist : :class:`~.PeakSet` or list of Peak-like objects, see :func:`~.prepare_peaklist`
+            The centroided mass spectrum to deconvolute next
+        """
+        self.peaklist = prepare_peaklist(peaklist)
+        self._deconvoluted_peaks = []
+        self._slice_cache = {}
+        self._quick_charge_table = None
+        self._quick_charge_stale = None
+        self._peak_arrays = None
+
     def deconvolute(self, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8), charge_carrier=PROTON,
                     truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW, mass_shift=None, **kwargs):
         """Deconvolute the spectrum, extracting isotopic patterns from the composition list.
@@ -301,9 +696,10 @@ class CompositionListDeconvoluter(CompositionListDeconvoluterBase):
         -------
         :class:`~.DeconvolutedPeakSet`
         """
-        for composition in self.composition_list:
+        for composition, charges in self._candidate_compositions(
+                error_tolerance, charge_range, charge_carrier, mass_shift):
             self.deconvolute_composition(composition, error_tolerance=error_tolerance,
-                                         charge_range=charge_range, charge_carrier=charge_carrier,
+                                         charge_range=charges, charge_carrier=charge_carrier,
                                          truncate_after=truncate_after, ignore_below=ignore_below,
                                          mass_shift=mass_shift)
         return DeconvolutedPeakSet(self._deconvoluted_peaks).reindex()
@@ -348,6 +744,8 @@ class CompositionListPeakDependenceGraphDeconvoluter(CompositionListDeconvoluter
         Produce extra logging information
     '''
 
+    _graph_parameters = ("max_missed_peaks", "use_monoisotopic_superceded_filtering")
+
     def __init__(self, peaklist, composition_list, scorer,
                  use_subtraction=False, scale_method='sum',
                  verbose=False, use_quick_charge=False, **kwargs):
@@ -357,10 +755,28 @@ class CompositionListPeakDependenceGraphDeconvoluter(CompositionListDeconvoluter
             scale_method=scale_method, verbose=verbose, use_quick_charge=use_quick_charge,
             **kwargs)
 
+        graph_kwargs = {k: v for k, v in kwargs.items() if k in self._graph_parameters}
         self.peak_dependency_network = PeakDependenceGraph(
-            self.peaklist, maximize=self.scorer.is_maximizing(), **kwargs)
+            self.peaklist, maximize=self.scorer.is_maximizing(), **graph_kwargs)
         self.max_missed_peaks = max_missed_peaks
 
+    def reset(self, peaklist):
+        """Prepare to deconvolute a new spectrum, `peaklist`, discarding everything
+        learned about the previous one, including the peak dependence graph, while keeping
+        the configuration, :attr:`pattern_store` and :attr:`composition_index`.
+
+        Parameters
+        ----------
+        peaklist : :class:`~.PeakSet` or list of Peak-like objects, see :func:`~.prepare_peaklist`
+            The centroided mass spectrum to deconvolute next
+        """
+        super(CompositionListPeakDependenceGraphDeconvoluter, self).reset(peaklist)
+        graph = self.peak_dependency_network
+        self.peak_dependency_network = PeakDependenceGraph(
+            self.peaklist, maximize=self.scorer.is_maximizing(),
+            max_missed_peaks=graph.max_missed_peaks,
+            use_monoisotopic_superceded_filtering=graph.use_monoisotopic_superceded_filtering)
+
     @property
     def max_missed_peaks(self):
         """The maximum number of missed peaks per isotopic fit record permitted.
@@ -424,8 +840,9 @@ class CompositionListPeakDependenceGraphDeconvoluter(CompositionListDeconvoluter
             An arbitrary mass shift to apply to the generated theoretical isotopic pattern,
             moving all peaks forward by that mass charge ratio transformed mass.
         """
-        for composition in self.composition_list:
-            self.deconvolute_composition(composition, error_tolerance, charge_range,
+        for composition, charges in self._candidate_compositions(
+                error_tolerance, charge_range, charge_carrier, mass_shift):
+            self.deconvolute_composition(composition, error_tolerance, charges,
                                          truncate_after=truncate_after, charge_carrier=charge_carrier,
                                          ignore_below=ignore_below, mass_shift=mass_shift)
 
@@ -7,6 +7,13 @@ For complete implementations see :class:`~.AveragineDeconvoluter` and
 '''
 
 import operator
+import multiprocessing
+
+from bisect import bisect_left, bisect_right
+
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
 
 from ms_deisotope.constants import (
     ERROR_TOLERANCE, TRUNCATE_AFTER, IGNORE_BELOW, MAX_ITERATION,
@@ -32,14 +39,24 @@ from ms_deisotope.peak_dependency_network import (
 
 
 from .base import DeconvoluterBase
+from .profiling import DeconvolutionProfile, timer
+from .budget import (
+    DeconvolutionBudget,
+    NARROWED_SEARCH,
+    QUICK_CHARGE,
+    REDUCED_ITERATIONS,
+    PRIORITY_TARGETS_ONLY)
 from .utils import (
     ChargeIterator,
+    isotopic_shift,
+    quick_charge_table,
     has_previous_peak_at_charge,
     has_successor_peak_at_charge,
     drop_placeholders,
     count_placeholders,
     first_peak,
     mean,
+    prepare_peaklist,
     info,
     debug)
 
@@ -64,14 +81,87 @@ class ExhaustivePeakSearchDeconvoluterBase(DeconvoluterBase):
         If not :const:`None`, the isotopic pattern truncation lower bound to contract each fit to
         incrementally, generating new fits for each dropped peak using
         :meth:`~.DeconvoluterBase.fit_incremental_truncation`
+    profile: :class:`~.DeconvolutionProfile` or :const:`None`
+        If not :const:`None`, the time spent in each phase of deconvolution and the number
+        of fits considered are recorded here. Passing ``profile=True`` creates a new
+        :class:`~.DeconvolutionProfile`.
 
     """
 
+    profile = None
+
     def __init__(self, peaklist, *args, **kwargs):
         super(ExhaustivePeakSearchDeconvoluterBase,
               self).__init__(peaklist, *args, **kwargs)
         self.use_quick_charge = kwargs.get("use_quick_charge", False)
         self.incremental_truncation = kwargs.get("incremental_truncation", None)
+        profile = kwargs.get("profile", None)
+        if profile is True:
+            profile = DeconvolutionProfile()
+        elif profile is False:
+            profile = None
+        self.profile = profile
+        if profile is not None:
+            profile.watch_pattern_caches(self._pattern_caches())
+
+    def _pattern_caches(self):
+        """The theoretical isotopic pattern caches whose pattern generation time
+        :attr:`profile` should record.
+
+        Returns
+        -------
+        list
+        """
+        return []
+
+    def _finish_profile(self, started):
+        profile = self.profile
+        profile.release_pattern_caches()
+        profile.record("total", timer() - started)
+        profile.count("deconvolutions")
+
+    def reset(self, peaklist):
+        """Prepare to deconvolute a new spectrum, `peaklist`, discarding everything
+        learned about the previous one while keeping the configuration, theoretical isotopic
+        pattern caches and other state which does not depend upon the peaks.
+
+        This lets one deconvoluter process many spectra with the same settings without paying
+        to construct a new one for each, as :class:`~.DeconvolutionEngine` does.
+
+        Parameters
+        ----------
+        peaklist : :class:`~.PeakSet` or list of Peak-like objects, see :func:`~.prepare_peaklist`
+            The centroided mass spectrum to deconvolute next
+        """
+        self.peaklist = prepare_peaklist(peaklist)
+        self._deconvoluted_peaks = []
+        self._slice_cache = {}
+        self._quick_charge_table = None
+        self._quick_charge_stale = None
+        self._peak_arrays = None
+
+    def _build_quick_charge_table(self, charge_range=(1, 8)):
+        """Pre-compute the :title-reference:`QuickCharge` charge states of every peak in
+        :attr:`peaklist` with :func:`~.quick_charge_table`, to be read by
+        :meth:`_get_all_peak_charge_pairs` in place of per-peak calls to :func:`~.quick_charge`.
+
+        As the table depends upon peak intensities, :meth:`subtraction` marks the rows of
+        the peaks it changes as stale, and those peaks fall back to :func:`~.quick_charge`.
+        When subtracting after each fit in a single pass, as :class:`~.AveragineDeconvoluter`
+        does, most rows go stale before they are read and building the table costs more
+        than it saves, so only the peak dependence graph deconvoluters use it. They build
+        it once, when the graph is first populated, and later iterations read the rows
+        their subtractions left untouched.
+
+        Parameters
+        ----------
+        charge_range : tuple, optional
+            The range of charge states to consider. Defaults to (1, 8)
+        """
+        lower, upper = sorted((abs(charge_range[0]), abs(charge_range[1])))
+        indptr, charges = quick_charge_table(self.peaklist, lower, upper)
+        self._quick_charge_table = (lower, upper, indptr, charges)
+        self._quick_charge_stale = np.zeros(len(indptr) - 1, dtype=np.uint8)
 
     def _get_all_peak_charge_pairs(self, peak, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8),
                                    left_search_limit=3, right_search_limit=3,
@@ -109,7 +199,10 @@ class ExhaustivePeakSearchDeconvoluterBase(DeconvoluterBase):
         charges = ChargeIterator(*charge_range)
 
         if use_quick_charge:
-            charges.sequence_from_quickcharge(self.peaklist, peak)
+            table = self._quick_charge_table
+            if (table is None or self._quick_charge_row_stale(peak) or
+                    not charges.sequence_from_quickcharge_table(table, peak)):
+                charges.sequence_from_quickcharge(self.peaklist, peak)
 
         for charge in charges:
             target_peaks.add((peak, charge))
@@ -186,6 +279,9 @@ class ExhaustivePeakSearchDeconvoluterBase(DeconvoluterBase):
         set
             The set of :class:`~.IsotopicFitRecord` instances produced
         """
+        profile = self.profile
+        if profile is not None:
+            started = timer()
         target_peaks = self._get_all_peak_charge_pairs(
             peak, error_tolerance=error_tolerance,
             charge_range=charge_range,
@@ -193,6 +289,12 @@ class ExhaustivePeakSearchDeconvoluterBase(DeconvoluterBase):
             right_search_limit=right_search_limit,
             recalculate_starting_peak=recalculate_starting_peak,
             use_quick_charge=self.use_quick_charge)
+        if profile is not None:
+            searched = timer()
+            profile.record("peak_search", searched - started)
+            profile.count("peak_charge_pairs", len(target_peaks))
+            pruned_by_peak_count = self.pruned_by_peak_count
+            pruned_by_score = self.pruned_by_score
 
         results = self._fit_peaks_at_charges(
             target_peaks, error_tolerance, charge_carrier=charge_carrier, truncate_after=truncate_after,
@@ -202,8 +304,38 @@ class ExhaustivePeakSearchDeconvoluterBase(DeconvoluterBase):
             for result in results:
                 solutions.update(self.fit_incremental_truncation(result, self.incremental_truncation))
             results = solutions
+        if profile is not None:
+            profile.record("scoring", timer() - searched)
+            profile.count("candidate_fits", len(results))
+            profile.count("pruned_by_peak_count", self.pruned_by_peak_count - pruned_by_peak_count)
+            profile.count("pruned_by_score", self.pruned_by_score - pruned_by_score)
         return (results)
 
+    def subtraction(self, isotopic_cluster, error_tolerance=ERROR_TOLERANCE):
+        """Subtract signal attributed to `isotopic_cluster` from the equivalent
+        peaks in :attr:`peaklist`, mutating the peaks within, recording the time
+        taken in :attr:`profile`.
+
+        See :meth:`~.DeconvoluterBase.subtraction`.
+
+        Parameters
+        ----------
+        isotopic_cluster : list of :class:`~.TheoreticalPeak`
+            The isotopic cluster to subtract
+        error_tolerance : float, optional
+            Parts-per-million mass accuracy error tolerance to permit when
+            finding matches for `isotopic_cluster`
+        """
+        profile = self.profile
+        if profile is None:
+            return super(ExhaustivePeakSearchDeconvoluterBase, self).subtraction(
+                isotopic_cluster, error_tolerance)
+        started = timer()
+        result = super(ExhaustivePeakSearchDeconvoluterBase, self).subtraction(
+            isotopic_cluster, error_tolerance)
+        profile.record("subtraction", timer() - started)
+        return result
+
     def charge_state_determination(self, peak, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8),
                                    left_search_limit=3, right_search_limit=3,
                                    charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
@@ -325,6 +457,8 @@ class ExhaustivePeakSearchDeconvoluterBase(DeconvoluterBase):
         tid = fit.theoretical
         dpeak = self._make_deconvoluted_peak(fit, charge_carrier)
         self._deconvoluted_peaks.append(dpeak)
+        if self.profile is not None:
+            self.profile.count("accepted_fits")
         if self.use_subtraction:
             self.subtraction(tid, error_tolerance)
         return dpeak
@@ -410,6 +544,9 @@ class ExhaustivePeakSearchDeconvoluterBase(DeconvoluterBase):
         -------
         :class:`~.DeconvolutedPeakSet`
         """
+        if self.profile is not None:
+            started = timer()
+            self.profile.watch_pattern_caches(self._pattern_caches())
         i = 0
         for peak in sorted(self.peaklist, key=order_chooser, reverse=True):
             if peak.mz < 2 or peak.intensity < self.minimum_intensity:
@@ -425,6 +562,8 @@ class ExhaustivePeakSearchDeconvoluterBase(DeconvoluterBase):
             self._deconvoluted_peaks = self._merge_peaks(
                 self._deconvoluted_peaks)
 
+        if self.profile is not None:
+            self._finish_profile(started)
         return DeconvolutedPeakSet(self._deconvoluted_peaks).reindex()
 
 
@@ -460,11 +599,42 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
     peak_dependency_network : :class:`~.PeakDependenceGraph`
         The peak dependence graph onto which isotopic fit dependences on peaks
         are constructed and solved.
+    subgraph_solver_type : str
+        How to select fits from each connected component of the graph. ``"top"`` takes
+        the single best fit, ``"disjoint"`` greedily takes the best fits which do not share
+        peaks, ``"interval"`` takes the set of fits with non-overlapping m/z intervals with
+        the best total score, and ``"iterative"`` subtracts the best fit and re-evaluates
+        the fits which overlapped it.
+    region_workers : int
+        If greater than 1, :meth:`deconvolute` splits :attr:`peaklist` into regions which
+        no isotopic fit can span, and deconvolutes them with this many workers. See
+        :meth:`deconvolute_regions`.
+    region_executor : str or object
+        The kind of pool to deconvolute regions with, either ``"process"`` or ``"thread"``,
+        or an existing pool with a :meth:`map` method, such as a :class:`multiprocessing.Pool`,
+        which will be reused and not closed. Defaults to ``"thread"``. A ``"process"`` pool
+        is started for every spectrum, which usually costs more than it saves, so pass an
+        existing pool instead to deconvolute many spectra in processes.
+    incremental_graph : bool
+        Whether :meth:`deconvolute` should re-fit only the peaks near signal which was
+        subtracted in the previous iteration, carrying forward the fits found for every
+        other peak instead of searching the whole peak list again. Defaults to :const:`True`.
+    budget : :class:`~.DeconvolutionBudget` or :const:`None`
+        If the ``time_budget`` (in seconds) or ``work_budget`` (in peaks explored) keyword
+        arguments are given, the limits on the deconvolution of :attr:`peaklist`. When they are
+        exceeded, :meth:`deconvolute` falls back to cheaper strategies, which are listed by
+        :attr:`degraded`. The clock starts at the first call to :meth:`targeted_deconvolution`
+        or :meth:`deconvolute`.
     """
 
+    budget = None
+
     def __init__(self, peaklist, *args, **kwargs):
         max_missed_peaks = kwargs.get("max_missed_peaks", 1)
         self.subgraph_solver_type = kwargs.get("subgraph_solver", 'top')
+        self.region_workers = kwargs.get("region_workers", 0)
+        self.region_executor = kwargs.get("region_executor", "thread")
+        self.incremental_graph = kwargs.get("incremental_graph", True)
         super(PeakDependenceGraphDeconvoluterBase,
               self).__init__(peaklist, *args, **kwargs)
         self.peak_dependency_network = PeakDependenceGraph(
@@ -472,6 +642,85 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
         self.max_missed_peaks = max_missed_peaks
         self.fit_postprocessor = kwargs.get("fit_postprocessor", None)
         self._priority_map = {}
+        self._fit_cache = None
+        self._dirty_peaks = None
+        self._reach_cache = {}
+        self._use_quick_charge_before_narrowing = None
+        time_budget = kwargs.get("time_budget", None)
+        work_budget = kwargs.get("work_budget", None)
+        if time_budget is not None or work_budget is not None:
+            self.budget = DeconvolutionBudget(time_budget, work_budget)
+
+    @property
+    def degraded(self):
+        """The cheaper strategies taken because :attr:`budget` was exceeded.
+
+        Returns
+        -------
+        list of str
+        """
+        if self.budget is None:
+            return []
+        return list(self.budget.degraded)
+
+    def _narrow_search(self, left_search_limit):
+        """Switch to a cheaper search for the peaks which remain to be explored when
+        :attr:`budget` is exceeded while building the peak dependence graph.
+
+        The search to the left of each peak is dropped, and only the :title-reference:`QuickCharge`
+        charge states are considered.
+
+        Parameters
+        ----------
+        left_search_limit : int
+            The number of steps to search to the left of each peak
+
+        Returns
+        -------
+        int
+            The number of steps to search to the left of each remaining peak
+        """
+        if left_search_limit > 1:
+            self.budget.degrade(NARROWED_SEARCH)
+            left_search_limit = 1
+        if not self.use_quick_charge:
+            self._use_quick_charge_before_narrowing = self.use_quick_charge
+            self.use_quick_charge = True
+            self.budget.degrade(QUICK_CHARGE)
+        return left_search_limit
+
+    def _restore_search(self):
+        # Undo the switch to QuickCharge made by :meth:`_narrow_search`, so that it does not
+        # carry over to the next spectrum
+        if self._use_quick_charge_before_narrowing is not None:
+            self.use_quick_charge = self._use_quick_charge_before_narrowing
+            self._use_quick_charge_before_narrowing = None
+
+    def reset(self, peaklist):
+        """Prepare to deconvolute a new spectrum, `peaklist`, discarding everything
+        learned about the previous one while keeping the configuration, theoretical isotopic
+        pattern caches and other state which does not depend upon the peaks.
+
+        The peak dependence graph and priority targets are discarded, :attr:`budget` is renewed
+        with the same limits, and the neighborhood sizes used to re-fit only changed peaks
+        between iterations are kept.
+
+        Parameters
+        ----------
+        peaklist : :class:`~.PeakSet` or list of Peak-like objects, see :func:`~.prepare_peaklist`
+            The centroided mass spectrum to deconvolute next
+        """
+        super(PeakDependenceGraphDeconvoluterBase, self).reset(peaklist)
+        max_missed_peaks = self.max_missed_peaks
+        self.peak_dependency_network = PeakDependenceGraph(
+            self.peaklist, maximize=self.scorer.is_maximizing())
+        self.max_missed_peaks = max_missed_peaks
+        self._priority_map = {}
+        self._fit_cache = None
+        self._dirty_peaks = None
+        self._restore_search()
+        if self.budget is not None:
+            self.budget = DeconvolutionBudget(self.budget.time_limit, self.budget.work_limit)
 
     @property
     def max_missed_peaks(self):
@@ -527,6 +776,43 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
         int
             The number of fits added to the graph
         """
+        fits = self._explore_local_fits(
+            peak, error_tolerance=error_tolerance, charge_range=charge_range,
+            left_search_limit=left_search_limit, right_search_limit=right_search_limit,
+            charge_carrier=charge_carrier, truncate_after=truncate_after, ignore_below=ignore_below)
+        for fit in fits:
+            self.peak_dependency_network.add_fit_dependence(fit)
+        return len(fits)
+
+    def _explore_local_fits(self, peak, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8), left_search_limit=1,
+                            right_search_limit=0, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
+                            ignore_below=IGNORE_BELOW):
+        """Select the fits in the local neighborhood of `peak` which :meth:`_explore_local` would
+        add to the peak dependence graph, without adding them.
+
+        Parameters
+        ----------
+        peak : :class:`~.FittedPeak`
+            The peak to start the search from
+        error_tolerance : float, optional
+            The parts-per-million error tolerance in m/z to search with. Defaults to |ERROR_TOLERANCE|
+        charge_range : tuple, optional
+            The range of charge states to consider. Defaults to (1, 8)
+        left_search_limit : int, optional
+            The number of steps to search to the left of `peak`. Defaults to 1
+        right_search_limit : int, optional
+            The number of steps to search to the right of `peak`. Defaults to 0
+        charge_carrier : float, optional
+            The mass of the charge carrier. Defaults to |PROTON|
+        truncate_after : float, optional
+            The percent of intensity to ensure is included in a theoretical isotopic pattern
+            starting from the monoisotopic peak.
+
+        Returns
+        -------
+        list of :class:`~.IsotopicFitRecord`
+            The selected fits, in the order they were selected
+        """
         results = self._fit_all_charge_states(
             peak, error_tolerance=error_tolerance, charge_range=charge_range, left_search_limit=left_search_limit,
             charge_carrier=charge_carrier, truncate_after=truncate_after, ignore_below=ignore_below)
@@ -541,19 +827,19 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
         n = len(results)
 
         stop = max(min(n // 2, 100), 10)
+        selected = []
         if n == 0:
-            return 0
-        i = 0
-        for i in range(stop):
+            return selected
+        for _ in range(stop):
             if len(results) == 0:
                 break
             candidate = self.scorer.select(results)
             if candidate is None:
                 break
-            self.peak_dependency_network.add_fit_dependence(candidate)
+            selected.append(candidate)
             results.discard(candidate)
 
-        return i
+        return selected
 
     def populate_graph(self, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8), left_search_limit=1,
                        right_search_limit=0, charge_carrier=PROTON,
@@ -579,20 +865,158 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
             starting from the monoisotopic peak. This will cause theoretical isotopic patterns
             to be truncated, excluding trailing peaks which do not contribute substantially to
             the overall shape of the isotopic pattern.
+
+        Notes
+        -----
+        If :attr:`_fit_cache` is set, the fits selected for each peak are stored in it, and
+        if :attr:`_dirty_peaks` is also set, peaks not marked in it re-use their stored fits
+        instead of being explored again. See :meth:`_mark_dirty_peaks`.
+
+        If :attr:`budget` is set and is exceeded, the remaining peaks are explored with the
+        cheaper search of :meth:`_narrow_search`.
         """
-        for peak in self.peaklist:
+        if self.use_quick_charge and self._quick_charge_table is None:
+            self._build_quick_charge_table(charge_range)
+        fit_cache = self._fit_cache
+        dirty_peaks = self._dirty_peaks
+        peak_graph = self.peak_dependency_network
+        budget = self.budget
+        narrowed = False
+        for i, peak in enumerate(self.peaklist):
             if peak in self._priority_map or peak.intensity < self.minimum_intensity:
                 if self.verbose:
                     debug("Skipping %r (%r)", peak,
                           peak.intensity < self.minimum_intensity)
                 continue
-            n = self._explore_local(
-                peak, error_tolerance=error_tolerance, charge_range=charge_range,
-                left_search_limit=left_search_limit, right_search_limit=right_search_limit,
-                charge_carrier=charge_carrier,
-                truncate_after=truncate_after, ignore_below=ignore_below)
+            if dirty_peaks is not None and not dirty_peaks[i] and fit_cache[i] is not None:
+                fits = fit_cache[i]
+            else:
+                if budget is not None and not narrowed and budget.spend():
+                    narrowed = True
+                    left_search_limit = self._narrow_search(left_search_limit)
+                fits = self._explore_local_fits(
+                    peak, error_tolerance=error_tolerance, charge_range=charge_range,
+                    left_search_limit=left_search_limit, right_search_limit=right_search_limit,
+                    charge_carrier=charge_carrier,
+                    truncate_after=truncate_after, ignore_below=ignore_below)
+                if fit_cache is not None:
+                    fit_cache[i] = fits
+            for fit in fits:
+                peak_graph.add_fit_dependence(fit)
             if self.verbose:
-                debug("Exlporing Area Around %r Yielded %d Fits", peak, n)
+                debug("Exlporing Area Around %r Yielded %d Fits", peak, len(fits))
+
+    def neighborhood_reach(self, mz, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8), left_search_limit=1,
+                           right_search_limit=0, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
+                           ignore_below=IGNORE_BELOW):
+        """Compute how far to the left and right of a peak at `mz` the fits found by
+        :meth:`_explore_local` for that peak may depend upon the intensities of other peaks.
+
+        Parameters
+        ----------
+        mz : float
+            The m/z of the peak being explored
+        error_tolerance : float, optional
+            The parts-per-million error tolerance in m/z to search with. Defaults to |ERROR_TOLERANCE|
+        charge_range : tuple, optional
+            The range of charge states to consider. Defaults to (1, 8)
+        left_search_limit : int, optional
+            The number of steps to search to the left of each peak. Defaults to 1
+        right_search_limit : int, optional
+            The number of steps to search to the right of each peak. Defaults to 0
+        charge_carrier : float, optional
+            The mass of the charge carrier. Defaults to |PROTON|
+        truncate_after : float, optional
+            The percent of intensity to ensure is included in a theoretical isotopic pattern
+        ignore_below : float, optional
+            The minimum relative abundance to consider a peak in a theoretical isotopic
+            pattern
+
+        Returns
+        -------
+        left : float
+            The m/z distance to the left of `mz`
+        right : float
+            The m/z distance to the right of `mz`
+        """
+        lowest_charge = min(abs(charge_range[0]), abs(charge_range[1]), key=lambda z: z or float('inf'))
+        charge = lowest_charge if charge_range[0] > 0 else -lowest_charge
+        shift = isotopic_shift(lowest_charge)
+        # :meth:`_explore_local` does not pass `right_search_limit` on to :meth:`_fit_all_charge_states`,
+        # so the right search always uses its default. Pad it by one step, as the width of a pattern
+        # does not always grow with m/z.
+        right_offset = (max(right_search_limit, 3) + 1) * shift
+        width = self._isotopic_pattern_width(
+            mz + right_offset, charge, charge_carrier=charge_carrier, truncate_after=truncate_after,
+            ignore_below=ignore_below)
+        # QuickCharge looks at peaks up to 1.1 m/z away, and the starting peak recalculation
+        # searches with a wider error tolerance.
+        left = max(left_search_limit * shift, 1.1)
+        right = max(right_offset + width, 1.1)
+        slack = 4 * error_tolerance * (mz + right)
+        return left + slack, right + slack
+
+    def _mark_dirty_peaks(self, intensities, mzs, search_parameters):
+        """Find the peaks whose neighborhood contains a peak whose intensity has changed since
+        `intensities` was recorded, and store them in :attr:`_dirty_peaks`.
+
+        Only these peaks can produce different fits in the next call to :meth:`populate_graph`.
+
+        Parameters
+        ----------
+        intensities : list of float
+            The intensity of each peak in :attr:`peaklist` before subtraction
+        mzs : list of float
+            The m/z of each peak in :attr:`peaklist`
+        search_parameters : dict
+            The keyword arguments to pass to :meth:`neighborhood_reach`
+
+        Returns
+        -------
+        int
+            The number of peaks which need to be explored again
+        """
+        n = len(mzs)
+        # The reach only depends upon the search parameters, so it is kept for later
+        # iterations and, if this deconvoluter is :meth:`reset`, later spectra
+        key = tuple(
+            tuple(value) if isinstance(value, list) else value
+            for _, value in sorted(search_parameters.items()))
+        try:
+            reaches = self._reach_cache[key]
+        except KeyError:
+            reaches = self._reach_cache[key] = {}
+
+        def reach_at(mz):
+            # The reach grows with m/z, so the reach at the top of each 1 m/z bin
+            # covers the whole bin
+            key = int(mz) + 1
+            try:
+                return reaches[key]
+            except KeyError:
+                reaches[key] = value = self.neighborhood_reach(key, **search_parameters)
+                return value
+
+        # Count the open windows at each position with a difference array
+        delta = [0] * (n + 1)
+        for i, peak in enumerate(self.peaklist):
+            if peak.intensity != intensities[i]:
+                # A peak to the right of this one reaches back at most `left`, and
+                # any peak to the left of that point reaches forward at most `right`
+                left, _ = reach_at(peak.mz)
+                _, right = reach_at(peak.mz + left)
+                delta[bisect_left(mzs, peak.mz - right)] += 1
+                delta[bisect_right(mzs, peak.mz + left)] -= 1
+        dirty_peaks = [False] * n
+        open_windows = 0
+        n_dirty = 0
+        for i in range(n):
+            open_windows += delta[i]
+            if open_windows > 0:
+                dirty_peaks[i] = True
+                n_dirty += 1
+        self._dirty_peaks = dirty_peaks
+        return n_dirty
 
     def postprocess_fits(self, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8),
                          charge_carrier=PROTON, *args, **kwargs):
@@ -627,6 +1051,9 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
             The mass of the charge carrier as used for the deconvolution. Required to
             back-out the neutral mass of the deconvoluted result
         """
+        profile = self.profile
+        if profile is not None:
+            started = timer()
         disjoint_envelopes = self.peak_dependency_network.find_non_overlapping_intervals()
         i = 0
         if self.subgraph_solver_type == 'disjoint':
@@ -635,6 +1062,8 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
             solver = self._solve_subgraph_iterative
         elif self.subgraph_solver_type == 'top':
             solver = self._solve_subgraph_top
+        elif self.subgraph_solver_type == 'interval':
+            solver = self._solve_subgraph_interval
         else:
             raise ValueError("Unknown solver type %r" %
                              (self.subgraph_solver_type, ))
@@ -645,6 +1074,11 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
                 self.peak_dependency_network.add_solution(dpeak.fit, dpeak)
                 self._deconvoluted_peaks.append(dpeak)
                 i += 1
+            if profile is not None:
+                profile.add_cluster(len(cluster))
+        if profile is not None:
+            profile.record("subgraph_solving", timer() - started)
+            profile.count("accepted_fits", i)
 
     def _solve_subgraph_top(self, cluster, error_tolerance=ERROR_TOLERANCE, charge_carrier=PROTON):
         """Given a :class:`~.DependenceCluster`, return the single best fit from the collection of
@@ -711,6 +1145,42 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
                 self.subtraction(tid, error_tolerance)
         return solutions
 
+    def _solve_subgraph_interval(self, cluster, error_tolerance=ERROR_TOLERANCE, charge_carrier=PROTON):
+        """Given a :class:`~.DependenceCluster`, find the set of isotopic fits whose m/z intervals
+        do not overlap with the best total score by weighted interval scheduling.
+
+        Unlike :meth:`_solve_subgraph_disjoint`, which greedily takes the best remaining fit, this
+        will prefer several compatible fits over a single fit which overlaps all of them if their
+        combined score is better.
+
+        Parameters
+        ----------
+        cluster : :class:`~.DependenceCluster`
+            The connected subgraph whose nodes will be searched
+        error_tolerance : float, optional
+            The error tolerance to use when performing subtraction, if subtraction is
+            being performed.
+        charge_carrier : float, optional
+            The mass of the charge carrier as used for the deconvolution. Required to
+            back-out the neutral mass of the deconvoluted result
+
+        Returns
+        -------
+        list of :class:`~DeconvolutedPeak`
+            The solved deconvolution solutions
+        """
+        solutions = []
+        for fit in cluster.interval_best_fits():
+            _, _, eid, tid = fit
+            rep_eid = drop_placeholders(eid)
+            if len(rep_eid) == 0:
+                continue
+            dpeak = self._make_deconvoluted_peak(fit, charge_carrier)
+            solutions.append(dpeak)
+            if self.use_subtraction:
+                self.subtraction(tid, error_tolerance)
+        return solutions
+
     def _solve_subgraph_iterative(self, cluster, error_tolerance=ERROR_TOLERANCE, charge_carrier=PROTON):
         """Given a :class:`~.DependenceCluster`, build a :class:`~.ConnectedSubgraph` and incrementally
         subtract the best fitting solution and update its overlapping envelopes.
@@ -805,6 +1275,171 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
                     node for node in subgraph if node.index not in mask]
         return solutions
 
+    def _isotopic_pattern_width(self, mz, charge, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
+                                ignore_below=IGNORE_BELOW):
+        """The m/z span of the widest theoretical isotopic pattern that would be fit
+        at `mz` and `charge`.
+
+        Deconvoluter types which support :meth:`deconvolute_regions` must implement this.
+        """
+        raise NotImplementedError(
+            "%s does not support region partitioning" % (self.__class__.__name__, ))
+
+    def _region_deconvoluter_config(self):
+        """The type, positional and keyword arguments with which to create a deconvoluter
+        with the same configuration as this one for a single region, as ``type(peaklist, *args, **kwargs)``.
+
+        Deconvoluter types which support :meth:`deconvolute_regions` must implement this.
+        """
+        raise NotImplementedError(
+            "%s does not support region partitioning" % (self.__class__.__name__, ))
+
+    def region_gap_width(self, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8), left_search_limit=1,
+                         right_search_limit=0, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
+                         ignore_below=IGNORE_BELOW):
+        """Compute the m/z gap between two adjacent peaks beyond which no isotopic fit considered
+        by :meth:`deconvolute` with these parameters can depend upon peaks on both sides of the gap.
+
+        This is the total :meth:`neighborhood_reach` of the highest m/z in :attr:`peaklist`.
+
+        Parameters
+        ----------
+        error_tolerance : float, optional
+            The parts-per-million error tolerance in m/z to search with. Defaults to |ERROR_TOLERANCE|
+        charge_range : tuple, optional
+            The range of charge states to consider. Defaults to (1, 8)
+        left_search_limit : int, optional
+            The number of steps to search to the left of each peak. Defaults to 1
+        right_search_limit : int, optional
+            The number of steps to search to the right of each peak. Defaults to 0
+        charge_carrier : float, optional
+            The mass of the charge carrier. Defaults to |PROTON|
+        truncate_after : float, optional
+            The percent of intensity to ensure is included in a theoretical isotopic pattern
+        ignore_below : float, optional
+            The minimum relative abundance to consider a peak in a theoretical isotopic
+            pattern
+
+        Returns
+        -------
+        float
+        """
+        if len(self.peaklist) == 0:
+            return 0.0
+        left, right = self.neighborhood_reach(
+            self.peaklist[-1].mz, error_tolerance=error_tolerance, charge_range=charge_range,
+            left_search_limit=left_search_limit, right_search_limit=right_search_limit,
+            charge_carrier=charge_carrier, truncate_after=truncate_after, ignore_below=ignore_below)
+        return left + right
+
+    def partition_regions(self, gap, n_groups=None):
+        """Split :attr:`peaklist` into runs of consecutive peaks wherever adjacent peaks are more
+        than `gap` m/z apart.
+
+        Parameters
+        ----------
+        gap : float
+            The m/z gap to split at, as from :meth:`region_gap_width`
+        n_groups : int, optional
+            If provided, merge consecutive regions until there are roughly this many
+            groups of a similar number of peaks.
+
+        Returns
+        -------
+        :class:`list` of :class:`tuple`
+            The ``(start, stop)`` positions of each region in :attr:`peaklist`
+        """
+        n = len(self.peaklist)
+        if n == 0:
+            return []
+        regions = []
+        start = 0
+        last_mz = self.peaklist[0].mz
+        for i in range(1, n):
+            mz = self.peaklist[i].mz
+            if mz - last_mz > gap:
+                regions.append((start, i))
+                start = i
+            last_mz = mz
+        regions.append((start, n))
+        if n_groups is None or len(regions) <= n_groups:
+            return regions
+        target = n / float(n_groups)
+        groups = []
+        start, stop = regions[0]
+        for region_start, region_stop in regions[1:]:
+            if stop - start >= target:
+                groups.append((start, stop))
+                start = region_start
+            stop = region_stop
+        groups.append((start, stop))
+        return groups
+
+    def _get_region_pool(self):
+        if self.region_executor == 'process':
+            return multiprocessing.Pool(self.region_workers), True
+        elif self.region_executor == 'thread':
+            return ThreadPool(self.region_workers), True
+        elif hasattr(self.region_executor, 'map'):
+            return self.region_executor, False
+        raise ValueError("Unknown region executor %r" % (self.region_executor, ))
+
+    def deconvolute_regions(self, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8), left_search_limit=1,
+                            right_search_limit=0, iterations=MAX_ITERATION, charge_carrier=PROTON,
+                            truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW,
+                            convergence=CONVERGENCE, **kwargs):
+        """Deconvolute the spectrum by splitting :attr:`peaklist` at every m/z gap wider than
+        :meth:`region_gap_width`, and deconvoluting each group of regions independently with
+        :attr:`region_workers` workers from :attr:`region_executor`.
+
+        Each group is deconvoluted by a fresh deconvoluter configured by :meth:`_region_deconvoluter_config`
+        with a copy of its peaks, and the remaining peak intensities are copied back to :attr:`peaklist`
+        afterwards. As no fit can span two regions, the result is the same as :meth:`deconvolute`
+        except when subtraction is used, where convergence is tested for each group separately,
+        or when :attr:`scorer` depends upon the whole peak list. :attr:`peak_dependency_network`
+        is not populated. If :attr:`profile` is set, the phases of each group are added to it,
+        and pattern generation by groups deconvoluted concurrently in threads sharing a
+        pattern cache may be counted more than once. If :attr:`budget` is set, each group
+        is given the same budget.
+
+        The parameters are the same as those of :meth:`deconvolute`.
+
+        Returns
+        -------
+        :class:`~.DeconvolutedPeakSet`
+        """
+        deconvolute_kwargs = dict(
+            error_tolerance=error_tolerance, charge_range=charge_range,
+            left_search_limit=left_search_limit, right_search_limit=right_search_limit,
+            iterations=iterations, charge_carrier=charge_carrier, truncate_after=truncate_after,
+            ignore_below=ignore_below, convergence=convergence, **kwargs)
+        gap = self.region_gap_width(
+            error_tolerance, charge_range, left_search_limit, right_search_limit,
+            charge_carrier, truncate_after, ignore_below)
+        regions = self.partition_regions(gap, max(self.region_workers, 1) * 4)
+        deconvoluter_type, args, init_kwargs = self._region_deconvoluter_config()
+        init_kwargs = dict(init_kwargs, region_workers=0, profile=self.profile is not None)
+        payloads = [
+            (deconvoluter_type, self.peaklist[start:stop], args, init_kwargs, deconvolute_kwargs)
+            for start, stop in regions]
+        pool, owned = self._get_region_pool()
+        try:
+            results = pool.map(_deconvolute_region, payloads)
+        finally:
+            if owned:
+                pool.close()
+                pool.join()
+        for (start, stop), (peaks, intensities, profile, degraded) in zip(regions, results):
+            self._deconvoluted_peaks.extend(peaks)
+            for i, intensity in enumerate(intensities):
+                self.peaklist[start + i].intensity = intensity
+            if self.profile is not None:
+                self.profile.merge(profile, include_totals=False)
+            for shortcut in degraded:
+                self.budget.degrade(shortcut)
+        self._quick_charge_table = None
+        return DeconvolutedPeakSet(list(self._deconvoluted_peaks)).reindex()
+
     def targeted_deconvolution(self, peak, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8),
                                left_search_limit=3, right_search_limit=3, charge_carrier=PROTON,
                                truncate_after=TRUNCATE_AFTER, ignore_below=IGNORE_BELOW):
@@ -835,6 +1470,9 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
         -------
         :class:`~.NetworkedTargetedDeconvolutionResult`
         """
+        if self.budget is not None:
+            self.budget.start()
+            self.budget.spend()
         self._explore_local(
             peak, error_tolerance=error_tolerance, charge_range=charge_range,
             left_search_limit=left_search_limit,
@@ -854,6 +1492,15 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
         followed by :meth:`select_best_disjoint_subgraphs` to populate the resulting
         :class:`~.DeconvolutedPeakSet`
 
+        If :attr:`region_workers` is greater than 1 and no targeted deconvolutions have been
+        requested, this delegates to :meth:`deconvolute_regions`.
+
+        If :attr:`budget` is exceeded, this degrades gracefully instead of running to completion.
+        If it was exceeded by targeted deconvolutions, only the priority targets are solved. If it
+        is exceeded while building the graph, the remaining peaks are explored with a cheaper
+        search, and no further iterations are done once it has been exceeded. The shortcuts taken
+        are listed by :attr:`degraded`.
+
         Parameters
         ----------
         error_tolerance : float, optional
@@ -885,56 +1532,131 @@ class PeakDependenceGraphDeconvoluterBase(ExhaustivePeakSearchDeconvoluterBase):
         -------
         :class:`~.DeconvolutedPeakSet`
         """
-        if not self.use_subtraction:
-            iterations = 1
-
-        begin_signal = sum([p.intensity for p in self.peaklist])
-        i = 0
-        for i in range(iterations):
-            if self.verbose:
-                info("<== Starting Iteration %d ===================>", (i, ))
-            # The first iteration doesn't need to have the entire graph
-            # rebuilt and might have been seeded with targeted queries
-            if i != 0:
-                self.peak_dependency_network.reset()
-            self.populate_graph(
+        profile = self.profile
+        if profile is not None:
+            started = timer()
+        if self.region_workers > 1 and not self._priority_map:
+            if profile is not None:
+                # Each region's deconvoluter records its own pattern generation
+                profile.release_pattern_caches()
+            result = self.deconvolute_regions(
                 error_tolerance=error_tolerance, charge_range=charge_range,
                 left_search_limit=left_search_limit, right_search_limit=right_search_limit,
-                charge_carrier=charge_carrier,
-                truncate_after=truncate_after, ignore_below=ignore_below)
-            self.postprocess_fits(
-                charge_range=charge_range,
-                charge_carrier=charge_carrier,
-                error_tolerance=error_tolerance)
-            self.select_best_disjoint_subgraphs(
-                error_tolerance, charge_carrier)
-            self._slice_cache.clear()
-            end_signal = sum([p.intensity for p in self.peaklist]) + 1
-
-            if (begin_signal - end_signal) / end_signal < convergence:
+                iterations=iterations, charge_carrier=charge_carrier, truncate_after=truncate_after,
+                ignore_below=ignore_below, convergence=convergence, **kwargs)
+            if profile is not None:
+                self._finish_profile(started)
+            return result
+        if profile is not None:
+            profile.watch_pattern_caches(self._pattern_caches())
+        budget = self.budget
+        if budget is not None:
+            budget.start()
+        # Built by the first call to populate_graph and kept for the later iterations
+        self._quick_charge_table = None
+        self._quick_charge_stale = None
+        try:
+            if not self.use_subtraction:
+                iterations = 1
+
+            search_parameters = None
+            if self.incremental_graph and iterations > 1 and len(self.peaklist) > 0:
+                search_parameters = dict(
+                    error_tolerance=error_tolerance, charge_range=charge_range,
+                    left_search_limit=left_search_limit, right_search_limit=right_search_limit,
+                    charge_carrier=charge_carrier, truncate_after=truncate_after,
+                    ignore_below=ignore_below)
+                try:
+                    self.neighborhood_reach(self.peaklist[0].mz, **search_parameters)
+                except NotImplementedError:
+                    search_parameters = None
+            if search_parameters is not None:
+                mzs = [p.mz for p in self.peaklist]
+                self._fit_cache = [None] * len(mzs)
+            self._dirty_peaks = None
+
+            begin_signal = sum([p.intensity for p in self.peaklist])
+            i = 0
+            for i in range(iterations):
+                if budget is not None and i != 0 and budget.exceeded():
+                    if PRIORITY_TARGETS_ONLY not in budget.degraded:
+                        budget.degrade(REDUCED_ITERATIONS)
+                    if self.verbose:
+                        info("Deconvolution Budget Exceeded After %d Iterations", (i, ))
+                    break
                 if self.verbose:
-                    info("(%0.4e - %0.4e) / %0.4e < %0.2g, Converged!",
-                         begin_signal, end_signal, end_signal, convergence)
-                break
-            begin_signal = end_signal
-        else:
-            if self.verbose:
-                info("Did Not Converge.")
+                    info("<== Starting Iteration %d ===================>", (i, ))
+                # The first iteration doesn't need to have the entire graph
+                # rebuilt and might have been seeded with targeted queries
+                if i != 0:
+                    self.peak_dependency_network.reset()
+                if profile is not None:
+                    profile.count("iterations")
+                    building = timer()
+                if budget is not None and i == 0 and self._priority_map and budget.exceeded():
+                    budget.degrade(PRIORITY_TARGETS_ONLY)
+                else:
+                    self.populate_graph(
+                        error_tolerance=error_tolerance, charge_range=charge_range,
+                        left_search_limit=left_search_limit, right_search_limit=right_search_limit,
+                        charge_carrier=charge_carrier,
+                        truncate_after=truncate_after, ignore_below=ignore_below)
+                if profile is not None:
+                    profile.record("graph_building", timer() - building)
+                self.postprocess_fits(
+                    charge_range=charge_range,
+                    charge_carrier=charge_carrier,
+                    error_tolerance=error_tolerance)
+                if search_parameters is not None:
+                    intensities = [p.intensity for p in self.peaklist]
+                self.select_best_disjoint_subgraphs(
+                    error_tolerance, charge_carrier)
+                self._slice_cache.clear()
+                if search_parameters is not None:
+                    n_dirty = self._mark_dirty_peaks(intensities, mzs, search_parameters)
+                    if self.verbose:
+                        info("%d Peaks Changed Neighborhoods", n_dirty)
+                end_signal = sum([p.intensity for p in self.peaklist]) + 1
+
+                if (begin_signal - end_signal) / end_signal < convergence:
+                    if self.verbose:
+                        info("(%0.4e - %0.4e) / %0.4e < %0.2g, Converged!",
+                             begin_signal, end_signal, end_signal, convergence)
+                    break
+                begin_signal = end_signal
+            else:
+                if self.verbose:
+                    info("Did Not Converge.")
+        finally:
+            self._fit_cache = None
+            self._dirty_peaks = None
+            self._restore_search()
         if self.verbose:
             info("Finished Deconvolution in %d Iterations", (i + 1, ))
         if self.merge_isobaric_peaks:
             self._deconvoluted_peaks = self._merge_peaks(
                 self._deconvoluted_peaks)
 
+        if profile is not None:
+            self._finish_profile(started)
         return DeconvolutedPeakSet(list(self._deconvoluted_peaks)).reindex()
 
 
+def _deconvolute_region(payload):
+    deconvoluter_type, peaklist, args, kwargs, deconvolute_kwargs = payload
+    deconvoluter = deconvoluter_type(peaklist, *args, **kwargs)
+    peaks = deconvoluter.deconvolute(**deconvolute_kwargs)
+    return list(peaks), [p.intensity for p in deconvoluter.peaklist], deconvoluter.profile, deconvoluter.degraded
+
+
 try:
     _has_c = True
     from ms_deisotope._c.deconvoluter_base import (
         _explore_local as _c_explore_local,
+        _explore_local_fits as _c_explore_local_fits,
         populate_graph as cpopulate_graph)
     PeakDependenceGraphDeconvoluterBase._explore_local = _c_explore_local
+    PeakDependenceGraphDeconvoluterBase._explore_local_fits = _c_explore_local_fits
     PeakDependenceGraphDeconvoluterBase.populate_graph = cpopulate_graph
 except ImportError as e:
     _has_c = False
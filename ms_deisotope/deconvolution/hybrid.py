@@ -36,9 +36,10 @@ class HybridAveragineCompositionListPeakDependenceGraphDeconvoluter(_APDGD, Comp
     def populate_graph(self, error_tolerance=ERROR_TOLERANCE, charge_range=(1, 8), left_search_limit=1,
                        right_search_limit=0, charge_carrier=PROTON, truncate_after=TRUNCATE_AFTER,
                        ignore_below=IGNORE_BELOW, mass_shift=None):
-        for composition in self.composition_list:
+        for composition, charges in self._candidate_compositions(
+                error_tolerance, charge_range, charge_carrier, mass_shift):
             self.deconvolute_composition(
-                composition, error_tolerance, charge_range=charge_range,
+                composition, error_tolerance, charge_range=charges,
                 truncate_after=truncate_after, charge_carrier=charge_carrier,
                 mass_shift=mass_shift)
         AveraginePeakDependenceGraphDeconvoluter.populate_graph(
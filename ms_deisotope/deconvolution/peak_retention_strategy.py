@@ -45,6 +45,15 @@ class PeakRetentionStrategyBase(object):
         """
         return from_fitted_peak(fitted_peak, charge)
 
+    def fingerprint(self):
+        """Describe the parameters of this strategy, as used by :func:`~.deconvolution_cache_key`.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, vars(self))
+
     @abc.abstractmethod
     def retain_peaks(self, peaklist, original_peaklist=None, charge_range=None, solutions=None):
         """Given a list of :class:`~.FittedPeak` objects left over after deconvolution,
@@ -0,0 +1,253 @@
+'''Opt-in instrumentation of the deconvolution process.
+
+A :class:`DeconvolutionProfile` attached to a deconvoluter as its ``profile``
+attribute records the wall time and number of calls spent in each phase of the
+deconvolution process, together with how many candidate isotopic fits were
+considered, pruned before scoring and accepted, and the sizes of the peak
+dependence graph clusters that were solved. Profiles from many deconvolutions
+can be merged to summarize a whole run.
+'''
+import time
+
+from collections import defaultdict
+
+
+#: The phases a :class:`DeconvolutionProfile` records, in the order they are reported.
+#: Phases are not exclusive. ``graph_building`` includes the ``peak_search`` and ``scoring``
+#: done while populating the peak dependence graph, ``scoring`` includes ``pattern_generation``
+#: and ``subgraph_solving`` includes ``subtraction``.
+PHASES = (
+    "total",
+    "graph_building",
+    "peak_search",
+    "scoring",
+    "pattern_generation",
+    "subgraph_solving",
+    "subtraction",
+)
+
+#: The counters a :class:`DeconvolutionProfile` records, in the order they are reported.
+COUNTERS = (
+    "deconvolutions",
+    "iterations",
+    "peak_charge_pairs",
+    "pruned_by_peak_count",
+    "pruned_by_score",
+    "candidate_fits",
+    "accepted_fits",
+    "clusters",
+)
+
+_PHASE_DEPTH = {
+    "total": 0,
+    "graph_building": 1,
+    "peak_search": 2,
+    "scoring": 2,
+    "pattern_generation": 3,
+    "subgraph_solving": 1,
+    "subtraction": 2,
+}
+
+
+timer = time.time
+
+
+class DeconvolutionProfile(object):
+    """Accumulates per-phase wall time and call counts, fit counters and cluster
+    sizes for one or more deconvolutions.
+
+    Attributes
+    ----------
+    times : :class:`defaultdict` of :class:`float`
+        The total wall time in seconds spent in each phase
+    calls : :class:`defaultdict` of :class:`int`
+        The number of times each phase was entered
+    counters : :class:`defaultdict` of :class:`int`
+        Event counts, such as the number of candidate and accepted fits
+    cluster_sizes : :class:`defaultdict` of :class:`int`
+        The number of dependence clusters solved of each size
+    """
+
+    def __init__(self):
+        self.times = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.cluster_sizes = defaultdict(int)
+        self._watched_caches = []
+
+    def record(self, phase, elapsed, calls=1):
+        """Add `elapsed` seconds and `calls` calls to `phase`.
+
+        Parameters
+        ----------
+        phase : str
+            The name of the phase, one of :data:`PHASES`
+        elapsed : float
+            The wall time spent in the phase in seconds
+        calls : int, optional
+            The number of calls to add. Defaults to 1
+        """
+        self.times[phase] += elapsed
+        self.calls[phase] += calls
+
+    def count(self, counter, n=1):
+        """Increment `counter` by `n`.
+
+        Parameters
+        ----------
+        counter : str
+            The name of the counter, one of :data:`COUNTERS`
+        n : int, optional
+            The amount to add. Defaults to 1
+        """
+        self.counters[counter] += n
+
+    def add_cluster(self, size):
+        """Record that a dependence cluster of `size` fits was solved.
+
+        Parameters
+        ----------
+        size : int
+            The number of fits in the cluster
+        """
+        self.cluster_sizes[size] += 1
+        self.counters["clusters"] += 1
+
+    def watch_pattern_caches(self, caches):
+        """Start attributing the pattern generation time and misses of `caches`
+        to the ``pattern_generation`` phase.
+
+        Only the change since this call is counted, when :meth:`release_pattern_caches`
+        is called.
+
+        Parameters
+        ----------
+        caches : :class:`~collections.abc.Iterable` of :class:`~.AveragineCache`
+            The isotopic pattern caches used by the deconvoluter. Objects without
+            ``generation_time`` and ``misses`` attributes are ignored.
+        """
+        for cache in caches:
+            if any(watched[0] is cache for watched in self._watched_caches):
+                continue
+            try:
+                self._watched_caches.append([cache, cache.generation_time, cache.misses])
+            except AttributeError:
+                continue
+
+    def release_pattern_caches(self):
+        """Record the pattern generation time and misses of each watched cache
+        since :meth:`watch_pattern_caches`, and stop watching them.
+        """
+        for cache, generation_time, misses in self._watched_caches:
+            self.record(
+                "pattern_generation", cache.generation_time - generation_time,
+                cache.misses - misses)
+        self._watched_caches = []
+
+    def merge(self, other, include_totals=True):
+        """Add the measurements of `other` to this profile.
+
+        Parameters
+        ----------
+        other : :class:`DeconvolutionProfile` or :const:`None`
+            The profile to merge. :const:`None` is ignored.
+        include_totals : bool, optional
+            Whether to add the ``total`` phase and ``deconvolutions`` counter of `other`.
+            These should be left out when `other` measured part of a deconvolution
+            this profile is already measuring. Defaults to :const:`True`.
+
+        Returns
+        -------
+        :class:`DeconvolutionProfile`
+            This profile
+        """
+        if other is None:
+            return self
+        for phase, elapsed in other.times.items():
+            if include_totals or phase != "total":
+                self.times[phase] += elapsed
+        for phase, calls in other.calls.items():
+            if include_totals or phase != "total":
+                self.calls[phase] += calls
+        for counter, n in other.counters.items():
+            if include_totals or counter != "deconvolutions":
+                self.counters[counter] += n
+        for size, n in other.cluster_sizes.items():
+            self.cluster_sizes[size] += n
+        return self
+
+    def __getstate__(self):
+        return {
+            "times": dict(self.times),
+            "calls": dict(self.calls),
+            "counters": dict(self.counters),
+            "cluster_sizes": dict(self.cluster_sizes),
+        }
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.times.update(state["times"])
+        self.calls.update(state["calls"])
+        self.counters.update(state["counters"])
+        self.cluster_sizes.update(state["cluster_sizes"])
+
+    def __reduce__(self):
+        return self.__class__, (), self.__getstate__()
+
+    def summary(self):
+        """Summarize the measurements as plain Python types.
+
+        Returns
+        -------
+        dict
+            With keys ``"phases"``, mapping each phase to its ``"time"`` and ``"calls"``,
+            ``"counters"``, mapping each counter to its value, and ``"cluster_sizes"``,
+            holding the ``"mean"`` and ``"max"`` cluster size and the ``"histogram"`` of
+            cluster sizes.
+        """
+        phases = {}
+        for phase in PHASES:
+            phases[phase] = {
+                "time": self.times.get(phase, 0.0),
+                "calls": self.calls.get(phase, 0),
+            }
+        counters = {counter: self.counters.get(counter, 0) for counter in COUNTERS}
+        n_clusters = sum(self.cluster_sizes.values())
+        total_size = sum(size * n for size, n in self.cluster_sizes.items())
+        cluster_sizes = {
+            "mean": total_size / float(n_clusters) if n_clusters else 0.0,
+            "max": max(self.cluster_sizes) if self.cluster_sizes else 0,
+            "histogram": dict(self.cluster_sizes),
+        }
+        return {
+            "phases": phases,
+            "counters": counters,
+            "cluster_sizes": cluster_sizes,
+        }
+
+    def report(self):
+        """Format the measurements as a human readable, multi-line report.
+
+        Nested phases are indented beneath the phase which includes them.
+
+        Returns
+        -------
+        str
+        """
+        summary = self.summary()
+        lines = ["%-24s %12s %12s" % ("Phase", "Time (s)", "Calls")]
+        for phase in PHASES:
+            entry = summary["phases"][phase]
+            label = "  " * _PHASE_DEPTH[phase] + phase
+            lines.append("%-24s %12.4f %12d" % (label, entry['time'], entry['calls']))
+        for counter in COUNTERS:
+            lines.append("%-24s %12d" % (counter, summary['counters'][counter]))
+        cluster_sizes = summary['cluster_sizes']
+        lines.append("%-24s %12.2f" % ("mean cluster size", cluster_sizes['mean']))
+        lines.append("%-24s %12d" % ("max cluster size", cluster_sizes['max']))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return "{self.__class__.__name__}(total={total:0.4f}, deconvolutions={deconvolutions})".format(
+            self=self, total=self.times.get("total", 0.0),
+            deconvolutions=self.counters.get("deconvolutions", 0))
@@ -0,0 +1,314 @@
+'''Content-addressed caches of deconvolution results.
+
+Identical centroided spectra deconvoluted with the same configuration, such as
+repeated MSn scans of the same precursor or re-runs of a parameter study, always
+produce the same deconvoluted peaks. A :class:`DeconvolutionEngine` given a
+``result_cache`` looks up each spectrum by :func:`deconvolution_cache_key`, a hash
+of its peak arrays and of the deconvolution configuration, and reuses the stored
+:class:`~.DeconvolutedPeakSet` instead of deconvoluting the spectrum again.
+
+Objects in the configuration, like averagine models, averagine caches and scorers,
+are identified by the value of their ``fingerprint`` method, which describes every
+parameter which changes the deconvoluted peaks. Other values are identified by their
+:func:`repr`. A configuration holding an object with neither a ``fingerprint`` method
+nor a :func:`repr` describing its parameters, like the default ``<... at 0x...>``,
+cannot be identified, and the spectra deconvoluted with it are not cached.
+'''
+import os
+import re
+import types
+import pickle
+import hashlib
+
+from collections import OrderedDict
+
+import numpy as np
+
+from ms_peak_picker import PeakIndex
+
+
+#: Configuration entries which do not change the deconvoluted peaks, and are left
+#: out of :func:`deconvolution_cache_key`. Results whose deconvolution exceeded its
+#: budget are never stored, so the budgets do not need to be part of the key.
+IGNORED_PARAMETERS = (
+    "verbose",
+    "verbose_priorities",
+    "profile",
+    "time_budget",
+    "work_budget",
+    "result_cache",
+)
+
+
+# The default object.__repr__, which describes where an object is, not what it is
+_DEFAULT_REPR = re.compile(r" at 0x[0-9a-fA-F]+>")
+
+
+class _UnidentifiableValue(ValueError):
+    pass
+
+
+def _configuration_token(value):
+    # A stable textual description of `value`, which does not depend upon the order
+    # of dictionary entries or on whether a sequence is a list or a tuple.
+    if isinstance(value, dict):
+        return "{%s}" % ", ".join(
+            "%r: %s" % (k, _configuration_token(v))
+            for k, v in sorted(value.items(), key=lambda item: str(item[0])))
+    if isinstance(value, (list, tuple)):
+        return "(%s)" % ", ".join(_configuration_token(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return "{%s}" % ", ".join(sorted(_configuration_token(v) for v in value))
+    if isinstance(value, (type, types.FunctionType, types.BuiltinFunctionType)):
+        name = getattr(value, "__qualname__", value.__name__)
+        if "<" in name:
+            # Lambdas and functions defined inside other functions
+            raise _UnidentifiableValue(value)
+        return "%s.%s" % (value.__module__, name)
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        return "array(%s, %r, %s)" % (value.dtype.str, value.shape, hashlib.sha1(value.tobytes()).hexdigest())
+    if isinstance(value, np.generic):
+        return repr(value.item())
+    fingerprint = getattr(value, "fingerprint", None)
+    if fingerprint is not None:
+        return _configuration_token(fingerprint())
+    token = repr(value)
+    if _DEFAULT_REPR.search(token):
+        raise _UnidentifiableValue(value)
+    return token
+
+
+def _peak_columns(peaklist):
+    if isinstance(peaklist, PeakIndex):
+        peaklist = peaklist.peaks
+    peaks = tuple(peaklist)
+    if peaks and isinstance(peaks[0], (list, tuple)):
+        columns = [[p[0] for p in peaks], [p[1] for p in peaks]]
+    else:
+        columns = [
+            [p.mz for p in peaks],
+            [p.intensity for p in peaks],
+            [getattr(p, "signal_to_noise", 0.0) for p in peaks],
+            [getattr(p, "full_width_at_half_max", 0.0) for p in peaks],
+            [getattr(p, "area", 0.0) for p in peaks],
+        ]
+    columns = np.array(columns, dtype=np.float64)
+    # Peak lists are sorted by m/z before they are deconvoluted
+    order = np.argsort(columns[0], kind="mergesort")
+    return np.ascontiguousarray(columns[:, order])
+
+
+def deconvolution_cache_key(peaklist, configuration):
+    """Compute the key under which the deconvolution of `peaklist` with `configuration`
+    is stored.
+
+    Parameters
+    ----------
+    peaklist : :class:`~.PeakSet` or list of Peak-like objects, see :func:`~.prepare_peaklist`
+        The centroided mass spectrum to deconvolute. The m/z, intensity, signal-to-noise
+        ratio, full width at half maximum and area of each peak are part of the key.
+    configuration : dict
+        Everything which controls how `peaklist` is deconvoluted. Entries named in
+        :data:`IGNORED_PARAMETERS` are not part of the key.
+
+    Returns
+    -------
+    str
+        A hexadecimal digest, or :const:`None` if `configuration` holds a value
+        which cannot be identified, so the result should not be cached
+    """
+    try:
+        token = _configuration_token({
+            k: v for k, v in configuration.items() if k not in IGNORED_PARAMETERS
+        })
+    except _UnidentifiableValue:
+        return None
+    hasher = hashlib.sha1()
+    hasher.update(token.encode("utf8"))
+    columns = _peak_columns(peaklist)
+    hasher.update(np.array(columns.shape, dtype=np.int64).tobytes())
+    hasher.update(columns.tobytes())
+    return hasher.hexdigest()
+
+
+class DeconvolutionResultCache(object):
+    """Base class for stores of deconvoluted peak sets keyed by :func:`deconvolution_cache_key`,
+    which evict the least recently used entry once they hold more than :attr:`max_size`.
+
+    Attributes
+    ----------
+    max_size : int
+        The maximum number of peak sets to keep
+    hits : int
+        The number of lookups which found a stored peak set
+    misses : int
+        The number of lookups which did not
+    """
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Retrieve the peak set stored under `key`.
+
+        Parameters
+        ----------
+        key : str
+            The key produced by :func:`deconvolution_cache_key`
+
+        Returns
+        -------
+        :class:`~.DeconvolutedPeakSet` or :const:`None`
+            A copy of the stored peak set, which may be modified freely, or :const:`None`
+            if no peak set is stored under `key`
+        """
+        peak_set = self._load(key)
+        if peak_set is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return peak_set
+
+    def put(self, key, peak_set):
+        """Store `peak_set` under `key`, evicting the least recently used peak
+        sets if the cache is full.
+
+        Parameters
+        ----------
+        key : str
+            The key produced by :func:`deconvolution_cache_key`
+        peak_set : :class:`~.DeconvolutedPeakSet`
+            The deconvoluted peaks. Later changes to `peak_set` are not stored.
+        """
+        self._store(key, peak_set)
+        self._evict()
+
+    def _load(self, key):
+        raise NotImplementedError()
+
+    def _store(self, key, peak_set):
+        raise NotImplementedError()
+
+    def _evict(self):
+        raise NotImplementedError()
+
+    def clear(self):
+        """Remove all stored peak sets.
+        """
+        raise NotImplementedError()
+
+    def __repr__(self):
+        return "{self.__class__.__name__}({size}/{self.max_size}, hits={self.hits}, misses={self.misses})".format(
+            self=self, size=len(self))
+
+
+class MemoryDeconvolutionResultCache(DeconvolutionResultCache):
+    """A :class:`DeconvolutionResultCache` which keeps peak sets in memory.
+    """
+
+    def __init__(self, max_size=1000):
+        super(MemoryDeconvolutionResultCache, self).__init__(max_size)
+        self.store = OrderedDict()
+
+    def _load(self, key):
+        peak_set = self.store.get(key)
+        if peak_set is None:
+            return None
+        self.store.move_to_end(key)
+        return peak_set.clone()
+
+    def _store(self, key, peak_set):
+        self.store[key] = peak_set.clone()
+        self.store.move_to_end(key)
+
+    def _evict(self):
+        while len(self.store) > self.max_size:
+            self.store.popitem(last=False)
+
+    def clear(self):
+        self.store.clear()
+
+    def __len__(self):
+        return len(self.store)
+
+    def __contains__(self, key):
+        return key in self.store
+
+
+class DiskDeconvolutionResultCache(DeconvolutionResultCache):
+    """A :class:`DeconvolutionResultCache` which pickles each peak set to its own file
+    in a directory, so that it may be shared between processes and runs.
+
+    Recency is tracked through the modification time of each file, and peak sets
+    written to the directory by other processes are found when they are looked up.
+
+    Attributes
+    ----------
+    path : str
+        The directory holding the peak sets
+    """
+
+    suffix = ".pkl"
+
+    def __init__(self, path, max_size=10000):
+        super(DiskDeconvolutionResultCache, self).__init__(max_size)
+        self.path = str(path)
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith(self.suffix):
+                entries.append((os.path.getmtime(os.path.join(self.path, name)), name[:-len(self.suffix)]))
+        entries.sort()
+        self._keys = OrderedDict((key, None) for _, key in entries)
+        self._evict()
+
+    def _path_for(self, key):
+        return os.path.join(self.path, key + self.suffix)
+
+    def _load(self, key):
+        path = self._path_for(key)
+        try:
+            with open(path, 'rb') as fh:
+                peak_set = pickle.load(fh)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            self._keys.pop(key, None)
+            return None
+        os.utime(path, None)
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        return peak_set
+
+    def _store(self, key, peak_set):
+        path = self._path_for(key)
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, 'wb') as fh:
+            pickle.dump(peak_set, fh, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+
+    def _evict(self):
+        while len(self._keys) > self.max_size:
+            key, _ = self._keys.popitem(last=False)
+            try:
+                os.remove(self._path_for(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        for key in list(self._keys):
+            try:
+                os.remove(self._path_for(key))
+            except OSError:
+                pass
+        self._keys.clear()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys or os.path.exists(self._path_for(key))
@@ -2,6 +2,8 @@
 
 import logging
 
+from bisect import bisect_left, bisect_right
+
 import numpy as np
 
 from ms_peak_picker import (
@@ -272,7 +274,7 @@ def quick_charge(peak_set, index, min_charge, max_charge):
         else:
             raise IndexError("%d is out of bounds for peak list of size %d in quick_charge" % (index, size))
     min_intensity = peak_set[index].intensity / 4.
-    charges = np.zeros(max_charge, dtype=int)
+    charges = np.zeros(max_charge + 1, dtype=int)
     for j in range(index + 1, size):
         if peak_set[j].intensity < min_intensity:
             continue
@@ -304,9 +306,232 @@ def quick_charge(peak_set, index, min_charge, max_charge):
     return np.where(charges)[0]
 
 
+def quick_charge_table(peak_set, min_charge, max_charge):
+    """Compute the :title-reference:`QuickCharge` feasible charge states for every peak in
+    ``peak_set`` in a single sweep over the peak list.
+
+    The result for each peak is identical to calling :func:`quick_charge` on it, but the window of
+    neighbors within 1.1 m/z of each peak is carried from one peak to the next instead of being
+    searched for again.
+
+    Parameters
+    ----------
+    peak_set : :class:`ms_peak_picker.PeakSet`
+        The centroided peak set to search
+    min_charge : int
+        The minimum charge state to consider
+    max_charge : int
+        The maximum charge state to consider
+
+    Returns
+    -------
+    indptr : np.ndarray
+        The offsets into ``charges`` where each peak's charge states begin, with one
+        more entry than there are peaks, as in a compressed sparse row matrix.
+    charges : np.ndarray
+        The feasible charge states of all peaks, in ascending order for each peak
+    """
+    mzs = [p.mz for p in peak_set]
+    intensities = [p.intensity for p in peak_set]
+    size = len(mzs)
+    indptr = np.zeros(size + 1, dtype=np.intp)
+    charges = []
+    flags = [False] * (max_charge + 1)
+    lo = 0
+    hi = 0
+    for index in range(size):
+        mz = mzs[index]
+        while mz - mzs[lo] > 1.1:
+            lo += 1
+        if hi <= index:
+            hi = index + 1
+        while hi < size and mzs[hi] - mz <= 1.1:
+            hi += 1
+        min_intensity = intensities[index] / 4.
+        found = []
+        for j in range(index + 1, hi):
+            if intensities[j] < min_intensity:
+                continue
+            diff = mzs[j] - mz
+            if diff <= 0:
+                continue
+            raw_charge = 1 / diff
+            charge = int(raw_charge + 0.5)
+            remain = raw_charge - int(raw_charge)
+            if 0.2 < remain < 0.8:
+                continue
+            if charge < min_charge or charge > max_charge:
+                continue
+            if not flags[charge]:
+                flags[charge] = True
+                found.append(charge)
+        if found:
+            for j in range(index - 1, lo - 1, -1):
+                diff = mz - mzs[j]
+                if diff <= 0:
+                    continue
+                raw_charge = 1 / diff
+                charge = int(raw_charge + 0.5)
+                remain = raw_charge - int(raw_charge)
+                if 0.2 < remain < 0.8:
+                    continue
+                if charge < min_charge or charge > max_charge:
+                    continue
+                if not flags[charge]:
+                    flags[charge] = True
+                    found.append(charge)
+            found.sort()
+            for charge in found:
+                flags[charge] = False
+            charges.extend(found)
+        indptr[index + 1] = len(charges)
+    return indptr, np.array(charges, dtype=np.int32)
+
+
+try:
+    from ms_peak_picker._c.peak_set import PeakSetIndexed as _PeakSetIndexed
+except ImportError:
+    _PeakSetIndexed = None
+
+
+class PeakSetArrays(object):
+    """A struct-of-arrays view of a :class:`~.PeakSet`, holding the m/z, intensity,
+    signal-to-noise ratio and index of each peak in contiguous arrays so that
+    peak queries can binary search over raw doubles instead of over
+    :class:`~.FittedPeak` objects.
+
+    Peak positions in these arrays are the same as in :attr:`peaklist`, and the
+    original :class:`~.FittedPeak` is only retrieved through :meth:`__getitem__`.
+    If a peak's intensity is changed, :meth:`refresh` must be called to keep
+    the arrays in sync.
+
+    Attributes
+    ----------
+    peaklist : :class:`~.PeakSet`
+        The peak list viewed
+    mz : np.ndarray
+        The m/z of each peak
+    intensity : np.ndarray
+        The intensity of each peak
+    signal_to_noise : np.ndarray
+        The signal-to-noise ratio of each peak
+    index : np.ndarray
+        The index of each peak in the profile spectrum it was picked from
+    size : int
+        The number of peaks
+    nearest_match : bool
+        Whether peak queries return the nearest peak within the error tolerance, as
+        :class:`~.PeakSetIndexed` does, or sweep around the first match as :class:`~.PeakSet` does
+    """
+
+    def __init__(self, peaklist):
+        self.peaklist = peaklist
+        self.size = len(peaklist)
+        self.mz = np.array([p.mz for p in peaklist], dtype=np.float64)
+        self.intensity = np.array([p.intensity for p in peaklist], dtype=np.float64)
+        self.signal_to_noise = np.array([p.signal_to_noise for p in peaklist], dtype=np.float64)
+        self.index = np.array([p.index for p in peaklist], dtype=np.intp)
+        self.nearest_match = _PeakSetIndexed is not None and isinstance(peaklist, _PeakSetIndexed)
+        # Scalar lookups are faster against lists than against numpy arrays
+        self._mz = self.mz.tolist()
+        self._intensity = self.intensity.tolist()
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        return self.peaklist[i]
+
+    def __repr__(self):
+        return "{self.__class__.__name__}({self.size})".format(self=self)
+
+    def has_peak(self, mz, error_tolerance=ERROR_TOLERANCE):
+        """Find the position of the peak matching `mz` within `error_tolerance` ppm error,
+        using the same search as :attr:`peaklist`'s :meth:`has_peak`.
+
+        Parameters
+        ----------
+        mz : float
+            The m/z to search for
+        error_tolerance : float, optional
+            The parts-per-million error tolerance
+
+        Returns
+        -------
+        int
+            The position of the peak, or -1 if no peak matches
+        """
+        if self.size == 0:
+            return -1
+        if self.nearest_match:
+            return self._nearest_ppm_error(mz, error_tolerance)
+        lo = 0
+        hi = self.size
+        while True:
+            if (hi - lo) < 5:
+                return self._sweep_ppm_error(mz, lo, hi, error_tolerance)
+            mid = (hi + lo) // 2
+            x = self._mz[mid]
+            if abs((mz - x) / x) <= error_tolerance:
+                return self._sweep_ppm_error(
+                    mz, max(mid - (mid if mid < 5 else 5), lo), min(mid + 5, hi), error_tolerance)
+            elif x > mz:
+                hi = mid
+            elif x < mz:
+                lo = mid
+            else:
+                return -1
+
+    def _nearest_ppm_error(self, mz, error_tolerance):
+        i = bisect_left(self._mz, mz)
+        best_index = -1
+        best_error = error_tolerance
+        for j in (i - 1, i):
+            if 0 <= j < self.size:
+                abs_error = abs((self._mz[j] - mz) / mz)
+                if abs_error < best_error:
+                    best_index = j
+                    best_error = abs_error
+        return best_index
+
+    def _sweep_ppm_error(self, mz, lo, hi, error_tolerance):
+        best_index = -1
+        best_error = float('inf')
+        best_intensity = 0
+        for i in range(lo, hi):
+            abs_error = abs((mz - self._mz[i]) / self._mz[i])
+            if abs_error < error_tolerance and abs_error < (best_error * 1.1) and self._intensity[i] > best_intensity:
+                best_index = i
+                best_error = abs_error
+                best_intensity = self._intensity[i]
+        return best_index
+
+    def between_bounds(self, m1, m2):
+        """Find the range of positions of the peaks whose m/z is between `m1` and `m2`
+
+        Returns
+        -------
+        start : int
+        stop : int
+        """
+        return bisect_left(self._mz, m1), bisect_right(self._mz, m2)
+
+    def refresh(self, i):
+        """Re-read the intensity of the `i` th peak from :attr:`peaklist`
+
+        Parameters
+        ----------
+        i : int
+            The position of the peak
+        """
+        self.intensity[i] = self._intensity[i] = self.peaklist[i].intensity
+
+
 try:
     _quick_charge = quick_charge
-    from ms_deisotope._c.deconvoluter_base import quick_charge
+    _quick_charge_table = quick_charge_table
+    _PeakSetArrays = PeakSetArrays
+    from ms_deisotope._c.deconvoluter_base import quick_charge, quick_charge_table, PeakSetArrays
 except ImportError:
     pass
 
@@ -368,6 +593,32 @@ class ChargeIterator(object):
     def sequence_from_quickcharge(self, peak_set, peak):
         charges = quick_charge(peak_set, peak.peak_count,
                                abs(self.lower), abs(self.upper))
+        self.sequence_from_charges(charges)
+
+    def sequence_from_quickcharge_table(self, table, peak):
+        """Set the charge sequence from a pre-computed :func:`quick_charge_table`.
+
+        Parameters
+        ----------
+        table : tuple
+            The ``(min_charge, max_charge, indptr, charges)`` table
+        peak : :class:`~.FittedPeak`
+            The peak to read the charge states of
+
+        Returns
+        -------
+        bool
+            Whether the table covered this iterator's charge range and ``peak``. If not,
+            the sequence is unchanged.
+        """
+        min_charge, max_charge, indptr, charges = table
+        index = peak.peak_count
+        if min_charge != self.lower or max_charge != self.upper or not (0 <= index < len(indptr) - 1):
+            return False
+        self.sequence_from_charges(charges[indptr[index]:indptr[index + 1]])
+        return True
+
+    def sequence_from_charges(self, charges):
         n = charges.shape[0]
         self.index = 0
         if n == 0:
@@ -3,6 +3,7 @@ from __future__ import absolute_import
 import json
 
 from ms_deisotope.data_source import ChargeNotProvided
+from ms_deisotope.peak_set import ColumnarDeconvolutedPeakSet
 
 class JSONScanFormatter(object):
 
@@ -135,6 +136,8 @@ class JSONScanFormatter(object):
         return points
 
     def deconvoluted_peak_set_to_json(self, peak_set):
+        if isinstance(peak_set, ColumnarDeconvolutedPeakSet):
+            return self._columnar_peak_set_to_json(peak_set)
         points = []
         for peak in peak_set:
             points.append({
@@ -148,6 +151,26 @@ class JSONScanFormatter(object):
             })
         return points
 
+    def _columnar_peak_set_to_json(self, peak_set):
+        points = []
+        offsets = peak_set.envelope_offsets.tolist()
+        envelope_mz = peak_set.envelope_mz.tolist()
+        envelope_intensity = peak_set.envelope_intensity.tolist()
+        for i, (mz, neutral_mass, charge, intensity) in enumerate(zip(
+                peak_set.mz.tolist(), peak_set.neutral_mass.tolist(),
+                peak_set.charge.tolist(), peak_set.intensity.tolist())):
+            start, end = offsets[i], offsets[i + 1]
+            points.append({
+                "mz": mz,
+                "neutral_mass": neutral_mass,
+                "charge": charge,
+                "envelope": [
+                    {'mz': envelope_mz[j], 'intensity': envelope_intensity[j]} for j in range(start, end)
+                ],
+                "intensity": intensity,
+            })
+        return points
+
     def raw_data_arrays_to_json(self, arrays):
         data = {
             "mz": arrays.mz.tolist(),
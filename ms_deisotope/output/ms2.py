@@ -1,6 +1,7 @@
 # pragma: no cover
 
 from ms_deisotope import mass_charge_ratio
+from ms_deisotope.peak_set import ColumnarDeconvolutedPeakSet
 
 from .text import TextScanSerializerBase
 
@@ -31,6 +32,9 @@ class MS2Serializer(TextScanSerializerBase):
 
     def format_peak_vectors(self, scan):
         if self.deconvoluted:
+            peak_set = scan.deconvoluted_peak_set
+            if isinstance(peak_set, ColumnarDeconvolutedPeakSet):
+                return (peak_set.envelope_mz.tolist(), peak_set.envelope_intensity.tolist(), None)
             mz = [i.mz for p in scan.deconvoluted_peak_set for i in p.envelope]
             intensity = [i.intensity for p in scan.deconvoluted_peak_set for i in p.envelope]
             return (mz, intensity, None)
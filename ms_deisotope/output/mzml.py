@@ -56,7 +56,9 @@ except ImportError:
     writer = None
 
 from ms_deisotope import version as lib_version
-from ms_deisotope.peak_set import DeconvolutedPeak, DeconvolutedPeakSet, Envelope, DeconvolutedPeakDriftTime
+from ms_deisotope.peak_set import (
+    DeconvolutedPeak, DeconvolutedPeakSet, Envelope, DeconvolutedPeakDriftTime,
+    ColumnarDeconvolutedPeakSet)
 from ms_deisotope.averagine import neutral_mass
 from ms_deisotope.qc.isolation import CoIsolation
 from ms_deisotope.data_source.common import (
@@ -160,6 +162,53 @@ class SpectrumDescription(Sequence):
             pass
         return descriptors
 
+    @classmethod
+    def from_peak_arrays(cls, mz_array, intensity_array):
+        """Calculate the spectrum's descriptors from parallel arrays of peak
+        m/z and intensity, which need not be sorted by m/z.
+
+        Parameters
+        ----------
+        mz_array : :class:`np.ndarray`
+            The m/z of each peak
+        intensity_array : :class:`np.ndarray`
+            The intensity of each peak
+
+        Returns
+        -------
+        :class:`SpectrumDescription`
+        """
+        descriptors = cls()
+        if len(mz_array):
+            base_peak_i = np.argmax(intensity_array)
+            base_peak_mz = float(mz_array[base_peak_i])
+            base_peak_intensity = float(intensity_array[base_peak_i])
+        else:
+            base_peak_mz = base_peak_intensity = 0
+        descriptors.append({
+            "name": "base peak m/z",
+            "value": base_peak_mz,
+        })
+        descriptors.append({
+            "name": "base peak intensity",
+            "value": base_peak_intensity,
+            "unit_name": writer.DEFAULT_INTENSITY_UNIT
+        })
+        descriptors.append({
+            "name": "total ion current",
+            "value": float(intensity_array.sum()),
+        })
+        if len(mz_array):
+            descriptors.append({
+                "name": "lowest observed m/z",
+                "value": float(mz_array.min())
+            })
+            descriptors.append({
+                "name": "highest observed m/z",
+                "value": float(mz_array.max())
+            })
+        return descriptors
+
     @classmethod
     def from_arrays(cls, arrays):
         """Calculate the spectrum's descriptors from a :class:`RawDataArrays`
@@ -767,12 +816,17 @@ class MzMLSerializer(ScanSerializerBase):
         deconvoluted = kwargs.get("deconvoluted", self.deconvoluted)
         extra_arrays = []
         if deconvoluted:
-            score_array = [
-                peak.score for peak in scan.deconvoluted_peak_set
-            ]
+            peak_set = scan.deconvoluted_peak_set
+            if isinstance(peak_set, ColumnarDeconvolutedPeakSet):
+                score_array = peak_set.score
+                envelope_array = peak_set.envelopes_to_array()
+            else:
+                score_array = [
+                    peak.score for peak in peak_set
+                ]
+                envelope_array = envelopes_to_array(
+                    [peak.envelope for peak in peak_set])
             extra_arrays.append(("deconvolution score array", score_array))
-            envelope_array = envelopes_to_array(
-                [peak.envelope for peak in scan.deconvoluted_peak_set])
             extra_arrays.append(("isotopic envelopes array", envelope_array))
         return extra_arrays
 
@@ -822,11 +876,18 @@ class MzMLSerializer(ScanSerializerBase):
             precursor_peaks = scan.arrays
         polarity = scan.polarity
         if deconvoluted:
-            charge_array = [p.charge for p in precursor_peaks]
+            if isinstance(precursor_peaks, ColumnarDeconvolutedPeakSet):
+                charge_array = precursor_peaks.charge
+            else:
+                charge_array = [p.charge for p in precursor_peaks]
         else:
             charge_array = None
 
-        if centroided:
+        if isinstance(precursor_peaks, ColumnarDeconvolutedPeakSet):
+            mz_array = precursor_peaks.mz
+            intensity_array = precursor_peaks.intensity
+            descriptors = SpectrumDescription.from_peak_arrays(mz_array, intensity_array)
+        elif centroided:
             descriptors = SpectrumDescription.from_peak_set(precursor_peaks)
             mz_array = [p.mz for p in precursor_peaks]
             intensity_array = [p.intensity for p in precursor_peaks]
@@ -1,3 +1,5 @@
+from ms_deisotope.peak_set import ColumnarDeconvolutedPeakSet
+
 from .common import ScanSerializerBase
 
 
@@ -121,6 +123,10 @@ class TextScanSerializerBase(ScanSerializerBase):
             state. :const:`None` otherwise.
         """
         if self.deconvoluted:
+            peak_set = scan.deconvoluted_peak_set
+            if isinstance(peak_set, ColumnarDeconvolutedPeakSet):
+                return (peak_set.neutral_mass.tolist(), peak_set.intensity.tolist(),
+                        peak_set.charge.tolist())
             neutral_mass = [p.neutral_mass for p in scan.deconvoluted_peak_set]
             intensity = [p.intensity for p in scan.deconvoluted_peak_set]
             charge = [p.charge for p in scan.deconvoluted_peak_set]
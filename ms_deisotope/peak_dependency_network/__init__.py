@@ -6,7 +6,7 @@ from .peak_network import (
 
 from .subgraph import (
     ConnectedSubgraph, FitNode,
-    GreedySubgraphSelection)
+    GreedySubgraphSelection, select_disjoint_fit_intervals)
 
 from .intervals import (
     Interval, IntervalTreeNode, SpanningMixin)
@@ -24,6 +24,7 @@ __all__ = [
     "FitNode",
     "ConnectedSubgraph",
     "GreedySubgraphSelection",
+    "select_disjoint_fit_intervals",
     "Interval",
     "IntervalTreeNode",
     "SpanningMixin",
@@ -3,7 +3,7 @@ import logging
 
 from collections import defaultdict
 
-from .subgraph import ConnectedSubgraph
+from .subgraph import ConnectedSubgraph, select_disjoint_fit_intervals
 from .intervals import SpanningMixin, IntervalTreeNode
 from ..utils import Base, TargetedDeconvolutionResultBase
 from ..task import LogUtilsMixin
@@ -135,6 +135,18 @@ class DependenceCluster(SpanningMixin):
         best_fits = fit_sets
         return [node.fit for node in best_fits]
 
+    def interval_best_fits(self):
+        """
+        Compute the set of isotopic fits spanning this cluster whose m/z
+        intervals do not overlap with the best total score, using
+        :func:`~.select_disjoint_fit_intervals`
+
+        Returns
+        -------
+        list of IsotopicFitRecord
+        """
+        return select_disjoint_fit_intervals(self.dependencies, self.maximize)
+
     def _start(self):
         """
         Determine the first mz coordinate for members of this cluster
@@ -192,11 +204,55 @@ except ImportError:
             self.dependencies = set()
             self._interval_tree = None
             self._populate_initial_graph()
+            self._reset_components()
 
         def _populate_initial_graph(self):
             for peak in self.peaklist:
                 self.nodes[peak.index] = PeakNode(peak)
 
+        def _reset_components(self):
+            '''Rebuild the disjoint set forest over peak positions from
+            the fits currently in :attr:`dependencies`.
+            '''
+            n = len(self.peaklist)
+            self._component_parent = list(range(n))
+            self._component_rank = [0] * n
+            self._components_stale = False
+            for fit_record in self.dependencies:
+                self._merge_components(fit_record)
+
+        def _find_component(self, i):
+            parent = self._component_parent
+            if i >= len(parent):
+                self._component_rank.extend([0] * (i + 1 - len(parent)))
+                parent.extend(range(len(parent), i + 1))
+            root = i
+            while parent[root] != root:
+                root = parent[root]
+            # Compress the path so later queries on these positions are direct
+            while parent[i] != root:
+                parent[i], i = root, parent[i]
+            return root
+
+        def _merge_components(self, fit_record):
+            '''Join the components of every real peak in `fit_record`.
+            '''
+            parent = self._component_parent
+            rank = self._component_rank
+            root = -1
+            for peak in fit_record.experimental:
+                if peak.peak_count < 0:
+                    continue
+                other = self._find_component(peak.peak_count)
+                if root < 0:
+                    root = other
+                elif other != root:
+                    if rank[other] > rank[root]:
+                        root, other = other, root
+                    elif rank[other] == rank[root]:
+                        rank[root] += 1
+                    parent[other] = root
+
         def add_fit_dependence(self, fit_record):
             '''Add the relatoinship between the experimental peaks
             in `fit_record` to the graph, expressed as a hyper-edge
@@ -205,7 +261,8 @@ except ImportError:
             This adds `fit_record` to :attr:`PeakNode.links` for each
             node corresponding to the :class:`~.FittedPeak` instance in
             :attr:`IsotopicFitRecord.experimental` of `fit_record`. It also
-            adds `fit_record to :attr:`dependencies`
+            adds `fit_record to :attr:`dependencies`, and joins the connected
+            components of its peaks.
 
             Parameters
             ----------
@@ -217,6 +274,8 @@ except ImportError:
                     continue
                 self.nodes[peak.index].links[fit_record] = fit_record.score
             self.dependencies.add(fit_record)
+            if not self._components_stale:
+                self._merge_components(fit_record)
 
         def nodes_for(self, fit_record, cache=None):
             if cache is None:
@@ -232,12 +291,16 @@ except ImportError:
         def drop_fit_dependence(self, fit_record):
             '''Remove this fit from the graph, deleting all
             hyper-edges.
+
+            Components cannot be split, so they will be rebuilt from the
+            remaining fits when they are next gathered.
             '''
             for node in self.nodes_for(fit_record):
                 try:
                     del node.links[fit_record]
                 except KeyError:
                     pass
+            self._components_stale = True
 
         def best_exact_fits(self):
             '''For each distinct group of experimental peaks, retain only
@@ -255,33 +318,29 @@ except ImportError:
                 best_fits.append(fits[-1])
             self.dependencies = set(best_fits)
 
-        def _gather_independent_clusters(self, nodes_for_cache=None):
-            clusters = defaultdict(set)
-            if nodes_for_cache is None:
-                nodes_for_cache = dict()
-            seed_nodes = self.nodes.values()
-            for seed_node in seed_nodes:
-                # This peak is depended upon by each fit in `dependencies`
-                dependencies = set(seed_node.links.keys())
+        def _gather_independent_clusters(self):
+            '''Group the fits in :attr:`dependencies` by the connected
+            component of the peaks they depend upon.
 
-                if len(dependencies) == 0:
+            Returns
+            -------
+            list of list of :class:`~.IsotopicFitRecord`
+            '''
+            if self._components_stale:
+                self._reset_components()
+            clusters = {}
+            for fit_record in self.dependencies:
+                for peak in fit_record.experimental:
+                    if peak.peak_count >= 0:
+                        break
+                else:
                     continue
-
-                # These fits also depend upon these other peaks, and those peaks are depended upon
-                # for other fits in turn, which depend upon the assignment of this peak.
-                for dep in list(dependencies):
-                    for node in self.nodes_for(dep, nodes_for_cache):
-                        dependencies |= clusters[node]
-
-                # Create a fresh copy to share out again to avoid eliminate possible errors of shared storage.
-                # This is likely unecessary under the current implementation.
-                dependencies = set(dependencies)
-
-                # Update all co-depended nodes with the full set of all fits which depend upon them
-                for dep in dependencies:
-                    for node in self.nodes_for(dep, nodes_for_cache):
-                        clusters[node] = dependencies
-            return clusters
+                root = self._find_component(peak.peak_count)
+                try:
+                    clusters[root].append(fit_record)
+                except KeyError:
+                    clusters[root] = [fit_record]
+            return list(clusters.values())
 
 
 class PeakDependenceGraph(PeakDependenceGraphBase, LogUtilsMixin):
@@ -299,6 +358,7 @@ class PeakDependenceGraph(PeakDependenceGraphBase, LogUtilsMixin):
         self.maximize = maximize
         if len(self.nodes) == 0:
             self._populate_initial_graph()
+        self._reset_components()
         self.clusters = None
         self._interval_tree = None
         self._solution_map = {}
@@ -483,6 +543,9 @@ class PeakDependenceGraph(PeakDependenceGraphBase, LogUtilsMixin):
         for dep in self.dependencies:
             mono_peak = dep.monoisotopic_peak
             if mono_peak.peak_count < 0:
+                # No other fit can claim a placeholder peak, so this fit
+                # cannot be superceded
+                keep.append(dep)
                 continue
             mono_peak_node = self.nodes[mono_peak.index]
             suppress = False
@@ -519,11 +582,8 @@ class PeakDependenceGraph(PeakDependenceGraphBase, LogUtilsMixin):
         self.best_exact_fits()
         if self.use_monoisotopic_superceded_filtering:
             self.drop_superceded_fits()
-        clusters = self._gather_independent_clusters()
-        # Use an `id` keyed dictionary over these copied sets to ensure we have exactly one reference
-        # to each set of inter-dependent fits, and then convert each set into an instance of `DependenceCluster`
-        clusters = [DependenceCluster(dependencies=c, maximize=self.maximize) for c in {
-            id(v): v for v in clusters.values() if v}.values()]
+        clusters = [DependenceCluster(dependencies=c, maximize=self.maximize)
+                    for c in self._gather_independent_clusters()]
         clusters = sorted(clusters, key=operator.attrgetter("start"))
         self.clusters = clusters
         return clusters
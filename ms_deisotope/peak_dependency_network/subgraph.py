@@ -1,3 +1,5 @@
+from bisect import bisect_left
+
 from .utils import GeneratorQueue
 from .intervals import SpanningMixin
 
@@ -114,6 +116,126 @@ class GreedySubgraphSelection(object):
         return solution
 
 
+def _schedule_fit_intervals(fits, maximize=True):
+    n = len(fits)
+    if n == 0:
+        return []
+    starts = []
+    ends = []
+    weights = []
+    for fit in fits:
+        starts.append(fit.experimental[0].mz)
+        ends.append(fit.experimental[-1].mz)
+        weight = fit.score if maximize else 1.0 / (1.0 + fit.score)
+        weights.append(weight * weight)
+    order = sorted(range(n), key=lambda i: ends[i])
+    sorted_ends = [ends[i] for i in order]
+    # best[j] is the greatest total weight using only the first j intervals by end
+    best = [0.0] * (n + 1)
+    predecessors = [0] * n
+    for j in range(n):
+        i = order[j]
+        # The number of intervals ending strictly before this interval starts
+        k = bisect_left(sorted_ends, starts[i], 0, j)
+        predecessors[j] = k
+        best[j + 1] = max(best[j], weights[i] + best[k])
+    selected = []
+    j = n
+    while j > 0:
+        i = order[j - 1]
+        if weights[i] + best[predecessors[j - 1]] > best[j - 1]:
+            selected.append(fits[i])
+            j = predecessors[j - 1]
+        else:
+            j -= 1
+    selected.reverse()
+    return selected
+
+
+def _split_dominated_fits(fits, maximize=True):
+    # Placeholder Peaks have a peak_count of -1
+    peak_sets = [frozenset(p.peak_count for p in fit.experimental if p.peak_count >= 0)
+                 for fit in fits]
+    containing = {}
+    for i, fit in enumerate(fits):
+        for peak_count in peak_sets[i]:
+            containing.setdefault((peak_count, fit.charge), []).append(i)
+    kept = []
+    dominated = []
+    for i, fit in enumerate(fits):
+        peaks = peak_sets[i]
+        is_dominated = False
+        if peaks:
+            for j in containing[next(iter(peaks)), fit.charge]:
+                if j == i or not peaks <= peak_sets[j]:
+                    continue
+                other = fits[j].score
+                if other == fit.score:
+                    # Of two fits with the same score and peaks, keep the first
+                    is_dominated = len(peak_sets[j]) > len(peaks) or j < i
+                elif maximize:
+                    is_dominated = other > fit.score
+                else:
+                    is_dominated = other < fit.score
+                if is_dominated:
+                    break
+        if is_dominated:
+            dominated.append(fit)
+        else:
+            kept.append(fit)
+    return kept, dominated
+
+
+def select_disjoint_fit_intervals(fits, maximize=True):
+    """Select the set of isotopic fits whose m/z intervals do not overlap with the greatest
+    total weight, as a weighted interval scheduling problem in :math:`O(n \\log n)` time.
+
+    Each fit spans the closed interval from the m/z of its first experimental peak to the
+    m/z of its last, so fits in the selected set never share a peak. When `maximize` is
+    true, a fit's weight is the square of its score, otherwise it is the square of
+    :math:`1 / (1 + score)` so that lower scores are preferred.
+
+    Scores grow with the number of peaks fit, but fits of parts of an envelope can each
+    match their own peaks more closely than the whole, and so outweigh it together. Squaring
+    the weights favours one strong fit over several weaker ones, moving the solution towards
+    the greedy selection. A fit whose real peaks all belong to another fit of the same charge
+    state with an equal or better score is also only considered for the gaps left between
+    the fits selected without it.
+
+    Parameters
+    ----------
+    fits : list of :class:`~.IsotopicFitRecord`
+        The fits to select from
+    maximize : bool, optional
+        Whether a greater score is better
+
+    Returns
+    -------
+    list of :class:`~.IsotopicFitRecord`
+        The selected fits, in ascending order of m/z
+    """
+    if not fits:
+        return []
+    kept, dominated = _split_dominated_fits(fits, maximize)
+    selected = _schedule_fit_intervals(kept, maximize)
+    if not dominated:
+        return selected
+    starts = [fit.experimental[0].mz for fit in selected]
+    ends = [fit.experimental[-1].mz for fit in selected]
+    remaining = []
+    for fit in dominated:
+        # The first selected interval which does not end before this one starts
+        k = bisect_left(ends, fit.experimental[0].mz)
+        if k < len(selected) and starts[k] <= fit.experimental[-1].mz:
+            continue
+        remaining.append(fit)
+    if not remaining:
+        return selected
+    selected.extend(select_disjoint_fit_intervals(remaining, maximize))
+    selected.sort(key=lambda fit: fit.experimental[0].mz)
+    return selected
+
+
 class ExhaustiveDisjointSolutionSelection(object):  # pragma: no cover
     shard_size = 7
 
@@ -261,6 +383,9 @@ try:
     _ConnectedSubgraph = ConnectedSubgraph
     _FitNode = FitNode
 
-    from ms_deisotope._c.peak_dependency_network.subgraph import ConnectedSubgraph, FitNode
+    _select_disjoint_fit_intervals = select_disjoint_fit_intervals
+
+    from ms_deisotope._c.peak_dependency_network.subgraph import (
+        ConnectedSubgraph, FitNode, select_disjoint_fit_intervals)
 except ImportError:
     has_c = False
@@ -2,6 +2,8 @@ import operator
 import math
 from collections import namedtuple
 
+import numpy as np
+
 from brainpy import mass_charge_ratio, neutral_mass as calc_neutral_mass, PROTON
 
 from ms_peak_picker import simple_peak, PeakSet as FittedPeakSet
@@ -306,18 +308,72 @@ class DeconvolutedPeakSet(Base):
         return binary_search(self.peaks, neutral_mass, tolerance, neutral_mass_getter)
 
     def all_peaks_for(self, neutral_mass, tolerance=1e-5):
-        lo = neutral_mass - neutral_mass * tolerance
-        hi = neutral_mass + neutral_mass * tolerance
+        lo = neutral_mass / (1 + tolerance)
+        hi = neutral_mass / (1 - tolerance)
         lo_peak, lo_err = self.get_nearest_peak(lo)
         hi_peak, hi_err = self.get_nearest_peak(hi)
         lo_ix = lo_peak.index.neutral_mass
-        if abs(ppm_error(lo_peak.neutral_mass, neutral_mass)) > tolerance:
+        if abs(ppm_error(neutral_mass, lo_peak.neutral_mass)) >= tolerance:
             lo_ix += 1
         hi_ix = hi_peak.index.neutral_mass + 1
-        if abs(ppm_error(hi_peak.neutral_mass, neutral_mass)) > tolerance:
+        if abs(ppm_error(neutral_mass, hi_peak.neutral_mass)) >= tolerance:
             hi_ix -= 1
         return self[lo_ix:hi_ix]
 
+    def _mass_column(self, use_mz=False):
+        if self._mz_ordered is None:
+            self.reindex()
+        if use_mz:
+            values = np.array([peak.mz for peak in self._mz_ordered], dtype=np.float64)
+            order = np.array([peak.index.neutral_mass for peak in self._mz_ordered], dtype=np.intp)
+            return values, order
+        return np.array([peak.neutral_mass for peak in self.peaks], dtype=np.float64), None
+
+    def has_peaks(self, neutral_masses, error_tolerance=1e-5, use_mz=False):
+        '''Find the position of the peak that best matches each of ``neutral_masses``
+        within ``error_tolerance`` mass accuracy ppm, as :meth:`has_peak` would.
+
+        Parameters
+        ----------
+        neutral_masses: :class:`np.ndarray`
+            The masses to search for
+        error_tolerance: double
+            The PPM error tolerance to apply
+        use_mz: bool
+            Whether to search using m/z instead of neutral mass
+
+        Returns
+        -------
+        :class:`np.ndarray` of int
+            The position of the matching peak in :attr:`peaks` for each query, or -1
+            where no peak matches
+        '''
+        values, order = self._mass_column(use_mz)
+        indices = nearest_match_indices(values, neutral_masses, error_tolerance)
+        if order is not None:
+            indices = np.where(indices >= 0, order[indices], -1)
+        return indices
+
+    def all_peaks_for_many(self, neutral_masses, tolerance=1e-5):
+        '''Find the positions of all peaks that match each of ``neutral_masses``
+        within ``tolerance`` mass accuracy ppm, as :meth:`all_peaks_for` would.
+
+        Parameters
+        ----------
+        neutral_masses: :class:`np.ndarray`
+            The masses to search for
+        tolerance: double
+            The PPM error tolerance to apply
+
+        Returns
+        -------
+        starts: :class:`np.ndarray` of int
+        ends: :class:`np.ndarray` of int
+            The peaks matching the ``i`` th query are ``peaks[starts[i]:ends[i]]``
+        '''
+        values, _ = self._mass_column()
+        return match_intervals(values, neutral_masses, tolerance)
+
     def __repr__(self):
         return "<DeconvolutedPeakSet %d Peaks>" % (len(self))
 
@@ -368,29 +424,37 @@ class DeconvolutedPeakSet(Base):
         return self.__class__(acc)._reindex()
 
 
-def merge(peaks_a, peaks_b, copy=True):
-    '''Combine two :class:`DeconvolutedPeakSet` objects.
+def merge_peak_sets(peak_sets, copy=True):
+    '''Combine any number of :class:`DeconvolutedPeakSet` objects.
+
+    Each input is already sorted by neutral mass, so sorting their concatenation
+    only has to merge those runs. Inputs which are not peak sets, like lists of
+    peaks, are accepted too.
 
     Parameters
     ----------
-    peaks_a: :class:`DeconvolutedPeakSet`
-    peaks_b: :class:`DeconvolutedPeakSet`
+    peak_sets: :class:`~.Iterable` of :class:`DeconvolutedPeakSet`
     copy: bool
         Whether or not to copy the peaks first. If not,
-        the two input peak sets should not be used again
+        the input peak sets should not be used again
         as their indices will have been corrupted.
 
     Returns
     -------
     :class:`DeconvolutedPeakSet`
+        An instance of the type of the first input if it is a :class:`DeconvolutedPeakSet`
     '''
-    tp = peaks_a.__class__
-    if copy:
-        peaks = tp(
-            tuple(p.clone() for p in peaks_a) +
-            tuple(p.clone() for p in peaks_b))
-    else:
-        peaks = tp(tuple(peaks_a) + tuple(peaks_b))
+    peak_sets = list(peak_sets)
+    tp = DeconvolutedPeakSet
+    if peak_sets and hasattr(peak_sets[0], 'reindex'):
+        tp = peak_sets[0].__class__
+    acc = []
+    for peak_set in peak_sets:
+        if copy:
+            acc.extend(p.clone() for p in peak_set)
+        else:
+            acc.extend(peak_set)
+    peaks = tp(tuple(acc))
     try:
         peaks.reindex()
     except AttributeError:
@@ -398,6 +462,29 @@ def merge(peaks_a, peaks_b, copy=True):
     return peaks
 
 
+def merge(peaks_a, peaks_b, copy=True):
+    '''Combine two :class:`DeconvolutedPeakSet` objects.
+
+    Parameters
+    ----------
+    peaks_a: :class:`DeconvolutedPeakSet`
+    peaks_b: :class:`DeconvolutedPeakSet`
+    copy: bool
+        Whether or not to copy the peaks first. If not,
+        the two input peak sets should not be used again
+        as their indices will have been corrupted.
+
+    Returns
+    -------
+    :class:`DeconvolutedPeakSet`
+
+    See Also
+    --------
+    :func:`merge_peak_sets`
+    '''
+    return merge_peak_sets((peaks_a, peaks_b), copy=copy)
+
+
 mz_getter = operator.attrgetter('mz')
 neutral_mass_getter = operator.attrgetter("neutral_mass")
 
@@ -492,6 +579,91 @@ def binary_search(peak_set, neutral_mass, tolerance, getter=operator.attrgetter(
             lo = mid
 
 
+def nearest_match_indices(values, queries, error_tolerance=1e-5):
+    """Find the position of the value nearest to each of `queries` in the sorted
+    array `values`, if it is within `error_tolerance` PPM error of that value.
+
+    Parameters
+    ----------
+    values : :class:`np.ndarray`
+        The values to search, in ascending order
+    queries : :class:`np.ndarray`
+        The values to search for, in any order
+    error_tolerance : float, optional
+        The PPM error tolerance to apply
+
+    Returns
+    -------
+    :class:`np.ndarray` of int
+        The position of the nearest match in `values` for each query, or -1
+        where there is no match
+    """
+    values = np.asarray(values, dtype=np.float64)
+    queries = np.asarray(queries, dtype=np.float64)
+    n = len(values)
+    indices = np.full(len(queries), -1, dtype=np.intp)
+    if n == 0:
+        return indices
+    i = np.searchsorted(values, queries)
+    lo = np.clip(i - 1, 0, n - 1)
+    hi = np.clip(i, 0, n - 1)
+    lo_error = np.abs(values[lo] - queries)
+    hi_error = np.abs(values[hi] - queries)
+    best = np.where(hi_error < lo_error, hi, lo)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        error = np.minimum(lo_error, hi_error) / np.abs(values[best])
+    hit = error < error_tolerance
+    indices[hit] = best[hit]
+    return indices
+
+
+def match_intervals(values, queries, tolerance=1e-5):
+    """Find the range of positions of the values within `tolerance` PPM error of each
+    of `queries` in the sorted array `values`.
+
+    Parameters
+    ----------
+    values : :class:`np.ndarray`
+        The values to search, in ascending order
+    queries : :class:`np.ndarray`
+        The values to search for, in any order
+    tolerance : float, optional
+        The PPM error tolerance to apply
+
+    Returns
+    -------
+    starts : :class:`np.ndarray` of int
+    ends : :class:`np.ndarray` of int
+        The matches of the ``i`` th query are ``values[starts[i]:ends[i]]``
+    """
+    values = np.asarray(values, dtype=np.float64)
+    queries = np.asarray(queries, dtype=np.float64)
+    n = len(values)
+    starts = np.searchsorted(values, queries / (1 + tolerance), 'left').astype(np.intp)
+    ends = np.searchsorted(values, queries / (1 - tolerance), 'right').astype(np.intp)
+    if n == 0:
+        return starts, ends
+
+    def within(indices):
+        found = values[np.clip(indices, 0, n - 1)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.abs(ppm_error(queries, found)) < tolerance
+
+    # The division above may round a bound to the wrong side of a value
+    # sitting on the edge of the window, so settle the edges with the exact
+    # comparison :meth:`DeconvolutedPeakSet.all_peaks_for` makes.
+    changed = True
+    while changed:
+        step_back = (starts > 0) & within(starts - 1)
+        step_forward = (starts < ends) & (values[np.clip(starts, 0, n - 1)] < queries) & ~within(starts)
+        starts += step_back.astype(np.intp) - step_forward
+        grow = (ends < n) & within(ends)
+        shrink = (ends > starts) & (values[np.clip(ends - 1, 0, n - 1)] > queries) & ~within(ends - 1)
+        ends += grow.astype(np.intp) - shrink
+        changed = step_back.any() or step_forward.any() or grow.any() or shrink.any()
+    return starts, ends
+
+
 try:
     has_c = True
     _Envelope = Envelope
@@ -499,16 +671,593 @@ try:
     _DeconvolutedPeak = DeconvolutedPeak
     _DeconvolutedPeakSolution = DeconvolutedPeakSolution
     _DeconvolutedPeakSet = DeconvolutedPeakSet
+    _nearest_match_indices = nearest_match_indices
+    _match_intervals = match_intervals
+    _merge_peak_sets = merge_peak_sets
 
     from ms_deisotope._c.peak_set import (
         Envelope, _Index, DeconvolutedPeak, DeconvolutedPeakSolution,
-        DeconvolutedPeakSetIndexed as DeconvolutedPeakSet
+        DeconvolutedPeakSetIndexed as DeconvolutedPeakSet,
+        nearest_match_indices, match_intervals, merge_peak_sets
     )
 
 except ImportError:
     has_c = False
 
 
+def _column_property(name):
+    def getter(self):
+        return self._columns[name]
+    return property(getter)
+
+
+class ColumnarDeconvolutedPeakSet(object):
+    """
+    A read-only collection of deconvoluted peaks stored column-wise, holding
+    one contiguous array per peak attribute rather than one :class:`DeconvolutedPeak`
+    per peak.
+
+    Peaks are ordered by `neutral_mass`. The isotopic envelope of each peak is packed
+    into the shared :attr:`envelope_mz` and :attr:`envelope_intensity` arrays, with the
+    envelope of the ``i`` th peak spanning ``envelope_offsets[i]:envelope_offsets[i + 1]``.
+
+    The attribute arrays are read-only views of the stored columns, which may be passed
+    to serializers without copying. :class:`DeconvolutedPeak` objects are only created
+    when they are requested by indexing, iteration or search, and are copies, so changes
+    made to them are not written back. Slicing by neutral mass shares the stored columns
+    with the original collection.
+
+    The :attr:`~.DeconvolutedPeak.fit` of the peaks is not stored.
+
+    Attributes
+    ----------
+    neutral_mass : :class:`np.ndarray` of float64
+    mz : :class:`np.ndarray` of float64
+    intensity : :class:`np.ndarray` of float64
+    charge : :class:`np.ndarray` of int32
+    score : :class:`np.ndarray` of float64
+    signal_to_noise : :class:`np.ndarray` of float64
+    full_width_at_half_max : :class:`np.ndarray` of float64
+    a_to_a2_ratio : :class:`np.ndarray` of float64
+    most_abundant_mass : :class:`np.ndarray` of float64
+    average_mass : :class:`np.ndarray` of float64
+    area : :class:`np.ndarray` of float64
+    chosen_for_msms : :class:`np.ndarray` of bool
+    envelope_offsets : :class:`np.ndarray` of int64
+        The start of each peak's envelope in :attr:`envelope_mz`, followed by the total
+        number of envelope points
+    envelope_mz : :class:`np.ndarray` of float64
+    envelope_intensity : :class:`np.ndarray` of float64
+    """
+
+    #: The per-peak columns, in the order :meth:`__init__` accepts them
+    columns = (
+        "neutral_mass", "intensity", "charge", "mz", "score", "signal_to_noise",
+        "full_width_at_half_max", "a_to_a2_ratio", "most_abundant_mass",
+        "average_mass", "area", "chosen_for_msms",
+    )
+
+    _column_types = {
+        "charge": np.int32,
+        "chosen_for_msms": np.bool_,
+    }
+
+    def __init__(self, neutral_mass, intensity, charge, mz=None, score=None, signal_to_noise=None,
+                 full_width_at_half_max=None, a_to_a2_ratio=None, most_abundant_mass=None,
+                 average_mass=None, area=None, chosen_for_msms=None, envelope_offsets=None,
+                 envelope_mz=None, envelope_intensity=None):
+        neutral_mass = np.array(neutral_mass, dtype=np.float64)
+        n = len(neutral_mass)
+        charge = np.array(charge, dtype=np.int32)
+        if mz is None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mz = np.where(
+                    charge != 0, (neutral_mass + charge * PROTON) / np.abs(charge), neutral_mass)
+        values = {
+            "neutral_mass": neutral_mass,
+            "intensity": intensity,
+            "charge": charge,
+            "mz": mz,
+            "score": score,
+            "signal_to_noise": signal_to_noise,
+            "full_width_at_half_max": full_width_at_half_max,
+            "a_to_a2_ratio": a_to_a2_ratio,
+            "most_abundant_mass": most_abundant_mass,
+            "average_mass": average_mass,
+            "area": area,
+            "chosen_for_msms": chosen_for_msms,
+        }
+        columns = {}
+        for name in self.columns:
+            dtype = self._column_types.get(name, np.float64)
+            value = values[name]
+            if value is None:
+                value = np.zeros(n, dtype=dtype)
+            else:
+                value = np.array(value, dtype=dtype)
+            if value.shape != (n, ):
+                raise ValueError("The %s column has shape %r, expected (%d,)" % (name, value.shape, n))
+            columns[name] = value
+
+        if envelope_offsets is None:
+            envelope_offsets = np.zeros(n + 1, dtype=np.int64)
+            envelope_mz = np.zeros(0, dtype=np.float64)
+            envelope_intensity = np.zeros(0, dtype=np.float64)
+        else:
+            envelope_offsets = np.array(envelope_offsets, dtype=np.int64)
+            envelope_mz = np.array(envelope_mz, dtype=np.float64)
+            envelope_intensity = np.array(envelope_intensity, dtype=np.float64)
+            if envelope_offsets.shape != (n + 1, ) or envelope_offsets[-1] != len(envelope_mz) or (
+                    len(envelope_mz) != len(envelope_intensity)):
+                raise ValueError("The envelope arrays do not describe %d envelopes" % (n, ))
+
+        if n > 1 and np.any(neutral_mass[1:] < neutral_mass[:-1]):
+            order = np.argsort(neutral_mass, kind='mergesort')
+            columns = {name: value[order] for name, value in columns.items()}
+            envelope_offsets, point_index = _gather_envelopes(envelope_offsets, order)
+            envelope_mz = envelope_mz[point_index]
+            envelope_intensity = envelope_intensity[point_index]
+        self._set_columns(columns, envelope_offsets, envelope_mz, envelope_intensity)
+
+    def _set_columns(self, columns, envelope_offsets, envelope_mz, envelope_intensity):
+        for value in columns.values():
+            value.flags.writeable = False
+        envelope_offsets.flags.writeable = False
+        envelope_mz.flags.writeable = False
+        envelope_intensity.flags.writeable = False
+        self._columns = columns
+        self._envelope_offsets = envelope_offsets
+        self._envelope_mz = envelope_mz
+        self._envelope_intensity = envelope_intensity
+        self._mz_order = None
+        self._mz_rank = None
+        return self
+
+    @classmethod
+    def from_peak_set(cls, peaks):
+        """Store the peaks of `peaks` column-wise.
+
+        Parameters
+        ----------
+        peaks : :class:`DeconvolutedPeakSet` or :class:`~.Iterable` of :class:`DeconvolutedPeak`
+
+        Returns
+        -------
+        :class:`ColumnarDeconvolutedPeakSet`
+        """
+        if isinstance(peaks, ColumnarDeconvolutedPeakSet):
+            return peaks.copy()
+        columns, envelope_offsets, envelope_mz, envelope_intensity = deconvoluted_peak_columns(peaks)
+        return cls(envelope_offsets=envelope_offsets, envelope_mz=envelope_mz,
+                   envelope_intensity=envelope_intensity, **columns)
+
+    def to_peak_set(self):
+        """Create a :class:`DeconvolutedPeakSet` holding every peak in this collection.
+
+        Returns
+        -------
+        :class:`DeconvolutedPeakSet`
+        """
+        peak_set = DeconvolutedPeakSet(self._make_peaks(0, len(self)))
+        peak_set.reindex()
+        return peak_set
+
+    neutral_mass = _column_property("neutral_mass")
+    intensity = _column_property("intensity")
+    charge = _column_property("charge")
+    mz = _column_property("mz")
+    score = _column_property("score")
+    signal_to_noise = _column_property("signal_to_noise")
+    full_width_at_half_max = _column_property("full_width_at_half_max")
+    a_to_a2_ratio = _column_property("a_to_a2_ratio")
+    most_abundant_mass = _column_property("most_abundant_mass")
+    average_mass = _column_property("average_mass")
+    area = _column_property("area")
+    chosen_for_msms = _column_property("chosen_for_msms")
+
+    @property
+    def envelope_offsets(self):
+        return self._envelope_offsets - self._envelope_offsets[0]
+
+    @property
+    def envelope_mz(self):
+        return self._envelope_mz[self._envelope_offsets[0]:self._envelope_offsets[-1]]
+
+    @property
+    def envelope_intensity(self):
+        return self._envelope_intensity[self._envelope_offsets[0]:self._envelope_offsets[-1]]
+
+    @property
+    def mz_order(self):
+        """The indices which sort the peaks by m/z.
+
+        Returns
+        -------
+        :class:`np.ndarray` of int
+        """
+        if self._mz_order is None:
+            self._mz_order = np.argsort(self._columns['mz'], kind='mergesort')
+            self._mz_order.flags.writeable = False
+        return self._mz_order
+
+    def _get_mz_rank(self):
+        if self._mz_rank is None:
+            self._mz_rank = np.empty(len(self), dtype=np.intp)
+            self._mz_rank[self.mz_order] = np.arange(len(self))
+        return self._mz_rank
+
+    @property
+    def indexed(self):
+        return True
+
+    def reindex(self):
+        """The peaks are always ordered by neutral mass, so there is nothing to update.
+
+        Returns
+        -------
+        self: ColumnarDeconvolutedPeakSet
+        """
+        return self
+
+    def __len__(self):
+        return len(self._columns['neutral_mass'])
+
+    def __repr__(self):
+        return "<ColumnarDeconvolutedPeakSet %d Peaks>" % (len(self))
+
+    def envelope(self, i):
+        """Create the isotopic envelope of the ``i`` th peak.
+
+        Parameters
+        ----------
+        i : int
+
+        Returns
+        -------
+        :class:`Envelope`
+        """
+        start = self._envelope_offsets[i]
+        end = self._envelope_offsets[i + 1]
+        return Envelope(zip(
+            self._envelope_mz[start:end].tolist(), self._envelope_intensity[start:end].tolist()))
+
+    def _make_peaks(self, start, end, indices=None):
+        if indices is None:
+            indices = np.arange(start, end)
+        columns = {name: value[indices] for name, value in self._columns.items()}
+        offsets = self._envelope_offsets
+        return deconvoluted_peaks_from_columns(
+            columns, offsets[indices], offsets[indices + 1], self._envelope_mz,
+            self._envelope_intensity, indices, self._get_mz_rank()[indices])
+
+    def _make_peak(self, i):
+        return self._make_peaks(0, 0, np.array([i]))[0]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step == 1:
+                return self._view(start, max(start, stop))
+            return self._take(np.arange(start, stop, step))
+        n = len(self)
+        if item < 0:
+            item += n
+        if not 0 <= item < n:
+            raise IndexError(item)
+        return self._make_peak(item)
+
+    def __iter__(self):
+        n = len(self)
+        chunk_size = 256
+        for start in range(0, n, chunk_size):
+            for peak in self._make_peaks(start, min(start + chunk_size, n)):
+                yield peak
+
+    def _view(self, start, end):
+        dup = self.__class__.__new__(self.__class__)
+        return dup._set_columns(
+            {name: value[start:end] for name, value in self._columns.items()},
+            self._envelope_offsets[start:end + 1], self._envelope_mz, self._envelope_intensity)
+
+    def _take(self, indices):
+        dup = self.__class__.__new__(self.__class__)
+        envelope_offsets, point_index = _gather_envelopes(self._envelope_offsets, indices)
+        return dup._set_columns(
+            {name: value[indices] for name, value in self._columns.items()},
+            envelope_offsets, self._envelope_mz[point_index], self._envelope_intensity[point_index])
+
+    def copy(self):
+        """Create a copy of this collection which does not share its columns with it.
+
+        Returns
+        -------
+        :class:`ColumnarDeconvolutedPeakSet`
+        """
+        return self._take(np.arange(len(self)))
+
+    def clone(self):
+        return self.copy()
+
+    def __reduce__(self):
+        columns = self._columns
+        return self.__class__, tuple(columns[name] for name in self.columns) + (
+            self.envelope_offsets, self.envelope_mz, self.envelope_intensity)
+
+    def __eq__(self, other):
+        if isinstance(other, ColumnarDeconvolutedPeakSet):
+            if len(self) != len(other):
+                return False
+            for name in ("neutral_mass", "intensity", "charge", "score"):
+                if not np.array_equal(self._columns[name], other._columns[name]):
+                    return False
+            return True
+        try:
+            return tuple(self) == tuple(other)
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not (self == other)
+
+    def _search(self, value, error_tolerance, use_mz):
+        if use_mz:
+            order = self.mz_order
+            values = self._columns['mz'][order]
+        else:
+            order = None
+            values = self._columns['neutral_mass']
+        lo = np.searchsorted(values, value - value * 2 * error_tolerance, 'left')
+        hi = np.searchsorted(values, value + value * 2 * error_tolerance, 'right')
+        if lo == hi:
+            return None
+        with np.errstate(divide='ignore', invalid='ignore'):
+            errors = np.abs((value - values[lo:hi]) / values[lo:hi])
+        best = np.argmin(errors)
+        if errors[best] >= error_tolerance:
+            return None
+        best += lo
+        if order is not None:
+            best = order[best]
+        return int(best)
+
+    def has_peak(self, neutral_mass, error_tolerance=1e-5, use_mz=False):
+        '''Find the peak that best matches ``neutral_mass`` within ``error_tolerance`` mass accuracy ppm.
+
+        If ``use_mz`` is True, instead of matching neutral masses, match peaks using m/z instead.
+
+        Parameters
+        ----------
+        neutral_mass: double
+            The mass to search for
+        error_tolerance: double
+            The PPM error tolerance to apply
+        use_mz: bool
+            Whether to search using m/z instead of neutral mass
+
+        Returns
+        -------
+        DeconvolutedPeak
+            The found peak, or None if no peak is found
+        '''
+        i = self._search(neutral_mass, error_tolerance, use_mz)
+        if i is None:
+            return None
+        return self._make_peak(i)
+
+    def all_peaks_for(self, neutral_mass, tolerance=1e-5):
+        '''Find all peaks that match ``neutral_mass`` within ``error_tolerance`` mass accuracy ppm.
+
+        Parameters
+        ----------
+        neutral_mass: double
+            The mass to search for
+        error_tolerance: double
+            The PPM error tolerance to apply
+
+        Returns
+        -------
+        tuple of DeconvolutedPeak
+            The found peaks
+        '''
+        starts, ends = match_intervals(self._columns['neutral_mass'], [neutral_mass], tolerance)
+        return tuple(self._make_peaks(starts[0], ends[0]))
+
+    def has_peaks(self, neutral_masses, error_tolerance=1e-5, use_mz=False):
+        '''Find the position of the peak that best matches each of ``neutral_masses``
+        within ``error_tolerance`` mass accuracy ppm, as :meth:`has_peak` would.
+
+        Parameters
+        ----------
+        neutral_masses: :class:`np.ndarray`
+            The masses to search for
+        error_tolerance: double
+            The PPM error tolerance to apply
+        use_mz: bool
+            Whether to search using m/z instead of neutral mass
+
+        Returns
+        -------
+        :class:`np.ndarray` of int
+            The position of the matching peak for each query, or -1 where no peak matches
+        '''
+        if use_mz:
+            order = self.mz_order
+            indices = nearest_match_indices(self._columns['mz'][order], neutral_masses, error_tolerance)
+            return np.where(indices >= 0, order[indices], -1)
+        return nearest_match_indices(self._columns['neutral_mass'], neutral_masses, error_tolerance)
+
+    def all_peaks_for_many(self, neutral_masses, tolerance=1e-5):
+        '''Find the positions of all peaks that match each of ``neutral_masses``
+        within ``tolerance`` mass accuracy ppm, as :meth:`all_peaks_for` would.
+
+        Parameters
+        ----------
+        neutral_masses: :class:`np.ndarray`
+            The masses to search for
+        tolerance: double
+            The PPM error tolerance to apply
+
+        Returns
+        -------
+        starts: :class:`np.ndarray` of int
+        ends: :class:`np.ndarray` of int
+            The peaks matching the ``i`` th query are ``self[starts[i]:ends[i]]``
+        '''
+        return match_intervals(self._columns['neutral_mass'], neutral_masses, tolerance)
+
+    def get_nearest_peak(self, neutral_mass):
+        '''Find the peak nearest to ``neutral_mass``, regardless of error.
+
+        Parameters
+        ----------
+        neutral_mass: double
+            The mass to search for
+
+        Returns
+        -------
+        DeconvolutedPeak
+            The nearest peak
+        double
+            The error between ``neutral_mass`` and the found peak
+        '''
+        values = self._columns['neutral_mass']
+        if len(values) == 0:
+            return None, float('inf')
+        i = np.searchsorted(values, neutral_mass)
+        lo = max(i - 1, 0)
+        hi = min(i + 1, len(values))
+        errors = np.abs(values[lo:hi] - neutral_mass)
+        best = np.argmin(errors)
+        return self._make_peak(lo + best), float(errors[best])
+
+    def between(self, m1, m2, tolerance=1e-5, use_mz=False):
+        """Retrieve a :class:`ColumnarDeconvolutedPeakSet` containing all the peaks
+        whose mass is between ``m1`` and ``m2``.
+
+        If ``use_mz`` is :const:`True` then search by m/z instead of mass
+
+        Parameters
+        ----------
+        m1 : float
+            The lower mass limit
+        m2 : float
+            The upper mass limit
+        use_mz: bool
+            Whether to search for m/z instead of neutral mass
+
+        Returns
+        -------
+        ColumnarDeconvolutedPeakSet
+        """
+        if use_mz:
+            order = self.mz_order
+            values = self._columns['mz'][order]
+            lo = np.searchsorted(values, m1, 'left')
+            hi = np.searchsorted(values, m2, 'right')
+            return self._take(np.sort(order[lo:hi]))
+        values = self._columns['neutral_mass']
+        lo = np.searchsorted(values, m1, 'left')
+        hi = np.searchsorted(values, m2, 'right')
+        return self._view(lo, hi)
+
+    def envelopes_to_array(self, dtype=np.float32):
+        """Pack the isotopic envelopes into the flat array written to the
+        "isotopic envelopes array" of an mzML file, in which each envelope is
+        preceded by a ``(0, 0)`` pair.
+
+        Parameters
+        ----------
+        dtype : :class:`np.dtype`, optional
+            The type of the array. Defaults to :class:`np.float32`
+
+        Returns
+        -------
+        :class:`np.ndarray`
+        """
+        offsets = self.envelope_offsets
+        n = len(self)
+        m = offsets[-1]
+        collection = np.zeros(2 * (n + m), dtype=dtype)
+        points = np.repeat(np.arange(n), np.diff(offsets)) + np.arange(m) + 1
+        collection[2 * points] = self.envelope_mz
+        collection[2 * points + 1] = self.envelope_intensity
+        return collection
+
+
+def _gather_envelopes(envelope_offsets, indices):
+    # Select the envelopes of the peaks at `indices` from CSR-packed envelope
+    # arrays, returning the new offsets and the indices of the selected points
+    starts = envelope_offsets[indices]
+    sizes = envelope_offsets[indices + 1] - starts
+    new_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=new_offsets[1:])
+    point_index = np.repeat(starts - new_offsets[:-1], sizes) + np.arange(new_offsets[-1])
+    return new_offsets, point_index
+
+
+def deconvoluted_peak_columns(peaks):
+    """Copy the attributes and isotopic envelopes of `peaks` into the columns
+    of a :class:`ColumnarDeconvolutedPeakSet`.
+
+    Returns
+    -------
+    columns : dict
+    envelope_offsets : :class:`np.ndarray` of int64
+    envelope_mz : :class:`np.ndarray` of float64
+    envelope_intensity : :class:`np.ndarray` of float64
+    """
+    peaks = list(peaks)
+    columns = {
+        name: [getattr(peak, name) for peak in peaks] for name in ColumnarDeconvolutedPeakSet.columns}
+    envelope_offsets = np.zeros(len(peaks) + 1, dtype=np.int64)
+    envelope_mz = []
+    envelope_intensity = []
+    for i, peak in enumerate(peaks):
+        for point in peak.envelope:
+            envelope_mz.append(point.mz)
+            envelope_intensity.append(point.intensity)
+        envelope_offsets[i + 1] = len(envelope_mz)
+    return columns, envelope_offsets, np.array(envelope_mz), np.array(envelope_intensity)
+
+
+def deconvoluted_peaks_from_columns(columns, envelope_starts, envelope_ends, envelope_mz,
+                                    envelope_intensity, positions, mz_rank):
+    """Create a :class:`DeconvolutedPeak` from each row of `columns`, whose isotopic
+    envelopes span ``envelope_starts[i]:envelope_ends[i]`` of `envelope_mz` and
+    `envelope_intensity`, and whose neutral mass and m/z indices are `positions`
+    and `mz_rank`.
+
+    Returns
+    -------
+    list of :class:`DeconvolutedPeak`
+    """
+    columns = {name: value.tolist() for name, value in columns.items()}
+    envelope_starts = envelope_starts.tolist()
+    envelope_ends = envelope_ends.tolist()
+    positions = positions.tolist()
+    mz_rank = mz_rank.tolist()
+    peaks = []
+    for j, i in enumerate(positions):
+        start = envelope_starts[j]
+        end = envelope_ends[j]
+        envelope = Envelope(zip(envelope_mz[start:end].tolist(), envelope_intensity[start:end].tolist()))
+        peaks.append(DeconvolutedPeak(
+            columns['neutral_mass'][j], columns['intensity'][j], columns['charge'][j],
+            columns['signal_to_noise'][j], _Index(i, mz_rank[j]),
+            columns['full_width_at_half_max'][j], columns['a_to_a2_ratio'][j],
+            columns['most_abundant_mass'][j], columns['average_mass'][j], columns['score'][j],
+            envelope, columns['mz'][j], None, columns['chosen_for_msms'][j], columns['area'][j]))
+    return peaks
+
+
+try:
+    _deconvoluted_peak_columns = deconvoluted_peak_columns
+    _deconvoluted_peaks_from_columns = deconvoluted_peaks_from_columns
+    from ms_deisotope._c.utils import deconvoluted_peak_columns, deconvoluted_peaks_from_columns
+except ImportError:
+    pass
+
+
 def window_peak_set(peak_set, window_size=100.0, peaks_per_window=10):
     lower_bound = math.floor(peak_set[0].neutral_mass / window_size) * window_size
     upper_bound = math.ceil(peak_set[-1].neutral_mass / window_size) * window_size
@@ -36,6 +36,7 @@ with fewer configurable parameters.
     print(bunch)
     print(bunch.precursor.deconvoluted_peak_set)
 '''
+import os
 import logging
 
 from six import string_types as basestring
@@ -46,9 +47,9 @@ from ms_peak_picker import pick_peaks, PeakSet, PeakIndex
 from ms_peak_picker.scan_filter import FTICRBaselineRemoval
 
 from ms_deisotope import constants
-from .averagine import AveragineCache, peptide, PROTON
+from .averagine import AveragineCache, AveragineCacheSnapshot, peptide, PROTON
 from .scoring import PenalizedMSDeconVFitter, MSDeconVFitter
-from .deconvolution import deconvolute_peaks
+from .deconvolution import DeconvolutionEngine, DeconvolutionProfile
 from .data_source import MSFileLoader, ScanIterator
 from .data_source.common import Scan, ScanBunch, ChargeNotProvided
 from .utils import Base
@@ -201,6 +202,193 @@ def _simplify_peak_set(peaks, bin_width=5.0):
     return PeakIndex(np.array([]), np.array([]), subset_peaks)
 
 
+#: The number of patterns a process keeps in memory, least recently used first,
+#: when its :class:`~.AveragineCache` reads from a shared snapshot and no other
+#: bound was given
+AVERAGINE_SNAPSHOT_WORKING_SET = 8192
+
+
+def averagine_snapshot_path(path, index=None):
+    """Get the path of the snapshot for the `index`-th averagine of a list of
+    averagines sharing the snapshot path `path`.
+
+    Parameters
+    ----------
+    path : str
+        The snapshot path given in the deconvolution arguments
+    index : int, optional
+        The position of the averagine in the list, or :const:`None` for a single averagine
+
+    Returns
+    -------
+    str
+    """
+    if index is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return "%s-%d%s" % (root, index, ext)
+
+
+def _load_averagine_snapshot(cache, path):
+    if not os.path.exists(path):
+        return None
+    try:
+        snapshot = AveragineCacheSnapshot(path)
+    except (ValueError, IOError, OSError):
+        return None
+    if snapshot.cache_truncation != cache.cache_truncation:
+        return None
+    if snapshot.base_composition != dict(cache.averagine.base_composition):
+        return None
+    return snapshot
+
+
+def build_averagine_cache(averagine, truncate_after=constants.TRUNCATE_AFTER,
+                          ignore_below=constants.IGNORE_BELOW, charge_range=(1, 8),
+                          charge_carrier=PROTON, snapshot_path=None, max_size=None,
+                          max_bytes=None, processes=1, table_step=None):
+    """Create an :class:`~.AveragineCache` for `averagine` holding the isotopic patterns
+    used by deconvolution with these parameters.
+
+    If `snapshot_path` names an :class:`~.AveragineCacheSnapshot` of the same averagine,
+    patterns are read from it instead of being generated. Otherwise, or if patterns were
+    missing from it, the snapshot is written there, so that every process given the same
+    path shares a single memory-mapped copy of the patterns.
+
+    A cache reading from a snapshot keeps at most :data:`AVERAGINE_SNAPSHOT_WORKING_SET`
+    patterns in memory unless it is bounded by `max_size` or `max_bytes`. A bounded
+    cache without a snapshot is not populated, as it could not keep the patterns, and
+    generates them on demand instead, which can shift envelope fits slightly.
+
+    If `averagine` is already an :class:`~.AveragineCache`, it is populated in place
+    rather than copied, and only patterns it does not hold yet are generated.
+
+    If `table_step` is given, the cache interpolates patterns from an :class:`~.AveragineTable`
+    sampled every `table_step` Daltons instead, see :meth:`~.AveragineCache.use_table`. Only
+    the table's grid is populated, and `snapshot_path`, `max_size` and `max_bytes` are not used.
+
+    Parameters
+    ----------
+    averagine : :class:`~.Averagine` or :class:`~.AveragineCache`
+        The averagine to generate patterns from
+    truncate_after : float, optional
+        The percentage of the signal in the theoretical isotopic pattern to include.
+    ignore_below : float, optional
+        Omit theoretical peaks whose intensity is below this number.
+    charge_range : tuple, optional
+        The range of charge states to generate patterns for
+    charge_carrier : float, optional
+        The mass of the charge carrier. Defaults to the mass of a proton.
+    snapshot_path : str, optional
+        The path of the snapshot to read from and write to
+    max_size : int, optional
+        The maximum number of patterns the cache keeps in memory. See :attr:`~.AveragineCache.max_size`
+    max_bytes : int, optional
+        The approximate maximum number of bytes of patterns the cache keeps in memory.
+        See :attr:`~.AveragineCache.max_bytes`
+    processes : int, optional
+        The number of worker processes to generate missing patterns with. See
+        :meth:`~.AveragineCache.populate`
+    table_step : float, optional
+        The grid spacing in Daltons of the interpolated pattern table to use
+
+    Returns
+    -------
+    :class:`~.AveragineCache`
+    """
+    if table_step:
+        cache = averagine if isinstance(averagine, AveragineCache) else AveragineCache(averagine)
+        cache.use_table(step_size=table_step)
+        cache.populate(
+            min_charge=charge_range[0], max_charge=charge_range[1], charge_carrier=charge_carrier)
+        return cache
+    if isinstance(averagine, AveragineCache):
+        cache = averagine
+        if max_size is not None:
+            cache.max_size = max_size
+        if max_bytes is not None:
+            cache.max_bytes = max_bytes
+    else:
+        cache = AveragineCache(averagine, max_size=max_size, max_bytes=max_bytes)
+    max_size = cache.max_size
+    max_bytes = cache.max_bytes
+    if snapshot_path is None and (max_size or max_bytes):
+        # Populating a bounded cache would only evict most of what it generated
+        return cache
+    snapshot = None
+    if snapshot_path is not None:
+        snapshot = _load_averagine_snapshot(cache, snapshot_path)
+        if snapshot is not None:
+            cache.attach_snapshot(snapshot)
+        # The snapshot must hold every pattern, so populate without evicting
+        cache.max_size = cache.max_bytes = 0
+    cache.populate(
+        truncate_after=truncate_after,
+        ignore_below=ignore_below,
+        min_charge=charge_range[0],
+        max_charge=charge_range[1],
+        charge_carrier=charge_carrier,
+        processes=processes)
+    if snapshot_path is not None:
+        if snapshot is None or len(cache.backend):
+            snapshot = cache.save_snapshot(snapshot_path)
+            cache.attach_snapshot(snapshot)
+        cache.clear()
+        cache.max_size = max_size
+        cache.max_bytes = max_bytes
+    if cache.snapshot is not None and not (cache.max_size or cache.max_bytes):
+        cache.max_size = AVERAGINE_SNAPSHOT_WORKING_SET
+    return cache
+
+
+def prepopulate_averagine_cache(deconvolution_args):
+    """Replace the ``"averagine"`` of `deconvolution_args`, or each averagine if it is
+    a list, with an :class:`~.AveragineCache` built by :func:`build_averagine_cache` from
+    the pattern generation parameters in `deconvolution_args`.
+
+    The ``"averagine_snapshot"`` key is removed from `deconvolution_args` and used as the
+    snapshot path. A list of averagines uses one path per averagine, see
+    :func:`averagine_snapshot_path`. The ``"averagine_cache_max_size"`` and
+    ``"averagine_cache_max_bytes"`` keys are removed too, and bound each cache, as is
+    the ``"averagine_cache_processes"`` key, the number of worker processes to generate
+    patterns with. The ``"averagine_table_step"`` key is removed too, and if set, each
+    cache interpolates its patterns from an :class:`~.AveragineTable` with that grid spacing.
+
+    Parameters
+    ----------
+    deconvolution_args : dict
+        The arguments for :func:`~.deconvolute_peaks`, modified in place
+
+    Returns
+    -------
+    dict
+    """
+    snapshot_path = deconvolution_args.pop('averagine_snapshot', None)
+    max_size = deconvolution_args.pop('averagine_cache_max_size', None)
+    max_bytes = deconvolution_args.pop('averagine_cache_max_bytes', None)
+    processes = deconvolution_args.pop('averagine_cache_processes', 1)
+    table_step = deconvolution_args.pop('averagine_table_step', None)
+    if 'averagine' not in deconvolution_args:
+        return deconvolution_args
+    averagine = deconvolution_args['averagine']
+    params = dict(
+        truncate_after=deconvolution_args.get('truncate_after', constants.TRUNCATE_AFTER),
+        ignore_below=deconvolution_args.get('ignore_below', constants.IGNORE_BELOW),
+        charge_range=deconvolution_args.get('charge_range', (1, 8)),
+        charge_carrier=deconvolution_args.get('charge_carrier', PROTON),
+        max_size=max_size, max_bytes=max_bytes, processes=processes, table_step=table_step)
+    if isinstance(averagine, (list, tuple)):
+        averagine = [
+            build_averagine_cache(
+                a, snapshot_path=averagine_snapshot_path(snapshot_path, i) if snapshot_path else None,
+                **params)
+            for i, a in enumerate(averagine)]
+    else:
+        averagine = build_averagine_cache(averagine, snapshot_path=snapshot_path, **params)
+    deconvolution_args['averagine'] = averagine
+    return deconvolution_args
+
+
 class ScanProcessor(Base, LogUtilsMixin):
     """Orchestrates the deconvolution of a :class:`~.ScanIterator` scan by scan. This process will
     apply different rules for MS1 scans and MSn scans. This type itself mimics a :class:`~.ScanIterator`,
@@ -213,6 +401,25 @@ class ScanProcessor(Base, LogUtilsMixin):
     MSn scan. These are described by :class:`PriorityTarget` objects.
 
     If an averagine-based deconvoluter is used, the averagine cache will be pre-populated.
+    If the deconvolution arguments include an ``averagine_snapshot`` path, or the averagine
+    given is an :class:`~.AveragineCache` loaded with :meth:`~.AveragineCache.from_snapshot`,
+    the memory-mapped snapshot is shared rather than copied, and only patterns missing from it
+    are generated. The ``averagine_cache_max_size`` and ``averagine_cache_max_bytes``
+    arguments bound the number of patterns each cache keeps in memory, and
+    ``averagine_cache_processes`` sets how many processes generate them. The
+    ``averagine_table_step`` argument makes each cache interpolate patterns from an
+    :class:`~.AveragineTable` with that grid spacing in Daltons instead. See
+    :func:`prepopulate_averagine_cache` and :meth:`averagine_cache_statistics`.
+
+    If the deconvolution arguments include a ``time_budget`` or ``work_budget``, scans whose
+    deconvolution exceeds it fall back to cheaper strategies, and are annotated with the
+    strategies used under ``"deconvolution degraded"``.
+
+    If the deconvolution arguments include a ``result_cache``, such as a
+    :class:`~.MemoryDeconvolutionResultCache` or :class:`~.DiskDeconvolutionResultCache`,
+    scans whose centroided peaks and deconvolution arguments match a scan deconvoluted
+    before reuse its deconvoluted peaks. Precursor scans with priority targets are always
+    deconvoluted.
 
     At the moment, MSn assumes only MS2. Until MS3 data become available for testing, this limit
     will remain.
@@ -255,6 +462,18 @@ class ScanProcessor(Base, LogUtilsMixin):
         Whether or not  to stop processing on an error. Defaults to `True`
     ms1_averaging: :class:`int`
         The number of adjacent MS1 scans to average prior to picking peaks.
+    ms1_deconvolution_profile: :class:`~.DeconvolutionProfile`
+        If `profile_deconvolution` was set, the time spent in each phase of deconvolution
+        of all MS1 scans processed so far, otherwise :const:`None`.
+    msn_deconvolution_profile: :class:`~.DeconvolutionProfile`
+        If `profile_deconvolution` was set, the time spent in each phase of deconvolution
+        of all MSn scans processed so far, otherwise :const:`None`.
+    ms1_deconvolution_engine: :class:`~.DeconvolutionEngine`
+        The deconvoluter reused for every MS1 scan, built from :attr:`ms1_deconvolution_args`
+        when the first MS1 scan is deconvoluted.
+    msn_deconvolution_engine: :class:`~.DeconvolutionEngine`
+        The deconvoluter reused for every MSn scan, built from :attr:`msn_deconvolution_args`
+        when the first MSn scan is deconvoluted.
     """
 
     def __init__(self, data_source, ms1_peak_picking_args=None,
@@ -269,7 +488,8 @@ class ScanProcessor(Base, LogUtilsMixin):
                  terminate_on_error=True,
                  ms1_averaging=0,
                  respect_isolation_window=False,
-                 too_many_peaks_threshold=7000):
+                 too_many_peaks_threshold=7000,
+                 profile_deconvolution=False):
         if loader_type is None:
             loader_type = _loader_creator
 
@@ -295,62 +515,80 @@ class ScanProcessor(Base, LogUtilsMixin):
         self._signal_source = self.loader_type(data_source)
         self.envelope_selector = envelope_selector
         self.terminate_on_error = terminate_on_error
+        if profile_deconvolution:
+            self.ms1_deconvolution_profile = DeconvolutionProfile()
+            self.msn_deconvolution_profile = DeconvolutionProfile()
+        else:
+            self.ms1_deconvolution_profile = None
+            self.msn_deconvolution_profile = None
+        self._ms1_deconvolution_engine = None
+        self._msn_deconvolution_engine = None
         self._prepopulate_averagine_cache()
 
+    def _make_deconvolution_engine(self, deconvolution_args, profile):
+        deconvolution_args = dict(deconvolution_args)
+        if profile is not None:
+            deconvolution_args['profile'] = profile
+        return DeconvolutionEngine(**deconvolution_args)
+
+    @property
+    def ms1_deconvolution_engine(self):
+        if self._ms1_deconvolution_engine is None:
+            self._ms1_deconvolution_engine = self._make_deconvolution_engine(
+                self.ms1_deconvolution_args, self.ms1_deconvolution_profile)
+        return self._ms1_deconvolution_engine
+
+    @property
+    def msn_deconvolution_engine(self):
+        if self._msn_deconvolution_engine is None:
+            self._msn_deconvolution_engine = self._make_deconvolution_engine(
+                self.msn_deconvolution_args, self.msn_deconvolution_profile)
+        return self._msn_deconvolution_engine
+
     def _prepopulate_averagine_cache(self):
-        if 'averagine' in self.ms1_deconvolution_args:
-            averagine = self.ms1_deconvolution_args['averagine']
-            ms1_truncate_after = self.ms1_deconvolution_args.get(
-                'truncate_after', constants.TRUNCATE_AFTER)
-            ms1_ignore_below = self.ms1_deconvolution_args.get(
-                'ignore_below', constants.IGNORE_BELOW)
-            ms1_charge_range = self.ms1_deconvolution_args.get('charge_range', (1, 8))
-            ms1_charge_carrier = self.ms1_deconvolution_args.get(
-                'charge_carrier', PROTON)
-            if isinstance(averagine, (list, tuple)):
-                averagine = [
-                    AveragineCache(a).populate(
-                        truncate_after=ms1_truncate_after,
-                        ignore_below=ms1_ignore_below,
-                        min_charge=ms1_charge_range[0],
-                        max_charge=ms1_charge_range[1],
-                        charge_carrier=ms1_charge_carrier)
-                    for a in averagine]
-            else:
-                averagine = AveragineCache(averagine).populate(
-                    truncate_after=ms1_truncate_after,
-                    ignore_below=ms1_ignore_below,
-                    min_charge=ms1_charge_range[0],
-                    max_charge=ms1_charge_range[1],
-                    charge_carrier=ms1_charge_carrier)
-            self.ms1_deconvolution_args['averagine'] = averagine
-        if 'averagine' in self.msn_deconvolution_args:
-            averagine = self.msn_deconvolution_args['averagine']
-            msn_truncate_after = self.msn_deconvolution_args.get(
-                'truncate_after', constants.TRUNCATE_AFTER)
-            msn_ignore_below = self.msn_deconvolution_args.get(
-                'ignore_below', constants.IGNORE_BELOW)
-            msn_charge_range = self.msn_deconvolution_args.get(
-                'charge_range', (1, 8))
-            msn_charge_carrier = self.msn_deconvolution_args.get(
-                'charge_carrier', PROTON)
-            if isinstance(averagine, (list, tuple)):
-                averagine = [
-                    AveragineCache(a).populate(
-                        truncate_after=msn_truncate_after,
-                        ignore_below=msn_ignore_below,
-                        min_charge=msn_charge_range[0],
-                        max_charge=msn_charge_range[1],
-                        charge_carrier=msn_charge_carrier
-                    ) for a in averagine]
-            else:
-                averagine = AveragineCache(averagine).populate(
-                    truncate_after=msn_truncate_after,
-                    ignore_below=msn_ignore_below,
-                    min_charge=msn_charge_range[0],
-                    max_charge=msn_charge_range[1],
-                    charge_carrier=msn_charge_carrier)
-            self.msn_deconvolution_args['averagine'] = averagine
+        prepopulate_averagine_cache(self.ms1_deconvolution_args)
+        prepopulate_averagine_cache(self.msn_deconvolution_args)
+
+    def averagine_cache_statistics(self):
+        """Collect the :meth:`~.AveragineCache.statistics` of the averagine caches
+        used to deconvolute MS1 and MSn scans.
+
+        Returns
+        -------
+        :class:`list` of :class:`tuple`
+            ``(ms level label, averagine cache, statistics)`` for each cache
+        """
+        result = []
+        for label, deconvolution_args in (("MS1", self.ms1_deconvolution_args),
+                                          ("MSn", self.msn_deconvolution_args)):
+            averagines = deconvolution_args.get("averagine")
+            if not isinstance(averagines, (list, tuple)):
+                averagines = [averagines]
+            for averagine in averagines:
+                if hasattr(averagine, "statistics"):
+                    result.append((label, averagine, averagine.statistics()))
+        return result
+
+    def deconvolution_profile_report(self):
+        """Format :attr:`ms1_deconvolution_profile` and :attr:`msn_deconvolution_profile`
+        as a human readable report.
+
+        Returns
+        -------
+        :class:`str`
+        """
+        if self.ms1_deconvolution_profile is None:
+            return "Deconvolution profiling is not enabled"
+        return "MS1 Deconvolution\n%s\n\nMSn Deconvolution\n%s" % (
+            self.ms1_deconvolution_profile.report(),
+            self.msn_deconvolution_profile.report())
+
+    def _annotate_degraded(self, scan, decon_result):
+        if not decon_result.degraded:
+            return
+        degraded = ', '.join(decon_result.degraded)
+        self.log("Deconvolution of %r exceeded its budget, degraded by %s" % (scan.id, degraded))
+        scan.annotations['deconvolution degraded'] = degraded
 
     def _reject_candidate_precursor_peak(self, peak, product_scan):
         isolation = product_scan.isolation_window
@@ -624,16 +862,16 @@ class ScanProcessor(Base, LogUtilsMixin):
         self.log("Deconvoluting Precursor Scan %r" % precursor_scan)
         self.log("Priorities: %r" % priorities)
 
-        ms1_deconvolution_args = self.ms1_deconvolution_args.copy()
+        charge_range = self.ms1_deconvolution_args['charge_range']
 
         if precursor_scan.polarity in (1, -1):
             polarity = precursor_scan.polarity
-            ms1_deconvolution_args['charge_range'] = tuple(
-                polarity * abs(c) for c in ms1_deconvolution_args['charge_range'])
+            charge_range = tuple(
+                polarity * abs(c) for c in charge_range)
         try:
-            decon_result = deconvolute_peaks(
+            decon_result = self.ms1_deconvolution_engine.deconvolute(
                 precursor_scan.peak_set, priority_list=priorities,
-                **ms1_deconvolution_args)
+                charge_range=charge_range)
         except NoIsotopicClustersError as e:
             e.scan_id = precursor_scan.id
             if self.terminate_on_error:
@@ -642,6 +880,7 @@ class ScanProcessor(Base, LogUtilsMixin):
                 self.log("No isotopic clusters found in %r" % precursor_scan.id)
 
         dec_peaks, priority_results = decon_result
+        self._annotate_degraded(precursor_scan, decon_result)
         if decon_result.errors:
             self.error("Errors occurred during deconvolution of %s, %r" % (
                 precursor_scan.id, decon_result.errors))
@@ -743,24 +982,26 @@ class ScanProcessor(Base, LogUtilsMixin):
         """
         self.log("Deconvoluting Product Scan %r" % (product_scan, ))
         precursor_ion = product_scan.precursor_information
-        deconargs = dict(self.msn_deconvolution_args)
+        charge_range = self.msn_deconvolution_args["charge_range"]
         if precursor_ion is not None:
             top_charge_state = precursor_ion.extracted_charge
             if not top_charge_state:
                 top_charge_state = precursor_ion.charge
-            charge_range = list(deconargs.get("charge_range", [1, top_charge_state]))
+            charge_range = list(charge_range)
             if top_charge_state is not None and top_charge_state is not ChargeNotProvided and\
                     top_charge_state != 0 and abs(top_charge_state) < abs(charge_range[1]):
                 charge_range[1] = top_charge_state
-            deconargs["charge_range"] = charge_range
 
         if product_scan.polarity in (-1, 1):
             polarity = product_scan.polarity
-            deconargs["charge_range"] = [
-                polarity * abs(c) for c in deconargs["charge_range"]]
+            charge_range = [
+                polarity * abs(c) for c in charge_range]
 
         try:
-            dec_peaks, _ = deconvolute_peaks(product_scan.peak_set, **deconargs)
+            decon_result = self.msn_deconvolution_engine.deconvolute(
+                product_scan.peak_set, charge_range=charge_range)
+            dec_peaks, _ = decon_result
+            self._annotate_degraded(product_scan, decon_result)
         except NoIsotopicClustersError as e:
             self.log("No Isotopic Clusters found in %r" % product_scan.id)
             e.scan_id = product_scan.id
@@ -4,7 +4,7 @@ import math
 import numpy as np
 import operator
 
-from .utils import Base
+from .utils import Base, overrides_method
 
 eps = 1e-4
 
@@ -95,6 +95,90 @@ class IsotopicFitRecord(object):
             self.score, self.charge, self.npeaks, self.monoisotopic_peak.mz)
 
 
+class IsotopicFitBatch(object):
+    """Many pairs of matched experimental and theoretical peak lists packed
+    into flat arrays so that they can be scored together.
+
+    The peaks of the ith fit are stored in positions ``indptr[i]:indptr[i + 1]``
+    of each peak array, as in a compressed sparse row matrix.
+
+    Attributes
+    ----------
+    indptr : np.ndarray
+        The offsets into the peak arrays where each fit begins, with one more
+        entry than there are fits
+    observed_mz : np.ndarray
+        The m/z of each experimental peak
+    observed_intensity : np.ndarray
+        The intensity of each experimental peak
+    observed_signal_to_noise : np.ndarray
+        The signal-to-noise ratio of each experimental peak
+    expected_mz : np.ndarray
+        The m/z of each theoretical peak
+    expected_intensity : np.ndarray
+        The intensity of each theoretical peak
+    """
+    __slots__ = ["indptr", "observed_mz", "observed_intensity", "observed_signal_to_noise",
+                 "expected_mz", "expected_intensity"]
+
+    def __init__(self, indptr, observed_mz, observed_intensity, observed_signal_to_noise,
+                 expected_mz, expected_intensity):
+        self.indptr = np.asarray(indptr, dtype=np.intp)
+        self.observed_mz = np.asarray(observed_mz, dtype=np.float64)
+        self.observed_intensity = np.asarray(observed_intensity, dtype=np.float64)
+        self.observed_signal_to_noise = np.asarray(observed_signal_to_noise, dtype=np.float64)
+        self.expected_mz = np.asarray(expected_mz, dtype=np.float64)
+        self.expected_intensity = np.asarray(expected_intensity, dtype=np.float64)
+
+    @classmethod
+    def from_peak_lists(cls, observed, expected):
+        """Pack parallel sequences of experimental and theoretical peak lists.
+
+        Parameters
+        ----------
+        observed : list of list of :class:`~.FittedPeak`
+            The experimental peaks of each fit
+        expected : list of list of :class:`~.TheoreticalPeak`
+            The theoretical peaks of each fit, the same length as the matching
+            entry of `observed`
+
+        Returns
+        -------
+        :class:`IsotopicFitBatch`
+        """
+        if len(observed) != len(expected):
+            raise ValueError("Cannot pack %d experimental peak lists with %d theoretical peak lists" % (
+                len(observed), len(expected)))
+        indptr = np.zeros(len(observed) + 1, dtype=np.intp)
+        for i, (obs, theo) in enumerate(zip(observed, expected)):
+            if len(obs) != len(theo):
+                raise ValueError("Fit %d has %d experimental peaks but %d theoretical peaks" % (
+                    i, len(obs), len(theo)))
+            indptr[i + 1] = indptr[i] + len(obs)
+        return cls(
+            indptr,
+            [p.mz for obs in observed for p in obs],
+            [p.intensity for obs in observed for p in obs],
+            [p.signal_to_noise for obs in observed for p in obs],
+            [p.mz for theo in expected for p in theo],
+            [p.intensity for theo in expected for p in theo])
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __repr__(self):
+        return "IsotopicFitBatch(nfits=%d, npeaks=%d)" % (len(self), self.indptr[-1])
+
+
+def _segment_sum(values, indptr):
+    starts = indptr[:-1]
+    totals = np.zeros(len(starts))
+    nonempty = indptr[1:] > starts
+    if nonempty.any():
+        totals[nonempty] = np.add.reduceat(values, starts[nonempty])
+    return totals
+
+
 class FitSelectorBase(Base):
     """An object that controls the filtering and
     selection of IsotopicFitRecord
@@ -125,6 +209,16 @@ class FitSelectorBase(Base):
     def is_maximizing(self):
         return False
 
+    def fingerprint(self):
+        """Describe the parameters of this selector, as used by
+        :func:`~.deconvolution_cache_key`.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, self.minimum_score)
+
 
 class MinimizeFitSelector(FitSelectorBase):
     """A FitSelector which tries to minimize the score of the best fit.
@@ -254,6 +348,77 @@ class IsotopicFitterBase(Base):
     def _evaluate(self, peaklist, observed, expected, **kwargs):
         return self.evaluate(peaklist, observed, expected, **kwargs)
 
+    def evaluate_batch(self, peaklist, observed, expected):
+        """Evaluate many pairs of peak lists for goodness-of-fit at once.
+
+        Fitters which support :meth:`evaluate_packed` pack the pairs into an
+        :class:`IsotopicFitBatch` and score them together, otherwise each pair
+        is passed to :meth:`evaluate` in turn.
+
+        Parameters
+        ----------
+        peaklist : :class:`~.PeakSet`
+            The full set of all experimental peaks
+        observed : list
+            The list of experimental peak lists of each fit
+        expected : list
+            The list of theoretical peak lists of each fit
+
+        Returns
+        -------
+        np.ndarray
+            The score of each fit
+        """
+        return np.array([self.evaluate(peaklist, obs, theo) for obs, theo in zip(observed, expected)],
+                        dtype=np.float64)
+
+    def evaluate_packed(self, peaklist, batch):
+        """Evaluate every fit in an :class:`IsotopicFitBatch`.
+
+        Parameters
+        ----------
+        peaklist : :class:`~.PeakSet`
+            The full set of all experimental peaks
+        batch : :class:`IsotopicFitBatch`
+            The packed experimental and theoretical peaks of each fit
+
+        Returns
+        -------
+        np.ndarray
+            The score of each fit
+        """
+        raise NotImplementedError("%s does not support packed evaluation" % (self.__class__.__name__, ))
+
+    def supports_packed_evaluation(self):
+        """Whether or not :meth:`evaluate_packed` is implemented by this fitter
+
+        Returns
+        -------
+        bool
+        """
+        return False
+
+    def best_possible_score(self, observed):
+        """An optimistic bound on the score of any theoretical isotopic pattern
+        matched against `observed`, which lets fits that :meth:`reject_score` would
+        reject be discarded before they are scaled and scored.
+
+        Fitters which cannot bound their score return positive infinity when
+        maximizing and negative infinity when minimizing, so nothing is discarded.
+
+        Parameters
+        ----------
+        observed : list
+            The list of experimental peaks that are part of the fit
+
+        Returns
+        -------
+        float
+        """
+        if self.is_maximizing():
+            return float('inf')
+        return -float('inf')
+
     def __call__(self, *args, **kwargs):
         """Invokes :meth:`evaluate`
 
@@ -285,6 +450,20 @@ class IsotopicFitterBase(Base):
         """
         return self.select.reject(fit)
 
+    def reject_score(self, score):
+        """Test whether a fit with this score is too poor to be used
+
+        Parameters
+        ----------
+        score : float
+            The score to test
+
+        Returns
+        -------
+        bool
+        """
+        return self.select.reject_score(score)
+
     def is_maximizing(self):
         """Whether or not this fitter's score gets better as it grows
 
@@ -298,6 +477,16 @@ class IsotopicFitterBase(Base):
     def configure(self, deconvoluter, **kwargs):
         return self
 
+    def fingerprint(self):
+        """Describe the parameters which determine the scores this fitter produces,
+        as used by :func:`~.deconvolution_cache_key`.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.__class__.__name__, vars(self))
+
 
 class GTestFitter(IsotopicFitterBase):
     r"""Evaluate an isotopic fit using a G-test
@@ -339,6 +528,24 @@ class ScaledGTestFitter(IsotopicFitterBase):
             normalized_observed, normalized_expected)])
         return g_score
 
+    def evaluate_batch(self, peaklist, observed, expected):
+        if not self.supports_packed_evaluation():
+            return IsotopicFitterBase.evaluate_batch(self, peaklist, observed, expected)
+        return self.evaluate_packed(peaklist, IsotopicFitBatch.from_peak_lists(observed, expected))
+
+    def supports_packed_evaluation(self):
+        # The packed form would bypass a subclass's own evaluate
+        return not overrides_method(self, "evaluate", "evaluate_packed")
+
+    def evaluate_packed(self, peaklist, batch):
+        sizes = np.diff(batch.indptr)
+        total_observed = _segment_sum(batch.observed_intensity, batch.indptr)
+        total_expected = _segment_sum(batch.expected_intensity, batch.indptr) + eps
+        normalized_observed = batch.observed_intensity / np.repeat(total_observed, sizes)
+        normalized_expected = batch.expected_intensity / np.repeat(total_expected, sizes)
+        return 2 * _segment_sum(
+            normalized_observed * np.log(normalized_observed / normalized_expected), batch.indptr)
+
 
 g_test_scaled = ScaledGTestFitter()
 
@@ -449,6 +656,63 @@ class MSDeconVFitter(IsotopicFitterBase):
             score += inc
         return score
 
+    def best_possible_score(self, observed):
+        # Each peak contributes at most the square root of its observed intensity, which
+        # is reached when the theoretical intensity matches it exactly. The bound is
+        # padded slightly so that rounding cannot make it smaller than a real score.
+        bound = 0
+        for obs in observed:
+            if obs.signal_to_noise < 1:
+                continue
+            if obs.intensity <= 0:
+                return float('inf')
+            bound += np.sqrt(obs.intensity)
+        return bound * (1 + 1e-9)
+
+    def score_packed_peaks(self, batch, mass_error_tolerance=0.02, minimum_signal_to_noise=1):
+        """Compute :meth:`score_peak` for every pair of peaks in an :class:`IsotopicFitBatch`.
+
+        Parameters
+        ----------
+        batch : :class:`IsotopicFitBatch`
+            The packed peaks to score
+        mass_error_tolerance : float, optional
+            The m/z error tolerance
+        minimum_signal_to_noise : float, optional
+            The signal-to-noise ratio an experimental peak must reach to contribute
+
+        Returns
+        -------
+        np.ndarray
+            The score of each peak pair
+        """
+        obs = batch.observed_intensity
+        theo = batch.expected_intensity
+        mass_error = np.abs(batch.observed_mz - batch.expected_mz)
+        mass_accuracy = np.where(mass_error <= mass_error_tolerance, 1 - mass_error / mass_error_tolerance, 0.)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deficit = (theo - obs) / obs
+        abundance_diff = np.zeros_like(obs)
+        mask = (obs < theo) & (deficit <= 1)
+        abundance_diff[mask] = 1 - deficit[mask]
+        mask = (obs >= theo) & (-deficit <= 1)
+        abundance_diff[mask] = np.sqrt(1 + deficit[mask])
+        score = np.sqrt(theo) * mass_accuracy * abundance_diff
+        score[batch.observed_signal_to_noise < minimum_signal_to_noise] = 0.
+        return score
+
+    def evaluate_batch(self, peaklist, observed, expected):
+        if not self.supports_packed_evaluation():
+            return IsotopicFitterBase.evaluate_batch(self, peaklist, observed, expected)
+        return self.evaluate_packed(peaklist, IsotopicFitBatch.from_peak_lists(observed, expected))
+
+    def supports_packed_evaluation(self):
+        # The packed form would bypass a subclass's own evaluate
+        return not overrides_method(self, "evaluate", "evaluate_packed")
+
+    def evaluate_packed(self, peaklist, batch):
+        return _segment_sum(self.score_packed_peaks(batch, self.mass_error_tolerance, 1), batch.indptr)
+
 
 class PenalizedMSDeconVFitter(IsotopicFitterBase):
     r'''An Isotopic Fitter which uses the :class:`MSDeconVFitter` score
@@ -471,6 +735,27 @@ class PenalizedMSDeconVFitter(IsotopicFitterBase):
         penalty = abs(self.penalizer.evaluate(peaklist, observed, expected))
         return score * (1 - penalty * self.penalty_factor)
 
+    def best_possible_score(self, observed):
+        # The penalty can only lower the MSDeconV score when it is scaled by a
+        # non-negative factor
+        if self.penalty_factor < 0:
+            return float('inf')
+        return self.msdeconv.best_possible_score(observed)
+
+    def evaluate_batch(self, peaklist, observed, expected):
+        if not self.supports_packed_evaluation():
+            return IsotopicFitterBase.evaluate_batch(self, peaklist, observed, expected)
+        return self.evaluate_packed(peaklist, IsotopicFitBatch.from_peak_lists(observed, expected))
+
+    def supports_packed_evaluation(self):
+        # The packed form would bypass a subclass's own evaluate
+        return not overrides_method(self, "evaluate", "evaluate_packed")
+
+    def evaluate_packed(self, peaklist, batch):
+        score = self.msdeconv.evaluate_packed(peaklist, batch)
+        penalty = np.abs(self.penalizer.evaluate_packed(peaklist, batch))
+        return score * (1 - penalty * self.penalty_factor)
+
 
 def decon2ls_chisqr_test(peaklist, observed, expected, **kwargs):
     fit_total = 0
@@ -525,6 +810,11 @@ class DistinctPatternFitter(IsotopicFitterBase):
         self.peak_count_scale = peak_count_scale
         self.domain_scale = domain_scale
 
+    def fingerprint(self):
+        # The interference detector is built from the spectrum being scored
+        return (self.__class__.__name__, self.select, self.g_test_scaled, self.peak_count_scale,
+                self.domain_scale)
+
     def evaluate(self, peaklist, experimental, theoretical, **kwargs):
         npeaks = float(len(experimental))
         if self.interference_detector is None:
@@ -556,6 +846,18 @@ class DotProductFitter(IsotopicFitterBase):
             total += e.intensity * t.intensity
         return total
 
+    def evaluate_batch(self, peaklist, observed, expected):
+        if not self.supports_packed_evaluation():
+            return IsotopicFitterBase.evaluate_batch(self, peaklist, observed, expected)
+        return self.evaluate_packed(peaklist, IsotopicFitBatch.from_peak_lists(observed, expected))
+
+    def supports_packed_evaluation(self):
+        # The packed form would bypass a subclass's own evaluate
+        return not overrides_method(self, "evaluate", "evaluate_packed")
+
+    def evaluate_packed(self, peaklist, batch):
+        return _segment_sum(batch.observed_intensity * batch.expected_intensity, batch.indptr)
+
 
 try:
     _has_c = True
@@ -566,11 +868,12 @@ try:
     _PenalizedMSDeconVFitter = PenalizedMSDeconVFitter
     _DistinctPatternFitter = DistinctPatternFitter
     _DotProductFitter = DotProductFitter
+    _IsotopicFitBatch = IsotopicFitBatch
 
     from ._c.scoring import (
         IsotopicFitRecord, LeastSquaresFitter, MSDeconVFitter,
         ScaledGTestFitter, PenalizedMSDeconVFitter, DistinctPatternFitter,
-        DotProductFitter)
+        DotProductFitter, IsotopicFitBatch)
 except ImportError as e:
     _has_c = False
 
@@ -1,10 +1,16 @@
+import os
+import pickle
+import tempfile
 import unittest
 
+import numpy as np
+
 from ms_deisotope.averagine import (
     peptide, calculate_mass, average_compositions,
     _Averagine, Averagine, add_compositions,
     AveragineCache, _AveragineCache, TheoreticalIsotopicPattern,
-    _TheoreticalIsotopicPattern, BasePeakToMonoisotopicOffsetEstimator)
+    _TheoreticalIsotopicPattern, BasePeakToMonoisotopicOffsetEstimator,
+    AveragineCacheSnapshot, AveragineTable, _AveragineTable)
 
 
 tid1 = [
@@ -62,6 +68,201 @@ TestAveragineCache = make_averagine_suite(AveragineCache)
 TestPurePythonAveragineCache = make_averagine_suite(_AveragineCache)
 
 
+def make_averagine_cache_snapshot_suite(cache_class):
+
+    class TestAveragineCacheSnapshot(unittest.TestCase):
+        def setUp(self):
+            handle, self.path = tempfile.mkstemp(suffix='.avgcache')
+            os.close(handle)
+
+        def tearDown(self):
+            os.remove(self.path)
+
+        def test_round_trip(self):
+            cache = cache_class(composition).populate(min_mz=900, max_mz=1010, max_charge=4)
+            snapshot = cache.save_snapshot(self.path)
+            self.assertEqual(len(snapshot), len(cache.backend))
+
+            loaded = cache_class.from_snapshot(self.path)
+            self.assertEqual(len(loaded.backend), 0)
+            self.assertEqual(dict(loaded.averagine), dict(cache.averagine))
+            for mz, charge in [(1000.2, 1), (950.0, 2), (1004.7, 3)]:
+                expected = cache.isotopic_cluster(mz, charge)
+                observed = loaded.isotopic_cluster(mz, charge)
+                self.assertEqual(len(expected), len(observed))
+                self.assertAlmostEqual(expected.origin, observed.origin)
+                for a, b in zip(expected, observed):
+                    self.assertAlmostEqual(a.mz, b.mz)
+                    self.assertAlmostEqual(a.intensity, b.intensity)
+                    self.assertEqual(a.charge, b.charge)
+            # Patterns served by the snapshot are not copied into an unbounded backend
+            self.assertEqual(len(loaded.backend), 0)
+            self.assertEqual(loaded.hits, 3)
+
+            loaded.populate(min_mz=900, max_mz=1010, max_charge=4)
+            self.assertEqual(len(loaded.backend), 0)
+            self.assertEqual(loaded.misses, 0)
+
+            bounded = cache_class(composition, snapshot=self.path, max_size=2)
+            for mz, charge in [(1000.2, 1), (950.0, 2), (1004.7, 3)]:
+                bounded.isotopic_cluster(mz, charge)
+            self.assertEqual(len(bounded.backend), 2)
+            self.assertEqual(bounded.misses, 0)
+
+        def test_pickle_by_reference(self):
+            snapshot = cache_class(composition).populate(
+                min_mz=900, max_mz=910).save_snapshot(self.path)
+            loaded = pickle.loads(pickle.dumps(snapshot, -1))
+            self.assertIsInstance(loaded, AveragineCacheSnapshot)
+            self.assertEqual(loaded.path, self.path)
+            self.assertEqual(len(loaded), 70)
+
+    return TestAveragineCacheSnapshot
+
+
+TestAveragineCacheSnapshot = make_averagine_cache_snapshot_suite(AveragineCache)
+TestPurePythonAveragineCacheSnapshot = make_averagine_cache_snapshot_suite(_AveragineCache)
+
+
+def make_bounded_averagine_cache_suite(cache_class):
+
+    class TestBoundedAveragineCache(unittest.TestCase):
+        def test_max_size(self):
+            cache = cache_class(composition, max_size=3)
+            for mz in [1000., 1001., 1002.]:
+                cache.isotopic_cluster(mz, 1)
+            # Touch the oldest entry so the next insertion evicts 1001 instead
+            cache.isotopic_cluster(1000., 1)
+            cache.isotopic_cluster(1003., 1)
+            self.assertEqual(len(cache.backend), 3)
+            self.assertEqual(cache.evictions, 1)
+            self.assertEqual(sorted(k[0] for k in cache.backend), [1000., 1002., 1003.])
+            self.assertEqual(cache.hits, 1)
+            self.assertEqual(cache.misses, 4)
+            self.assertGreater(cache.generation_time, 0)
+            stats = cache.statistics()
+            self.assertAlmostEqual(stats['hit_rate'], 0.2)
+            cache.reset_statistics()
+            self.assertEqual(cache.statistics()['hits'], 0)
+
+        def test_max_bytes(self):
+            cache = cache_class(composition, max_bytes=1)
+            cache.populate(min_mz=900, max_mz=910, max_charge=3)
+            self.assertEqual(len(cache.backend), 1)
+            self.assertEqual(cache.misses, 20)
+            self.assertEqual(cache.evictions, 19)
+
+            cache = cache_class(composition, max_bytes=10 ** 9)
+            cache.populate(min_mz=900, max_mz=910, max_charge=3)
+            self.assertEqual(cache.evictions, 0)
+            self.assertGreater(cache.current_bytes, 0)
+            cache.clear()
+            self.assertEqual(cache.current_bytes, 0)
+
+        def test_incremental_populate(self):
+            cache = cache_class(composition)
+            cache.populate(min_mz=900, max_mz=910, max_charge=3)
+            self.assertEqual(cache.misses, 20)
+            cache.populate(min_mz=900, max_mz=915, max_charge=4)
+            self.assertEqual(len(cache.backend), 45)
+            self.assertEqual(cache.misses, 45)
+
+        def test_parallel_populate(self):
+            serial = cache_class(composition).populate(min_mz=900, max_mz=920, max_charge=4)
+            parallel = cache_class(composition).populate(
+                min_mz=900, max_mz=920, max_charge=4, processes=2)
+            self.assertEqual(set(serial.backend), set(parallel.backend))
+            for key, tid in serial.backend.items():
+                other = parallel.backend[key]
+                self.assertAlmostEqual(tid.origin, other.origin)
+                for a, b in zip(tid, other):
+                    self.assertAlmostEqual(a.mz, b.mz)
+                    self.assertAlmostEqual(a.intensity, b.intensity)
+
+        def test_unbounded(self):
+            cache = cache_class(composition)
+            cache.populate(min_mz=900, max_mz=910, max_charge=3)
+            self.assertEqual(len(cache.backend), 20)
+            self.assertEqual(cache.evictions, 0)
+            self.assertEqual(cache.current_bytes, 0)
+
+    return TestBoundedAveragineCache
+
+
+TestBoundedAveragineCache = make_bounded_averagine_cache_suite(AveragineCache)
+TestPurePythonBoundedAveragineCache = make_bounded_averagine_cache_suite(_AveragineCache)
+
+
+def make_averagine_table_suite(table_class, cache_class):
+
+    class TestAveragineTable(unittest.TestCase):
+        def test_interpolation(self):
+            table = table_class(composition, 10.0)
+            rng = np.random.RandomState(3)
+            cases = [(1000.3, 1), (800.25, 3), (1200.7, 12), (912.1, -2)]
+            cases.extend(zip(rng.uniform(200, 2000, 300), rng.randint(1, 12, 300)))
+            for mz, charge in cases:
+                for truncate_after in (0.95, 0.8):
+                    expected = peptide.isotopic_cluster(
+                        mz, charge, truncate_after=truncate_after, ignore_below=0.0)
+                    observed = table.isotopic_cluster(
+                        mz, charge, truncate_after=truncate_after, ignore_below=0.0)
+                    self.assertAlmostEqual(observed.monoisotopic_mz, mz)
+                    if len(expected) != len(observed):
+                        # Only when the exact pattern reaches `truncate_after` within the
+                        # interpolation error of the peak it is truncated after
+                        self.assertEqual(abs(len(expected) - len(observed)), 1)
+                        kept = min(len(expected), len(observed))
+                        expected = peptide.isotopic_cluster(mz, charge, truncate_after=1.0, ignore_below=0.0)
+                        cumulative = np.cumsum([p.intensity for p in expected])
+                        cumulative /= cumulative[-1]
+                        self.assertLess(abs(cumulative[kept - 1] - truncate_after), 2e-3)
+                        # The untruncated patterns still agree over the peaks either one kept
+                        expected = expected[:kept + 1]
+                        observed = table.isotopic_cluster(
+                            mz, charge, truncate_after=1.0, ignore_below=0.0)[:kept + 1]
+                    for a, b in zip(expected, observed):
+                        self.assertAlmostEqual(a.mz, b.mz, delta=1e-3)
+                        self.assertAlmostEqual(a.intensity, b.intensity, delta=0.01)
+                        self.assertEqual(a.charge, b.charge)
+            self.assertGreater(len(table), 0)
+
+        def test_below_grid(self):
+            table = table_class(composition, 100.0)
+            expected = peptide.isotopic_cluster(50.0, 1)
+            observed = table.isotopic_cluster(50.0, 1)
+            self.assertEqual(len(expected), len(observed))
+            self.assertEqual(len(table), 0)
+
+        def test_cache_uses_table(self):
+            cache = cache_class(composition).use_table(table_class(composition, 10.0))
+            for charge in range(1, 30):
+                cache.isotopic_cluster(1000.0, charge)
+            self.assertEqual(len(cache.backend), 0)
+            # Each new charge state reaches past the grid generated so far
+            self.assertEqual((cache.hits, cache.misses), (0, 29))
+            self.assertGreater(cache.generation_time, 0)
+            for charge in range(1, 30):
+                cache.isotopic_cluster(1001.0, charge)
+            self.assertEqual((cache.hits, cache.misses), (28, 30))
+            cache.isotopic_cluster(5.0, 1)
+            self.assertEqual(cache.misses, 31)
+
+            cache = cache_class(composition).use_table(table_class(composition, 10.0))
+            cache.populate(max_mz=1000, max_charge=4)
+            self.assertEqual(len(cache.table), 400)
+            self.assertEqual(cache.misses, 400)
+            cache.isotopic_cluster(999.0, 4)
+            self.assertEqual(cache.statistics()['hits'], 1)
+            self.assertIsNone(cache.use_table(False).table)
+
+    return TestAveragineTable
+
+
+TestAveragineTable = make_averagine_table_suite(AveragineTable, AveragineCache)
+TestPurePythonAveragineTable = make_averagine_table_suite(_AveragineTable, _AveragineCache)
+
+
 class TestSupportMethods(unittest.TestCase):
     def test_average_composition(self):
         avgd = average_compositions([composition, composition])
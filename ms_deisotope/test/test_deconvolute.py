@@ -1,20 +1,31 @@
+import os
+import shutil
 import unittest
 import logging
+import tempfile
+
 import numpy as np
 
 import brainpy
 
 from ms_deisotope.data_source import common, mzml, MSFileLoader
-from ms_deisotope.averagine import peptide, glycopeptide, TheoreticalIsotopicPattern
-from ms_peak_picker import reprofile
+from ms_deisotope.averagine import (
+    peptide, glycopeptide, glycan, TheoreticalIsotopicPattern, AveragineCache, isotopic_shift)
+from ms_peak_picker import reprofile, FittedPeak
 from ms_deisotope.deconvolution import (
     deconvolute_peaks, AveragineDeconvoluter,
     AveraginePeakDependenceGraphDeconvoluter,
+    MultiAveraginePeakDependenceGraphDeconvoluter,
     CompositionListDeconvoluter,
     CompositionListPeakDependenceGraphDeconvoluter,
+    CompositionPatternStore, composition_hash, CompositionIndex,
     count_placeholders, drop_placeholders,
-    ChargeIterator)
-from ms_deisotope.scoring import PenalizedMSDeconVFitter, MSDeconVFitter
+    ChargeIterator, quick_charge, quick_charge_table,
+    PeakSetArrays, prepare_peaklist, DeconvolutionProfile, DeconvolutionEngine,
+    MemoryDeconvolutionResultCache, DiskDeconvolutionResultCache)
+from ms_deisotope.deconvolution.hybrid import HybridAveragineCompositionListPeakDependenceGraphDeconvoluter
+from ms_deisotope.scoring import PenalizedMSDeconVFitter, MSDeconVFitter, IsotopicFitRecord
+from ms_deisotope.peak_dependency_network import select_disjoint_fit_intervals
 from brainpy import neutral_mass
 
 from ms_deisotope.test.test_scan import (
@@ -55,6 +66,110 @@ class TestAveragineDeconvolution(unittest.TestCase):
         states = list(charge_states)
         self.assertEqual(states, [1, 3])
 
+    def test_quick_charge_table(self):
+        scan = self.make_scan()
+        rng = np.random.RandomState(1)
+        mzs = np.sort(rng.uniform(200, 260, 1500))
+        random_peaks = prepare_peaklist(zip(mzs, rng.uniform(10, 1000, 1500)))
+        for peaks in (scan.peak_set, random_peaks):
+            indptr, charges = quick_charge_table(peaks, 1, 8)
+            self.assertEqual(len(indptr), len(peaks) + 1)
+            for i in range(len(peaks)):
+                expected = quick_charge(peaks, i, 1, 8)
+                self.assertEqual(charges[indptr[i]:indptr[i + 1]].tolist(), list(expected))
+        peaks = scan.peak_set
+        indptr, charges = quick_charge_table(peaks, 1, 8)
+        charge_states = ChargeIterator(1, 8)
+        self.assertTrue(charge_states.sequence_from_quickcharge_table((1, 8, indptr, charges), peaks[0]))
+        self.assertEqual(list(charge_states), [1, 3])
+        charge_states = ChargeIterator(1, 5)
+        self.assertFalse(charge_states.sequence_from_quickcharge_table((1, 8, indptr, charges), peaks[0]))
+        config = {
+            "averagine": peptide,
+            "scorer": PenalizedMSDeconVFitter(5., 1.),
+            "use_quick_charge": True
+        }
+
+        class PerPeakQuickChargeDeconvoluter(AveraginePeakDependenceGraphDeconvoluter):
+            def _build_quick_charge_table(self, charge_range=(1, 8)):
+                pass
+
+        deconvoluter = AveraginePeakDependenceGraphDeconvoluter(peaks, **config)
+        dpeaks = deconvoluter.deconvolute()
+        self.assertIsNotNone(deconvoluter._quick_charge_table)
+        reference = PerPeakQuickChargeDeconvoluter(peaks, **config).deconvolute()
+        self.assertEqual(len(dpeaks), len(reference))
+        for a, b in zip(dpeaks, reference):
+            self.assertAlmostEqual(a.neutral_mass, b.neutral_mass)
+
+    def test_quick_charge_table_subtraction(self):
+        reader = MSFileLoader(datafile("three_test_scans.mzML"))
+        scan = reader.next().precursor
+        scan.pick_peaks()
+
+        class PerPeakQuickChargeDeconvoluter(AveraginePeakDependenceGraphDeconvoluter):
+            def _build_quick_charge_table(self, charge_range=(1, 8)):
+                pass
+
+        config = {
+            "averagine": peptide,
+            "scorer": PenalizedMSDeconVFitter(20., 2.),
+            "use_quick_charge": True,
+        }
+        # A single subtracting pass would make most rows stale before reading them
+        deconvoluter = AveragineDeconvoluter(scan.peak_set.clone(), use_subtraction=True, **config)
+        deconvoluter.deconvolute()
+        self.assertIsNone(deconvoluter._quick_charge_table)
+
+        deconvoluter = AveraginePeakDependenceGraphDeconvoluter(scan.peak_set.clone(), **config)
+        built = []
+        build = deconvoluter._build_quick_charge_table
+        deconvoluter._build_quick_charge_table = lambda charge_range: built.append(build(charge_range))
+        dpeaks = deconvoluter.deconvolute()
+        # The table is built once and subtraction only invalidates the rows of the peaks it changed
+        self.assertEqual(len(built), 1)
+        self.assertIsNotNone(deconvoluter._quick_charge_table)
+        stale = deconvoluter._quick_charge_stale
+        self.assertGreater(stale.sum(), 0)
+        self.assertLess(stale.sum(), len(stale))
+        reference = PerPeakQuickChargeDeconvoluter(scan.peak_set.clone(), **config).deconvolute()
+        self.assertEqual(len(dpeaks), len(reference))
+        for a, b in zip(dpeaks, reference):
+            self.assertAlmostEqual(a.neutral_mass, b.neutral_mass)
+            self.assertEqual(a.charge, b.charge)
+
+    def test_peak_arrays(self):
+        scan = self.make_scan()
+        peaks = scan.peak_set.peaks
+        arrays = PeakSetArrays(peaks)
+        self.assertEqual(len(arrays), len(peaks))
+        rng = np.random.RandomState(1)
+        queries = [p.mz * (1 + e) for p in peaks for e in rng.uniform(-3e-5, 3e-5, 5)]
+        for mz in queries:
+            i = arrays.has_peak(mz, 2e-5)
+            match = peaks.has_peak(mz, 2e-5)
+            if match is None:
+                self.assertEqual(i, -1)
+            else:
+                self.assertIs(arrays[i], match)
+        start, stop = arrays.between_bounds(peaks[2].mz, peaks[5].mz)
+        self.assertEqual((start, stop), (2, 6))
+        for algorithm_type, config in [
+                (AveragineDeconvoluter, {"use_subtraction": True}),
+                (AveraginePeakDependenceGraphDeconvoluter, {})]:
+            config.update({"averagine": peptide, "scorer": PenalizedMSDeconVFitter(5., 1.)})
+            reference = deconvolute_peaks(
+                scan.peak_set.clone(), config, deconvoluter_type=algorithm_type).peak_set
+            config['use_peak_arrays'] = True
+            result = deconvolute_peaks(
+                scan.peak_set.clone(), config, deconvoluter_type=algorithm_type)
+            self.assertIsNotNone(result.deconvoluter._peak_arrays)
+            dpeaks = result.peak_set
+            self.assertEqual(len(dpeaks), len(reference))
+            for a, b in zip(dpeaks, reference):
+                self.assertAlmostEqual(a.neutral_mass, b.neutral_mass)
+                self.assertAlmostEqual(a.score, b.score)
+
     def test_deconvolution(self):
         scan = self.make_scan()
         algorithm_type = AveragineDeconvoluter
@@ -91,6 +206,369 @@ class TestAveragineDeconvolution(unittest.TestCase):
                 deconvoluter.peak_dependency_network.find_solution_for(fp).mz,
                 peak.mz, 3)
 
+    def test_graph_clusters(self):
+        scan = self.make_scan()
+        scan.pick_peaks()
+        deconvoluter = AveraginePeakDependenceGraphDeconvoluter(
+            scan.peak_set.clone(), averagine=peptide, scorer=PenalizedMSDeconVFitter(5., 1.))
+        deconvoluter.deconvolute()
+        graph = deconvoluter.peak_dependency_network
+        seen = {}
+        for i, cluster in enumerate(graph.clusters):
+            for fit in cluster:
+                for peak in fit.experimental:
+                    if peak.peak_count < 0:
+                        continue
+                    # Every peak belongs to exactly one connected component
+                    self.assertEqual(seen.setdefault(peak.peak_count, i), i)
+        self.assertEqual(
+            sum(len(cluster) for cluster in graph.clusters), len(graph.dependencies))
+
+    def test_interval_graph_deconvolution(self):
+        scan = self.make_scan()
+        scan.pick_peaks()
+        deconresult = deconvolute_peaks(
+            scan.peak_set, {
+                "averagine": peptide,
+                "scorer": PenalizedMSDeconVFitter(5., 1.),
+                "subgraph_solver": "interval",
+            }, deconvoluter_type=AveraginePeakDependenceGraphDeconvoluter)
+        dpeaks = deconresult.peak_set
+        assert len(dpeaks) == 2
+        for point in points:
+            peak = dpeaks.has_peak(neutral_mass(point[0], point[1]))
+            self.assertIsNotNone(peak)
+
+        peaks = {}
+
+        def make_fit(mzs, score, charge=1):
+            experimental = []
+            for mz in mzs:
+                if mz not in peaks:
+                    peaks[mz] = FittedPeak(mz, 100, 1, len(peaks), len(peaks), 0, 0)
+                experimental.append(peaks[mz])
+            return IsotopicFitRecord(experimental[0], score, charge, None, experimental)
+
+        wide = make_fit([100., 104.], 10.)
+        left = make_fit([100., 101.], 8.)
+        right = make_fit([102., 103.], 8.)
+        touching = make_fit([101., 102.], 20.)
+        fits = [wide, left, right]
+        self.assertEqual(select_disjoint_fit_intervals(fits), [left, right])
+        self.assertEqual(select_disjoint_fit_intervals(fits, False), [left, right])
+        self.assertEqual(select_disjoint_fit_intervals(fits + [touching]), [touching])
+        self.assertEqual(select_disjoint_fit_intervals([]), [])
+
+        # Fits of parts of an envelope do not outweigh the better fit of all of it
+        whole = make_fit([200., 200.5, 201., 201.5], 10., 2)
+        front = make_fit([200., 200.5], 6., 2)
+        back = make_fit([201., 201.5], 6., 2)
+        self.assertEqual(select_disjoint_fit_intervals([front, whole, back]), [whole])
+        # unless the envelope's fit loses to another, leaving a part of it unexplained
+        other = make_fit([199.666, 200., 200.333, 200.5], 20., 3)
+        self.assertEqual(select_disjoint_fit_intervals([front, whole, back, other]), [other, back])
+
+    def test_interval_graph_deconvolution_matches_disjoint(self):
+        reader = MSFileLoader(datafile("three_test_scans.mzML"))
+        scan = reader.next().precursor
+        scan.pick_peaks()
+        spacing = isotopic_shift()
+
+        def count_isotope_ladders(peaks):
+            # Same charge peaks one isotope apart are usually a split envelope
+            count = 0
+            for peak in peaks:
+                for other in peaks.all_peaks_for(peak.neutral_mass + spacing, 5e-5):
+                    if other.charge == peak.charge:
+                        count += 1
+            return count
+
+        results = {}
+        for solver in ("disjoint", "interval"):
+            results[solver] = deconvolute_peaks(
+                scan.peak_set.clone(), {
+                    "averagine": peptide,
+                    "scorer": MSDeconVFitter(10.),
+                    "subgraph_solver": solver,
+                }, charge_range=(1, 8)).peak_set
+        disjoint, interval = results["disjoint"], results["interval"]
+        self.assertLess(abs(len(interval) - len(disjoint)), len(disjoint) * 0.02)
+        self.assertLessEqual(count_isotope_ladders(interval), count_isotope_ladders(disjoint))
+
+    def test_incremental_graph_deconvolution(self):
+        reader = MSFileLoader(datafile("three_test_scans.mzML"))
+        scan = reader.next().precursor
+        scan.pick_peaks()
+        results = []
+        for incremental_graph in (False, True):
+            deconvoluter = AveraginePeakDependenceGraphDeconvoluter(
+                scan.peak_set.clone(), averagine=peptide, scorer=PenalizedMSDeconVFitter(20., 2.),
+                incremental_graph=incremental_graph)
+            results.append(deconvoluter.deconvolute(charge_range=(1, 8), iterations=10))
+            self.assertIsNone(deconvoluter._fit_cache)
+        reference, dpeaks = results
+        self.assertEqual(len(dpeaks), len(reference))
+        for a, b in zip(dpeaks, reference):
+            self.assertAlmostEqual(a.neutral_mass, b.neutral_mass)
+            self.assertEqual(a.charge, b.charge)
+            self.assertAlmostEqual(a.score, b.score)
+
+    def test_deconvolution_profile(self):
+        scan = self.make_scan()
+        scan.pick_peaks()
+        result = deconvolute_peaks(
+            scan.peak_set, averagine=peptide, scorer=PenalizedMSDeconVFitter(5., 1.),
+            charge_range=(1, 8), profile=True)
+        self.assertIsNone(deconvolute_peaks(
+            scan.peak_set, averagine=peptide, scorer=PenalizedMSDeconVFitter(5., 1.)).profile)
+        profile = result.profile
+        self.assertIsInstance(profile, DeconvolutionProfile)
+        summary = profile.summary()
+        phases = summary['phases']
+        counters = summary['counters']
+        self.assertEqual(counters['deconvolutions'], 1)
+        self.assertEqual(counters['accepted_fits'], len(result.peak_set))
+        self.assertEqual(counters['clusters'], sum(summary['cluster_sizes']['histogram'].values()))
+        self.assertGreaterEqual(counters['candidate_fits'], counters['accepted_fits'])
+        self.assertEqual(phases['graph_building']['calls'], counters['iterations'])
+        self.assertEqual(phases['subtraction']['calls'], len(result.peak_set))
+        self.assertGreater(phases['peak_search']['calls'], 0)
+        self.assertGreaterEqual(phases['total']['time'], phases['graph_building']['time'])
+        merged = DeconvolutionProfile().merge(profile).merge(profile)
+        self.assertEqual(merged.counters['deconvolutions'], 2)
+        self.assertIn("subgraph_solving", merged.report())
+
+    def test_deconvolution_budget(self):
+        scan = self.make_scan()
+        scan.pick_peaks()
+        config = {
+            "averagine": peptide,
+            "scorer": PenalizedMSDeconVFitter(5., 1.),
+        }
+        result = deconvolute_peaks(scan.peak_set.clone(), config, iterations=10)
+        self.assertEqual(result.degraded, [])
+        result = deconvolute_peaks(scan.peak_set.clone(), config, iterations=10, work_budget=1)
+        self.assertEqual(result.degraded, ["narrowed_search", "quick_charge", "reduced_iterations"])
+        self.assertFalse(result.deconvoluter.use_quick_charge)
+        for point in points:
+            self.assertIsNotNone(result.peak_set.has_peak(neutral_mass(point[0], point[1])))
+        peaks = scan.peak_set.clone()
+        result = deconvolute_peaks(
+            peaks, config, iterations=10, work_budget=1, priority_list=[peaks.has_peak(points[0][0])])
+        self.assertEqual(result.degraded, ["priority_targets_only"])
+        self.assertEqual(len(result.peak_set), 1)
+        self.assertAlmostEqual(result.priorities[0].mz, points[0][0], 3)
+
+        # An error while narrowed does not leave QuickCharge on for the next spectrum
+        deconvoluter = AveraginePeakDependenceGraphDeconvoluter(
+            scan.peak_set.clone(), averagine=peptide, scorer=PenalizedMSDeconVFitter(5., 1.), work_budget=1)
+
+        def fail(*args, **kwargs):
+            raise ValueError("failed")
+
+        deconvoluter.select_best_disjoint_subgraphs = fail
+        with self.assertRaises(ValueError):
+            deconvoluter.deconvolute(iterations=10)
+        self.assertIn("quick_charge", deconvoluter.degraded)
+        self.assertFalse(deconvoluter.use_quick_charge)
+        deconvoluter._narrow_search(1)
+        deconvoluter.reset(scan.peak_set.clone())
+        self.assertFalse(deconvoluter.use_quick_charge)
+
+    def test_candidate_pruning(self):
+        scan = self.make_scan()
+        scan.pick_peaks()
+        configs = [(AveraginePeakDependenceGraphDeconvoluter, {
+            "averagine": AveragineCache(peptide).populate(max_charge=4),
+            "scorer": PenalizedMSDeconVFitter(5., 1.),
+        }), (MultiAveraginePeakDependenceGraphDeconvoluter, {
+            "averagines": [AveragineCache(model).populate(max_charge=4) for model in (peptide, glycan)],
+            "scorer": PenalizedMSDeconVFitter(5., 1.),
+        })]
+        for deconvoluter_type, config in configs:
+            profile = DeconvolutionProfile()
+            pruned = deconvolute_peaks(
+                scan.peak_set.clone(), dict(config), charge_range=(1, 3), profile=profile,
+                deconvoluter_type=deconvoluter_type)
+            unpruned = deconvolute_peaks(
+                scan.peak_set.clone(), dict(config), charge_range=(1, 3), prune_candidates=False,
+                deconvoluter_type=deconvoluter_type)
+            self.assertIsInstance(pruned.deconvoluter, deconvoluter_type)
+            self.assertGreater(pruned.deconvoluter.pruned_by_peak_count, 0)
+            self.assertEqual(unpruned.deconvoluter.pruned_by_peak_count, 0)
+            self.assertEqual(
+                profile.counters['pruned_by_peak_count'], pruned.deconvoluter.pruned_by_peak_count)
+            self.assertEqual(len(pruned.peak_set), len(unpruned.peak_set))
+            for a, b in zip(pruned.peak_set, unpruned.peak_set):
+                self.assertAlmostEqual(a.neutral_mass, b.neutral_mass)
+                self.assertEqual(a.charge, b.charge)
+                self.assertAlmostEqual(a.score, b.score)
+
+    def test_fit_theoretical_distribution_override(self):
+        scan = self.make_scan()
+        calls = []
+
+        class CountingDeconvoluter(AveraginePeakDependenceGraphDeconvoluter):
+            def fit_theoretical_distribution(self, *args, **kwargs):
+                calls.append(args)
+                return super(CountingDeconvoluter, self).fit_theoretical_distribution(*args, **kwargs)
+
+        class CountingMultiDeconvoluter(MultiAveraginePeakDependenceGraphDeconvoluter):
+            def fit_theoretical_distribution(self, *args, **kwargs):
+                calls.append(args)
+                return super(CountingMultiDeconvoluter, self).fit_theoretical_distribution(*args, **kwargs)
+
+        configs = [(CountingDeconvoluter, AveraginePeakDependenceGraphDeconvoluter, {
+            "averagine": AveragineCache(peptide),
+            "scorer": PenalizedMSDeconVFitter(5., 1.),
+        }), (CountingMultiDeconvoluter, MultiAveraginePeakDependenceGraphDeconvoluter, {
+            "averagines": [AveragineCache(model) for model in (peptide, glycan)],
+            "scorer": PenalizedMSDeconVFitter(5., 1.),
+        })]
+        for deconvoluter_type, base_type, config in configs:
+            del calls[:]
+            overridden = deconvolute_peaks(
+                scan.peak_set.clone(), dict(config), charge_range=(1, 3),
+                deconvoluter_type=deconvoluter_type).peak_set
+            # Every fit goes through the override rather than the batch scoring path
+            self.assertGreater(len(calls), 0)
+            expected = deconvolute_peaks(
+                scan.peak_set.clone(), dict(config), charge_range=(1, 3),
+                deconvoluter_type=base_type).peak_set
+            self.assertEqual(len(overridden), len(expected))
+            for a, b in zip(overridden, expected):
+                self.assertAlmostEqual(a.neutral_mass, b.neutral_mass)
+                self.assertEqual(a.charge, b.charge)
+                self.assertAlmostEqual(a.score, b.score)
+
+    def test_deconvolution_engine(self):
+        reader = MSFileLoader(datafile("three_test_scans.mzML"))
+        scans = [scan.pick_peaks() for scan in reader.next().products]
+        # Fill the cache up front so that the patterns used do not depend upon the
+        # order in which spectra are deconvoluted
+        config = {
+            "averagine": AveragineCache(peptide).populate(max_charge=4),
+            "scorer": MSDeconVFitter(10.),
+        }
+        engine = DeconvolutionEngine(config, charge_range=(1, 3), profile=True)
+        self.assertEqual(engine.parameters, {"charge_range": (1, 3)})
+        deconvoluter = None
+        for scan, result in zip(scans, engine.deconvolute_all(scan.peak_set for scan in scans)):
+            if deconvoluter is not None:
+                self.assertIs(result.deconvoluter, deconvoluter)
+            deconvoluter = result.deconvoluter
+            reference = deconvolute_peaks(scan.peak_set, dict(config), charge_range=(1, 3))
+            self.assertEqual(len(result.peak_set), len(reference.peak_set))
+            for a, b in zip(result.peak_set, reference.peak_set):
+                self.assertAlmostEqual(a.neutral_mass, b.neutral_mass)
+                self.assertEqual(a.charge, b.charge)
+                self.assertAlmostEqual(a.score, b.score)
+        self.assertEqual(engine.profile.counters['deconvolutions'], len(scans))
+        # Priority targets do not carry over to the next spectrum
+        peaks = scans[0].peak_set
+        result = engine.deconvolute(peaks, priority_list=[peaks[0]], charge_range=(1, 2))
+        self.assertEqual(len(result.priorities), 1)
+        self.assertEqual(engine.deconvolute(peaks).priorities, [])
+
+    def test_deconvolution_result_cache(self):
+        reader = MSFileLoader(datafile("three_test_scans.mzML"))
+        scans = [scan.pick_peaks() for scan in reader.next().products]
+        config = {
+            "averagine": AveragineCache(peptide).populate(max_charge=4),
+            "scorer": MSDeconVFitter(10.),
+        }
+        cache = MemoryDeconvolutionResultCache(max_size=2)
+        engine = DeconvolutionEngine(config, charge_range=(1, 3), result_cache=cache)
+        reference = engine.deconvolute(scans[0].peak_set)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 1, 1))
+        result = engine.deconvolute(scans[0].peak_set.clone())
+        self.assertEqual(cache.hits, 1)
+        self.assertIsNone(result.deconvoluter)
+        self.assertIsNot(result.peak_set, reference.peak_set)
+        self.assertEqual(result.peak_set, reference.peak_set)
+        # Different arguments and priority targets are deconvoluted again
+        engine.deconvolute(scans[0].peak_set, charge_range=(1, 2))
+        peaks = scans[0].peak_set
+        self.assertIsNotNone(engine.deconvolute(peaks, priority_list=[peaks[0]]).deconvoluter)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 2, 2))
+        engine.deconvolute(scans[1].peak_set)
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn(engine.cache_key(scans[0].peak_set), cache)
+
+        path = tempfile.mkdtemp()
+        engine = DeconvolutionEngine(
+            config, charge_range=(1, 3), result_cache=DiskDeconvolutionResultCache(path))
+        engine.deconvolute(scans[0].peak_set)
+        cache = DiskDeconvolutionResultCache(path, max_size=1)
+        self.assertEqual(len(cache), 1)
+        result = cache.get(engine.cache_key(scans[0].peak_set))
+        self.assertEqual(result, reference.peak_set)
+        cache.clear()
+        self.assertEqual(os.listdir(path), [])
+        os.rmdir(path)
+
+    def test_deconvolution_result_cache_configuration(self):
+        reader = MSFileLoader(datafile("three_test_scans.mzML"))
+        peaks = reader.next().products[0].pick_peaks().peak_set
+
+        def cache_key(averagine, **kwargs):
+            config = {"averagine": averagine, "scorer": MSDeconVFitter(10.)}
+            config.update(kwargs)
+            return DeconvolutionEngine(config, result_cache=MemoryDeconvolutionResultCache()).cache_key(peaks)
+
+        key = cache_key(AveragineCache(peptide))
+        # Configurations which differ only inside the averagine cache
+        self.assertNotEqual(cache_key(AveragineCache(peptide, cache_truncation=0.01)), key)
+        table_cache = AveragineCache(peptide)
+        table_cache.use_table()
+        self.assertNotEqual(cache_key(table_cache), key)
+        self.assertNotEqual(cache_key(AveragineCache(glycan)), key)
+        # Which patterns are already stored does not change the deconvoluted peaks
+        self.assertEqual(cache_key(AveragineCache(peptide, max_size=10).populate(max_charge=2)), key)
+        self.assertNotEqual(cache_key(AveragineCache(peptide), scorer=MSDeconVFitter(5.)), key)
+
+        # Objects which describe only where they are cannot be identified
+        self.assertIsNone(cache_key(peptide, unknown=object()))
+        engine = DeconvolutionEngine(
+            {"averagine": peptide, "scorer": MSDeconVFitter(10.), "unknown": object()},
+            deconvoluter_type=lambda peaklist, unknown, **kwargs: AveraginePeakDependenceGraphDeconvoluter(
+                peaklist, **kwargs),
+            result_cache=MemoryDeconvolutionResultCache())
+        self.assertIsNone(engine.cache_key(peaks))
+        engine.deconvolute(peaks)
+        self.assertEqual((engine.result_cache.hits, engine.result_cache.misses, len(engine.result_cache)),
+                         (0, 0, 0))
+
+    def test_region_deconvolution(self):
+        scan = self.make_scan()
+        peaks = [p.clone() for p in scan.peak_set]
+        shifted = []
+        for p in peaks:
+            p = p.clone()
+            p.mz += 500
+            shifted.append(p)
+        peaklist = prepare_peaklist(peaks + shifted)
+        config = {
+            "averagine": peptide,
+            "scorer": PenalizedMSDeconVFitter(5., 1.),
+        }
+        reference = AveraginePeakDependenceGraphDeconvoluter(peaklist.clone(), **config).deconvolute()
+        deconvoluter = AveraginePeakDependenceGraphDeconvoluter(
+            peaklist.clone(), region_workers=2, **config)
+        gap = deconvoluter.region_gap_width()
+        regions = deconvoluter.partition_regions(gap)
+        # Each copy holds two envelopes far enough apart to be separate regions
+        self.assertEqual(len(regions), 4)
+        self.assertEqual(regions[1][1], len(peaks))
+        self.assertEqual(
+            deconvoluter.partition_regions(gap, 2),
+            [(0, len(peaks)), (len(peaks), len(peaklist))])
+        dpeaks = deconvoluter.deconvolute()
+        self.assertEqual(len(dpeaks), len(reference))
+        for a, b in zip(dpeaks, reference):
+            self.assertAlmostEqual(a.neutral_mass, b.neutral_mass)
+            self.assertAlmostEqual(a.score, b.score)
+
 
 class TestCompositionListDeconvolution(unittest.TestCase):
     compositions = [
@@ -256,6 +734,128 @@ class TestCompositionListDeconvolution(unittest.TestCase):
                     composition, charge, missed_peaks, score, fit_record, validation))
             assert not missed
 
+    def test_pattern_store(self):
+        scan = self.make_scan()
+        scan.pick_peaks()
+        self.assertEqual(
+            composition_hash(self.compositions[0]),
+            composition_hash(dict(self.compositions[0])))
+        self.assertNotEqual(
+            composition_hash(self.compositions[0]),
+            composition_hash(self.compositions[1]))
+        store = CompositionPatternStore().populate(self.compositions, (-1, -8))
+        self.assertEqual(len(store), len(self.compositions) * 8)
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'patterns.npz')
+            store.save(path)
+            loaded = CompositionPatternStore.load(path)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(set(store.backend), set(loaded.backend))
+        for key, tid in store.backend.items():
+            other = loaded.backend[key]
+            self.assertEqual(len(tid), len(other))
+            self.assertAlmostEqual(tid.origin, other.origin)
+            for a, b in zip(tid, other):
+                self.assertEqual(a.mz, b.mz)
+                self.assertEqual(a.intensity, b.intensity)
+        for algorithm_type in (CompositionListDeconvoluter, CompositionListPeakDependenceGraphDeconvoluter):
+            decon_config = {
+                "composition_list": self.compositions,
+                "scorer": PenalizedMSDeconVFitter(5., 2.),
+                "use_subtraction": algorithm_type is CompositionListPeakDependenceGraphDeconvoluter
+            }
+            reference = deconvolute_peaks(
+                scan.peak_set.clone(), decon_config, charge_range=(-1, -8),
+                deconvoluter_type=algorithm_type).peak_set
+            decon_config['pattern_store'] = loaded
+            hits = loaded.hits
+            result = deconvolute_peaks(
+                scan.peak_set.clone(), decon_config, charge_range=(-1, -8),
+                deconvoluter_type=algorithm_type).peak_set
+            self.assertGreater(loaded.hits, hits)
+            self.assertEqual(loaded.misses, 0)
+            self.assertEqual(len(reference), len(result))
+            for a, b in zip(reference, result):
+                self.assertAlmostEqual(a.neutral_mass, b.neutral_mass, 6)
+                self.assertAlmostEqual(a.score, b.score, 6)
+        deconvoluter = HybridAveragineCompositionListPeakDependenceGraphDeconvoluter(
+            scan.peak_set.clone(), composition_list=self.compositions, averagine=glycan,
+            scorer=PenalizedMSDeconVFitter(5., 2.), pattern_store=loaded)
+        self.assertIs(deconvoluter.pattern_store, loaded)
+        self.assertGreater(len(deconvoluter.deconvolute(charge_range=(-1, -8))), 0)
+        self.assertEqual(loaded.misses, 0)
+
+    def test_composition_index(self):
+        scan = self.make_scan()
+        scan.pick_peaks()
+        compositions = self.compositions + [
+            brainpy.parse_formula('C6H12O6'),
+            brainpy.parse_formula('C900H1480N60O660'),
+        ]
+        index = CompositionIndex(compositions)
+        self.assertEqual(len(index), len(compositions))
+        self.assertEqual(index.order[0], 4)
+        self.assertEqual(index.order[-1], 5)
+        selected = index.select(scan.peak_set[0].mz, scan.peak_set[-1].mz, (-1, -8))
+        self.assertNotIn(4, selected)
+        self.assertNotIn(5, selected)
+        for i in range(len(self.compositions)):
+            self.assertIn(i, selected)
+        for algorithm_type in (CompositionListDeconvoluter, CompositionListPeakDependenceGraphDeconvoluter):
+            results = []
+            for use_composition_index in (False, True):
+                store = CompositionPatternStore()
+                decon_config = {
+                    "composition_list": compositions,
+                    "scorer": PenalizedMSDeconVFitter(5., 2.),
+                    "use_subtraction": algorithm_type is CompositionListPeakDependenceGraphDeconvoluter,
+                    "use_composition_index": use_composition_index,
+                    "pattern_store": store,
+                }
+                peaks = deconvolute_peaks(
+                    scan.peak_set.clone(), decon_config, charge_range=(-1, -8),
+                    deconvoluter_type=algorithm_type).peak_set
+                results.append((peaks, store.misses))
+            (reference, reference_evaluated), (result, evaluated) = results
+            self.assertLess(evaluated, reference_evaluated)
+            self.assertEqual(len(reference), len(result))
+            for a, b in zip(reference, result):
+                self.assertAlmostEqual(a.neutral_mass, b.neutral_mass, 6)
+                self.assertAlmostEqual(a.score, b.score, 6)
+
+    def test_composition_index_reuse(self):
+        scan = self.make_scan()
+        scan.pick_peaks()
+        for algorithm_type in (CompositionListDeconvoluter, CompositionListPeakDependenceGraphDeconvoluter):
+            decon_config = {
+                "composition_list": self.compositions,
+                "scorer": PenalizedMSDeconVFitter(5., 2.),
+                "use_subtraction": algorithm_type is CompositionListPeakDependenceGraphDeconvoluter,
+            }
+            first = deconvolute_peaks(
+                scan.peak_set.clone(), decon_config, charge_range=(-1, -8),
+                deconvoluter_type=algorithm_type)
+            index = decon_config['composition_index']
+            self.assertIs(first.deconvoluter.composition_index, index)
+            second = deconvolute_peaks(
+                scan.peak_set.clone(), decon_config, charge_range=(-1, -8),
+                deconvoluter_type=algorithm_type)
+            self.assertIs(second.deconvoluter.composition_index, index)
+
+            engine = DeconvolutionEngine(
+                decon_config, charge_range=(-1, -8), deconvoluter_type=algorithm_type)
+            self.assertIsNotNone(engine.cache_key(scan.peak_set))
+            results = [engine.deconvolute(scan.peak_set.clone()) for _ in range(2)]
+            self.assertIs(results[0].deconvoluter, results[1].deconvoluter)
+            self.assertIs(results[1].deconvoluter.composition_index, index)
+            for result in results:
+                self.assertEqual(len(result.peak_set), len(first.peak_set))
+                for a, b in zip(first.peak_set, result.peak_set):
+                    self.assertAlmostEqual(a.neutral_mass, b.neutral_mass, 6)
+                    self.assertAlmostEqual(a.score, b.score, 6)
+
 
 class TestSolutionRetrieval(unittest.TestCase):
     def make_scan(self):
@@ -34,6 +34,113 @@ def make_peak_set_test_suite(peak_set_cls, peak_cls):
                 for p in ps.all_peaks_for(xi):
                     assert abs((xi - p.neutral_mass) / p.neutral_mass) < 1e-5
 
+        def test_bulk_search(self):
+            x = np.arange(1000, 1200, 0.5)
+            y = np.ones_like(x)
+
+            peaks = [peak_cls(x[i], y[i], 1, 1, None, 0) for i in range(len(x))]
+            ps = peak_set_cls(peaks)
+            ps.reindex()
+
+            queries = np.arange(1200, 1000, -0.0137)
+            indices = ps.has_peaks(queries)
+            starts, ends = ps.all_peaks_for_many(queries)
+            for i, xi in enumerate(queries):
+                peak = ps.has_peak(xi)
+                if peak is None:
+                    assert indices[i] == -1
+                else:
+                    assert ps[indices[i]] is peak
+                assert tuple(ps.peaks[starts[i]:ends[i]]) == tuple(ps.all_peaks_for(xi))
+
+        def test_bulk_search_boundary(self):
+            rng = np.random.RandomState(7)
+            x = np.sort(rng.uniform(1000, 1200, 2000))
+            y = np.ones_like(x)
+
+            peaks = [peak_cls(x[i], y[i], 1, 1, None, 0) for i in range(len(x))]
+            ps = peak_set_cls(peaks)
+            ps.reindex()
+
+            for tolerance in (1e-5, 1e-3):
+                # Place each query just inside or just outside the window of a peak,
+                # where a window taken around the query would disagree with one
+                # taken around the peak.
+                anchors = x[rng.randint(0, len(x), 500)]
+                sign = rng.choice([-1, 1], 500)
+                nudge = rng.choice([-1e-6, 1e-6], 500)
+                queries = anchors * (1 + sign * tolerance * (1 + nudge))
+                starts, ends = ps.all_peaks_for_many(queries, tolerance)
+                for i, xi in enumerate(queries):
+                    expected = x[np.abs((xi - x) / x) < tolerance].tolist()
+                    assert [p.neutral_mass for p in ps.all_peaks_for(xi, tolerance)] == expected
+                    assert x[starts[i]:ends[i]].tolist() == expected
+
+        if peak_cls is module.DeconvolutedPeak:
+
+            def test_merge(self):
+                rng = np.random.RandomState(2)
+                peak_sets = []
+                for n in (300, 50, 0):
+                    x = rng.uniform(1000, 1200, n)
+                    peaks = [peak_cls(x[i], 1, i % 3 + 1, 1, None, 0) for i in range(n)]
+                    ps = peak_set_cls(peaks)
+                    ps.reindex()
+                    peak_sets.append(ps)
+                extra = [peak_cls(mass, 1, 1, 1, None, 0) for mass in (1100.5, 1000.25)]
+
+                merged = module.merge_peak_sets(peak_sets + [extra])
+                assert isinstance(merged, peak_set_cls)
+                assert len(merged) == 352
+                expected = sorted([p for ps in peak_sets for p in ps] + extra, key=module.neutral_mass_getter)
+                assert [p.neutral_mass for p in merged] == [p.neutral_mass for p in expected]
+                assert [p.mz for p in merged._mz_ordered] == sorted(p.mz for p in expected)
+                for i, peak in enumerate(merged):
+                    assert peak.index.neutral_mass == i
+                    assert merged._mz_ordered[peak.index.mz] is peak
+                for i, peak in enumerate(peak_sets[0]):
+                    assert peak.index.neutral_mass == i
+                for peak in peak_sets[1]:
+                    assert merged.has_peak(peak.neutral_mass) == peak
+
+                merged = module.merge_peak_sets(peak_sets[:2], copy=False)
+                assert merged.has_peak(peak_sets[1][10].neutral_mass) is peak_sets[1][10]
+
+        if hasattr(peak_set_cls, 'set_interval_index_size'):
+
+            def test_interval_index(self):
+                x = np.sort(np.random.RandomState(1).uniform(1000, 1200, 5000))
+                y = np.ones_like(x)
+
+                peaks = [peak_cls(x[i], y[i], 1, 1, None, 0) for i in range(len(x))]
+                ps = peak_set_cls(peaks)
+                ps.reindex()
+                assert ps.interval_index_cells > 0
+                # The size chosen automatically is reported, and chosen again for other peaks
+                assert ps.interval_index_size == ps.interval_index_cells
+                assert pickle.loads(pickle.dumps(ps, -1)).interval_index_size == ps.interval_index_size
+                small = peak_set_cls([p.clone() for p in peaks[:10]])
+                small.reindex()
+                assert small.interval_index_size == 0
+                plain = peak_set_cls([p.clone() for p in peaks])
+                plain.set_interval_index_size(0)
+                assert plain.interval_index_cells == 0
+
+                masses = np.array([p.neutral_mass for p in peaks])
+                # Wide tolerances reach past the index cells neighbouring the query
+                for tolerance, step in ((1e-5, 0.0137), (5e-4, 0.137), (1e-3, 0.137)):
+                    for xi in np.arange(1000, 1200, step):
+                        a = ps.has_peak(xi, tolerance)
+                        b = plain.has_peak(xi, tolerance)
+                        assert (a is None and b is None) or a == b
+                        expected = tuple(
+                            peaks[i] for i in np.flatnonzero(np.abs((xi - masses) / masses) < tolerance))
+                        assert ps.all_peaks_for(xi, tolerance) == expected
+                        assert plain.all_peaks_for(xi, tolerance) == expected
+
+                reloaded = pickle.loads(pickle.dumps(plain, -1))
+                assert reloaded.interval_index_cells == 0
+
         if module.DeconvolutedPeakSet == peak_set_cls:
 
             def test_pickle(self):
@@ -73,5 +180,88 @@ except ImportError:
     TestPythonDeconvolutedPeakSet = make_peak_set_test_suite(_DeconvolutedPeakSet, _DeconvolutedPeak)
 
 
+def envelope_points(peak):
+    return [tuple(point) for point in peak.envelope]
+
+
+class TestColumnarDeconvolutedPeakSet(unittest.TestCase):
+    def make_peak_set(self):
+        x = np.arange(1000, 1200, 0.5)
+        peaks = []
+        for i, mass in enumerate(x):
+            charge = i % 3 + 1
+            mz = module.mass_charge_ratio(mass, charge)
+            envelope = [(mz + k * 1.003 / charge, 10. * (i + 1) / (k + 1)) for k in range(i % 4)]
+            peaks.append(module.DeconvolutedPeak(
+                mass, 10. * (i + 1), charge, 5., None, 0.01, score=i * 0.5, envelope=envelope, mz=mz))
+        ps = module.DeconvolutedPeakSet(peaks[::-1])
+        ps.reindex()
+        return ps
+
+    def test_round_trip(self):
+        ps = self.make_peak_set()
+        columnar = module.ColumnarDeconvolutedPeakSet.from_peak_set(ps)
+        assert len(columnar) == len(ps)
+        assert np.all(np.diff(columnar.neutral_mass) >= 0)
+        for a, b in zip(columnar, ps):
+            assert a == b
+            assert a.mz == b.mz
+            assert envelope_points(a) == envelope_points(b)
+            assert a.index.neutral_mass == b.index.neutral_mass
+            assert a.index.mz == b.index.mz
+        assert columnar.to_peak_set() == ps
+        from ms_deisotope.output.text_utils import envelopes_to_array
+        assert np.array_equal(
+            columnar.envelopes_to_array(), envelopes_to_array([p.envelope for p in ps]))
+
+        reloaded = pickle.loads(pickle.dumps(columnar[10:50], -1))
+        assert reloaded == columnar[10:50]
+        assert [envelope_points(p) for p in reloaded] == [envelope_points(p) for p in ps.peaks[10:50]]
+
+    def test_search(self):
+        ps = self.make_peak_set()
+        columnar = module.ColumnarDeconvolutedPeakSet.from_peak_set(ps)
+        for peak in ps.peaks[::7]:
+            assert columnar.has_peak(peak.neutral_mass) == peak
+            assert columnar.has_peak(peak.mz, use_mz=True).mz == peak.mz
+            assert columnar.has_peak(peak.neutral_mass + 0.2) is None
+            matches = columnar.all_peaks_for(peak.neutral_mass, 1e-3)
+            expected = [p for p in ps if abs(peak.neutral_mass - p.neutral_mass) < p.neutral_mass * 1e-3]
+            assert list(matches) == expected
+            nearest, error = columnar.get_nearest_peak(peak.neutral_mass + 0.1)
+            assert nearest == peak
+            assert abs(error - 0.1) < 1e-6
+
+        window = columnar.between(1050, 1100)
+        assert tuple(window) == tuple(ps.between(1050, 1100))
+        assert np.shares_memory(window.neutral_mass, columnar.neutral_mass)
+        assert [envelope_points(p) for p in window] == [envelope_points(p) for p in ps.between(1050, 1100)]
+        assert tuple(columnar.between(600, 700, use_mz=True)) == tuple(ps.between(600, 700, use_mz=True))
+        with self.assertRaises(ValueError):
+            columnar.intensity[0] = 0
+
+    def test_bulk_search(self):
+        ps = self.make_peak_set()
+        columnar = module.ColumnarDeconvolutedPeakSet.from_peak_set(ps)
+        queries = np.array([peak.neutral_mass for peak in ps.peaks[::-7]] + [0.5, 1e6])
+        assert columnar.has_peaks(queries).tolist() == ps.has_peaks(queries).tolist()
+        assert columnar.has_peaks(queries)[-2:].tolist() == [-1, -1]
+        mz_queries = np.array([peak.mz for peak in ps.peaks[::7]])
+        indices = columnar.has_peaks(mz_queries, use_mz=True)
+        assert np.allclose(columnar.mz[indices], mz_queries)
+        starts, ends = columnar.all_peaks_for_many(queries, 1e-3)
+        for i, query in enumerate(queries):
+            assert tuple(columnar[starts[i]:ends[i]]) == columnar.all_peaks_for(query, 1e-3)
+
+        # Queries on either side of the edge of a peak's window
+        masses = columnar.neutral_mass[::5]
+        for sign in (-1, 1):
+            for nudge in (-1e-6, 1e-6):
+                queries = masses * (1 + sign * 1e-3 * (1 + nudge))
+                starts, ends = columnar.all_peaks_for_many(queries, 1e-3)
+                for i, query in enumerate(queries):
+                    assert tuple(columnar[starts[i]:ends[i]]) == tuple(ps.all_peaks_for(query, 1e-3))
+
+
 if __name__ == '__main__':
     unittest.main()
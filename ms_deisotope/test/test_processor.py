@@ -1,7 +1,10 @@
+import os
+import shutil
+import tempfile
 import unittest
 
 from ms_deisotope import processor
-from ms_deisotope.averagine import glycopeptide, peptide
+from ms_deisotope.averagine import AveragineCache, glycopeptide, peptide
 from ms_deisotope.scoring import PenalizedMSDeconVFitter, MSDeconVFitter
 
 from ms_deisotope.test.common import datafile
@@ -86,5 +89,104 @@ class TestScanProcessor(unittest.TestCase):
             self.assertAlmostEqual(mass, recalculated_precursors[product.id], 2)
 
 
+class TestAveragineCachePreparation(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "averagine.snapshot")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def prepare(self, **kwargs):
+        args = {"averagine": peptide, "charge_range": (1, 3), "truncate_after": 0.95}
+        args.update(kwargs)
+        processor.prepopulate_averagine_cache(args)
+        return args
+
+    def test_shared_snapshot(self):
+        args = self.prepare(averagine_snapshot=self.path)
+        self.assertNotIn("averagine_snapshot", args)
+        first = args['averagine']
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(first.snapshot.path, self.path)
+        self.assertEqual(len(first.backend), 0)
+        self.assertEqual(first.max_size, processor.AVERAGINE_SNAPSHOT_WORKING_SET)
+
+        # Another process given the same path only maps the snapshot
+        second = self.prepare(averagine_snapshot=self.path)['averagine']
+        self.assertEqual(second.misses, 0)
+        self.assertEqual(len(second.backend), 0)
+        tid = second.isotopic_cluster(1000.0, 2, truncate_after=0.95)
+        self.assertEqual(second.misses, 0)
+        self.assertEqual(len(tid), len(peptide.isotopic_cluster(1000.0, 2, truncate_after=0.95)))
+
+        # A snapshot of a different averagine is replaced
+        third = self.prepare(averagine=glycopeptide, averagine_snapshot=self.path)['averagine']
+        self.assertGreater(third.misses, 0)
+        self.assertEqual(third.snapshot.base_composition, dict(glycopeptide.base_composition))
+
+    def test_snapshot_per_averagine(self):
+        caches = self.prepare(averagine=[peptide, glycopeptide], averagine_snapshot=self.path)['averagine']
+        for i, cache in enumerate(caches):
+            self.assertEqual(cache.snapshot.path, processor.averagine_snapshot_path(self.path, i))
+            self.assertTrue(os.path.exists(cache.snapshot.path))
+
+    def test_bounded(self):
+        args = self.prepare(averagine_snapshot=self.path, averagine_cache_max_size=10)
+        self.assertNotIn("averagine_cache_max_size", args)
+        cache = args['averagine']
+        self.assertEqual(cache.max_size, 10)
+        # The snapshot written while building the cache is complete despite the bound
+        self.assertEqual(len(cache.snapshot), len(self.prepare()['averagine'].backend))
+        misses = cache.misses
+        for mz in range(1000, 1020):
+            cache.isotopic_cluster(mz, 2, truncate_after=0.95)
+        self.assertEqual(len(cache.backend), 10)
+        self.assertEqual(cache.misses, misses)
+
+        cache = self.prepare(averagine_cache_max_bytes=10 ** 6)['averagine']
+        self.assertEqual(cache.max_bytes, 10 ** 6)
+        self.assertEqual(len(cache.backend), 0)
+
+    def test_without_snapshot(self):
+        cache = self.prepare()['averagine']
+        self.assertIsNone(cache.snapshot)
+        self.assertGreater(len(cache.backend), 0)
+        self.assertEqual(cache.max_size, 0)
+
+    def test_reuse_existing_cache(self):
+        existing = AveragineCache(peptide)
+        existing.populate(max_mz=1000, min_charge=1, max_charge=3, truncate_after=0.95)
+        kept = len(existing.backend)
+        misses = existing.misses
+        cache = self.prepare(averagine=existing)['averagine']
+        self.assertIs(cache, existing)
+        reference = self.prepare()['averagine']
+        self.assertEqual(len(cache.backend), len(reference.backend))
+        # Only the patterns above the m/z already populated were generated
+        self.assertEqual(cache.misses - misses, len(reference.backend) - kept)
+
+    def test_parallel_populate(self):
+        cache = self.prepare(averagine_cache_processes=2)['averagine']
+        self.assertNotIn("averagine_cache_processes", self.prepare(averagine_cache_processes=2))
+        reference = self.prepare()['averagine']
+        self.assertEqual(sorted(cache.backend), sorted(reference.backend))
+        for key in list(reference.backend)[::500]:
+            self.assertEqual(cache.backend[key], reference.backend[key])
+
+    def test_table(self):
+        args = self.prepare(averagine_table_step=10.0, averagine_snapshot=self.path)
+        self.assertNotIn("averagine_table_step", args)
+        cache = args['averagine']
+        self.assertEqual(cache.table.step_size, 10.0)
+        # The grid reaches the largest neutral mass of the charge range, and no snapshot is needed
+        self.assertEqual(len(cache.table), 900)
+        self.assertEqual(len(cache.backend), 0)
+        self.assertFalse(os.path.exists(self.path))
+        misses = cache.misses
+        cache.isotopic_cluster(2500.0, 3, truncate_after=0.95)
+        self.assertEqual((cache.hits, cache.misses), (1, misses))
+
+
 if __name__ == '__main__':
     unittest.main()
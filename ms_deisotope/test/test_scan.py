@@ -3,7 +3,10 @@ import unittest
 import numpy as np
 
 from ms_deisotope.data_source import common, mzml
+from ms_deisotope.data_source.scan import wire
 from ms_deisotope.averagine import peptide
+from ms_deisotope.scoring import PenalizedMSDeconVFitter
+from ms_deisotope.peak_set import ColumnarDeconvolutedPeakSet
 
 from ms_peak_picker import FittedPeak
 from ms_peak_picker.peak_statistics import gaussian_shape
@@ -87,6 +90,38 @@ class TestScanMachinery(unittest.TestCase):
         assert part.intensity.sum() > 0
         assert (scan.arrays * 2).between_mz(575., 577.).intensity.sum() > part.intensity.sum()
 
+    def test_wire_encoding(self):
+        scan = self.make_scan()
+        scan.pick_peaks()
+        scan.deconvolute(averagine=peptide, scorer=PenalizedMSDeconVFitter(5., 1.))
+        packed = common.ProcessedScan(
+            scan.id, scan.title, None, scan.ms_level, scan.scan_time, scan.index,
+            scan.peak_set, scan.deconvoluted_peak_set, scan.polarity, None, None,
+            None, None, [], {})
+        encoded = wire.encode_processed_scan(packed)
+        assert wire.is_encoded_scan(encoded)
+        assert not wire.is_encoded_scan(packed)
+
+        decoded = wire.decode_processed_scan(encoded)
+        self.assertEqual(decoded.id, packed.id)
+        self.assertEqual(decoded.scan_time, packed.scan_time)
+        self.assertEqual(decoded.polarity, packed.polarity)
+        self.assertEqual(decoded.peak_set, packed.peak_set)
+        self.assertEqual(len(decoded.deconvoluted_peak_set), len(packed.deconvoluted_peak_set))
+        for a, b in zip(decoded.deconvoluted_peak_set, packed.deconvoluted_peak_set):
+            self.assertEqual(a, b)
+            self.assertEqual(a.score, b.score)
+            self.assertEqual(list(a.envelope), list(b.envelope))
+        self.assertIsNotNone(decoded.deconvoluted_peak_set.has_peak(packed.deconvoluted_peak_set[0].neutral_mass))
+
+        decoded = wire.decode_processed_scan(encoded, include_fitted=False, columnar=True)
+        self.assertIsNone(decoded.peak_set)
+        assert isinstance(decoded.deconvoluted_peak_set, ColumnarDeconvolutedPeakSet)
+        self.assertEqual(len(decoded.deconvoluted_peak_set), len(packed.deconvoluted_peak_set))
+
+        with self.assertRaises(ValueError):
+            wire.decode_processed_scan(b"spam" + encoded[4:])
+
 
 if __name__ == '__main__':
     unittest.main()
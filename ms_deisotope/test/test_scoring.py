@@ -7,7 +7,7 @@ from brainpy._c.isotopic_distribution import TheoreticalPeak as Peak
 
 from ms_deisotope.scoring import (
         PenalizedMSDeconVFitter, MSDeconVFitter, DotProductFitter, ScaledGTestFitter,
-        GTestFitter, LeastSquaresFitter)
+        GTestFitter, LeastSquaresFitter, IsotopicFitBatch)
 
 experimental = [
     FittedPeak(mz=739.920, intensity=8356.829, signal_to_noise=100.000,
@@ -76,6 +76,57 @@ class IsotopicFitScoringTests(unittest.TestCase):
         score = scorer(None, experimental, theoretical)
         self.assertAlmostEqual(score, 7.463484119741042e-05, 3)
 
+    def test_evaluate_batch(self):
+        # A second fit with one peak off by too much m/z and too little signal-to-noise
+        shifted = [FittedPeak(mz=p.mz + 0.03 * (i == 1), intensity=p.intensity * 0.7,
+                              signal_to_noise=0.5 if i == 2 else p.signal_to_noise,
+                              peak_count=p.peak_count, index=p.index,
+                              full_width_at_half_max=p.full_width_at_half_max, area=p.area)
+                   for i, p in enumerate(experimental)]
+        observed = [experimental, shifted, experimental[:2]]
+        expected = [theoretical, theoretical, theoretical[:2]]
+        batch = IsotopicFitBatch.from_peak_lists(observed, expected)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(list(batch.indptr), [0, 4, 8, 10])
+        for scorer in [PenalizedMSDeconVFitter(20, 2.0), MSDeconVFitter(), DotProductFitter(),
+                       ScaledGTestFitter(), LeastSquaresFitter()]:
+            scores = scorer.evaluate_batch(None, observed, expected)
+            self.assertEqual(len(scores), 3)
+            for score, obs, theo in zip(scores, observed, expected):
+                self.assertAlmostEqual(score, scorer.evaluate(None, obs, theo), 6)
+            if not isinstance(scorer, LeastSquaresFitter):
+                self.assertTrue(np.allclose(scorer.evaluate_packed(None, batch), scores))
+        self.assertEqual(len(MSDeconVFitter().evaluate_batch(None, [], [])), 0)
+        with self.assertRaises(ValueError):
+            IsotopicFitBatch.from_peak_lists([experimental], [theoretical[:3]])
+
+    def test_evaluate_batch_override(self):
+        class ConstantFitter(MSDeconVFitter):
+            def evaluate(self, peaklist, observed, expected, **kwargs):
+                return 1.0
+
+            def _evaluate(self, peaklist, observed, expected):
+                return 1.0
+
+        scorer = ConstantFitter()
+        self.assertTrue(MSDeconVFitter().supports_packed_evaluation())
+        # Packed scoring would bypass the subclass's own scoring
+        self.assertFalse(scorer.supports_packed_evaluation())
+        scores = scorer.evaluate_batch(None, [experimental, experimental], [theoretical, theoretical])
+        self.assertEqual(list(scores), [1.0, 1.0])
+
+    def test_best_possible_score(self):
+        for scorer in [PenalizedMSDeconVFitter(20, 2.0), MSDeconVFitter()]:
+            bound = scorer.best_possible_score(experimental)
+            self.assertGreaterEqual(bound, scorer.evaluate(None, experimental, theoretical))
+            # The bound is reached when the pattern matches exactly
+            self.assertAlmostEqual(bound, scorer.evaluate(None, experimental, experimental), 3)
+            self.assertFalse(scorer.reject_score(bound))
+        self.assertTrue(MSDeconVFitter(1000.).reject_score(MSDeconVFitter(1000.).best_possible_score(experimental)))
+        # Fitters without a bound never discard a fit
+        for scorer in [DotProductFitter(1e12), LeastSquaresFitter(0.)]:
+            self.assertFalse(scorer.reject_score(scorer.best_possible_score(experimental)))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -8,6 +8,7 @@ except ImportError:
     from queue import Empty as QueueEmpty
 
 from ms_deisotope.data_source.common import ProcessedScan
+from ms_deisotope.data_source.scan.wire import is_encoded_scan, decode_processed_scan
 from ms_deisotope.task import TaskBase, CallInterval
 
 from .process import (
@@ -101,10 +102,13 @@ class ScanCollator(TaskBase):
         ----------
         item : str or ProcessedScan
             Either a stub indicating why this work item
-            is not
+            is not, a ProcessedScan, or a ProcessedScan encoded
+            by :func:`~.encode_processed_scan`
         index : int
             Scan index to store
         """
+        if is_encoded_scan(item):
+            item = decode_processed_scan(item, include_fitted=self.include_fitted)
         if self._log_received_scans:
             self.log("-- received %d: %s" % (index, item))
         self.waiting[index] = item
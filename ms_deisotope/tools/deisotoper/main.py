@@ -148,6 +148,25 @@ def check_if_profile(loader):
 @click.option("-v", "--extract-only-tandem-envelopes", is_flag=True, default=False,
               help='Only work on regions that will be chosen for MS/MS')
 @click.option("--verbose", is_flag=True, help="Log additional diagnostic information for each scan.")
+@click.option("-tb", "--time-budget", type=float, default=None, help=(
+    "The number of seconds to spend deconvoluting a scan before falling back to cheaper "
+    "strategies. Scans which exceed it are annotated as degraded."))
+@click.option("--profile-deconvolution", is_flag=True, default=False, help=(
+    "Record the time spent in each phase of deconvolution and report it for the whole run."))
+@click.option("--averagine-cache-size", type=int, default=None, help=(
+    "The maximum number of isotopic patterns each averagine cache keeps in memory in each worker "
+    "process, evicting the least recently used. Defaults to no limit."))
+@click.option("--averagine-cache-bytes", type=int, default=None, help=(
+    "The approximate maximum number of bytes of isotopic patterns each averagine cache keeps in "
+    "memory in each worker process, evicting the least recently used. Defaults to no limit."))
+@click.option("--averagine-snapshot-dir", type=click.Path(file_okay=False, writable=True), default=None, help=(
+    "A directory to keep memory-mapped averagine isotopic pattern snapshots in. They are built once "
+    "and shared by every worker process, and reused and extended by later runs. Defaults to a "
+    "temporary directory removed at the end of the run."))
+@click.option("--averagine-table-step", type=float, default=None, help=(
+    "Interpolate averagine isotopic patterns from a table sampled every this many Daltons of "
+    "neutral mass instead of generating and caching one pattern per m/z and charge state. The "
+    "other averagine cache options are ignored when this is set."))
 @click.option("-g", "--ms1-averaging", default=0, type=int, help=(
     "The number of MS1 scans before and after the current MS1 "
     "scan to average when picking peaks."))
@@ -163,7 +182,9 @@ def deisotope(ms_file, outfile_path, averagine=None, start_time=None, end_time=N
               transform=None, msn_transform=None, processes=4, extract_only_tandem_envelopes=False,
               ignore_msn=False, isotopic_strictness=2.0, ms1_averaging=0,
               msn_isotopic_strictness=0.0, signal_to_noise_threshold=1.0, mass_offset=0.0,
-              deconvolute=True, verbose=False):
+              deconvolute=True, verbose=False, time_budget=None, profile_deconvolution=False,
+              averagine_snapshot_dir=None, averagine_cache_size=None, averagine_cache_bytes=None,
+              averagine_table_step=None):
     '''Convert raw mass spectra data into deisotoped neutral mass peak lists written to mzML.
     '''
     if transform is None:
@@ -253,7 +274,8 @@ def deisotope(ms_file, outfile_path, averagine=None, start_time=None, end_time=N
             "truncate_after": workflow.SampleConsumer.MS1_ISOTOPIC_PATTERN_WIDTH,
             "ignore_below": workflow.SampleConsumer.MS1_IGNORE_BELOW,
             "deconvoluter_type": ms1_deconvoluter_type,
-            "use_quick_charge": True
+            "use_quick_charge": True,
+            "time_budget": time_budget,
         }
 
         if msn_isotopic_strictness >= 1:
@@ -276,7 +298,22 @@ def deisotope(ms_file, outfile_path, averagine=None, start_time=None, end_time=N
             "ignore_below": workflow.SampleConsumer.MSN_IGNORE_BELOW,
             "use_quick_charge": True,
             "deconvoluter_type": msn_deconvoluter_type,
+            "time_budget": time_budget,
         }
+        for deconvolution_args in (ms1_deconvolution_args, msn_deconvolution_args):
+            if averagine_cache_size:
+                deconvolution_args['averagine_cache_max_size'] = averagine_cache_size
+            if averagine_cache_bytes:
+                deconvolution_args['averagine_cache_max_bytes'] = averagine_cache_bytes
+            if averagine_table_step:
+                deconvolution_args['averagine_table_step'] = averagine_table_step
+        if averagine_snapshot_dir is not None:
+            if not os.path.exists(averagine_snapshot_dir):
+                os.makedirs(averagine_snapshot_dir)
+            ms1_deconvolution_args['averagine_snapshot'] = os.path.join(
+                averagine_snapshot_dir, "ms1-averagine.snapshot")
+            msn_deconvolution_args['averagine_snapshot'] = os.path.join(
+                averagine_snapshot_dir, "msn-averagine.snapshot")
     else:
         ms1_deconvolution_args = None
         msn_deconvolution_args = None
@@ -294,7 +331,8 @@ def deisotope(ms_file, outfile_path, averagine=None, start_time=None, end_time=N
         ignore_tandem_scans=ignore_msn,
         ms1_averaging=ms1_averaging,
         deconvolute=deconvolute,
-        verbose=verbose)
+        verbose=verbose,
+        profile_deconvolution=profile_deconvolution and deconvolute)
     consumer.start()
 
 
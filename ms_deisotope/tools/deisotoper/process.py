@@ -17,6 +17,7 @@ from ms_deisotope.processor import (
     NoIsotopicClustersError, EmptyScanError)
 
 from ms_deisotope.task import show_message
+from ms_deisotope.data_source.scan.wire import encode_processed_scan
 
 
 DONE = b"--NO-MORE--"
@@ -122,6 +123,10 @@ class ScanIDYieldingProcess(Process):
 
 
 class ScanTransformMixin(object):
+    #: Whether :meth:`send_scan` encodes scans with :func:`~.encode_processed_scan`
+    #: instead of letting the output queue pickle them
+    encode_scans = False
+
     def log_error(self, error, scan_id, scan, product_scan_ids):
         tb = traceback.format_exc()
         self.log_handler(
@@ -159,7 +164,10 @@ class ScanTransformMixin(object):
         # into the message sent back to the main process which in
         # turn can form a reference cycle and eat a lot of memory
         scan.product_scans = []
-        self.output_queue.put((scan, scan.index, scan.ms_level))
+        if self.encode_scans:
+            self.output_queue.put((encode_processed_scan(scan), scan.index, scan.ms_level))
+        else:
+            self.output_queue.put((scan, scan.index, scan.ms_level))
 
     def all_work_done(self):
         return self._work_complete.is_set()
@@ -219,6 +227,14 @@ class DeconvolutingScanTransformingProcess(Process, ScanTransformMixin):
     output_queue : multiprocessing.JoinableQueue
         A shared output queue which this object will put
         :class:`ms_deisotope.data_source.common.ProcessedScan` bunches onto.
+    profile_queue : multiprocessing.Queue
+        If not :const:`None`, deconvolution is profiled and the MS1 and MSn
+        :class:`~.DeconvolutionProfile` of this process are put onto this queue
+        when it finishes.
+    encode_scans : bool
+        Whether processed scans are put onto :attr:`output_queue` encoded by
+        :func:`~.encode_processed_scan`, which is much cheaper to send between
+        processes than a pickled scan.
     """
 
     def __init__(self, ms_file_path, input_queue, output_queue,
@@ -226,7 +242,8 @@ class DeconvolutingScanTransformingProcess(Process, ScanTransformMixin):
                  msn_peak_picking_args=None,
                  ms1_deconvolution_args=None, msn_deconvolution_args=None,
                  envelope_selector=None, ms1_averaging=0, log_handler=None,
-                 deconvolute=True, verbose=False, too_many_peaks_threshold=7000):
+                 deconvolute=True, verbose=False, too_many_peaks_threshold=7000,
+                 profile_queue=None, encode_scans=True):
         if log_handler is None:
             log_handler = show_message
 
@@ -276,6 +293,8 @@ class DeconvolutingScanTransformingProcess(Process, ScanTransformMixin):
         self._work_complete = multiprocessing.Event()
         self.log_handler = log_handler
         self.too_many_peaks_threshold = too_many_peaks_threshold
+        self.profile_queue = profile_queue
+        self.encode_scans = encode_scans
 
     def make_scan_transformer(self, loader=None):
         transformer = ScanProcessor(
@@ -286,7 +305,8 @@ class DeconvolutingScanTransformingProcess(Process, ScanTransformMixin):
             msn_deconvolution_args=self.msn_deconvolution_args,
             loader_type=lambda x: x,
             envelope_selector=self.envelope_selector,
-            ms1_averaging=self.ms1_averaging)
+            ms1_averaging=self.ms1_averaging,
+            profile_deconvolution=self.profile_queue is not None)
         return transformer
 
     def handle_scan_bunch(self, scan, product_scans, scan_id, product_scan_ids, process_msn=True):
@@ -356,6 +376,16 @@ class DeconvolutingScanTransformingProcess(Process, ScanTransformMixin):
                 self.log_error(err, product_scan.id,
                                product_scan, [])
 
+    def _log_averagine_cache_statistics(self):
+        for label, averagine, stats in self.transformer.averagine_cache_statistics():
+            self.log_message(
+                "%s averagine cache: %d hits, %d misses (%0.1f%% hit rate), %d evictions, "
+                "%0.2fs generating, %d patterns kept" % (
+                    label, stats['hits'], stats['misses'], stats['hit_rate'] * 100,
+                    stats['evictions'], stats['generation_time'], stats['size']))
+            if self.verbose:
+                self.log_message("%s %r: %r" % (label, averagine, stats))
+
     def _silence_loggers(self):
         nologs = ["deconvolution_scan_processor"]
         if not self.deconvolute:
@@ -416,6 +446,11 @@ class DeconvolutingScanTransformingProcess(Process, ScanTransformMixin):
                 self.output_queue.join()
 
         self.log_message("Done (%d scans)" % i)
+        if self.deconvolute:
+            self._log_averagine_cache_statistics()
+        if self.profile_queue is not None:
+            self.profile_queue.put((transformer.ms1_deconvolution_profile,
+                                    transformer.msn_deconvolution_profile))
 
         if self.no_more_event is None:
             self.output_queue.put((DONE, DONE, DONE))
@@ -1,11 +1,20 @@
 '''Defines the base class for organizing the multiprocessing deconvolution algorithm
 encapsulating all behaviors from start to finish.
 '''
+import os
+import shutil
+import tempfile
 import multiprocessing
 
 from multiprocessing import JoinableQueue
 
-from ms_deisotope.processor import MSFileLoader
+try:
+    from Queue import Empty as QueueEmpty
+except ImportError:
+    from queue import Empty as QueueEmpty
+
+from ms_deisotope.processor import MSFileLoader, prepopulate_averagine_cache
+from ms_deisotope.deconvolution import DeconvolutionProfile
 
 from ms_deisotope.feature_map.quick_index import index as build_scan_index
 from ms_deisotope.task import TaskBase
@@ -31,6 +40,12 @@ class ScanGeneratorBase(object):
         Whether or not to process intervals around MSn precursors in MS1 scans or not.
     ignore_tandem_scans: bool
         Whether or not to ignore MSn scans.
+    ms1_deconvolution_profile: :class:`~.DeconvolutionProfile`
+        The time spent in each phase of deconvolution of MS1 scans, once all scans
+        have been generated, if deconvolution was profiled.
+    msn_deconvolution_profile: :class:`~.DeconvolutionProfile`
+        The time spent in each phase of deconvolution of MSn scans, once all scans
+        have been generated, if deconvolution was profiled.
     """
     def configure_iteration(self, start_scan=None, end_scan=None, max_scans=None):
         """Set :attr:`_iterator` to the result of :meth:`make_iterator`
@@ -66,6 +81,9 @@ class ScanGeneratorBase(object):
 
     _iterator = None
 
+    ms1_deconvolution_profile = None
+    msn_deconvolution_profile = None
+
     def __iter__(self):
         return self
 
@@ -130,7 +148,7 @@ class ScanGenerator(TaskBase, ScanGeneratorBase):
                  ms1_peak_picking_args=None, msn_peak_picking_args=None,
                  ms1_deconvolution_args=None, msn_deconvolution_args=None,
                  extract_only_tandem_envelopes=False, ignore_tandem_scans=False,
-                 ms1_averaging=0, deconvolute=True, verbose=False):
+                 ms1_averaging=0, deconvolute=True, verbose=False, profile_deconvolution=False):
         self.ms_file = ms_file
         self.ignore_tandem_scans = ignore_tandem_scans
 
@@ -160,6 +178,12 @@ class ScanGenerator(TaskBase, ScanGeneratorBase):
         self.verbose = verbose
         self.log_controller = self.ipc_logger()
 
+        self.profile_deconvolution = profile_deconvolution
+        self._profile_queue = None
+        self.ms1_deconvolution_profile = None
+        self.msn_deconvolution_profile = None
+        self._averagine_snapshot_dir = None
+
     @property
     def scan_source(self):
         return self.ms_file
@@ -196,6 +220,53 @@ class ScanGenerator(TaskBase, ScanGeneratorBase):
             # something else went wrong
             self.error("An error occurred while pre-indexing.", e)
 
+    def _prepare_averagine_snapshots(self):
+        """Write the averagine cache snapshots the deconvolution processes read from
+        once, in this process, so that each of them maps the same patterns instead of
+        generating its own copy.
+
+        If there are several deconvolution processes, or the averagine caches are bounded,
+        and no ``averagine_snapshot`` was given, the snapshots are written to a temporary
+        directory which is removed when iteration finishes. A bounded cache without a
+        snapshot would otherwise generate its patterns on demand, centred on the first
+        m/z seen in each bin, and give slightly different envelopes.
+
+        Caches which interpolate from an ``averagine_table_step`` table keep no patterns
+        to share, so no snapshot is written for them.
+        """
+        if not self.deconvoluting:
+            return
+        for name, label in (("ms1_deconvolution_args", "ms1"), ("msn_deconvolution_args", "msn")):
+            deconvolution_args = getattr(self, name)
+            if not deconvolution_args or 'averagine' not in deconvolution_args:
+                continue
+            if deconvolution_args.get('averagine_table_step'):
+                continue
+            deconvolution_args = dict(deconvolution_args)
+            if deconvolution_args.get('averagine_snapshot') is None:
+                bounded = (deconvolution_args.get('averagine_cache_max_size') or
+                           deconvolution_args.get('averagine_cache_max_bytes'))
+                if self.number_of_helpers < 1 and not bounded:
+                    continue
+                if self._averagine_snapshot_dir is None:
+                    self._averagine_snapshot_dir = tempfile.mkdtemp(prefix="ms-deisotope-averagine-")
+                deconvolution_args['averagine_snapshot'] = os.path.join(
+                    self._averagine_snapshot_dir, "%s-averagine.snapshot" % (label, ))
+            setattr(self, name, deconvolution_args)
+            self.log("Building %s averagine cache snapshot %s" % (
+                label.upper(), deconvolution_args['averagine_snapshot']))
+            # The deconvolution processes have not started yet, so their share of
+            # the machine is free to generate patterns with
+            snapshot_args = dict(deconvolution_args)
+            snapshot_args.setdefault('averagine_cache_processes', min(
+                self.number_of_helpers + 1, multiprocessing.cpu_count()))
+            prepopulate_averagine_cache(snapshot_args)
+
+    def _remove_averagine_snapshots(self):
+        if self._averagine_snapshot_dir is not None:
+            shutil.rmtree(self._averagine_snapshot_dir, ignore_errors=True)
+            self._averagine_snapshot_dir = None
+
     def _make_interval_tree(self, start_scan, end_scan):
         reader = MSFileLoader(self.ms_file, decode_binary=False)
         if start_scan is not None:
@@ -225,7 +296,27 @@ class ScanGenerator(TaskBase, ScanGeneratorBase):
             log_handler=self.log_controller.sender(),
             ms1_averaging=self.ms1_averaging,
             deconvolute=self.deconvoluting,
-            verbose=self.verbose)
+            verbose=self.verbose,
+            profile_queue=self._profile_queue)
+
+    def _collect_deconvolution_profiles(self, timeout=30):
+        """Merge the deconvolution profiles sent by each worker process which was started
+        into :attr:`ms1_deconvolution_profile` and :attr:`msn_deconvolution_profile`.
+        """
+        if self._profile_queue is None:
+            return
+        workers = [self._deconv_process] + list(self._deconv_helpers or [])
+        n_started = sum(1 for worker in workers if worker is not None and worker.pid is not None)
+        self.ms1_deconvolution_profile = DeconvolutionProfile()
+        self.msn_deconvolution_profile = DeconvolutionProfile()
+        for _ in range(n_started):
+            try:
+                ms1_profile, msn_profile = self._profile_queue.get(True, timeout)
+            except QueueEmpty:
+                self.log("Not all deconvolution profiles were received")
+                break
+            self.ms1_deconvolution_profile.merge(ms1_profile)
+            self.msn_deconvolution_profile.merge(msn_profile)
 
     def _make_collator(self):
         return ScanCollator(
@@ -241,6 +332,8 @@ class ScanGenerator(TaskBase, ScanGeneratorBase):
             # Not all platforms permit limiting the size of queues
             self._input_queue = JoinableQueue()
             self._output_queue = JoinableQueue()
+        if self.profile_deconvolution:
+            self._profile_queue = multiprocessing.Queue()
 
         self._preindex_file()
 
@@ -249,6 +342,7 @@ class ScanGenerator(TaskBase, ScanGeneratorBase):
             self._make_interval_tree(start_scan, end_scan)
 
         self._terminate()
+        self._prepare_averagine_snapshots()
         self._scan_yielder_process = ScanIDYieldingProcess(
             self.ms_file, self._input_queue, start_scan=start_scan, end_scan=end_scan,
             max_scans=max_scans, no_more_event=self.scan_ids_exhausted_event,
@@ -270,12 +364,15 @@ class ScanGenerator(TaskBase, ScanGeneratorBase):
 
         for scan in self._order_manager:
             yield scan
+        self._collect_deconvolution_profiles()
         self.log_controller.stop()
         self.join()
         self._terminate()
+        self._remove_averagine_snapshots()
 
     def configure_iteration(self, start_scan=None, end_scan=None, max_scans=None):
         self._iterator = self.make_iterator(start_scan, end_scan, max_scans)
 
     def close(self):
         self._terminate()
+        self._remove_averagine_snapshots()
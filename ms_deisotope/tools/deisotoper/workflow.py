@@ -77,7 +77,7 @@ class SampleConsumer(TaskBase):
                  msn_deconvolution_args=None, start_scan_id=None, end_scan_id=None, storage_path=None,
                  sample_name=None, storage_type=None, n_processes=5,
                  extract_only_tandem_envelopes=False, ignore_tandem_scans=False,
-                 ms1_averaging=0, deconvolute=True, verbose=False):
+                 ms1_averaging=0, deconvolute=True, verbose=False, profile_deconvolution=False):
 
         if storage_type is None:
             storage_type = ThreadedMzMLScanStorageHandler
@@ -117,7 +117,7 @@ class SampleConsumer(TaskBase):
             extract_only_tandem_envelopes=extract_only_tandem_envelopes,
             ignore_tandem_scans=ignore_tandem_scans,
             ms1_averaging=ms1_averaging, deconvolute=deconvolute,
-            verbose=verbose)
+            verbose=verbose, profile_deconvolution=profile_deconvolution)
 
         self.start_scan_id = start_scan_id
         self.end_scan_id = end_scan_id
@@ -181,6 +181,11 @@ class SampleConsumer(TaskBase):
                 last_scan_time = scan.scan_time
                 last_scan_index = scan.index
         self.log("Finished Recieving Scans")
+        if self.scan_generator.ms1_deconvolution_profile is not None:
+            self.log("MS1 Deconvolution Profile\n%s" % (
+                self.scan_generator.ms1_deconvolution_profile.report(), ))
+            self.log("MSn Deconvolution Profile\n%s" % (
+                self.scan_generator.msn_deconvolution_profile.report(), ))
         sink.complete()
         self.log("Completed Sample %s" % (self.sample_name,))
         sink.commit()
@@ -137,13 +137,21 @@ class DeconvolutionProcessResult(object):
         The resulting deconvoluted peaks
     priorities : list
         The extracted results from the targeted deconvolution list
+    profile : :class:`~.DeconvolutionProfile`, optional
+        The time spent in each phase of deconvolution and the number of fits
+        considered, if profiling was requested.
+    degraded : list
+        The cheaper strategies the deconvoluter fell back to because its time or work
+        budget was exceeded. Empty if the deconvolution ran to completion.
     """
 
-    def __init__(self, deconvoluter, peak_set, priorities, errors=None):
+    def __init__(self, deconvoluter, peak_set, priorities, errors=None, profile=None, degraded=None):
         self.deconvoluter = deconvoluter
         self.peak_set = peak_set
         self.priorities = priorities
         self.errors = errors
+        self.profile = profile
+        self.degraded = degraded or []
 
     def __getitem__(self, i):
         if i == 0:
@@ -224,6 +232,33 @@ def da2ppm(mass, error_tolerance):
     return (x - mass) / mass
 
 
+def overrides_method(obj, name, implementation):
+    """Check whether the class of `obj` defines the method `name` in a class
+    which comes before the one defining the method `implementation`, so that
+    `implementation`, which reproduces what `name` does, no longer agrees with it.
+
+    Parameters
+    ----------
+    obj : object
+        The object to inspect
+    name : str
+        The name of the method which may be overridden
+    implementation : str
+        The name of the method which bypasses `name`
+
+    Returns
+    -------
+    bool
+    """
+    for cls in type(obj).__mro__:
+        attributes = vars(cls)
+        if implementation in attributes:
+            return False
+        if name in attributes:
+            return True
+    return False
+
+
 def dict_proxy(attribute):
     """Return a decorator for a class to give it a `dict`-like API proxied
     from one of its attributes